@@ -0,0 +1,101 @@
+"""
+Perfil Redis para despliegues multi-proceso (USE_REDIS=1)
+Channel layer, caché y Celery apuntan a Redis para que `trading_loop`, Daphne y
+los workers de gunicorn compartan grupos de WebSocket y caché. Cada servicio usa
+su propia base lógica del mismo servidor y un pool de conexiones acotado.
+"""
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit
+
+# Bases lógicas por servicio (sobre REDIS_URL)
+CHANNELS_DB = 0
+CACHE_DB = 1
+CELERY_BROKER_DB = 2
+CELERY_RESULTS_DB = 3
+
+
+def redis_db_url(url, db):
+    """Misma URL de Redis apuntando a la base lógica `db`"""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, f'/{db}', parts.query, parts.fragment))
+
+
+def channel_layers(url, max_connections=20, capacity=1500, expiry=10):
+    """CHANNEL_LAYERS con channels_redis (un pool por event loop, acotado a `max_connections`)"""
+    return {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [{'address': url, 'max_connections': max_connections}],
+                'prefix': 'intradia',
+                'capacity': capacity,
+                'expiry': expiry,
+                'group_expiry': 86400,
+            },
+        },
+    }
+
+
+def caches(url, max_connections=50, timeout=300):
+    """CACHES con el backend Redis de Django y un BlockingConnectionPool compartido por hilos"""
+    return {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': url,
+            'TIMEOUT': timeout,
+            'KEY_PREFIX': 'intradia',
+            'OPTIONS': {
+                'pool_class': 'redis.BlockingConnectionPool',
+                'max_connections': max_connections,
+                'timeout': 2,  # Espera máxima por una conexión libre del pool
+                'socket_connect_timeout': 2,
+                'socket_timeout': 2,
+                'health_check_interval': 30,
+            },
+        },
+    }
+
+
+def celery_settings(broker_url, result_url, max_connections=20):
+    """Claves CELERY_* para broker y resultados en Redis"""
+    return {
+        'CELERY_BROKER_URL': broker_url,
+        'CELERY_RESULT_BACKEND': result_url,
+        'CELERY_RESULT_EXPIRES': 3600,
+        'CELERY_BROKER_POOL_LIMIT': 10,
+        'CELERY_REDIS_MAX_CONNECTIONS': max_connections,
+        'CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP': True,
+        'CELERY_BROKER_TRANSPORT_OPTIONS': {
+            'visibility_timeout': 3600,
+            'socket_connect_timeout': 5,
+            'socket_timeout': 5,
+            'health_check_interval': 30,
+        },
+    }
+
+
+@contextmanager
+def fake_redis_server(host='127.0.0.1', port=0):
+    """
+    Servidor Redis falso por TCP (fakeredis) para tests y desarrollo local.
+
+    Habla el protocolo real, así que channels_redis, el caché de Django y kombu
+    se conectan como a un Redis de verdad. Los scripts Lua de channels_redis
+    requieren `lupa`. Retorna la URL base (`redis://host:port/0`).
+    """
+    import threading
+    from fakeredis import TcpFakeServer
+
+    server = TcpFakeServer((host, port))
+    # Los hilos de cada cliente no deben bloquear el cierre del servidor
+    server.daemon_threads = True
+    server.block_on_close = False
+    thread = threading.Thread(target=server.serve_forever, name='fake-redis', daemon=True)
+    thread.start()
+    try:
+        bound_host, bound_port = server.server_address[:2]
+        yield f'redis://{bound_host}:{bound_port}/0'
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=5)
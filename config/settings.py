@@ -286,6 +286,28 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_CACHE_BACKEND = 'django-cache'
 
+# Perfil de producción multi-proceso: channel layer, caché y Celery en Redis.
+# Sin él, los group_send del trading_loop no llegan a Daphne y cada worker tiene su caché.
+USE_REDIS = os.getenv('USE_REDIS', '').lower() in {'1', 'true', 'yes'}
+if USE_REDIS:
+    from config.redis_profile import (
+        CACHE_DB, CELERY_BROKER_DB, CELERY_RESULTS_DB, CHANNELS_DB,
+        caches, celery_settings, channel_layers, redis_db_url,
+    )
+    REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))
+    if 'channels' in INSTALLED_APPS:
+        CHANNEL_LAYERS = channel_layers(
+            os.getenv('REDIS_CHANNELS_URL', redis_db_url(REDIS_URL, CHANNELS_DB)),
+            max_connections=int(os.getenv('REDIS_CHANNELS_MAX_CONNECTIONS', '20')),
+        )
+    CACHES = caches(os.getenv('REDIS_CACHE_URL', redis_db_url(REDIS_URL, CACHE_DB)),
+                    max_connections=REDIS_MAX_CONNECTIONS)
+    globals().update(celery_settings(
+        os.getenv('CELERY_BROKER_URL', redis_db_url(REDIS_URL, CELERY_BROKER_DB)),
+        os.getenv('CELERY_RESULT_BACKEND', redis_db_url(REDIS_URL, CELERY_RESULTS_DB)),
+        max_connections=REDIS_MAX_CONNECTIONS,
+    ))
+
 TIME_ZONE = os.getenv('TIMEZONE', TIME_ZONE)
 
 # Celery Beat schedule (ejemplos, ajustar símbolos vía env)
@@ -307,12 +329,6 @@ try:
             'schedule': 300.0,
             'args': (SYMBOLS[0], 1, '5m'),  # zone_id dummy, será inyectado desde runtime
         },
-        # TRADING AUTOMÁTICO - Procesar TODOS los instrumentos activos cada 2 segundos
-        'auto-trading-all-symbols': {
-            'task': 'engine.tasks.process_all_active_symbols',
-            'schedule': 2.0,  # Cada 2 segundos para no sobrecargar
-            'args': (),
-        },
         # Obtener datos frescos cada hora
         'fetch-fresh-data': {
             'task': 'engine.tasks.fetch_historical_data',
@@ -325,11 +341,45 @@ try:
             'schedule': 60.0,  # cada 60 segundos
             'args': (5,),
         },
+        # Retención de ticks: archivar fuera de la ventana caliente y resumir en velas 1m
+        'compact-ticks': {
+            'task': 'engine.tasks.compact_ticks_task',
+            'schedule': 3600.0,  # cada hora
+            'args': (),
+        },
 }
+    # TRADING AUTOMÁTICO - Procesar TODOS los instrumentos activos cada 2 segundos.
+    # En modo push (TRADING_LOOP_MODE=push) la evaluación la disparan los ticks
+    # desde trading_loop, así que el barrido periódico se desactiva.
+    if os.getenv('TRADING_LOOP_MODE', 'sweep') != 'push':
+        CELERY_BEAT_SCHEDULE['auto-trading-all-symbols'] = {
+            'task': 'engine.tasks.process_all_active_symbols',
+            'schedule': 2.0,  # Cada 2 segundos para no sobrecargar
+            'args': (),
+        }
 except ImportError:
     # Celery no está instalado, usar configuración vacía
     CELERY_BEAT_SCHEDULE = {}
 
+# Bus de ticks entre procesos (save_realtime_tick -> trading_loop): sockets Unix en este directorio
+TICK_BUS_DIR = Path(os.getenv('TICK_BUS_DIR', '/tmp/intradia-tickbus'))
+TICK_BUS_ENABLED = os.getenv('TICK_BUS_ENABLED', '1').lower() in {'1', 'true', 'yes'}
+
+# Archivo columnar de ticks (.npy por símbolo y día) para replay y análisis offline
+TICK_ARCHIVE_DIR = Path(os.getenv('TICK_ARCHIVE_DIR', str(BASE_DIR / 'data' / 'tick_archive')))
+
+# Bitácora de decisiones del trading loop (JSONL con rotación)
+DECISION_JOURNAL_ENABLED = os.getenv('DECISION_JOURNAL_ENABLED', '1').lower() in {'1', 'true', 'yes'}
+DECISION_JOURNAL_DIR = Path(os.getenv('DECISION_JOURNAL_DIR', str(BASE_DIR / 'data' / 'decisions')))
+
+# Perfilador de consultas ORM por ciclo del trading loop (opcional)
+QUERY_PROFILE_ENABLED = os.getenv('QUERY_PROFILE_ENABLED', '0').lower() in {'1', 'true', 'yes'}
+QUERY_BUDGET_PER_CYCLE = int(os.getenv('QUERY_BUDGET_PER_CYCLE', '0'))  # 0 = sin presupuesto
+QUERY_PROFILE_N_PLUS_ONE = int(os.getenv('QUERY_PROFILE_N_PLUS_ONE', '5'))
+
+# Antigüedad máxima (s) del read-model de /engine/trades/ antes de reconstruirlo en la vista
+TRADES_SNAPSHOT_MAX_AGE = float(os.getenv('TRADES_SNAPSHOT_MAX_AGE', '30'))
+
 # Deriv API Configuration
 DERIV_API_TOKEN = os.getenv('DERIV_API_TOKEN', 'rOB3RNqw1EevPzu')
 DERIV_ACCOUNT_ID = os.getenv('DERIV_ACCOUNT_ID', '')
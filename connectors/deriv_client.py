@@ -2,14 +2,18 @@ from __future__ import annotations
 
 import os
 import time
-import json
-import websocket
 import threading
+from concurrent.futures import CancelledError, Future, TimeoutError as FutureTimeoutError
 from dataclasses import dataclass
 from typing import Callable, Dict, Any, Optional
 
 from tenacity import retry, stop_after_attempt, wait_exponential_jitter
 
+from connectors.deriv_connector import DerivConnector, close_connector, get_connector
+
+# Cuenta dtrade REAL que el usuario quiere usar
+TARGET_LOGINID = 'CR9822432'
+
 
 @dataclass
 class OrderRequest:
@@ -95,10 +99,9 @@ class DerivClient:
         self.last_call_ts = 0.0
         self.failure_count = 0
         self.circuit_open_until = 0.0
-        self.ws = None
-        self.connected = False
-        self.response_data = {}
-        self.response_event = threading.Event()
+        # Los sockets los gestiona el pool compartido del proceso (connectors.deriv_connector)
+        self._connector: Optional[DerivConnector] = None
+        self._ratelimit_lock = threading.Lock()
         # Caché simple para contratos ofrecidos: key=(symbol, contract_type, duration)
         self._contracts_cache: Dict[str, float] = {}
         self._cache_ttl_seconds = 600  # 10 minutos
@@ -109,9 +112,6 @@ class DerivClient:
         # Account list y cuenta seleccionada
         self.account_list: list = []
         self.current_loginid: Optional[str] = None
-        # Thread para heartbeat (mantener conexión viva)
-        self._heartbeat_thread: Optional[threading.Thread] = None
-        self._heartbeat_running = False
         self._last_attempted_token_loginid = False  # Rastrear si Deriv rechazó token:loginid
         # Métricas de reconexión
         self.reconnect_attempts = 0
@@ -134,175 +134,73 @@ class DerivClient:
         now = time.time()
         recent_10m = [t for t in self._reconnect_history if now - t <= 600]
         return {
-            'total': self.reconnect_attempts,
+            'total': self.reconnect_attempts + (self._connector.reconnects if self._connector else 0),
             'last_10m': len(recent_10m)
         }
 
+    @property
+    def connected(self) -> bool:
+        """True si el pool compartido tiene al menos un socket autorizado"""
+        return self._connector is not None and self._connector.connected
+
+    @property
+    def connector(self) -> Optional[DerivConnector]:
+        """Conector del pool compartido (None hasta autenticar)"""
+        return self._connector
+
+    def close(self) -> None:
+        """Cerrar el pool de sockets de este token (afecta a todo el proceso)"""
+        if self._connector is not None:
+            close_connector(self._connector.api_token, self._connector.app_id)
+            self._connector = None
+
+    def _auth_token(self) -> str:
+        """Token de authorize: token:loginid para REAL salvo que Deriv ya lo haya rechazado"""
+        if not self.is_demo and not self._last_attempted_token_loginid:
+            return f"{self.api_token}:{TARGET_LOGINID}"
+        return self.api_token
+
     def _ratelimit(self):
-        now = time.time()
-        min_interval = 1.0 / self.rate_limit_per_sec
-        if now - self.last_call_ts < min_interval:
-            time.sleep(min_interval - (now - self.last_call_ts))
-        self.last_call_ts = time.time()
+        with self._ratelimit_lock:
+            now = time.time()
+            min_interval = 1.0 / self.rate_limit_per_sec
+            if now - self.last_call_ts < min_interval:
+                time.sleep(min_interval - (now - self.last_call_ts))
+            self.last_call_ts = time.time()
 
-    def _connect_websocket_with_token_only(self):
-        """Conexión WebSocket que solo envía el token (sin loginid)"""
-        try:
-            def on_message(ws, message):
-                try:
-                    data = json.loads(message)
-                    # Siempre guardar respuestas importantes (authorize, buy, proposal, balance, proposal_open_contract, etc.)
-                    if any(key in data for key in ['authorize', 'buy', 'proposal', 'balance', 'proposal_open_contract', 'contracts_for', 'ticks_history', 'history', 'error']):
-                        self.response_data = data
-                        self.response_event.set()
-                        # Debug: mostrar qué se recibió
-                        if 'authorize' in data:
-                            auth_data = data.get('authorize', {})
-                            if auth_data:
-                                print(f"📨 Respuesta authorize recibida: loginid={auth_data.get('loginid', 'N/A')}, balance={auth_data.get('balance', 0)}")
-                    elif not self.response_data:
-                        # Si no hay datos previos y no es una respuesta esperada, guardar igual
-                        self.response_data = data
-                        self.response_event.set()
-                except json.JSONDecodeError:
-                    print(f"❌ Error parsing WebSocket message: {message[:100]}")
-            
-            def on_error(ws, error):
-                # Log solo para errores críticos
-                # print(f"WebSocket error: {error}")
-                self.connected = False
-            
-            def on_close(ws, close_status_code, close_msg):
-                # Log solo para debug
-                # print("WebSocket connection closed")
-                self.connected = False
-                self._stop_heartbeat()
-            
-            def on_open(ws):
-                # Log solo para debug
-                # print("WebSocket connection opened")
-                self.connected = True
-                # IMPORTANTE: Enviar SOLO el token (sin loginid)
-                auth_msg = {
-                    "authorize": self.api_token
-                }
-                ws.send(json.dumps(auth_msg))
-                
-                # Iniciar heartbeat para mantener conexión viva
-                self._start_heartbeat()
-            
-            self.ws = websocket.WebSocketApp(
-                f"wss://ws.derivws.com/websockets/v3?app_id={self.app_id}",
-                on_message=on_message,
-                on_error=on_error,
-                on_close=on_close,
-                on_open=on_open
-            )
-            
-            # Ejecutar en hilo separado
-            wst = threading.Thread(target=self.ws.run_forever)
-            wst.daemon = True
-            wst.start()
-            
-            # Esperar conexión
-            time.sleep(2)
-            return self.connected
-            
-        except Exception as e:
-            print(f"Error connecting WebSocket: {e}")
-            return False
-    
-    def _connect_websocket(self):
-        """Conectar a WebSocket de Deriv"""
-        if self.connected and self.ws:
-            return True
-            
+    def send_request_async(self, payload: Dict[str, Any], timeout: float = 30) -> Future:
+        """
+        Enviar una petición sin bloquear a través del pool compartido
+
+        El conector etiqueta cada petición con req_id, así que varias peticiones
+        (proposal, buy, proposal_open_contract...) pueden estar en vuelo a la vez.
+
+        Returns:
+            Future que se resuelve con el dict de respuesta
+        """
+        if self._connector is None:
+            raise ConnectionError('not_authenticated')
+        return self._connector.submit(payload, timeout)
+
+    def wait_response(self, future: Future, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Esperar la respuesta de una petición enviada con send_request_async
+
+        Returns:
+            Dict de respuesta, o None si se agotó el timeout
+        """
         try:
-            def on_message(ws, message):
-                try:
-                    data = json.loads(message)
-                    
-                    # Siempre guardar respuestas importantes (authorize, buy, proposal, balance, etc.)
-                    # Estas respuestas deben activar el evento para que el código que espera pueda continuar
-                    if any(key in data for key in ['authorize', 'buy', 'proposal', 'balance', 'proposal_open_contract', 'contracts_for', 'ticks_history', 'history', 'error']):
-                        self.response_data = data
-                        self.response_event.set()
-                    elif not self.response_data:
-                        # Si no hay datos previos y no es una respuesta esperada, guardar igual
-                        # (puede ser una respuesta inesperada pero válida)
-                        self.response_data = data
-                        self.response_event.set()
-                    
-                    # Procesar ticks en tiempo real
-                    msg_type = data.get('msg_type', '')
-                    if msg_type == 'tick':
-                        tick_data = data.get('tick', {})
-                        if tick_data:
-                            # Aquí podrías procesar ticks en tiempo real
-                            # Por ejemplo, actualizar precios, detectar señales, etc.
-                            pass
-                except json.JSONDecodeError:
-                    print(f"❌ Error parsing WebSocket message: {message[:100]}")
-            
-            def on_error(ws, error):
-                print(f"WebSocket error: {error}")
-                self.connected = False
-            
-            def on_close(ws, close_status_code, close_msg):
-                # Log solo para debug
-                # print("WebSocket connection closed")
-                self.connected = False
-            
-            def on_open(ws):
-                # Log solo para debug
-                # print("WebSocket connection opened")
-                self.connected = True
-                # IMPORTANTE: Autenticar con loginid específico desde el inicio
-                # Si Deriv ya rechazó token:loginid anteriormente, usar solo token
-                target_loginid = 'CR9822432'  # Cuenta dtrade REAL que queremos usar
-                
-                # Intentar autenticar con loginid específico desde el inicio
-                # Si Deriv ya rechazó token:loginid antes, no intentar de nuevo
-                if not self.is_demo and not self._last_attempted_token_loginid:
-                    auth_msg = {
-                        "authorize": f"{self.api_token}:{target_loginid}"
-                    }
-                    print(f"🔐 Autenticando con cuenta REAL: {target_loginid}")
-                else:
-                    # Si es demo O si Deriv rechazó token:loginid antes, usar solo token
-                    auth_msg = {
-                        "authorize": self.api_token
-                    }
-                    if self.is_demo:
-                        print(f"🔐 Autenticando con cuenta DEMO (token solo)")
-                    else:
-                        print(f"🔐 Autenticando con cuenta REAL (token solo, Deriv rechazó token:loginid)")
-                
-                ws.send(json.dumps(auth_msg))
-                
-                # Iniciar heartbeat para mantener conexión viva
-                self._start_heartbeat()
-            
-            self.ws = websocket.WebSocketApp(
-                "wss://ws.derivws.com/websockets/v3?app_id=1089",
-                on_message=on_message,
-                on_error=on_error,
-                on_close=on_close,
-                on_open=on_open
-            )
-            
-            # Ejecutar en hilo separado
-            wst = threading.Thread(target=self.ws.run_forever)
-            wst.daemon = True
-            wst.start()
-            
-            # Esperar conexión
-            time.sleep(2)
-            return self.connected
-            
-        except Exception as e:
-            print(f"Error connecting WebSocket: {e}")
-            return False
+            return future.result(timeout=timeout)
+        except (FutureTimeoutError, TimeoutError, CancelledError):
+            # Cancelar para que el conector la retire de su tabla de pendientes
+            future.cancel()
+            return None
+        except ConnectionError as e:
+            return {'error': {'code': 'ConnectionClosed', 'message': str(e)}}
+
+    def send_request(self, payload: Dict[str, Any], timeout: float = 10) -> Optional[Dict[str, Any]]:
+        """Enviar una petición y esperar su respuesta (None si timeout)"""
+        return self.wait_response(self.send_request_async(payload, timeout), timeout)
 
     def authenticate(self):
         """Autenticar usando WebSocket y seleccionar cuenta real/demo"""
@@ -315,15 +213,16 @@ class DerivClient:
         # print(f"🔍 Target account type: {'DEMO' if self.is_demo else 'REAL'}")
         
         try:
-            if not self._connect_websocket():
-                self._record_reconnect('fallo_conexion_inicial')
-                print("❌ Failed to connect WebSocket")
-                return False
+            # El pool ya autorizado responde de inmediato; si no, espera el authorize real
+            connector = get_connector(self._auth_token(), self.app_id)
+            if not connector.connected:
+                if not self.is_demo and not self._last_attempted_token_loginid:
+                    print(f"🔐 Autenticando con cuenta REAL: {TARGET_LOGINID}")
+                elif self.is_demo:
+                    print(f"🔐 Autenticando con cuenta DEMO (token solo)")
+            auth_response = connector.start(timeout=15)
             
-            # Esperar respuesta de autenticación
-            if self.response_event.wait(timeout=10):
-                auth_response = self.response_data
-                
+            if auth_response is not None:
                 # Verificar si hay error en la respuesta (puede ser por usar formato token:loginid)
                 if auth_response.get('error'):
                     error_info = auth_response.get('error', {})
@@ -335,33 +234,15 @@ class DerivClient:
                         # Marcar que Deriv rechazó token:loginid (no intentar de nuevo)
                         self._last_attempted_token_loginid = True
                         print(f"⚠️  Deriv rechazó formato token:loginid, reintentando con token solo...")
-                        # Cerrar conexión actual
-                        self._stop_heartbeat()
-                        if self.ws:
-                            try:
-                                self.ws.close()
-                            except:
-                                pass
-                        self.connected = False
-                        time.sleep(2)  # Dar más tiempo para cerrar conexión
-                        
-                        # Limpiar respuesta anterior
-                        self.response_data = {}
-                        self.response_event.clear()
-                        
-                        # Reintentar autenticación con solo token (modificar on_open para usar solo token)
-                        # Necesitamos crear una nueva conexión que envíe solo el token
+                        # Cerrar el pool rechazado y abrir uno con solo token
+                        close_connector(connector.api_token, connector.app_id)
                         self._record_reconnect('token_loginid_rejected')
-                        if not self._connect_websocket_with_token_only():
-                            print("❌ Failed to reconnect WebSocket")
-                            return False
-                        
-                        # Esperar nueva respuesta
-                        if not self.response_event.wait(timeout=15):
+                        connector = get_connector(self._auth_token(), self.app_id)
+                        auth_response = connector.start(timeout=15)
+                        if auth_response is None:
                             print("❌ Timeout esperando autenticación")
                             return False
                         
-                        auth_response = self.response_data
                         # Verificar que la respuesta es válida
                         if not auth_response or not auth_response.get('authorize'):
                             print(f"❌ Respuesta de autenticación inválida: {auth_response}")
@@ -414,7 +295,7 @@ class DerivClient:
                         print(f"⚠️  No se encontró account_list. Respuesta completa keys: {list(auth_response.keys())}")
                 
                 # IMPORTANTE: El usuario ha especificado que SOLO quiere usar la cuenta CR9822432
-                target_loginid = 'CR9822432'  # Cuenta dtrade específica que el usuario quiere usar
+                target_loginid = TARGET_LOGINID
                 default_loginid = authorize_data.get('loginid', '')
                 
                 # Filtrar account_list para incluir SOLO CR9822432
@@ -468,7 +349,9 @@ class DerivClient:
                     'account_type': account_type_from_loginid,
                     'source': 'authorize_response'
                 }
-                self._balance_cache_time = time.time()
+                # El authorize puede venir de un pool ya abierto: usar su antigüedad real
+                self._balance_cache_time = connector.authorized_at or time.time()
+                self._connector = connector
                 
                 print(f"✅ Auth exitosa | Cuenta: {self.current_loginid} ({account_type_from_loginid.upper()}) | Balance: ${auth_balance:.2f}")
                 return True
@@ -485,12 +368,18 @@ class DerivClient:
             traceback.print_exc()
             return False
     
-    def switch_account(self, loginid: str) -> bool:
+    def switch_account(self, loginid: str, drain_timeout: float = 10.0) -> bool:
         """
         Cambiar a una cuenta específica (re-autenticando con loginid)
         
+        Todas las conexiones de un pool se autorizan con el mismo token, también al
+        reconectar. Re-autorizar un solo socket dejaría los demás en la cuenta
+        anterior, así que se abre el pool de `token:loginid` (espera el authorize de
+        todas sus conexiones) y el pool anterior se drena y se cierra.
+        
         Args:
             loginid: Login ID de la cuenta a la que cambiar
+            drain_timeout: Segundos máximos esperando las peticiones en vuelo del pool anterior
             
         Returns:
             True si el cambio fue exitoso, False en caso contrario
@@ -504,36 +393,40 @@ class DerivClient:
             return False
         
         try:
-            # Re-autenticar con loginid específico
-            self.response_event.clear()
-            auth_msg = {
-                "authorize": f"{self.api_token}:{loginid}"
-            }
-            self.ws.send(json.dumps(auth_msg))
+            connector = get_connector(f"{self.api_token}:{loginid}", self.app_id)
+            data = connector.start(timeout=15)
+            if data is None:
+                print("⏰ Timeout waiting for switch_account response")
+                return False
             
-            # Esperar respuesta
-            if self.response_event.wait(timeout=10):
-                data = self.response_data
-                if data.get('authorize', {}).get('error'):
-                    print(f"❌ Error switching account: {data['authorize']['error']}")
-                    return False
-                
-                if data.get('authorize'):
-                    self.current_loginid = loginid
-                    # Limpiar caché de balance al cambiar de cuenta
-                    self.clear_cache()
-                    return True
+            error = data.get('error') or data.get('authorize', {}).get('error')
+            if error or not data.get('authorize'):
+                if error:
+                    print(f"❌ Error switching account: {error}")
                 else:
                     print(f"⚠️  Unexpected response when switching account: {data}")
-                    return False
-            else:
-                print("⏰ Timeout waiting for switch_account response")
+                close_connector(connector.api_token, connector.app_id)
                 return False
+            
+            previous, self._connector = self._connector, connector
+            self.current_loginid = loginid
+            # Limpiar caché de balance al cambiar de cuenta
+            self.clear_cache()
+            if previous is not None and previous is not connector:
+                self._retire_connector(previous, drain_timeout)
+            return True
                 
         except Exception as e:
             print(f"❌ Error switching account: {e}")
             return False
 
+    def _retire_connector(self, connector: DerivConnector, drain_timeout: float) -> None:
+        """Esperar a que terminen las peticiones en vuelo (p.ej. un buy) y cerrar el pool"""
+        deadline = time.time() + drain_timeout
+        while connector.pending and time.time() < deadline:
+            time.sleep(0.05)
+        close_connector(connector.api_token, connector.app_id)
+
     def _cache_key(self, symbol: str, contract_type: str, duration: int) -> str:
         return f"{symbol}:{contract_type}:{duration}"
 
@@ -550,7 +443,6 @@ class DerivClient:
                 return {'error': 'not_connected'}
         
         try:
-            self.response_event.clear()
             req = {
                 "proposal": 1,
                 "amount": float(amount),
@@ -561,9 +453,8 @@ class DerivClient:
                 "duration_unit": "s",
                 "symbol": symbol,
             }
-            self.ws.send(json.dumps(req))
-            if self.response_event.wait(timeout=10):
-                data = self.response_data
+            data = self.send_request(req, timeout=10)
+            if data is not None:
                 if data.get("error"):
                     return {'error': data['error']}
                 
@@ -596,7 +487,7 @@ class DerivClient:
                 return True  # Cambiar de False a True para evitar rechazar trades válidos
         
         # Verificar que WebSocket esté conectado antes de enviar proposal
-        if not self.ws or not self.ws.sock or not self.ws.sock.connected:
+        if not self.connected:
             # Si no está conectado, intentar reconectar, pero si falla, asumir que está ofrecido
             if not self.authenticate():
                 print(f"  ⚠️ {symbol}: WebSocket desconectado para verificar contrato, asumiendo que está ofrecido")
@@ -610,7 +501,6 @@ class DerivClient:
             return True
         
         try:
-            self.response_event.clear()
             req = {
                 "proposal": 1,
                 "amount": 1.0,
@@ -623,19 +513,19 @@ class DerivClient:
             }
             
             # Verificar que WebSocket esté conectado antes de enviar
-            if not self.ws or not self.ws.sock or not self.ws.sock.connected:
+            if not self.connected:
                 print(f"  ⚠️ {symbol}: WebSocket desconectado al enviar proposal, asumiendo que está ofrecido")
                 return True  # Cambiar de False a True para evitar rechazar trades válidos
             
             try:
-                self.ws.send(json.dumps(req))
+                future = self.send_request_async(req)
             except Exception as send_error:
                 # Si falla enviar proposal, asumir que está ofrecido (evitar rechazar por problemas de envío)
                 print(f"  ⚠️ {symbol}: Error enviando proposal: {send_error}, asumiendo que está ofrecido")
                 return True  # Cambiar de False a True para evitar rechazar trades válidos
             
-            if self.response_event.wait(timeout=10):
-                data = self.response_data
+            data = self.wait_response(future, timeout=10)
+            if data is not None:
                 if data.get("error"):
                     error_info = data.get("error", {})
                     error_code = error_info.get('code', '') if isinstance(error_info, dict) else ''
@@ -673,8 +563,6 @@ class DerivClient:
         
         try:
             # Usar WebSocket para obtener datos históricos
-            self.response_event.clear()
-            
             ticks_msg = {
                 "ticks_history": symbol,
                 "granularity": self._convert_timeframe(timeframe),
@@ -682,12 +570,8 @@ class DerivClient:
                 "end": int(time.time())
             }
             
-            self.ws.send(json.dumps(ticks_msg))
-            
-            # Esperar respuesta
-            if self.response_event.wait(timeout=30):
-                data = dict(self.response_data) if isinstance(self.response_data, dict) else self.response_data
-                self.response_data = {}
+            data = self.send_request(ticks_msg, timeout=30)
+            if data is not None:
                 if data.get('error'):
                     print(f"Error WebSocket: {data['error']}")
                     return []
@@ -832,14 +716,9 @@ class DerivClient:
                 if req.take_profit:
                     buy_msg['parameters']['take_profit'] = req.take_profit
             
-            # Enviar orden a través de WebSocket
-            self.response_event.clear()
-            self.ws.send(json.dumps(buy_msg))
-            
-            # Esperar respuesta
-            if self.response_event.wait(timeout=10):
-                data = self.response_data
-                
+            # Enviar orden a través de WebSocket y esperar su respuesta
+            data = self.send_request(buy_msg, timeout=10)
+            if data is not None:
                 if data.get('error'):
                     self.failure_count += 1
                     error_msg = data.get('error', {}).get('message', 'Unknown error')
@@ -866,10 +745,20 @@ class DerivClient:
                 self.circuit_open_until = time.time() + 60
             return {'accepted': False, 'reason': str(e)}
 
+    def _streamed_balance(self) -> Optional[Dict[str, Any]]:
+        """Balance del stream de suscripción del conector, si está vivo (sin llamar a Deriv)"""
+        stream = getattr(self._connector, 'balance_stream', None)
+        return stream.info() if stream is not None else None
+
     def get_balance(self) -> Dict[str, Any]:
         """
         Obtener balance con caché para evitar rate limiting
+
+        Con el stream de balance activo (BalanceService) se lee de memoria.
         """
+        streamed = self._streamed_balance()
+        if streamed is not None:
+            return streamed
         now = time.time()
         
         # Si el caché es válido, retornarlo (evitar llamadas innecesarias)
@@ -888,7 +777,7 @@ class DerivClient:
             self._ratelimit()  # Aplicar rate limiting
             
             # Verificar conexión antes de intentar obtener balance
-            if not self.connected or not self.ws or not self.ws.sock or not self.ws.sock.connected:
+            if not self.connected:
                 # Intentar autenticar una sola vez
                 if not self.authenticate():
                     # Si falla autenticación, usar caché si existe
@@ -910,7 +799,7 @@ class DerivClient:
                 return self._balance_cache_value
             
             # Verificar que WebSocket esté realmente conectado antes de enviar
-            if not self.ws or not self.ws.sock or not self.ws.sock.connected:
+            if not self.connected:
                 # Si no está conectado, usar caché
                 if self._balance_cache_value:
                     print("⚠️ Usando balance en caché (WebSocket desconectado)")
@@ -918,14 +807,12 @@ class DerivClient:
                 return {'balance': 0.0, 'currency': 'USD', 'account_type': 'demo' if self.is_demo else 'real', 'error': 'ws_disconnected'}
             
             # Solicitar balance a Deriv (devolverá balance de la cuenta autenticada actualmente)
-            self.response_event.clear()
-            
             balance_msg = {
                 'balance': 1
             }
             
             try:
-                self.ws.send(json.dumps(balance_msg))
+                future = self.send_request_async(balance_msg)
             except Exception as e:
                 print(f"⚠️ Error enviando mensaje de balance: {e}")
                 # Si falla al enviar, usar caché
@@ -934,69 +821,9 @@ class DerivClient:
                 return {'balance': 0.0, 'currency': 'USD', 'account_type': 'demo' if self.is_demo else 'real', 'error': 'send_failed'}
             
             # Esperar respuesta
-            if self.response_event.wait(timeout=10):
-                data = self.response_data
-                
-                if data.get('error'):
-                    error_info = data['error']
-                    error_code = error_info.get('code', '')
-                    error_msg = error_info.get('message', '')
-                    
-                    print(f"❌ Error obteniendo balance: {error_code} - {error_msg}")
-                    
-                    # Si es rate limit, usar caché anterior si existe (solo caché del websocket)
-                    if error_code == 'RateLimit':
-                        # Mantener caché anterior pero marcar error (solo si viene del websocket)
-                        if self._balance_cache_value:
-                            self._balance_cache_value['error_code'] = 'RateLimit'
-                            self._balance_cache_value['error_message'] = error_msg
-                            self._balance_cache_time = now
-                            return self._balance_cache_value
-                    
-                    # Otro error: retornar caché si existe (solo del websocket)
-                    if self._balance_cache_value:
-                        return self._balance_cache_value
-                    # Si no hay caché, usar account_type basado en is_demo
-                    return {'balance': 0.0, 'currency': 'USD', 'account_type': 'demo' if self.is_demo else 'real', 'error': error_code}
-                
-                balance_info = data.get('balance', {})
-                
-                # Usar current_loginid (CR9822432) para determinar account_type
-                if self.current_loginid == 'CR9822432':
-                    account_type = 'real'
-                    loginid = 'CR9822432'
-                else:
-                    # Fallback si no es CR9822432
-                    if self.current_loginid and (self.current_loginid.startswith('VRTC') or self.current_loginid.startswith('VRT')):
-                        account_type = 'demo'
-                    else:
-                        account_type = 'real' if not self.is_demo else 'demo'
-                    loginid = self.current_loginid or balance_info.get('loginid', '')
-                
-                # Obtener balance del websocket
-                balance_from_ws = float(balance_info.get('balance', 0))
-                response_loginid = balance_info.get('loginid', '')
-                
-                # Construir resultado usando balance del websocket
-                # Marcar account_type según current_loginid (CR9822432 = REAL)
-                result = {
-                    'balance': balance_from_ws,
-                    'currency': balance_info.get('currency', 'USD'),
-                    'loginid': self.current_loginid,  # Siempre usar current_loginid (CR9822432)
-                    'account_type': 'real' if self.current_loginid == 'CR9822432' else account_type
-                }
-                
-                # Log útil: mostrar balance del websocket
-                if response_loginid != self.current_loginid:
-                    print(f"💰 Balance: ${balance_from_ws:.2f} | Auth: {response_loginid} | Target: {self.current_loginid} ({result['account_type'].upper()})")
-                else:
-                    print(f"💰 Balance: ${balance_from_ws:.2f} | Cuenta: {self.current_loginid} ({result['account_type'].upper()})")
-                
-                # Actualizar caché
-                self._balance_cache_value = result
-                self._balance_cache_time = now
-                
-                return result
+            data = self.wait_response(future, timeout=10)
+            if data is not None:
+                return self._balance_from_response(data, now)
             else:
                 # Timeout: usar caché si existe en lugar de mostrar error repetitivo
                 if self._balance_cache_value:
@@ -1019,6 +846,112 @@ class DerivClient:
             # Si no hay caché, usar account_type basado en is_demo
             return {'balance': 0.0, 'currency': 'USD', 'account_type': 'demo' if self.is_demo else 'real', 'error': str(e)}
 
+    async def aget_balance(self) -> Dict[str, Any]:
+        """
+        Versión async de get_balance para vistas ASGI
+
+        Usa el mismo caché; la petición viaja por `DerivConnector.arequest()`, así que
+        la espera de la respuesta no ocupa un hilo. Solo la autenticación inicial
+        (bloqueante) se delega a un hilo.
+        """
+        from asgiref.sync import sync_to_async
+
+        streamed = self._streamed_balance()
+        if streamed is not None:
+            return streamed
+        now = time.time()
+        if (self._balance_cache_value and
+            (now - self._balance_cache_time) < self._balance_cache_ttl and
+            not self._balance_cache_value.get('error')):
+            return self._balance_cache_value
+        if (self._balance_cache_value and
+            (now - self._balance_cache_time) < 30.0 and
+            self._balance_cache_value.get('error_code') == 'RateLimit'):
+            return self._balance_cache_value
+
+        fallback = {'balance': 0.0, 'currency': 'USD', 'account_type': 'demo' if self.is_demo else 'real'}
+        try:
+            if not self.connected:
+                if not await sync_to_async(self.authenticate, thread_sensitive=False)():
+                    if self._balance_cache_value:
+                        return self._balance_cache_value
+                    return {**fallback, 'error': 'auth_failed'}
+            try:
+                data = await self.connector.arequest({'balance': 1}, timeout=10)
+            except TimeoutError:
+                if self._balance_cache_value:
+                    return self._balance_cache_value
+                return {**fallback, 'error': 'timeout'}
+            return self._balance_from_response(data, now)
+        except Exception as e:
+            print(f"❌ Error aget_balance: {e}")
+            if self._balance_cache_value:
+                return self._balance_cache_value
+            return {**fallback, 'error': str(e)}
+
+    def _balance_from_response(self, data: Dict[str, Any], now: float) -> Dict[str, Any]:
+        """Interpretar la respuesta de `balance` y actualizar el caché (compartido por get_balance/aget_balance)"""
+        if data.get('error'):
+            error_info = data['error']
+            error_code = error_info.get('code', '')
+            error_msg = error_info.get('message', '')
+            
+            print(f"❌ Error obteniendo balance: {error_code} - {error_msg}")
+            
+            # Si es rate limit, usar caché anterior si existe (solo caché del websocket)
+            if error_code == 'RateLimit':
+                # Mantener caché anterior pero marcar error (solo si viene del websocket)
+                if self._balance_cache_value:
+                    self._balance_cache_value['error_code'] = 'RateLimit'
+                    self._balance_cache_value['error_message'] = error_msg
+                    self._balance_cache_time = now
+                    return self._balance_cache_value
+            
+            # Otro error: retornar caché si existe (solo del websocket)
+            if self._balance_cache_value:
+                return self._balance_cache_value
+            # Si no hay caché, usar account_type basado en is_demo
+            return {'balance': 0.0, 'currency': 'USD', 'account_type': 'demo' if self.is_demo else 'real', 'error': error_code}
+        
+        balance_info = data.get('balance', {})
+        
+        # Usar current_loginid (CR9822432) para determinar account_type
+        if self.current_loginid == 'CR9822432':
+            account_type = 'real'
+            loginid = 'CR9822432'
+        else:
+            # Fallback si no es CR9822432
+            if self.current_loginid and (self.current_loginid.startswith('VRTC') or self.current_loginid.startswith('VRT')):
+                account_type = 'demo'
+            else:
+                account_type = 'real' if not self.is_demo else 'demo'
+            loginid = self.current_loginid or balance_info.get('loginid', '')
+        
+        # Obtener balance del websocket
+        balance_from_ws = float(balance_info.get('balance', 0))
+        response_loginid = balance_info.get('loginid', '')
+        
+        # Construir resultado usando balance del websocket
+        # Marcar account_type según current_loginid (CR9822432 = REAL)
+        result = {
+            'balance': balance_from_ws,
+            'currency': balance_info.get('currency', 'USD'),
+            'loginid': self.current_loginid,  # Siempre usar current_loginid (CR9822432)
+            'account_type': 'real' if self.current_loginid == 'CR9822432' else account_type
+        }
+        
+        # Log útil: mostrar balance del websocket
+        if response_loginid != self.current_loginid:
+            print(f"💰 Balance: ${balance_from_ws:.2f} | Auth: {response_loginid} | Target: {self.current_loginid} ({result['account_type'].upper()})")
+        else:
+            print(f"💰 Balance: ${balance_from_ws:.2f} | Cuenta: {self.current_loginid} ({result['account_type'].upper()})")
+        
+        # Actualizar caché
+        self._balance_cache_value = result
+        self._balance_cache_time = now
+        
+        return result
+
     def cancel_order(self, order_id: str) -> bool:
         return True
 
@@ -1041,19 +974,12 @@ class DerivClient:
                     return {'error': 'Not connected'}
             
             # Enviar consulta de contrato
-            self.response_event.clear()
-            
             contract_msg = {
                 'contracts_for': 1,
                 'contract_id': contract_id
             }
-            self.ws.send(json.dumps(contract_msg))
-            
-            # Esperar respuesta
-            if self.response_event.wait(timeout=10):
-                data = dict(self.response_data) if isinstance(self.response_data, dict) else self.response_data
-                self.response_data = {}
-                
+            data = self.send_request(contract_msg, timeout=10)
+            if data is not None:
                 if data.get('error'):
                     return {'error': data['error']}
                 
@@ -1083,18 +1009,12 @@ class DerivClient:
                 if not self.authenticate():
                     return {'error': 'Not connected'}
             
-            self.response_event.clear()
-            
             contract_msg = {
                 'proposal_open_contract': 1,
                 'contract_id': contract_id
             }
-            self.ws.send(json.dumps(contract_msg))
-            
-            if self.response_event.wait(timeout=10):
-                data = dict(self.response_data) if isinstance(self.response_data, dict) else self.response_data
-                self.response_data = {}
-                
+            data = self.send_request(contract_msg, timeout=10)
+            if data is not None:
                 if data.get('error'):
                     return {'error': data['error']}
                 
@@ -1126,47 +1046,6 @@ class DerivClient:
             print(f"Error get_open_contract_info: {e}")
             return {'error': str(e)}
     
-    def _start_heartbeat(self):
-        """Iniciar heartbeat para mantener conexión WebSocket viva"""
-        if self._heartbeat_running:
-            return
-        
-        self._heartbeat_running = True
-        
-        def heartbeat_loop():
-            """Loop de heartbeat: enviar ping cada 30 segundos"""
-            while self._heartbeat_running and self.connected:
-                try:
-                    time.sleep(30)  # Esperar 30 segundos entre pings
-                    if self._heartbeat_running and self.connected and self.ws:
-                        # Verificar que el socket esté conectado antes de enviar ping
-                        if hasattr(self.ws, 'sock') and self.ws.sock and hasattr(self.ws.sock, 'connected'):
-                            if self.ws.sock.connected:
-                                # Enviar ping (Deriv usa "ping" como mensaje de texto)
-                                try:
-                                    self.ws.send(json.dumps({"ping": 1}))
-                                except Exception as e:
-                                    # Si falla enviar ping, la conexión probablemente se perdió
-                                    print(f"⚠️ Error enviando heartbeat: {e}")
-                                    self.connected = False
-                                    break
-                            else:
-                                # Socket no conectado, salir del loop
-                                self.connected = False
-                                break
-                        else:
-                            # No hay socket, salir del loop
-                            self.connected = False
-                            break
-                except Exception as e:
-                    # Si hay error en el loop, salir
-                    print(f"⚠️ Error en heartbeat loop: {e}")
-                    self.connected = False
-                    break
-        
-        self._heartbeat_thread = threading.Thread(target=heartbeat_loop, daemon=True)
-        self._heartbeat_thread.start()
-    
     def sell_contract(self, contract_id: str) -> Dict[str, Any]:
         """
         Cerrar/vender un contrato abierto antes de que expire
@@ -1182,18 +1061,13 @@ class DerivClient:
                 if not self.authenticate():
                     return {'error': 'Not connected'}
             
-            self.response_event.clear()
-            
             # En Deriv, para cerrar un contrato se envía el contract_id con price: 0 (vender al precio de mercado)
             sell_msg = {
                 'sell': contract_id,
                 'price': 0  # 0 = vender al precio de mercado actual
             }
-            self.ws.send(json.dumps(sell_msg))
-            
-            if self.response_event.wait(timeout=10):
-                data = self.response_data
-                
+            data = self.send_request(sell_msg, timeout=10)
+            if data is not None:
                 if data.get('error'):
                     return {'error': data['error'].get('message', 'Error desconocido')}
                 
@@ -1212,12 +1086,60 @@ class DerivClient:
         except Exception as e:
             print(f"Error sell_contract: {e}")
             return {'error': str(e)}
-    
-    def _stop_heartbeat(self):
-        """Detener heartbeat"""
-        self._heartbeat_running = False
-        if self._heartbeat_thread and self._heartbeat_thread.is_alive():
-            # Esperar a que termine el thread (máximo 1 segundo)
-            self._heartbeat_thread.join(timeout=1)
-        self._heartbeat_thread = None
 
+
+_shared_clients: Dict[tuple, DerivClient] = {}
+_shared_clients_lock = threading.Lock()
+
+# DerivAPIConfig activa (token, is_demo, app_id): se relee como mucho cada ACTIVE_CONFIG_TTL segundos
+ACTIVE_CONFIG_TTL = 30.0
+_active_config: Optional[tuple] = None
+_active_config_time = 0.0
+
+
+def _active_api_config() -> tuple:
+    global _active_config, _active_config_time
+    now = time.time()
+    if _active_config is not None and now - _active_config_time < ACTIVE_CONFIG_TTL:
+        return _active_config
+    config_key = (None, None, None)
+    try:
+        from trading_bot.models import DerivAPIConfig
+        config = DerivAPIConfig.objects.filter(is_active=True).only('api_token', 'is_demo', 'app_id').first()
+        if config:
+            config_key = (config.api_token, config.is_demo, config.app_id)
+    except Exception:
+        # Sin BD disponible: no cachear, se reintenta en la siguiente llamada
+        return config_key
+    _active_config, _active_config_time = config_key, now
+    return config_key
+
+
+def clear_active_config_cache() -> None:
+    """Forzar la relectura de la DerivAPIConfig activa (p.ej. tras editarla)"""
+    global _active_config
+    _active_config = None
+
+
+def get_deriv_client(api_token: Optional[str] = None, is_demo: Optional[bool] = None,
+                     app_id: Optional[str] = None) -> DerivClient:
+    """
+    DerivClient compartido del proceso para una configuración
+
+    Sin argumentos usa la DerivAPIConfig activa (cacheada `ACTIVE_CONFIG_TTL`
+    segundos, así el hot path no consulta la BD en cada llamada). Todos los
+    clientes con el mismo token comparten además el pool de sockets de
+    `get_connector()`, así que el trading loop, las tareas y las vistas no abren
+    conexiones propias.
+    """
+    if api_token is None:
+        config_token, config_is_demo, config_app_id = _active_api_config()
+        if config_token:
+            api_token, is_demo, app_id = config_token, config_is_demo, config_app_id
+    key = (api_token, is_demo, app_id)
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = DerivClient(api_token=api_token, is_demo=is_demo, app_id=app_id)
+            _shared_clients[key] = client
+        return client
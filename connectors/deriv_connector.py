@@ -0,0 +1,478 @@
+"""
+Conector asyncio de Deriv con pool de conexiones autenticadas
+Un solo event loop por proceso (en un hilo propio) mantiene N sockets autorizados,
+con una única política de reconexión y un único heartbeat. Lo usan el trading loop,
+las tareas de Celery y las vistas (síncronas o async) a través de `get_connector()`.
+"""
+
+from __future__ import annotations
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import websockets
+
+logger = logging.getLogger(__name__)
+
+DERIV_WS_URL = "wss://ws.derivws.com/websockets/v3?app_id={app_id}"
+
+StreamCallback = Callable[[Dict[str, Any]], Any]
+
+
+@dataclass
+class ReconnectPolicy:
+    """Backoff exponencial con jitter compartido por todas las conexiones del pool"""
+    initial_delay: float = 0.5
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+    jitter: float = 0.2
+
+    def delay(self, attempt: int) -> float:
+        base = min(self.max_delay, self.initial_delay * (self.multiplier ** attempt))
+        return base * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class DerivConnection:
+    """
+    Un socket autenticado con despacho por req_id.
+
+    - Las respuestas se entregan al future de su req_id; los mensajes de streams
+      (ticks, balance, proposal_open_contract con subscribe=1) reutilizan el req_id
+      de la petición original y se entregan a su callback.
+    - Si el socket cae, las peticiones en vuelo fallan con ConnectionError, se
+      reconecta según `ReconnectPolicy` y se re-suscriben los streams activos.
+    """
+
+    def __init__(self, url: str, auth_token: str, policy: ReconnectPolicy,
+                 heartbeat_interval: float = 30.0, name: str = 'deriv'):
+        self.url = url
+        self.auth_token = auth_token
+        self.policy = policy
+        self.heartbeat_interval = heartbeat_interval
+        self.name = name
+        self.authorize_response: Optional[Dict[str, Any]] = None
+        self.authorized_at = 0.0
+        self.reconnects = 0
+        self._ws = None
+        self._req_ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._streams: Dict[int, Tuple[Dict[str, Any], StreamCallback]] = {}
+        self._subscription_ids: Dict[int, str] = {}
+        self._ready = asyncio.Event()
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._ready.is_set() and self._ws is not None
+
+    @property
+    def load(self) -> int:
+        return len(self._pending)
+
+    def has_stream(self, subscription_id: str) -> bool:
+        """True si este socket está conectado y lleva el stream `subscription_id`"""
+        return self.connected and subscription_id in list(self._subscription_ids.values())
+
+    async def start(self, timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+        """Arrancar la conexión y esperar al primer authorize (sin sleeps fijos)"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.authorize_response
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._ws is not None:
+            await self._ws.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._fail_pending('connection_closed')
+
+    async def _wait_connected(self, timeout: float) -> None:
+        """Esperar a que termine una reconexión en curso antes de enviar"""
+        if not self.connected:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        if not self.connected:
+            raise ConnectionError(f"{self.name}: no conectado")
+
+    async def request(self, payload: Dict[str, Any], timeout: float = 10.0) -> Dict[str, Any]:
+        """Enviar una petición y esperar su respuesta (TimeoutError / ConnectionError)"""
+        await self._wait_connected(timeout)
+        req_id = next(self._req_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = future
+        try:
+            await self._ws.send(json.dumps(dict(payload, req_id=req_id)))
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{self.name}: timeout esperando req_id={req_id}")
+        except websockets.ConnectionClosed as e:
+            raise ConnectionError(str(e))
+        finally:
+            self._pending.pop(req_id, None)
+
+    async def subscribe(self, payload: Dict[str, Any], callback: StreamCallback,
+                        timeout: float = 10.0) -> Dict[str, Any]:
+        """
+        Abrir un stream (payload con subscribe=1). La primera respuesta se retorna
+        y también se pasa a `callback`, igual que las siguientes.
+        """
+        await self._wait_connected(timeout)
+        req_id = next(self._req_ids)
+        self._streams[req_id] = (payload, callback)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = future
+        try:
+            await self._ws.send(json.dumps(dict(payload, req_id=req_id)))
+            first = await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, websockets.ConnectionClosed) as e:
+            self._streams.pop(req_id, None)
+            if isinstance(e, asyncio.TimeoutError):
+                raise TimeoutError(f"{self.name}: timeout abriendo stream req_id={req_id}")
+            raise ConnectionError(str(e))
+        finally:
+            self._pending.pop(req_id, None)
+        if first.get('error'):
+            self._streams.pop(req_id, None)
+        return first
+
+    async def forget(self, subscription_id: str) -> None:
+        """Cerrar un stream por su subscription.id"""
+        for req_id, sub_id in list(self._subscription_ids.items()):
+            if sub_id == subscription_id:
+                self._streams.pop(req_id, None)
+                self._subscription_ids.pop(req_id, None)
+        if self.connected:
+            try:
+                await self.request({'forget': subscription_id}, timeout=5)
+            except (TimeoutError, ConnectionError):
+                pass
+
+    async def _authorize(self, ws) -> Dict[str, Any]:
+        await ws.send(json.dumps({'authorize': self.auth_token, 'req_id': 0}))
+        while True:
+            data = json.loads(await ws.recv())
+            if data.get('req_id') == 0 or data.get('msg_type') == 'authorize':
+                return data
+
+    async def _run(self) -> None:
+        attempt = 0
+        while not self._closing:
+            try:
+                async with websockets.connect(self.url, ping_interval=None, max_size=None) as ws:
+                    response = await asyncio.wait_for(self._authorize(ws), 15)
+                    self.authorize_response = response
+                    self.authorized_at = time.time()
+                    if response.get('error'):
+                        # Token inválido: no tiene sentido reconectar en bucle
+                        logger.error(f"{self.name}: authorize rechazado: {response['error']}")
+                        self._ready.set()
+                        return
+                    self._ws = ws
+                    attempt = 0
+                    self._ready.set()
+                    # El lector debe estar activo antes de re-suscribir (espera respuestas)
+                    helpers = [
+                        asyncio.ensure_future(self._heartbeat()),
+                        asyncio.ensure_future(self._resubscribe()),
+                    ]
+                    try:
+                        await self._reader(ws)
+                    finally:
+                        for task in helpers:
+                            task.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"{self.name}: conexión perdida: {e}")
+            self._ws = None
+            self._ready.clear()
+            self._fail_pending('connection_lost')
+            if self._closing:
+                break
+            self.reconnects += 1
+            delay = self.policy.delay(attempt)
+            attempt += 1
+            logger.info(f"{self.name}: reconectando en {delay:.1f}s (intento {attempt})")
+            await asyncio.sleep(delay)
+
+    async def _reader(self, ws) -> None:
+        async for message in ws:
+            try:
+                data = json.loads(message)
+            except json.JSONDecodeError:
+                logger.warning(f"{self.name}: mensaje no JSON: {message[:100]}")
+                continue
+            self._dispatch(data)
+
+    def _dispatch(self, data: Dict[str, Any]) -> None:
+        req_id = data.get('req_id')
+        future = self._pending.get(req_id)
+        if future is not None and not future.done():
+            future.set_result(data)
+        stream = self._streams.get(req_id)
+        if stream is not None:
+            callback = stream[1]
+            subscription = data.get('subscription') or {}
+            if subscription.get('id'):
+                self._subscription_ids[req_id] = subscription['id']
+            try:
+                result = callback(data)
+                if asyncio.iscoroutine(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                logger.error(f"{self.name}: error en callback de stream: {e}")
+
+    async def _resubscribe(self) -> None:
+        streams = list(self._streams.values())
+        self._streams.clear()
+        self._subscription_ids.clear()
+        for payload, callback in streams:
+            try:
+                await self.subscribe(payload, callback)
+            except (TimeoutError, ConnectionError) as e:
+                logger.warning(f"{self.name}: no se pudo re-suscribir {payload}: {e}")
+
+    async def _heartbeat(self) -> None:
+        """Ping de aplicación; si no responde, cerrar el socket para forzar reconexión"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.request({'ping': 1}, timeout=10)
+            except (TimeoutError, ConnectionError):
+                logger.warning(f"{self.name}: heartbeat sin respuesta, reconectando")
+                if self._ws is not None:
+                    await self._ws.close()
+                return
+
+    def _fail_pending(self, reason: str) -> None:
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(ConnectionError(reason))
+
+
+class DerivConnectionPool:
+    """Pool de conexiones autenticadas con el mismo token; elige la menos cargada"""
+
+    def __init__(self, api_token: str, app_id: str = '1089', size: int = 2,
+                 policy: Optional[ReconnectPolicy] = None, heartbeat_interval: float = 30.0,
+                 url: Optional[str] = None):
+        url = url or DERIV_WS_URL.format(app_id=app_id)
+        policy = policy or ReconnectPolicy()
+        self.connections: List[DerivConnection] = [
+            DerivConnection(url, api_token, policy, heartbeat_interval, name=f'deriv-{i}')
+            for i in range(max(1, size))
+        ]
+
+    @property
+    def authorize_response(self) -> Optional[Dict[str, Any]]:
+        for connection in self.connections:
+            if connection.authorize_response is not None:
+                return connection.authorize_response
+        return None
+
+    @property
+    def authorized_at(self) -> float:
+        return max(c.authorized_at for c in self.connections)
+
+    @property
+    def connected(self) -> bool:
+        return any(c.connected for c in self.connections)
+
+    @property
+    def reconnects(self) -> int:
+        return sum(c.reconnects for c in self.connections)
+
+    def stream_connected(self, subscription_id: str) -> bool:
+        return any(c.has_stream(subscription_id) for c in self.connections)
+
+    async def start(self, timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+        """Arrancar todas las conexiones; retorna el primer authorize recibido"""
+        results = await asyncio.gather(*(c.start(timeout) for c in self.connections))
+        for response in results:
+            if response is not None:
+                return response
+        return None
+
+    def _pick(self) -> DerivConnection:
+        live = [c for c in self.connections if c.connected] or self.connections
+        return min(live, key=lambda c: c.load)
+
+    async def request(self, payload: Dict[str, Any], timeout: float = 10.0) -> Dict[str, Any]:
+        return await self._pick().request(payload, timeout)
+
+    async def subscribe(self, payload: Dict[str, Any], callback: StreamCallback,
+                        timeout: float = 10.0) -> Dict[str, Any]:
+        return await self._pick().subscribe(payload, callback, timeout)
+
+    async def forget(self, subscription_id: str) -> None:
+        for connection in self.connections:
+            await connection.forget(subscription_id)
+
+    async def close(self) -> None:
+        await asyncio.gather(*(c.close() for c in self.connections), return_exceptions=True)
+
+
+class DerivConnector:
+    """
+    Puente entre código síncrono (hilos, Celery) y async (vistas ASGI) y el pool.
+
+    El pool vive en un event loop propio en un hilo daemon; `request()` bloquea
+    el hilo llamador, `submit()` retorna un concurrent Future y `arequest()` se
+    puede await-ear desde cualquier otro event loop.
+    """
+
+    def __init__(self, api_token: str, app_id: str = '1089', pool_size: int = 2,
+                 policy: Optional[ReconnectPolicy] = None, heartbeat_interval: float = 30.0,
+                 url: Optional[str] = None):
+        self.api_token = api_token
+        self.app_id = app_id
+        self._pool_args = (api_token, app_id, pool_size, policy, heartbeat_interval, url)
+        self._pool: Optional[DerivConnectionPool] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Stream de balance activo sobre este conector (engine.services.balance_service)
+        self.balance_stream = None
+
+    @property
+    def connected(self) -> bool:
+        return self._pool is not None and self._pool.connected
+
+    @property
+    def authorize_response(self) -> Optional[Dict[str, Any]]:
+        return self._pool.authorize_response if self._pool else None
+
+    @property
+    def authorized_at(self) -> float:
+        return self._pool.authorized_at if self._pool else 0.0
+
+    @property
+    def reconnects(self) -> int:
+        return self._pool.reconnects if self._pool else 0
+
+    def stream_connected(self, subscription_id: str) -> bool:
+        """True si el socket que lleva el stream `subscription_id` está conectado"""
+        return self._pool is not None and self._pool.stream_connected(subscription_id)
+
+    @property
+    def pending(self) -> int:
+        """Peticiones en vuelo en todo el pool"""
+        return sum(c.load for c in self._pool.connections) if self._pool else 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name='deriv-connector', daemon=True)
+                self._thread.start()
+                self._loop = loop
+                self._pool = DerivConnectionPool(*self._pool_args)
+            return self._loop
+
+    def _run(self, coro: Awaitable) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def start(self, timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+        """
+        Conectar (si hace falta) y retornar la respuesta de authorize.
+        Si el pool ya está autorizado retorna de inmediato.
+        """
+        self._ensure_loop()
+        if self._pool.connected:
+            return self._pool.authorize_response
+        try:
+            return self._run(self._pool.start(timeout)).result(timeout + 1)
+        except Exception as e:
+            logger.error(f"Error iniciando conector Deriv: {e}")
+            return None
+
+    def submit(self, payload: Dict[str, Any], timeout: float = 30.0) -> Future:
+        """Enviar sin bloquear; retorna un concurrent.futures.Future con la respuesta"""
+        return self._run(self._pool_request(payload, timeout))
+
+    async def _pool_request(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        return await self._pool.request(payload, timeout)
+
+    def request(self, payload: Dict[str, Any], timeout: float = 10.0) -> Dict[str, Any]:
+        """Enviar y esperar la respuesta desde código síncrono"""
+        return self.submit(payload, timeout).result(timeout + 1)
+
+    async def arequest(self, payload: Dict[str, Any], timeout: float = 10.0) -> Dict[str, Any]:
+        """Enviar y esperar la respuesta desde otro event loop (p.ej. vistas async)"""
+        return await asyncio.wrap_future(self.submit(payload, timeout))
+
+    def subscribe(self, payload: Dict[str, Any], callback: StreamCallback,
+                  timeout: float = 10.0) -> Future:
+        """Abrir un stream; `callback` se ejecuta en el hilo del conector"""
+        return self._run(self._pool.subscribe(payload, callback, timeout))
+
+    def forget(self, subscription_id: str) -> Future:
+        return self._run(self._pool.forget(subscription_id))
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._loop is None:
+            return
+        try:
+            self._run(self._pool.close()).result(timeout)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        with self._lock:
+            self._loop = None
+            self._pool = None
+
+
+_connectors: Dict[Tuple[str, str], DerivConnector] = {}
+_connectors_lock = threading.Lock()
+_connectors_pid = os.getpid()
+
+
+def get_connector(api_token: str, app_id: str = '1089', pool_size: Optional[int] = None) -> DerivConnector:
+    """
+    Conector compartido del proceso para (token, app_id)
+
+    Tras un fork (workers prefork de Celery) se descartan los conectores heredados,
+    ya que su hilo de event loop no sobrevive al fork.
+    """
+    global _connectors_pid
+    with _connectors_lock:
+        if os.getpid() != _connectors_pid:
+            _connectors.clear()
+            _connectors_pid = os.getpid()
+        key = (api_token, str(app_id))
+        connector = _connectors.get(key)
+        if connector is None:
+            size = pool_size or int(os.getenv('DERIV_POOL_SIZE', '2'))
+            connector = DerivConnector(api_token, str(app_id), pool_size=size)
+            _connectors[key] = connector
+        return connector
+
+
+def close_connector(api_token: str, app_id: str = '1089') -> None:
+    """Cerrar y olvidar el conector de (token, app_id)"""
+    with _connectors_lock:
+        connector = _connectors.pop((api_token, str(app_id)), None)
+    if connector is not None:
+        connector.close()
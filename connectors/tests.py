@@ -1,3 +1,157 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
 
-# Create your tests here.
+import websockets
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from connectors import deriv_connector
+from connectors.deriv_client import DerivClient, clear_active_config_cache, get_deriv_client
+from connectors.deriv_connector import DerivConnector, ReconnectPolicy
+
+
+class FakeDerivServer:
+    """Servidor WebSocket local que imita las respuestas de Deriv (eco de req_id)"""
+
+    def __init__(self):
+        self.connections = 0
+        self.authorized = []  # Token de authorize de cada conexión
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._started.wait(5)
+
+    def _serve(self):
+        asyncio.set_event_loop(self.loop)
+
+        async def main():
+            self.server = await websockets.serve(self._handler, '127.0.0.1', 0)
+            self.port = self.server.sockets[0].getsockname()[1]
+            self._started.set()
+            await self.server.serve_forever()
+
+        try:
+            self.loop.run_until_complete(main())
+        except asyncio.CancelledError:
+            pass
+
+    async def _handler(self, ws):
+        self.connections += 1
+        async for message in ws:
+            data = json.loads(message)
+            req_id = data.get('req_id')
+            if 'authorize' in data:
+                self.authorized.append(data['authorize'])
+                # token:loginid autoriza esa cuenta; el token solo, la demo
+                loginid = data['authorize'].split(':', 1)[1] if ':' in data['authorize'] else 'VRTC1'
+                await ws.send(json.dumps({'msg_type': 'authorize', 'req_id': req_id,
+                                          'authorize': {'loginid': loginid, 'balance': 10}}))
+            elif 'ticks' in data:
+                await ws.send(json.dumps({'msg_type': 'tick', 'req_id': req_id,
+                                          'error': {'code': 'InvalidSymbol', 'message': 'Símbolo inválido'}}))
+            elif data.get('drop'):
+                await ws.close()
+                return
+            elif 'proposal' in data:
+                # La primera propuesta responde más tarde que la segunda
+                asyncio.ensure_future(self._reply_later(ws, data))
+            else:
+                await ws.send(json.dumps({'req_id': req_id, 'echo': data}))
+
+    async def _reply_later(self, ws, data):
+        await asyncio.sleep(0.2 if data['symbol'] == 'R_10' else 0.0)
+        await ws.send(json.dumps({'req_id': data['req_id'], 'msg_type': 'proposal',
+                                  'proposal': {'symbol': data['symbol']}}))
+
+    @property
+    def url(self):
+        return f'ws://127.0.0.1:{self.port}'
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.server.close)
+
+
+class DerivConnectorTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeDerivServer()
+        self.connector = DerivConnector('token', pool_size=1, url=self.server.url,
+                                        policy=ReconnectPolicy(initial_delay=0.01, max_delay=0.05))
+
+    def tearDown(self):
+        self.connector.close()
+        self.server.stop()
+
+    def test_authorize_and_out_of_order_replies(self):
+        response = self.connector.start(timeout=5)
+        self.assertEqual(response['authorize']['loginid'], 'VRTC1')
+
+        client = DerivClient(api_token='token', is_demo=True)
+        client._connector = self.connector
+        slow = client.send_request_async({'proposal': 1, 'symbol': 'R_10'})
+        fast = client.send_request_async({'proposal': 1, 'symbol': 'R_25'})
+        self.assertEqual(client.wait_response(fast, 5)['proposal']['symbol'], 'R_25')
+        self.assertFalse(slow.done())
+        self.assertEqual(client.wait_response(slow, 5)['proposal']['symbol'], 'R_10')
+
+    def test_reconnects_after_drop(self):
+        self.connector.start(timeout=5)
+        with self.assertRaises(ConnectionError):
+            self.connector.request({'drop': 1}, timeout=5)
+        self.assertEqual(self.connector.request({'ping': 1}, timeout=5)['echo']['ping'], 1)
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(self.connector.reconnects, 1)
+
+    def test_switch_account_rebuilds_the_whole_pool(self):
+        policy = ReconnectPolicy(initial_delay=0.01, max_delay=0.05)
+        old = DerivConnector('token', pool_size=2, url=self.server.url, policy=policy)
+        new = DerivConnector('token:CR2', pool_size=2, url=self.server.url, policy=policy)
+        deriv_connector._connectors[('token', '1089')] = old
+        deriv_connector._connectors[('token:CR2', '1089')] = new
+        self.addCleanup(deriv_connector._connectors.clear)
+        self.addCleanup(new.close)
+        old.start(timeout=5)
+
+        client = DerivClient(api_token='token', is_demo=True, app_id='1089')
+        client._connector = old
+        self.assertTrue(client.switch_account('CR2'))
+
+        # Las dos conexiones del pool nuevo están en la cuenta nueva; el anterior se cerró
+        self.assertIs(client.connector, new)
+        self.assertEqual(self.server.authorized, ['token', 'token', 'token:CR2', 'token:CR2'])
+        self.assertEqual(client.current_loginid, 'CR2')
+        self.assertFalse(old.connected)
+        self.assertNotIn(('token', '1089'), deriv_connector._connectors)
+
+    def test_tick_subscription_error_is_raised(self):
+        from asgiref.sync import async_to_sync
+        from trading_bot.deriv_service import DerivAPI
+
+        self.connector.start(timeout=5)
+        api = DerivAPI('token')
+        api.connector = self.connector
+
+        async def on_tick(tick):
+            pass
+
+        with self.assertRaisesMessage(Exception, 'Símbolo inválido'):
+            async_to_sync(api.subscribe_to_ticks)('R_BAD', on_tick)
+
+
+class SharedDerivClientTests(TestCase):
+    def setUp(self):
+        from trading_bot.models import DerivAPIConfig
+
+        user = User.objects.create_user('trader')
+        DerivAPIConfig.objects.create(user=user, api_token='tok-shared', is_demo=True, app_id='1089')
+        self.addCleanup(clear_active_config_cache)
+
+    def test_active_config_is_cached_between_calls(self):
+        from connectors import deriv_client
+
+        self.addCleanup(deriv_client._shared_clients.clear)
+        with self.assertNumQueries(1):
+            first = get_deriv_client()
+            second = get_deriv_client()
+        self.assertIs(first, second)
+        self.assertEqual((first.api_token, first.app_id), ('tok-shared', '1089'))
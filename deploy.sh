@@ -157,6 +157,20 @@ server {
         add_header Cache-Control "public";
     }
 
+    # Vistas async (balance, trades, métricas, trades activos) y WebSocket: Daphne (ASGI).
+    # Esperan a Deriv y a la BD sin ocupar un worker sync de Gunicorn.
+    location ~ ^/(engine/(balance|trades|metrics)/|engine/api/trades/active/|ws/) {
+        proxy_pass http://127.0.0.1:${DAPHNE_PORT};
+        proxy_set_header Host \$host;
+        proxy_set_header X-Real-IP \$remote_addr;
+        proxy_set_header X-Forwarded-For \$proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto \$scheme;
+        proxy_redirect off;
+        proxy_http_version 1.1;
+        proxy_set_header Upgrade \$http_upgrade;
+        proxy_set_header Connection "upgrade";
+    }
+
     # Proxy a Gunicorn
     location / {
         proxy_pass http://127.0.0.1:${GUNICORN_PORT};
@@ -9,6 +9,7 @@ from datetime import timedelta
 from decimal import Decimal
 from monitoring.models import OrderAudit
 from connectors.deriv_client import DerivClient
+from engine.services.contract_settlement import contract_id_for, reconcile_contracts
 from trading_bot.models import DerivAPIConfig
 
 
@@ -103,20 +104,11 @@ class Command(BaseCommand):
         
         self.stdout.write(f'🔍 Verificando {total_trades} contrato(s) pendiente(s)...')
         
+        candidates = []
         for trade in pending_trades:
             try:
                 # Obtener contract_id del trade
-                contract_id = None
-                
-                # Intentar desde response_payload
-                if trade.response_payload:
-                    if isinstance(trade.response_payload, dict):
-                        contract_id = (
-                            trade.response_payload.get('contract_id') or
-                            trade.response_payload.get('order_id') or
-                            (trade.response_payload.get('buy', {}).get('contract_id') 
-                             if isinstance(trade.response_payload.get('buy'), dict) else None)
-                        )
+                contract_id = contract_id_for(trade)
                 
                 # Si no hay contract_id, intentar marcar como expirado basado en el tiempo
                 if not contract_id:
@@ -138,16 +130,28 @@ class Command(BaseCommand):
                                 f'  ⚠️ Trade {trade.id} ({trade.symbol}): Sin contract_id, marcado como expirado (edad: {int(trade_age.total_seconds()/60)} min)'
                             )
                         )
-                        continue
-                    else:
-                        # Aún no tiene suficiente edad, saltarlo
-                        continue
+                    # Aún no tiene suficiente edad, saltarlo
+                    continue
                 
-                # Verificar estado del contrato en Deriv
-                contract_info = client.get_open_contract_info(str(contract_id))
+                candidates.append(trade)
+            except Exception as e:
+                error_count += 1
+                self.stdout.write(
+                    self.style.ERROR(
+                        f'  ❌ Error procesando trade {trade.id} ({trade.symbol}): {str(e)}'
+                    )
+                )
+        
+        # Verificar estado de los contratos en Deriv: un stream por contrato, todos en
+        # paralelo; los ya vendidos se liquidan con la primera respuesta
+        service = reconcile_contracts(client.connector, candidates, wait=15.0)
+        
+        for trade in candidates:
+            try:
+                state = service.last_states.get(trade.id)
+                error_msg = service.errors.get(trade.id)
                 
-                if contract_info.get('error'):
-                    error_msg = contract_info.get('error', 'Error desconocido')
+                if error_msg is not None:
                     error_str = str(error_msg).lower()
                     
                     # Si el error indica que el contrato no existe o expiró
@@ -177,39 +181,24 @@ class Command(BaseCommand):
                         )
                     continue
                 
-                # Verificar si el contrato ya se vendió/cerró
-                if contract_info.get('is_sold', False):
-                    # El contrato ya se cerró
-                    status = contract_info.get('status')  # 'won' o 'lost'
-                    profit = Decimal(str(contract_info.get('profit', 0)))
-                    
-                    trade.status = status if status else ('won' if profit > 0 else 'lost')
-                    trade.pnl = profit
-                    
-                    if not trade.response_payload:
-                        trade.response_payload = {}
-                    trade.response_payload['auto_updated'] = True
-                    trade.response_payload['auto_updated_at'] = timezone.now().isoformat()
-                    trade.response_payload['contract_info'] = contract_info
-                    
-                    trade.save()
+                if state == 'settled':
+                    # El contrato ya se cerró y se liquidó desde su stream
+                    trade.refresh_from_db(fields=['status', 'pnl'])
                     updated_count += 1
                     self.stdout.write(
                         self.style.SUCCESS(
-                            f'  ✅ Trade {trade.id} ({trade.symbol}): Actualizado - Status: {trade.status}, P&L: ${profit:.2f}'
+                            f'  ✅ Trade {trade.id} ({trade.symbol}): Actualizado - Status: {trade.status}, P&L: ${trade.pnl or 0:.2f}'
                         )
                     )
                 else:
-                    # El contrato aún está activo, verificar si debería haber expirado
-                    # Basado en la duración del contrato (si está disponible)
-                    # Por ahora, solo loguear que está activo
+                    # El contrato aún está activo (o no respondió a tiempo)
                     trade_age = timezone.now() - trade.timestamp
                     if trade_age > timedelta(hours=1):
                         # Si tiene más de 1 hora, probablemente debería haber expirado
                         # Pero no lo marcamos automáticamente sin confirmar
                         self.stdout.write(
                             self.style.WARNING(
-                                f'  ⏳ Trade {trade.id} ({trade.symbol}): Aún activo pero tiene {int(trade_age.total_seconds()/60)} minutos (contract_id: {contract_id})'
+                                f'  ⏳ Trade {trade.id} ({trade.symbol}): Aún activo pero tiene {int(trade_age.total_seconds()/60)} minutos (contract_id: {contract_id_for(trade)})'
                             )
                         )
                 
@@ -0,0 +1,29 @@
+"""
+Comando para archivar ticks fuera de la ventana caliente y aplicar la retención del archivo
+"""
+from django.core.management.base import BaseCommand
+
+from engine.services.tick_retention import TickRetentionPolicy, compact_ticks
+
+
+class Command(BaseCommand):
+    help = 'Archiva ticks antiguos (bloques float64 por día + velas 1m) y purga el archivo vencido'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hot-hours', type=float, default=None,
+                            help='Horas de ticks que se mantienen en la tabla Tick (default: TICK_HOT_RETENTION_HOURS o 24)')
+        parser.add_argument('--archive-days', type=int, default=None,
+                            help='Días que se conservan los bloques archivados (default: TICK_ARCHIVE_RETENTION_DAYS o 30)')
+
+    def handle(self, *args, **options):
+        policy = TickRetentionPolicy()
+        if options['hot_hours'] is not None:
+            policy.hot_hours = options['hot_hours']
+        if options['archive_days'] is not None:
+            policy.archive_days = options['archive_days']
+
+        self.stdout.write(f'🗜️ Compactando ticks (ventana caliente {policy.hot_hours}h, archivo {policy.archive_days} días)...')
+        stats = compact_ticks(policy)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {stats['archived']} ticks archivados en {stats['chunks']} bloques, {stats['purged']} bloques purgados"
+        ))
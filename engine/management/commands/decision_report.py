@@ -0,0 +1,35 @@
+"""
+Comando para resumir la bitácora de decisiones (efectividad de filtros)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from engine.services.decision_journal import read_decisions, summarize_decisions
+
+
+class Command(BaseCommand):
+    help = 'Resume la bitácora de decisiones: resultados, motivos de rechazo y estados por estrategia'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24.0, help='Ventana a analizar (0 = todo)')
+        parser.add_argument('--dir', type=str, default=None, help='Carpeta de la bitácora')
+
+    def handle(self, *args, **options):
+        since = time.time() - options['hours'] * 3600 if options['hours'] else None
+        summary = summarize_decisions(read_decisions(options['dir'], since=since))
+        total = summary['total']
+        self.stdout.write(f'📝 {total} decisiones registradas')
+        if not total:
+            return
+
+        self.stdout.write('\n📊 Resultados:')
+        for status, count in sorted(summary['by_status'].items(), key=lambda item: -item[1]):
+            self.stdout.write(f'   • {status}: {count} ({count / total:.1%})')
+        self.stdout.write('\n🚫 Motivos:')
+        for reason, count in sorted(summary['by_reason'].items(), key=lambda item: -item[1]):
+            self.stdout.write(f'   • {reason}: {count}')
+        self.stdout.write('\n🎯 Por estrategia elegida:')
+        for origin, statuses in sorted(summary['by_origin'].items()):
+            detail = ', '.join(f'{status}={count}' for status, count in sorted(statuses.items()))
+            self.stdout.write(f'   • {origin}: {detail}')
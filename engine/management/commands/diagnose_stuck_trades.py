@@ -175,13 +175,5 @@ class Command(BaseCommand):
         # Verificar conexión WebSocket
         self.stdout.write('\n   Estado WebSocket:')
         self.stdout.write(f'   - connected: {client.connected}')
-        if hasattr(client, 'ws') and client.ws:
-            self.stdout.write(f'   - ws existe: True')
-            if hasattr(client.ws, 'sock') and client.ws.sock:
-                self.stdout.write(f'   - sock existe: True')
-                self.stdout.write(f'   - sock.connected: {client.ws.sock.connected if hasattr(client.ws.sock, "connected") else "N/A"}')
-            else:
-                self.stdout.write(self.style.WARNING('   - sock NO existe'))
-        else:
-            self.stdout.write(self.style.WARNING('   - ws NO existe'))
+        self.stdout.write(f'   - reconexiones del pool: {client.get_reconnect_stats()}')
 
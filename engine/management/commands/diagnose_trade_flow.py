@@ -57,11 +57,7 @@ class Command(BaseCommand):
             
             self.stdout.write(self.style.SUCCESS('✅ Autenticación exitosa'))
             self.stdout.write(f'   - Connected: {client.connected}')
-            self.stdout.write(f'   - WebSocket existe: {client.ws is not None}')
-            if client.ws:
-                self.stdout.write(f'   - WebSocket sock existe: {client.ws.sock is not None}')
-                if client.ws.sock:
-                    self.stdout.write(f'   - WebSocket connected: {getattr(client.ws.sock, "connected", "N/A")}')
+            self.stdout.write(f'   - Reconexiones del pool: {client.get_reconnect_stats()}')
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'❌ Error inicializando cliente: {e}'))
             import traceback
@@ -142,25 +138,6 @@ class Command(BaseCommand):
         else:
             self.stdout.write(self.style.SUCCESS('   ✅ Cliente conectado'))
         
-        # Verificar estado WebSocket
-        if not client.ws:
-            self.stdout.write(self.style.ERROR('   ❌ WebSocket no existe'))
-            return
-        
-        if not client.ws.sock:
-            self.stdout.write(self.style.ERROR('   ❌ WebSocket sock no existe'))
-            return
-        
-        sock_connected = getattr(client.ws.sock, 'connected', False)
-        if not sock_connected:
-            self.stdout.write(self.style.WARNING('   ⚠️ WebSocket sock no está conectado, intentando reconectar...'))
-            if not client.authenticate():
-                self.stdout.write(self.style.ERROR('   ❌ No se pudo reconectar WebSocket'))
-                return
-            self.stdout.write(self.style.SUCCESS('   ✅ WebSocket reconectado'))
-        else:
-            self.stdout.write(self.style.SUCCESS('   ✅ WebSocket sock conectado'))
-        
         # PASO 3: Probar consulta de contrato
         self.stdout.write(f'\n🔍 PASO 3: Consultando estado del contrato en Deriv API...')
         self.stdout.write(f'   Enviando: proposal_open_contract con contract_id={contract_id}')
@@ -249,9 +226,6 @@ class Command(BaseCommand):
                 if not client.authenticate():
                     return {'error': 'Not connected'}
             
-            # Limpiar evento anterior
-            client.response_event.clear()
-            
             # Preparar mensaje
             contract_msg = {
                 'proposal_open_contract': 1,
@@ -261,16 +235,16 @@ class Command(BaseCommand):
             self.stdout.write(f'   📤 Mensaje enviado: {json.dumps(contract_msg)}')
             
             # Enviar mensaje
-            client.ws.send(json.dumps(contract_msg))
+            future = client.send_request_async(contract_msg)
             self.stdout.write(f'   ✅ Mensaje enviado por WebSocket')
             
             # Esperar respuesta con timeout
             timeout = 10
             self.stdout.write(f'   ⏳ Esperando respuesta (timeout: {timeout}s)...')
             
-            if client.response_event.wait(timeout=timeout):
-                self.stdout.write(f'   ✅ Evento recibido')
-                data = client.response_data
+            data = client.wait_response(future, timeout=timeout)
+            if data is not None:
+                self.stdout.write(f'   ✅ Respuesta recibida')
                 
                 self.stdout.write(f'   📥 Respuesta completa: {json.dumps(data, indent=2, default=str)[:500]}')
                 
@@ -0,0 +1,33 @@
+"""
+Comando para exportar ticks al archivo columnar .npy (replay y análisis offline)
+"""
+from datetime import date
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from engine.services.tick_archive import default_root, export_ticks
+
+
+class Command(BaseCommand):
+    help = 'Exporta ticks (archivo + tabla caliente) a ficheros .npy por símbolo y día UTC'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', type=str, default='',
+                            help='Símbolos separados por coma (default: todos)')
+        parser.add_argument('--since', type=date.fromisoformat, default=None, help='Primer día (YYYY-MM-DD)')
+        parser.add_argument('--until', type=date.fromisoformat, default=None, help='Último día (YYYY-MM-DD)')
+        parser.add_argument('--output', type=str, default='',
+                            help='Directorio destino (default: settings.TICK_ARCHIVE_DIR)')
+        parser.add_argument('--overwrite', action='store_true', help='Reescribir días ya exportados')
+
+    def handle(self, *args, **options):
+        symbols = [s.strip() for s in options['symbols'].split(',') if s.strip()] or None
+        root = Path(options['output']) if options['output'] else default_root()
+
+        self.stdout.write(f'📦 Exportando ticks a {root}...')
+        written = export_ticks(symbols, since=options['since'], until=options['until'],
+                               root=root, overwrite=options['overwrite'])
+        for symbol, count in written.items():
+            self.stdout.write(f'   • {symbol}: {count} ticks')
+        self.stdout.write(self.style.SUCCESS(f'✅ {sum(written.values())} ticks exportados'))
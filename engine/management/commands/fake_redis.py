@@ -0,0 +1,33 @@
+"""
+Comando para levantar un Redis falso local (fakeredis por TCP) y probar el perfil USE_REDIS
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Servidor Redis falso en memoria para desarrollo: arrancar los procesos con '
+            'USE_REDIS=1 REDIS_URL=redis://127.0.0.1:<puerto>/0')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=6399)
+
+    def handle(self, *args, **options):
+        try:
+            from config.redis_profile import fake_redis_server
+            server = fake_redis_server(options['host'], options['port'])
+            url = server.__enter__()
+        except ImportError:
+            raise CommandError('Requiere fakeredis (y lupa para el channel layer): pip install -r requirements-dev.txt')
+
+        self.stdout.write(self.style.SUCCESS(f'🧪 Redis falso escuchando en {url}'))
+        self.stdout.write(f'   export USE_REDIS=1 REDIS_URL={url}')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('\n⚠️  Deteniendo Redis falso...'))
+        finally:
+            server.__exit__(None, None, None)
@@ -0,0 +1,14 @@
+"""
+Comando para reconstruir los agregados de resultados (TradeOutcomeBucket) desde OrderAudit
+"""
+from django.core.management.base import BaseCommand
+
+from monitoring.aggregates import rebuild_outcome_buckets
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los agregados horarios de trades liquidados desde OrderAudit'
+
+    def handle(self, *args, **options):
+        created = rebuild_outcome_buckets()
+        self.stdout.write(self.style.SUCCESS(f'✅ {created} buckets de resultados reconstruidos'))
@@ -0,0 +1,55 @@
+"""
+Comando para el backtest por replay de ticks de las cuatro estrategias del loop
+"""
+import json
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+
+from engine.services.tick_archive import TickArchiveReader
+from engine.services.tick_replay import ReplayConfig, StoredTickData, TickReplayBacktester
+
+
+def _day_start(value: str) -> datetime:
+    return datetime.combine(datetime.strptime(value, '%Y-%m-%d').date(), dt_time.min, tzinfo=dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    help = 'Replay de ticks grabados con las estrategias del TickTradingLoop (win rate y P&L por estrategia)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', type=str, required=True, help='Símbolos separados por coma')
+        parser.add_argument('--since', type=str, default=None, help='Primer día UTC (YYYY-MM-DD)')
+        parser.add_argument('--until', type=str, default=None, help='Último día UTC incluido (YYYY-MM-DD)')
+        parser.add_argument('--source', choices=['archive', 'db'], default='archive',
+                            help='archive: ficheros .npy (export_tick_archive); db: TickChunk + Tick')
+        parser.add_argument('--archive-dir', type=str, default=None, help='Directorio del archivo .npy')
+        parser.add_argument('--stake', type=float, default=1.0, help='Monto por operación')
+        parser.add_argument('--payout', type=float, default=0.95, help='Ganancia neta por unidad si gana')
+        parser.add_argument('--interval', type=float, default=30.0, help='Segundos mínimos entre entradas por símbolo')
+        parser.add_argument('--per-tick', action='store_true',
+                            help='Evaluar con analyze_symbol tick a tick en vez de las señales vectorizadas')
+        parser.add_argument('--json', action='store_true', help='Imprimir el reporte como JSON')
+
+    def handle(self, *args, **options):
+        symbols = [s.strip() for s in options['symbols'].split(',') if s.strip()]
+        since = _day_start(options['since']) if options['since'] else None
+        until = _day_start(options['until']) + timedelta(days=1) if options['until'] else None
+        source = TickArchiveReader(options['archive_dir']) if options['source'] == 'archive' else StoredTickData()
+        config = ReplayConfig(stake=options['stake'], payout=options['payout'],
+                              min_interval_seconds=options['interval'], vectorized=not options['per_tick'])
+
+        report = TickReplayBacktester(config).run(source, symbols, since, until).to_dict()
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"🔁 {report['ticks']} ticks evaluados en {report['elapsed_seconds']}s "
+                          f"({report['ticks_per_minute']} ticks/min)")
+        for origin, stats in report['by_strategy'].items():
+            self.stdout.write(f"   • {origin}: {stats['trades']} trades, win rate {stats['win_rate']:.1%}, "
+                              f"P&L ${stats['pnl']:.2f}")
+        total = report['total']
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Total: {total['trades']} trades, win rate {total['win_rate']:.1%}, P&L ${total['pnl']:.2f}"
+        ))
@@ -6,22 +6,46 @@ import os
 import sys
 import time
 import json
+import signal
 import websocket
 import threading
 from datetime import datetime
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from market.models import Tick
 from trading_bot.models import DerivAPIConfig
+from engine.services.tick_bus import TickBusPublisher
+from engine.services.tick_writer import TickWriter
 
 
 class Command(BaseCommand):
     help = 'Guarda ticks en tiempo real de Deriv en la base de datos'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--flush-ms', type=int, default=250,
+                            help='Intervalo máximo entre escrituras por lotes (ms)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Ticks máximos por escritura')
+        parser.add_argument('--no-bus', action='store_true',
+                            help='No publicar los ticks en el bus entre procesos (trading_loop --tick-source bus)')
+
     def handle(self, *args, **options):
         self.ws = None
         self.connected = False
         self.tick_count = 0
+        self.tick_writer = TickWriter(
+            flush_interval_ms=options.get('flush_ms', 250),
+            max_batch_rows=options.get('batch_size', 500),
+        )
+        self.tick_writer.start()
+        # Bus de ticks: el trading loop recibe cada tick antes de que se escriba en BD
+        self.tick_bus = None
+        if getattr(settings, 'TICK_BUS_ENABLED', True) and not options.get('no_bus'):
+            try:
+                self.tick_bus = TickBusPublisher()
+                self.stdout.write(self.style.SUCCESS(f'🚌 Publicando ticks en el bus: {self.tick_bus.directory}'))
+            except OSError as e:
+                self.stdout.write(self.style.WARNING(f'⚠️ Bus de ticks no disponible: {e}'))
         
         # Obtener configuración de API desde la BD
         try:
@@ -39,7 +63,7 @@ class Command(BaseCommand):
         
         self.stdout.write(self.style.SUCCESS('🚀 Iniciando guardado de ticks en tiempo real...'))
         self.stdout.write(f'📊 Suscribiéndose a FOREX, COMMODITIES, ÍNDICES...')
-        self.stdout.write('💾 Guardando ticks en base de datos...')
+        self.stdout.write(f'💾 Guardando ticks en base de datos (lotes cada {self.tick_writer.flush_interval * 1000:.0f} ms)...')
         self.stdout.write('=' * 60)
         
         # Símbolos a suscribir (excluyendo crypto, OTC, BOOM, CRASH según la cuenta)
@@ -66,21 +90,55 @@ class Command(BaseCommand):
             on_open=self.on_open
         )
         
+        # Ctrl-C / SIGTERM: salir del bucle y vaciar los ticks pendientes antes de terminar
+        self.stopping = False
+        previous_handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                previous_handlers[sig] = signal.signal(sig, self.request_stop)
+        
         # Mantener conexión con reintentos
-        while True:
-            try:
-                self.ws.run_forever()
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'❌ Error en WebSocket: {e}'))
-                self.stdout.write(self.style.WARNING('🔄 Reintentando en 10 segundos...'))
-                time.sleep(10)
-                self.ws = websocket.WebSocketApp(
-                    f"wss://ws.derivws.com/websockets/v3?app_id={self.app_id}",
-                    on_message=self.on_message,
-                    on_error=self.on_error,
-                    on_close=self.on_close,
-                    on_open=self.on_open
-                )
+        try:
+            while not self.stopping:
+                try:
+                    # run_forever captura el KeyboardInterrupt y retorna: se sale por `stopping`
+                    self.ws.run_forever()
+                except Exception as e:
+                    if self.stopping:
+                        break
+                    self.stdout.write(self.style.ERROR(f'❌ Error en WebSocket: {e}'))
+                    self.stdout.write(self.style.WARNING('🔄 Reintentando en 10 segundos...'))
+                    time.sleep(10)
+                    self.ws = websocket.WebSocketApp(
+                        f"wss://ws.derivws.com/websockets/v3?app_id={self.app_id}",
+                        on_message=self.on_message,
+                        on_error=self.on_error,
+                        on_close=self.on_close,
+                        on_open=self.on_open
+                    )
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+            self.shutdown()
+    
+    def request_stop(self, signum, frame):
+        """Handler de SIGINT/SIGTERM"""
+        self.stopping = True
+        raise KeyboardInterrupt
+    
+    def shutdown(self):
+        """Escribir los ticks que quedan en el buffer y cerrar el bus"""
+        self.stdout.write(self.style.WARNING('\n⚠️  Deteniendo guardado de ticks...'))
+        if self.ws:
+            self.ws.keep_running = False
+        self.tick_writer.stop()
+        if self.tick_bus is not None:
+            self.tick_bus.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'💾 {self.tick_writer.submitted} ticks enviados a la BD | descartados: {self.tick_writer.dropped}'
+        ))
     
     def on_message(self, ws, message):
         try:
@@ -103,23 +161,24 @@ class Command(BaseCommand):
             if not symbol or price == 0:
                 return
             
+            # Primero al bus (sin BD en el camino tick -> decisión)
+            if self.tick_bus is not None:
+                try:
+                    self.tick_bus.publish(symbol, float(epoch), float(price), float(tick_data.get('volume', 0) or 0))
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f'Error publicando tick en el bus: {e}'))
+            
             # Convertir timestamp
             timestamp = timezone.make_aware(datetime.fromtimestamp(epoch))
             
-            # Guardar en base de datos (evitar duplicados)
-            tick, created = Tick.objects.get_or_create(
-                symbol=symbol,
-                timestamp=timestamp,
-                defaults={
-                    'price': price,
-                    'volume': tick_data.get('volume', 0)
-                }
-            )
-            
-            if created:
+            # Encolar para escritura por lotes (los duplicados los ignora la BD)
+            if self.tick_writer.submit(symbol, timestamp, price, tick_data.get('volume', 0)):
                 self.tick_count += 1
                 if self.tick_count % 50 == 0:
-                    self.stdout.write(self.style.SUCCESS(f'✅ Guardados {self.tick_count} ticks nuevos'))
+                    self.stdout.write(self.style.SUCCESS(
+                        f'✅ Recibidos {self.tick_count} ticks | enviados a BD: {self.tick_writer.submitted} | '
+                        f'pendientes: {self.tick_writer.pending} | último flush: {self.tick_writer.last_flush_seconds * 1000:.1f} ms'
+                    ))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error guardando tick: {e}'))
     
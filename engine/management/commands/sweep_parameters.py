@@ -0,0 +1,63 @@
+"""
+Comando para barrer parámetros de las estrategias con backtests de replay en paralelo
+"""
+import json
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from engine.services.param_sweep import parameter_grid, random_configs, run_sweep, write_results
+
+
+def _day_start(value: str) -> datetime:
+    return datetime.combine(datetime.strptime(value, '%Y-%m-%d').date(), dt_time.min, tzinfo=dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    help = ('Barrido de parámetros (grid o aleatorio) sobre el archivo .npy de ticks. '
+            'El espacio es un JSON {"reversal.fatigue_threshold": [4, 5, 6], '
+            '"adaptive.base_z_score_threshold": {"min": 1.8, "max": 3.0}, ...}')
+
+    def add_arguments(self, parser):
+        parser.add_argument('space', type=str, help='Fichero JSON con el espacio de parámetros')
+        parser.add_argument('--symbols', type=str, required=True, help='Símbolos separados por coma')
+        parser.add_argument('--random', type=int, default=0,
+                            help='Número de muestras aleatorias (0 = grid completo)')
+        parser.add_argument('--seed', type=int, default=None, help='Semilla de la búsqueda aleatoria')
+        parser.add_argument('--since', type=str, default=None, help='Primer día UTC (YYYY-MM-DD)')
+        parser.add_argument('--until', type=str, default=None, help='Último día UTC incluido (YYYY-MM-DD)')
+        parser.add_argument('--archive-dir', type=str, default=None, help='Directorio del archivo .npy')
+        parser.add_argument('--workers', type=int, default=None, help='Procesos (default: núcleos)')
+        parser.add_argument('--rank-by', choices=['pnl', 'win_rate'], default='pnl')
+        parser.add_argument('--min-trades', type=int, default=20,
+                            help='Configuraciones con menos trades van al final del ranking')
+        parser.add_argument('--output', type=str, default='sweep_results.csv', help='CSV del ranking')
+        parser.add_argument('--top', type=int, default=10, help='Filas a mostrar')
+
+    def handle(self, *args, **options):
+        space = json.loads(Path(options['space']).read_text())
+        if options['random']:
+            configs = list(random_configs(space, options['random'], options['seed']))
+        else:
+            if any(isinstance(spec, dict) for spec in space.values()):
+                raise CommandError('Los rangos {"min", "max"} requieren --random N')
+            configs = list(parameter_grid(space))
+        symbols = [s.strip() for s in options['symbols'].split(',') if s.strip()]
+        since = _day_start(options['since']) if options['since'] else None
+        until = _day_start(options['until']) + timedelta(days=1) if options['until'] else None
+
+        self.stdout.write(f'🧪 {len(configs)} configuraciones sobre {", ".join(symbols)}...')
+        try:
+            rows = run_sweep(configs, symbols, root=options['archive_dir'], since=since, until=until,
+                             workers=options['workers'], rank_by=options['rank_by'],
+                             min_trades=options['min_trades'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        write_results(rows, Path(options['output']))
+
+        for row in rows[:options['top']]:
+            params = ', '.join(f'{name}={row[name]}' for name in sorted(space))
+            self.stdout.write(f"   #{row['rank']}: P&L ${row['pnl']:.2f}, win rate {row['win_rate']:.1%}, "
+                              f"{row['trades']} trades | {params}")
+        self.stdout.write(self.style.SUCCESS(f"✅ Ranking escrito en {options['output']}"))
@@ -2,11 +2,24 @@
 Comando para ejecutar el trading loop directamente
 Evita problemas de Celery en Windows
 """
+import os
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections
 from engine.services.tick_trading_loop import TickTradingLoop
 from engine.services.capital_manager import CapitalManager
+from engine.services.contract_settlement import (
+    get_settlement_service, start_settlement_service, stop_settlement_service
+)
+from engine.services.balance_service import start_balance_service, stop_balance_service
+from engine.services.decision_journal import start_decision_journal, stop_decision_journal
+from engine.services.query_profiler import QueryProfiler, profiler_from_settings
+from engine.services.trades_read_model import refresh_trades_snapshot
+from monitoring.metrics import start_metrics_server
+from market.live_feed import notify_dashboard
 from market.models import Tick
 from monitoring.models import OrderAudit
 from django.utils import timezone
@@ -19,9 +32,25 @@ from decimal import Decimal
 class Command(BaseCommand):
     help = 'Ejecuta el loop de trading cada 2 segundos'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=int(os.getenv('TRADING_LOOP_WORKERS', '8')),
+                            help='Hilos para evaluar señales de los símbolos en paralelo (1 = secuencial)')
+        parser.add_argument('--mode', choices=['sweep', 'push'], default=os.getenv('TRADING_LOOP_MODE', 'sweep'),
+                            help='sweep: barrer todos los símbolos cada ciclo; push: evaluar solo los símbolos que reciben ticks')
+        parser.add_argument('--debounce-ms', type=int, default=int(os.getenv('TRADING_LOOP_DEBOUNCE_MS', '250')),
+                            help='Modo push: ventana para agrupar ticks de un mismo símbolo en una evaluación')
+        parser.add_argument('--tick-source', choices=['bus', 'deriv'], default=os.getenv('TRADING_LOOP_TICK_SOURCE', 'bus'),
+                            help='Modo push: bus = ticks de save_realtime_tick por el bus entre procesos; '
+                                 'deriv = socket propio a Deriv')
+        parser.add_argument('--metrics-port', type=int, default=int(os.getenv('TRADING_LOOP_METRICS_PORT', '0')),
+                            help='Puerto HTTP para las métricas Prometheus de latencia del loop (0 = desactivado)')
+        parser.add_argument('--profile-queries', action='store_true',
+                            help='Resumen por ciclo de consultas ORM por método llamador y patrones N+1')
+        parser.add_argument('--query-budget', type=int, default=None,
+                            help='Consultas máximas por ciclo antes de avisar (implica --profile-queries)')
+
     def handle(self, *args, **options):
         from connectors.deriv_client import DerivClient
-        import os
         
         # Usar estrategia estadística híbrida (NUEVA)
         use_statistical = True
@@ -125,10 +154,107 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('   • Protección de ganancias: ACTIVA'))
         self.stdout.write('')
         
+        # Evaluación de señales en paralelo; el chequeo de riesgo y la orden siguen en serie
+        workers = max(1, options.get('workers') or 1)
+        push_mode = options.get('mode') == 'push'
+        executor = None
+        scheduler = None
+        if push_mode:
+            # Modo push: el ingest de ticks dispara la evaluación de cada símbolo;
+            # el ciclo periódico solo mantiene capital, prioridades y contratos
+            from engine.services.tick_event_scheduler import TickEventScheduler
+            if options.get('tick_source') == 'bus':
+                # Ticks publicados por save_realtime_tick: sin BD entre el tick y la decisión
+                from engine.services.tick_bus import TickBusSubscriber
+                tick_service = TickBusSubscriber()
+            else:
+                from engine.services.realtime_tick_service import tick_service
+
+            def on_result(symbol, result):
+                if result and result.get('status') == 'executed':
+                    signal_info = result.get('signal', {})
+                    self.stdout.write(self.style.SUCCESS(f'  ✅ {symbol} {signal_info.get("direction")} (tick)'))
+                    self._notify_trade_executed(channel_layer, symbol)
+
+            scheduler = TickEventScheduler(loop, debounce_ms=options.get('debounce_ms', 250),
+                                           workers=workers, on_result=on_result)
+            scheduler.start()
+            tick_service.add_tick_callback(scheduler.on_tick)
+            tick_service.start()
+            self.stdout.write(self.style.SUCCESS(
+                f'⚡ Modo push: evaluación por tick (debounce {options.get("debounce_ms", 250)}ms, {workers} hilos, '
+                f'ticks: {options.get("tick_source")})'
+            ))
+        elif workers > 1:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='symbol-eval')
+            self.stdout.write(self.style.SUCCESS(f'⚡ Evaluación concurrente de símbolos: {workers} hilos'))
+        
+        # Métricas de latencia tick → orden: viven en este proceso, se exponen por HTTP propio
+        metrics_port = options.get('metrics_port') or 0
+        if metrics_port:
+            try:
+                start_metrics_server(metrics_port)
+                self.stdout.write(self.style.SUCCESS(f'📈 Métricas Prometheus en :{metrics_port}/metrics'))
+            except OSError as e:
+                self.stdout.write(self.style.WARNING(f'⚠️ No se pudo abrir el puerto de métricas {metrics_port}: {e}'))
+
+        # Bitácora de decisiones: cada evaluación de process_symbol se escribe en segundo plano
+        journal = None
+        if getattr(settings, 'DECISION_JOURNAL_ENABLED', False):
+            journal = start_decision_journal()
+            self.stdout.write(self.style.SUCCESS(f'📝 Bitácora de decisiones en {journal.path}'))
+
+        # Perfilador de consultas: opcional, atribuye cada consulta del ciclo a su método llamador
+        profiler = profiler_from_settings()
+        if options.get('profile_queries') or options.get('query_budget'):
+            profiler = profiler or QueryProfiler(n_plus_one_threshold=getattr(settings, 'QUERY_PROFILE_N_PLUS_ONE', 5))
+        if profiler:
+            if options.get('query_budget'):
+                profiler.budget = options['query_budget']
+            profiler.install()
+            budget_msg = f' (presupuesto {profiler.budget}/ciclo)' if profiler.budget else ''
+            self.stdout.write(self.style.SUCCESS(f'🗄️ Perfilador de consultas ORM activo{budget_msg}'))
+
+        # Liquidación por suscripción: cada contrato abierto tiene su stream en el conector
+        settlement = None
+        try:
+            if client.connected or client.authenticate():
+                def on_settled(trade):
+                    status_emoji = "✅" if trade.status == 'won' else "❌"
+                    self.stdout.write(self.style.SUCCESS(
+                        f'  {status_emoji} {trade.symbol} {trade.action.upper()}: {trade.status.upper()} - P&L: ${trade.pnl:.2f} (stream)'
+                    ))
+
+                settlement = start_settlement_service(client.connector, on_settled=on_settled)
+                self.stdout.write(self.style.SUCCESS(
+                    f'📡 Liquidación por suscripción activa ({settlement.subscribed} contratos abiertos en seguimiento)'
+                ))
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f'⚠️ Liquidación por suscripción no disponible, se consultará cada contrato: {e}'))
+
+        # Balance por suscripción: get_balance() del loop y del riesgo se sirve de memoria
+        balance_service = None
+        try:
+            if client.connected:
+                balance_service = start_balance_service(client.connector)
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f'⚠️ Stream de balance no disponible: {e}'))
+        if balance_service:
+            self.stdout.write(self.style.SUCCESS(f'💰 Stream de balance activo (${balance_service.balance})'))
+        else:
+            self.stdout.write(self.style.WARNING('⚠️ Stream de balance no disponible, se consultará a Deriv'))
+        
         try:
             recovery_mode = False
             idle_cycles = 0
+            dashboard_state = None
             while True:
+                if profiler:
+                    self._report_query_profile(profiler, profiler.begin_cycle())
+
+                # Métricas de trades: un snapshot por ciclo compartido por todos los símbolos
+                loop.adaptive_filter_manager.invalidate_snapshot()
+                
                 # Recargar configuración desde BD en cada iteración (para aplicar cambios dinámicos)
                 try:
                     from engine.models import CapitalConfig
@@ -206,7 +332,6 @@ class Command(BaseCommand):
 
                 # Si no hay símbolos en BD, usar active_symbols.json como fallback
                 if not symbols:
-                    import os
                     import json
                     active_symbols_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'active_symbols.json')
                     if os.path.exists(active_symbols_path):
@@ -272,6 +397,14 @@ class Command(BaseCommand):
                 except Exception:
                     pass
 
+                if scheduler:
+                    # Solo se evalúan por tick los símbolos seleccionados en este ciclo
+                    scheduler.set_symbols(symbols_list)
+                    if hasattr(tick_service, 'subscribe_to_symbol'):
+                        # El bus ya trae todos los símbolos de save_realtime_tick
+                        for symbol in symbols_list:
+                            tick_service.subscribe_to_symbol(symbol)
+
                 self.stdout.write('=' * 60)
                 self.stdout.write(f'📊 Símbolos encontrados: {len(symbols_list)}')
                 if symbols_list:
@@ -418,13 +551,16 @@ class Command(BaseCommand):
                 
                 if not symbols_list:
                     self.stdout.write(self.style.WARNING('⚠️ No hay símbolos para procesar. Esperando ticks...'))
-                else:
+                elif not scheduler:
                     self.stdout.write(self.style.SUCCESS(f'🔄 Procesando {len(symbols_list)} símbolos...'))
                 
-                for symbol in symbols_list:
+                evaluations = self._evaluate_symbols(loop, executor, symbols_list) if executor else {}
+                
+                # En modo push los símbolos ya se procesaron al llegar sus ticks
+                for symbol in (symbols_list if not scheduler else []):
                     try:
                         self.stdout.write(f'   🔍 Analizando {symbol}...', ending='')
-                        result = loop.process_symbol(symbol)
+                        result = loop.process_symbol(symbol, signals=evaluations.get(symbol))
                         
                         if not result:
                             self.stdout.write(' ⏭️ Sin resultado')
@@ -454,30 +590,7 @@ class Command(BaseCommand):
                                 )
                             
                             # Enviar actualización WebSocket a la plantilla
-                            try:
-                                # Obtener última operación
-                                last_trade = OrderAudit.objects.filter(
-                                    symbol=symbol,
-                                    accepted=True
-                                ).order_by('-timestamp').first()
-                                
-                                if last_trade:
-                                    # Enviar mensaje al grupo de WebSocket
-                                    async_to_sync(channel_layer.group_send)(
-                                        'trading_updates',
-                                        {
-                                            'type': 'trading_update',
-                                            'message': {
-                                                'trade_executed': True,
-                                                'symbol': symbol,
-                                                'direction': last_trade.action,
-                                                'order_id': last_trade.request_payload.get('order_id') if last_trade.request_payload else None,
-                                                'status': 'pending'
-                                            }
-                                        }
-                                    )
-                            except Exception as e:
-                                pass  # Error silencioso
+                            self._notify_trade_executed(channel_layer, symbol)
                         elif status == 'skipped':
                             skipped_count += 1
                             # No mostrar logs de símbolos omitidos (para reducir spam)
@@ -517,6 +630,20 @@ class Command(BaseCommand):
                         # Continuar con siguiente símbolo - no detener el loop
                         continue
                 
+                if scheduler:
+                    counts = scheduler.pop_counts()
+                    executed_count += counts['executed']
+                    rejected_count += counts['rejected']
+                    skipped_count += counts['skipped']
+                    self.stdout.write(
+                        f'⚡ Ticks: {scheduler.ticks} | Evaluaciones: {scheduler.evaluations} | Agrupados: {scheduler.coalesced}'
+                    )
+                    if hasattr(tick_service, 'gaps'):
+                        self.stdout.write(
+                            f'🚌 Bus de ticks: {tick_service.received} recibidos | perdidos: {tick_service.gaps} | '
+                            f'latencia último: {tick_service.last_latency * 1e6:.0f} µs'
+                        )
+
                 # Siempre mostrar resumen para diagnóstico
                 self.stdout.write('')
                 self.stdout.write(
@@ -585,6 +712,16 @@ class Command(BaseCommand):
                         # No detener el loop si falla la verificación
                         pass
                 
+                # Read-model de /engine/trades/: el dashboard lo lee sin abrir conexiones a Deriv
+                try:
+                    snapshot = refresh_trades_snapshot(current_balance, adaptive_manager=loop.adaptive_filter_manager)
+                    # Empujar a los dashboards solo si cambió algo (balance o métricas del snapshot)
+                    if (snapshot.etag, snapshot.balance) != dashboard_state:
+                        dashboard_state = (snapshot.etag, snapshot.balance)
+                        notify_dashboard()
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f'⚠️ No se pudo actualizar el snapshot de trades: {e}'))
+                
                 self.stdout.write('=' * 60)
                 self.stdout.write('')
                 
@@ -619,6 +756,77 @@ class Command(BaseCommand):
             else:
                 self.stdout.write(self.style.ERROR('❌ Demasiados errores consecutivos. Deteniendo...'))
                 raise
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
+            if scheduler:
+                scheduler.stop()
+                tick_service.stop()
+            if settlement:
+                stop_settlement_service()
+            if balance_service:
+                stop_balance_service()
+            if journal:
+                stop_decision_journal()
+            if profiler:
+                self._report_query_profile(profiler, profiler.uninstall())
+
+    def _report_query_profile(self, profiler, profile):
+        """Resumen del ciclo perfilado (aviso si supera el presupuesto)"""
+        if profile is None:
+            return
+        if profiler.over_budget(profile):
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ Presupuesto de consultas superado: {profile.queries} > {profiler.budget}'
+            ))
+        self.stdout.write(profile.format())
+    
+    def _notify_trade_executed(self, channel_layer, symbol):
+        """Enviar la última operación aceptada del símbolo al grupo de WebSocket"""
+        try:
+            last_trade = OrderAudit.objects.filter(
+                symbol=symbol,
+                accepted=True
+            ).order_by('-timestamp').first()
+            
+            if last_trade:
+                async_to_sync(channel_layer.group_send)(
+                    'trading_updates',
+                    {
+                        'type': 'trading_update',
+                        'message': {
+                            'trade_executed': True,
+                            'symbol': symbol,
+                            'direction': last_trade.action,
+                            'order_id': last_trade.request_payload.get('order_id') if last_trade.request_payload else None,
+                            'status': 'pending'
+                        }
+                    }
+                )
+        except Exception:
+            pass  # Error silencioso
+    
+    def _evaluate_symbols(self, loop, executor, symbols):
+        """
+        Evaluar las estrategias de todos los símbolos en paralelo (sin órdenes).
+        Los símbolos cuya evaluación falle se reevalúan en la fase serializada.
+        """
+        def evaluate(symbol):
+            try:
+                return loop.evaluate_symbol(symbol)
+            finally:
+                # Cada hilo del pool tiene su propia conexión de BD
+                close_old_connections()
+        
+        futures = {symbol: executor.submit(evaluate, symbol) for symbol in symbols}
+        evaluations = {}
+        for symbol, future in futures.items():
+            try:
+                evaluations[symbol] = future.result()
+            except Exception as e:
+                import logging
+                logging.getLogger('trading_loop').warning(f"Evaluación concurrente falló para {symbol}: {e}")
+        return evaluations
     
     def _check_pending_trades(self, client):
         """Verificar operaciones abiertas y actualizar su estado aunque se haya perdido la suscripción."""
@@ -638,7 +846,13 @@ class Command(BaseCommand):
             updated_count = 0
             error_count = 0
             
+            settlement = get_settlement_service()
+            
             for trade in pending_trades:
+                # Los contratos con stream activo se liquidan al llegar el evento
+                if settlement and settlement.is_tracking(trade.id):
+                    continue
+                
                 # Tiempo transcurrido desde la apertura
                 elapsed = (timezone.now() - trade.timestamp).total_seconds()
                 elapsed_hours = elapsed / 3600
@@ -718,6 +932,12 @@ class Command(BaseCommand):
                     error_count += 1
                     continue
                 
+                # Con servicio de liquidación: suscribirse (la primera respuesta trae el estado)
+                # en lugar de consultar el contrato de forma bloqueante; si el stream
+                # falló se vuelve a la consulta directa
+                if settlement and trade.id not in settlement.errors and settlement.track(trade):
+                    continue
+                
                 # Consultar estado (reintentos breves para cubrir reconexiones)
                 try:
                     if not getattr(client, 'connected', False):
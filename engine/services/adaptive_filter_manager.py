@@ -4,12 +4,28 @@ Ajusta dinámicamente los umbrales de filtros cuando el rendimiento cae
 """
 
 from __future__ import annotations
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from decimal import Decimal
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import timedelta
+from django.db.models import Count, Q
 from django.utils import timezone
 from monitoring.models import OrderAudit
+from monitoring.signals import trade_settled
+
+
+# Versión de los resultados liquidados en este proceso: cambia cada vez que un
+# trade pasa a won/lost e invalida los snapshots de métricas cacheados
+_settled_version = 0
+
+
+def _on_trade_settled(sender, **kwargs):
+    global _settled_version
+    _settled_version += 1
+
+
+trade_settled.connect(_on_trade_settled, dispatch_uid='adaptive_filter_manager_snapshot')
 
 
 @dataclass
@@ -27,6 +43,20 @@ class PerformanceMetrics:
     trades_today: int
 
 
+@dataclass
+class TradeStatsSnapshot:
+    """
+    Métricas derivadas de OrderAudit calculadas una vez y compartidas por todos
+    los símbolos del ciclo (2 consultas en lugar de ~10 por símbolo)
+    """
+    recent_outcomes: List[Tuple[str, str, Optional[Decimal]]]  # (status, symbol, pnl), más reciente primero
+    total_trades: int
+    trades_today: int
+    version: int
+    created_at: float
+    _symbol_performance: Dict[int, Dict[str, Dict[str, float]]] = field(default_factory=dict)
+
+
 @dataclass
 class AdaptiveParameters:
     """Parámetros adaptativos ajustados dinámicamente"""
@@ -77,6 +107,9 @@ class AdaptiveFilterManager:
                  recovery_check_interval: int = 5,  # Revisar cada 5 trades
                  min_win_rate_recovery: float = 0.52,
                  recovery_steps: int = 10,  # Pasos graduales de recuperación
+                 
+                 # Vida máxima del snapshot de métricas (≈ un ciclo del trading loop)
+                 snapshot_ttl_seconds: float = 10.0,
                  ):
         """
         Inicializar gestor adaptativo de filtros
@@ -85,6 +118,7 @@ class AdaptiveFilterManager:
             win_rate_threshold: Win rate mínimo para considerar rendimiento normal (52%)
             drawdown_threshold: Drawdown mínimo para activar modo conservador (5%)
             losing_streak_threshold: Número de pérdidas consecutivas para activar modo (3)
+            snapshot_ttl_seconds: Segundos que se reutiliza el snapshot de métricas de trades
         """
         self.win_rate_threshold = win_rate_threshold
         self.drawdown_threshold = drawdown_threshold
@@ -125,6 +159,10 @@ class AdaptiveFilterManager:
         self.pause_reason: str = ''
         self._last_probe_ts: float | None = None  # Último intento de micro‑trade durante pausa
         
+        # Snapshot de métricas de trades (se recalcula por ciclo o al liquidarse un trade)
+        self.snapshot_ttl_seconds = snapshot_ttl_seconds
+        self._snapshot: Optional[TradeStatsSnapshot] = None
+        
         # Parámetros actuales ajustados
         self.current_parameters = AdaptiveParameters(
             z_score_threshold=self.base_z_score_threshold,
@@ -156,6 +194,16 @@ class AdaptiveFilterManager:
         Returns:
             PerformanceMetrics con todas las métricas calculadas
         """
+        snapshot = self.get_snapshot()
+        outcomes = [status for status, _, _ in snapshot.recent_outcomes]
+        return self.metrics_from_outcomes(outcomes, snapshot.total_trades, snapshot.trades_today, current_balance)
+
+    def metrics_from_outcomes(self, outcomes: List[str], total_trades: int, trades_today: int,
+                              current_balance: Decimal) -> PerformanceMetrics:
+        """
+        Métricas a partir de resultados ya obtenidos (won/lost, más reciente primero);
+        lo usa `calculate_metrics` con OrderAudit y el replay con trades simulados
+        """
         # Actualizar balance pico
         self.update_peak_balance(current_balance)
         
@@ -170,84 +218,84 @@ class AdaptiveFilterManager:
             drawdown_pct = 0.0
         
         # Calcular win rate global (últimas N operaciones)
-        try:
-            global_trades = OrderAudit.objects.filter(
-                accepted=True,
-                status__in=['won', 'lost']
-            ).order_by('-timestamp')[:self.win_rate_global_lookback]
-            
-            global_total = global_trades.count()
-            global_won = global_trades.filter(status='won').count()
-            win_rate_global = (global_won / global_total) if global_total > 0 else 0.0
-        except Exception:
-            win_rate_global = 0.0
+        global_trades = outcomes[:self.win_rate_global_lookback]
+        win_rate_global = (global_trades.count('won') / len(global_trades)) if global_trades else 0.0
         
         # Calcular win rate reciente (últimas 20 operaciones) - CRÍTICO PARA FILTRADO
-        try:
-            recent_trades = list(OrderAudit.objects.filter(
-                accepted=True,
-                status__in=['won', 'lost']
-            ).order_by('-timestamp')[:20])  # Siempre últimos 20 trades
-            
-            recent_total = len(recent_trades)
-            recent_won = sum(1 for t in recent_trades if t.status == 'won')
-            win_rate_recent = (recent_won / recent_total) if recent_total > 0 else 0.0
-        except Exception:
-            win_rate_recent = 0.0
+        recent_trades = outcomes[:20]  # Siempre últimos 20 trades
+        win_rate_recent = (recent_trades.count('won') / len(recent_trades)) if recent_trades else 0.0
+        
+        # Calcular rachas (pérdidas/ganancias consecutivas) sobre los últimos 10
+        losing_streak = 0
+        winning_streak = 0
+        for status in outcomes[:10]:
+            if status == 'lost':
+                losing_streak += 1
+                winning_streak = 0
+            elif status == 'won':
+                winning_streak += 1
+                losing_streak = 0
+        
+        return PerformanceMetrics(
+            win_rate_global=win_rate_global,
+            win_rate_recent=win_rate_recent,
+            drawdown_pct=drawdown_pct,
+            current_balance=current_balance,
+            initial_balance=self.initial_balance or Decimal('0'),
+            peak_balance=self.peak_balance or Decimal('0'),
+            losing_streak=losing_streak,
+            winning_streak=winning_streak,
+            total_trades=total_trades,
+            trades_today=trades_today
+        )
+    
+    def invalidate_snapshot(self):
+        """Descartar el snapshot de métricas (inicio de ciclo o trade liquidado)"""
+        self._snapshot = None
+    
+    def get_snapshot(self) -> TradeStatsSnapshot:
+        """
+        Snapshot de métricas de trades compartido por todos los símbolos
         
-        # Calcular rachas (pérdidas/ganancias consecutivas)
+        Se reutiliza mientras no se liquide ningún trade en este proceso y no
+        supere `snapshot_ttl_seconds` (cubre liquidaciones hechas en otro proceso).
+        """
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if (snapshot is not None and snapshot.version == _settled_version
+                and now - snapshot.created_at < self.snapshot_ttl_seconds):
+            return snapshot
+        
+        version = _settled_version
+        limit = max(self.win_rate_global_lookback, 20)
         try:
-            last_trades = list(
+            recent_outcomes = list(
                 OrderAudit.objects.filter(
                     accepted=True,
                     status__in=['won', 'lost']
-                ).order_by('-timestamp')[:10]
+                ).order_by('-timestamp').values_list('status', 'symbol', 'pnl')[:limit]
             )
-            
-            losing_streak = 0
-            winning_streak = 0
-            
-            for trade in last_trades:
-                if trade.status == 'lost':
-                    if losing_streak == 0:
-                        losing_streak = 1
-                    else:
-                        losing_streak += 1
-                    winning_streak = 0
-                elif trade.status == 'won':
-                    if winning_streak == 0:
-                        winning_streak = 1
-                    else:
-                        winning_streak += 1
-                    losing_streak = 0
         except Exception:
-            losing_streak = 0
-            winning_streak = 0
+            recent_outcomes = []
         
-        # Contar trades totales y del día
         try:
-            total_trades = OrderAudit.objects.filter(accepted=True).count()
-            today = timezone.now().date()
-            trades_today = OrderAudit.objects.filter(
-                accepted=True,
-                timestamp__date=today
-            ).count()
+            counts = OrderAudit.objects.filter(accepted=True).aggregate(
+                total=Count('id'),
+                today=Count('id', filter=Q(timestamp__date=timezone.now().date())),
+            )
+            total_trades, trades_today = counts['total'] or 0, counts['today'] or 0
         except Exception:
             total_trades = 0
             trades_today = 0
         
-        return PerformanceMetrics(
-            win_rate_global=win_rate_global,
-            win_rate_recent=win_rate_recent,
-            drawdown_pct=drawdown_pct,
-            current_balance=current_balance,
-            initial_balance=self.initial_balance or Decimal('0'),
-            peak_balance=self.peak_balance or Decimal('0'),
-            losing_streak=losing_streak,
-            winning_streak=winning_streak,
+        self._snapshot = TradeStatsSnapshot(
+            recent_outcomes=recent_outcomes,
             total_trades=total_trades,
-            trades_today=trades_today
+            trades_today=trades_today,
+            version=version,
+            created_at=now,
         )
+        return self._snapshot
     
     def should_activate_conservative_mode(self, metrics: PerformanceMetrics) -> bool:
         """
@@ -480,40 +528,42 @@ class AdaptiveFilterManager:
             }
         """
         try:
-            from decimal import Decimal
+            snapshot = self.get_snapshot()
+            cached = snapshot._symbol_performance.get(lookback)
+            if cached is not None:
+                # Copia: los llamadores agregan entradas (p.ej. fallback por ticks)
+                return {symbol: dict(perf) for symbol, perf in cached.items()}
             
             # Obtener últimos N trades finalizados
-            recent_trades = list(
-                OrderAudit.objects.filter(
-                    accepted=True,
-                    status__in=['won', 'lost']
-                ).order_by('-timestamp')[:lookback]
-            )
+            if lookback <= len(snapshot.recent_outcomes) or len(snapshot.recent_outcomes) < max(self.win_rate_global_lookback, 20):
+                recent_trades = snapshot.recent_outcomes[:lookback]
+            else:
+                recent_trades = list(
+                    OrderAudit.objects.filter(
+                        accepted=True,
+                        status__in=['won', 'lost']
+                    ).order_by('-timestamp').values_list('status', 'symbol', 'pnl')[:lookback]
+                )
             
             # Agrupar por símbolo
             symbol_stats: Dict[str, Dict[str, Any]] = {}
             
-            for trade in recent_trades:
-                symbol = trade.symbol
-                
+            for status, symbol, pnl in recent_trades:
                 if symbol not in symbol_stats:
                     symbol_stats[symbol] = {
                         'won': 0,
                         'lost': 0,
                         'total_pnl': Decimal('0.00'),
-                        'trades': []
                     }
                 
-                symbol_stats[symbol]['trades'].append(trade)
-                
-                if trade.status == 'won':
+                if status == 'won':
                     symbol_stats[symbol]['won'] += 1
-                elif trade.status == 'lost':
+                elif status == 'lost':
                     symbol_stats[symbol]['lost'] += 1
                 
                 # Sumar P&L
-                if trade.pnl:
-                    symbol_stats[symbol]['total_pnl'] += Decimal(str(trade.pnl))
+                if pnl:
+                    symbol_stats[symbol]['total_pnl'] += Decimal(str(pnl))
             
             # Calcular métricas finales
             result: Dict[str, Dict[str, float]] = {}
@@ -550,7 +600,8 @@ class AdaptiveFilterManager:
                     'score': score
                 }
             
-            return result
+            snapshot._symbol_performance[lookback] = result
+            return {symbol: dict(perf) for symbol, perf in result.items()}
             
         except Exception as e:
             print(f"Error calculando desempeño de símbolos: {e}")
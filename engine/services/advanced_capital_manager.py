@@ -9,8 +9,7 @@ from decimal import Decimal
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, Tuple, List
 from django.utils import timezone
-from django.db.models import Sum, Avg, StdDev
-from monitoring.models import OrderAudit
+from monitoring.aggregates import outcome_totals
 import math
 
 
@@ -161,33 +160,24 @@ class AdvancedCapitalManager:
         """
         since = timezone.now() - timedelta(days=days)
         
-        queryset = OrderAudit.objects.filter(
-            timestamp__gte=since,
-            status__in=['won', 'lost'],
-            pnl__isnull=False
-        )
-        
-        if symbol:
-            queryset = queryset.filter(symbol=symbol)
-        
-        won_trades = queryset.filter(status='won')
-        lost_trades = queryset.filter(status='lost')
+        # Agregados horarios mantenidos al liquidarse cada trade (solo trades con pnl)
+        totals = outcome_totals(since, symbol=symbol)
         
-        total_trades = queryset.count()
-        won_count = won_trades.count()
-        lost_count = lost_trades.count()
+        won_count = totals['won_pnl_count']
+        lost_count = totals['lost_pnl_count']
+        total_trades = won_count + lost_count
         
         win_rate = (won_count / total_trades) if total_trades > 0 else 0.0
         
         # Promedios
-        avg_win = won_trades.aggregate(avg=Avg('pnl'))['avg'] or Decimal('0.00')
-        avg_loss = lost_trades.aggregate(avg=Avg('pnl'))['avg'] or Decimal('0.00')
+        avg_win = (totals['won_pnl'] / won_count) if won_count else Decimal('0.00')
+        avg_loss = (totals['lost_pnl'] / lost_count) if lost_count else Decimal('0.00')
         
-        # Desviación estándar para VaR
-        pnl_values = list(queryset.values_list('pnl', flat=True))
-        if pnl_values:
+        # Desviación estándar para VaR: Σ(x-m)² = Σx² - 2mΣx + n·m²
+        if total_trades:
             mean_pnl = float(avg_win) * win_rate + float(avg_loss) * (1 - win_rate)
-            variance = sum((float(x) - mean_pnl) ** 2 for x in pnl_values) / len(pnl_values)
+            pnl_sum = float(totals['won_pnl'] + totals['lost_pnl'])
+            variance = (totals['pnl_sq'] - 2 * mean_pnl * pnl_sum + total_trades * mean_pnl ** 2) / total_trades
             std_dev = math.sqrt(variance) if variance > 0 else 0.0
         else:
             std_dev = 0.0
@@ -0,0 +1,258 @@
+"""
+Balance por suscripción
+Un único stream `balance` (subscribe=1) en el conector compartido mantiene el
+balance autoritativo en memoria. `DerivClient.get_balance()` lo lee de aquí
+mientras el stream está vivo, así que las consultas del hot path no cuestan nada
+ni consumen rate limit. Cada cambio se publica a los listeners (dashboard, loop).
+"""
+
+from __future__ import annotations
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BalanceUpdate:
+    balance: Decimal
+    currency: str
+    loginid: str
+    source: str  # stream | buy
+    received_at: float
+    version: int
+
+    @property
+    def account_type(self) -> str:
+        # Las cuentas virtuales de Deriv empiezan por VR (VRTC...)
+        return 'demo' if self.loginid.startswith('VR') else 'real'
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Mismo formato que DerivClient.get_balance()"""
+        return {
+            'balance': float(self.balance),
+            'currency': self.currency,
+            'loginid': self.loginid,
+            'account_type': self.account_type,
+            'source': self.source,
+        }
+
+
+BalanceListener = Callable[[BalanceUpdate], None]
+
+
+class BalanceService:
+    """
+    Stream de balance sobre un DerivConnector.
+
+    - Los mensajes llegan en el hilo del conector: solo se actualiza el valor en memoria.
+    - Los listeners se ejecutan en un hilo propio; si llegan varios cambios mientras
+      se publican, solo se publica el último.
+    - El conector re-suscribe el stream tras reconectar; mientras el socket que lo
+      lleva está caído `info()` retorna None y el cliente vuelve a consultar a Deriv.
+    - Un `balance_after` de una compra solo se registra si el stream no envió nada
+      desde que se envió la compra (el stream es igual o más reciente).
+    """
+
+    def __init__(self, connector):
+        """
+        Args:
+            connector: DerivConnector (o compatible) con `subscribe`, `forget` y `stream_connected`
+        """
+        self.connector = connector
+        self._lock = threading.Lock()
+        self._update: Optional[BalanceUpdate] = None
+        self._listeners: List[BalanceListener] = []
+        self._publisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='balance-publisher')
+        self._publish_pending = False
+        self._subscription_id: Optional[str] = None
+        self.last_error: Any = None
+
+        # Estadísticas
+        self.messages = 0
+        self.published = 0
+
+    @property
+    def balance(self) -> Optional[Decimal]:
+        update = self._update
+        return update.balance if update else None
+
+    @property
+    def live(self) -> bool:
+        """True si hay un valor recibido y el socket que lleva la suscripción sigue conectado"""
+        subscription_id = self._subscription_id
+        if self._update is None or not subscription_id:
+            return False
+        return bool(self.connector.stream_connected(subscription_id))
+
+    def info(self) -> Optional[Dict[str, Any]]:
+        """Balance actual en el formato de get_balance() (None si el stream no está vivo)"""
+        update = self._update
+        if update is None or not self.live:
+            return None
+        return update.as_dict()
+
+    def add_listener(self, listener: BalanceListener) -> None:
+        """Registrar un listener; recibe el valor actual de inmediato si ya hay uno"""
+        with self._lock:
+            self._listeners.append(listener)
+            has_value = self._update is not None
+        if has_value:
+            self._schedule_publish()
+
+    def start(self, timeout: float = 10.0) -> bool:
+        """Abrir el stream y esperar el primer balance"""
+        try:
+            future: Future = self.connector.subscribe({'balance': 1, 'subscribe': 1}, self._on_message)
+            first = future.result(timeout)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning(f"No se pudo abrir el stream de balance: {e}")
+            return False
+        if first.get('error'):
+            self.last_error = first['error']
+            logger.warning(f"Deriv rechazó el stream de balance: {first['error']}")
+            return False
+        # Exponer el servicio al DerivClient de cualquier módulo que comparta el conector
+        self.connector.balance_stream = self
+        return True
+
+    def stop(self) -> None:
+        if getattr(self.connector, 'balance_stream', None) is self:
+            self.connector.balance_stream = None
+        subscription_id, self._subscription_id = self._subscription_id, None
+        if subscription_id:
+            try:
+                self.connector.forget(subscription_id)
+            except Exception as e:
+                logger.debug(f"No se pudo cerrar el stream de balance: {e}")
+        self._publisher.shutdown(wait=True)
+
+    def record(self, balance: Decimal, sent_at: float, source: str = 'buy') -> Optional[BalanceUpdate]:
+        """
+        Balance conocido por otra vía (balance_after de una compra)
+
+        Args:
+            sent_at: Hora (time.time()) a la que se envió la compra; si el stream
+                envió un balance después, ese es igual o más reciente y se ignora este
+
+        Returns:
+            La actualización, o None si se ignoró o no cambió nada
+        """
+        return self._set(Decimal(str(balance)), None, None, source, not_before=sent_at)
+
+    def _on_message(self, data: Dict[str, Any]) -> None:
+        """Callback del stream (hilo del conector): no toca la BD"""
+        if data.get('error'):
+            self.last_error = data['error']
+            return
+        subscription_id = (data.get('subscription') or {}).get('id')
+        if subscription_id:
+            self._subscription_id = subscription_id
+        payload = data.get('balance') or {}
+        if payload.get('balance') is None:
+            return
+        self.messages += 1
+        self._set(Decimal(str(payload['balance'])), payload.get('currency') or 'USD',
+                  payload.get('loginid') or '', 'stream')
+
+    def _set(self, balance: Decimal, currency: Optional[str], loginid: Optional[str], source: str,
+             not_before: Optional[float] = None) -> Optional[BalanceUpdate]:
+        with self._lock:
+            previous = self._update
+            if (not_before is not None and previous is not None and previous.source == 'stream'
+                    and previous.received_at >= not_before):
+                return None
+            if currency is None:
+                currency = previous.currency if previous else 'USD'
+            if loginid is None:
+                loginid = previous.loginid if previous else ''
+            if previous is not None and (previous.balance, previous.currency, previous.loginid) == (balance, currency, loginid):
+                return None
+            update = BalanceUpdate(balance=balance, currency=currency, loginid=loginid, source=source,
+                                   received_at=time.time(), version=(previous.version + 1) if previous else 1)
+            self._update = update
+        self._schedule_publish()
+        return update
+
+    def _schedule_publish(self) -> None:
+        with self._lock:
+            if self._publish_pending:
+                return
+            self._publish_pending = True
+        try:
+            self._publisher.submit(self._publish)
+        except RuntimeError:
+            # Servicio detenido
+            self._publish_pending = False
+
+    def _publish(self) -> None:
+        with self._lock:
+            self._publish_pending = False
+            update = self._update
+            listeners = list(self._listeners)
+        if update is None:
+            return
+        for listener in listeners:
+            try:
+                listener(update)
+            except Exception as e:
+                logger.warning(f"Error publicando balance en {listener}: {e}")
+        self.published += 1
+
+
+def publish_to_dashboard(update: BalanceUpdate) -> None:
+    """Listener por defecto: balance del read-model de trades + aviso a los dashboards"""
+    from engine.services.trades_read_model import set_snapshot_balance
+    from market.live_feed import notify_dashboard
+
+    close_old_connections()
+    set_snapshot_balance(update.balance)
+    notify_dashboard()
+
+
+_service: Optional[BalanceService] = None
+_service_lock = threading.Lock()
+
+
+def start_balance_service(connector, publish: bool = True, timeout: float = 10.0) -> Optional[BalanceService]:
+    """
+    Servicio de balance del proceso (el trading loop lo arranca al conectar)
+
+    Returns:
+        El servicio, o None si Deriv no abrió el stream (se sigue consultando)
+    """
+    global _service
+    with _service_lock:
+        if _service is not None and _service.connector is connector:
+            return _service
+        if _service is not None:
+            _service.stop()
+        service = BalanceService(connector)
+        if not service.start(timeout):
+            service.stop()
+            _service = None
+            return None
+        if publish:
+            service.add_listener(publish_to_dashboard)
+        _service = service
+        return service
+
+
+def get_balance_service() -> Optional[BalanceService]:
+    return _service
+
+
+def stop_balance_service() -> None:
+    global _service
+    with _service_lock:
+        service, _service = _service, None
+    if service is not None:
+        service.stop()
@@ -9,7 +9,7 @@ from decimal import Decimal
 from datetime import datetime, time, timedelta
 from typing import Optional, Dict, Any, Tuple
 from django.utils import timezone
-from django.db.models import Sum
+from monitoring.aggregates import outcome_totals
 from monitoring.models import OrderAudit
 
 
@@ -122,16 +122,9 @@ class CapitalManager:
         now = timezone.now()
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         
-        # Sumar P&L de trades cerrados hoy
-        closed_trades = OrderAudit.objects.filter(
-            timestamp__gte=today_start,
-            status__in=['won', 'lost'],
-            pnl__isnull=False
-        )
-        
-        daily_pnl = closed_trades.aggregate(
-            total_pnl=Sum('pnl')
-        )['total_pnl'] or Decimal('0.00')
+        # Sumar P&L de trades cerrados hoy (buckets horarios UTC: el día empieza en un bucket)
+        totals = outcome_totals(today_start)
+        daily_pnl = totals['won_pnl'] + totals['lost_pnl']
         
         return Decimal(str(daily_pnl))
     
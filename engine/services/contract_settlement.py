@@ -0,0 +1,293 @@
+"""
+Liquidación de contratos por suscripción
+Cada contrato comprado abre un stream `proposal_open_contract` (subscribe=1) en el
+conector compartido; cuando Deriv reporta `is_sold` se escribe el estado final y el
+P&L en OrderAudit. Sustituye las consultas `get_open_contract_info` una por una.
+"""
+
+from __future__ import annotations
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from monitoring.models import OrderAudit
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ('pending', 'active', 'open')
+
+
+def contract_id_for(trade: OrderAudit) -> Optional[str]:
+    """contract_id de una operación (response_payload o, como respaldo, request_payload)"""
+    for payload in (trade.response_payload, trade.request_payload):
+        if not isinstance(payload, dict):
+            continue
+        buy = payload.get('buy')
+        contract_id = (
+            payload.get('contract_id') or
+            payload.get('order_id') or
+            (buy.get('contract_id') if isinstance(buy, dict) else None)
+        )
+        if contract_id:
+            return str(contract_id)
+    return None
+
+
+def settle_trade(trade_id: int, contract: Dict[str, Any], source: str = 'subscription') -> Optional[OrderAudit]:
+    """
+    Escribir el resultado final de un contrato vendido/expirado
+
+    Idempotente: si la operación ya no está abierta (la liquidó otro proceso) no
+    hace nada. La fila se bloquea para que dos liquidadores no la cuenten dos veces.
+
+    Args:
+        trade_id: pk de OrderAudit
+        contract: Payload `proposal_open_contract` de Deriv (con is_sold)
+        source: Origen de la liquidación (se guarda en response_payload)
+
+    Returns:
+        La operación actualizada, o None si ya estaba liquidada
+    """
+    profit = Decimal(str(contract.get('profit', 0) or 0))
+    status = contract.get('status')
+    if status not in ('won', 'lost'):
+        status = 'won' if profit > 0 else 'lost'
+
+    with transaction.atomic():
+        trade = OrderAudit.objects.select_for_update().filter(pk=trade_id).first()
+        if trade is None or trade.status not in OPEN_STATUSES:
+            return None
+        trade.status = status
+        trade.pnl = profit
+        if contract.get('sell_price') is not None:
+            trade.exit_price = Decimal(str(contract['sell_price']))
+        payload = trade.response_payload if isinstance(trade.response_payload, dict) else {}
+        payload['settled_by'] = source
+        payload['settled_at'] = timezone.now().isoformat()
+        trade.response_payload = payload
+        trade.save(update_fields=['status', 'pnl', 'exit_price', 'response_payload'])
+    return trade
+
+
+class ContractSettlementService:
+    """
+    Seguimiento de contratos abiertos mediante streams de Deriv.
+
+    - `track(trade)` abre un stream por contrato; la primera respuesta ya trae el
+      estado actual, así que un contrato vendido se liquida de inmediato.
+    - Los mensajes llegan en el hilo del conector; la escritura en BD se hace en un
+      hilo propio para no bloquear el event loop.
+    - Tras liquidar (o si Deriv responde con error) se cierra el stream. Los errores
+      quedan en `errors` para que el llamador decida (p.ej. marcar como expirado).
+    """
+
+    def __init__(self, connector, on_settled: Optional[Callable[[OrderAudit], None]] = None):
+        """
+        Args:
+            connector: DerivConnector (o compatible) con `subscribe` y `forget`
+            on_settled: Callback opcional tras liquidar cada operación
+        """
+        self.connector = connector
+        self.on_settled = on_settled
+        self._cond = threading.Condition()
+        self._states: Dict[int, str] = {}  # trade_id -> subscribing/open/settling/settled/error
+        self._subscriptions: Dict[int, str] = {}
+        self.errors: Dict[int, Any] = {}
+        self.last_states: Dict[int, str] = {}
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='contract-settlement')
+
+        # Estadísticas
+        self.subscribed = 0
+        self.settled = 0
+
+    def is_tracking(self, trade_id: int) -> bool:
+        with self._cond:
+            return self._states.get(trade_id) in ('subscribing', 'open', 'settling')
+
+    def track(self, trade: OrderAudit) -> bool:
+        """Suscribirse al contrato de una operación abierta (False si no aplica o ya se sigue)"""
+        contract_id = contract_id_for(trade)
+        if not contract_id or trade.status not in OPEN_STATUSES:
+            return False
+        with self._cond:
+            if self._states.get(trade.pk) in ('subscribing', 'open', 'settling'):
+                return False
+            self._states[trade.pk] = 'subscribing'
+            self.errors.pop(trade.pk, None)
+            self.subscribed += 1
+        payload = {
+            'proposal_open_contract': 1,
+            'contract_id': int(contract_id) if contract_id.isdigit() else contract_id,
+            'subscribe': 1,
+        }
+        try:
+            future = self.connector.subscribe(payload, partial(self._on_message, trade.pk))
+        except Exception as e:
+            self._finish(trade.pk, 'error', error=str(e))
+            return False
+        future.add_done_callback(partial(self._on_subscribed, trade.pk))
+        return True
+
+    def track_open(self, max_age_hours: float = 2.0) -> int:
+        """Seguir todas las operaciones abiertas recientes (al arrancar o tras reiniciar)"""
+        since = timezone.now() - timedelta(hours=max_age_hours)
+        trades = OrderAudit.objects.filter(status__in=OPEN_STATUSES, accepted=True, timestamp__gte=since)
+        return sum(1 for trade in trades if self.track(trade))
+
+    def reconcile(self, trades: Iterable[OrderAudit], wait: float = 10.0) -> Dict[int, str]:
+        """
+        Conciliar un lote en paralelo: suscribirse a todos y esperar el primer estado
+
+        Returns:
+            {trade_id: estado} con estado settled/open/error (o subscribing si no respondió)
+        """
+        trade_ids = [trade.pk for trade in trades if self.track(trade)]
+        deadline = time.monotonic() + wait
+        with self._cond:
+            while any(self._states.get(tid) in ('subscribing', 'settling') for tid in trade_ids):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            self.last_states = {tid: self._states.get(tid) for tid in trade_ids}
+            return self.last_states
+
+    def stop(self) -> None:
+        """Cerrar todos los streams y esperar las escrituras pendientes"""
+        with self._cond:
+            subscriptions = list(self._subscriptions.values())
+            self._subscriptions.clear()
+            for trade_id, state in self._states.items():
+                if state in ('subscribing', 'open'):
+                    self._states[trade_id] = 'stopped'
+        for subscription_id in subscriptions:
+            self._forget(subscription_id)
+        self._writer.shutdown(wait=True)
+
+    def _on_subscribed(self, trade_id: int, future: Future) -> None:
+        try:
+            future.result()
+        except Exception as e:
+            self._finish(trade_id, 'error', error=str(e))
+
+    def _on_message(self, trade_id: int, data: Dict[str, Any]) -> None:
+        """Callback del stream (hilo del conector): no toca la BD"""
+        if data.get('error'):
+            self._finish(trade_id, 'error', error=data['error'])
+            return
+        subscription_id = (data.get('subscription') or {}).get('id')
+        contract = data.get('proposal_open_contract') or {}
+        with self._cond:
+            state = self._states.get(trade_id)
+            if state not in ('subscribing', 'open'):
+                # Mensaje tardío de un stream ya cerrado o en liquidación
+                return
+            if subscription_id:
+                self._subscriptions[trade_id] = subscription_id
+            if not contract.get('is_sold'):
+                if state == 'subscribing':
+                    self._states[trade_id] = 'open'
+                    self._cond.notify_all()
+                return
+            self._states[trade_id] = 'settling'
+        self._writer.submit(self._settle, trade_id, contract)
+
+    def _settle(self, trade_id: int, contract: Dict[str, Any]) -> None:
+        try:
+            close_old_connections()
+            trade = settle_trade(trade_id, contract)
+            if trade is not None:
+                with self._cond:
+                    self.settled += 1
+                logger.info(f"Contrato liquidado: trade {trade_id} {trade.symbol} {trade.status} P&L {trade.pnl}")
+                if self.on_settled:
+                    self.on_settled(trade)
+            self._finish(trade_id, 'settled')
+        except Exception as e:
+            logger.exception(f"Error liquidando trade {trade_id}: {e}")
+            self._finish(trade_id, 'error', error=str(e))
+
+    def _finish(self, trade_id: int, state: str, error: Any = None) -> None:
+        with self._cond:
+            if self._states.get(trade_id) == 'stopped':
+                return
+            self._states[trade_id] = state
+            if error is not None:
+                self.errors[trade_id] = error
+            subscription_id = self._subscriptions.pop(trade_id, None)
+            self._cond.notify_all()
+        if subscription_id:
+            self._forget(subscription_id)
+
+    def _forget(self, subscription_id: str) -> None:
+        try:
+            self.connector.forget(subscription_id)
+        except Exception as e:
+            logger.debug(f"No se pudo cerrar el stream {subscription_id}: {e}")
+
+
+_service: Optional[ContractSettlementService] = None
+_service_lock = threading.Lock()
+
+
+def start_settlement_service(connector, on_settled: Optional[Callable[[OrderAudit], None]] = None,
+                             resume: bool = True) -> ContractSettlementService:
+    """Servicio de liquidación del proceso (el trading loop lo arranca al conectar)"""
+    global _service
+    with _service_lock:
+        if _service is None or _service.connector is not connector:
+            if _service is not None:
+                _service.stop()
+            _service = ContractSettlementService(connector, on_settled=on_settled)
+        service = _service
+    if resume:
+        service.track_open()
+    return service
+
+
+def get_settlement_service() -> Optional[ContractSettlementService]:
+    return _service
+
+
+def stop_settlement_service() -> None:
+    global _service
+    with _service_lock:
+        service, _service = _service, None
+    if service is not None:
+        service.stop()
+
+
+def track_trade(trade: Union[OrderAudit, None]) -> bool:
+    """Seguir una operación recién comprada si hay servicio activo en este proceso"""
+    service = _service
+    if service is None or trade is None:
+        return False
+    try:
+        return service.track(trade)
+    except Exception as e:
+        logger.warning(f"No se pudo suscribir el contrato del trade {getattr(trade, 'pk', None)}: {e}")
+        return False
+
+
+def reconcile_contracts(connector, trades: Iterable[OrderAudit], wait: float = 10.0) -> ContractSettlementService:
+    """
+    Conciliación puntual (Celery, comandos): un stream por contrato abierto en
+    paralelo, se liquidan los ya vendidos y se cierran todos los streams.
+
+    Returns:
+        El servicio usado (ya detenido): `last_states`, `errors` y `settled`
+    """
+    service = ContractSettlementService(connector)
+    try:
+        service.reconcile(trades, wait=wait)
+    finally:
+        service.stop()
+    return service
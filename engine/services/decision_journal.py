@@ -0,0 +1,261 @@
+"""
+Bitácora de decisiones de estrategia (JSONL append-only con rotación)
+Cada evaluación de `process_symbol` deja una línea con las cuatro señales, el
+origen elegido, los parámetros adaptativos y el resultado (estado + filtro que la
+rechazó). El loop solo encola un dict; serializar y escribir lo hace un hilo propio.
+"""
+
+from __future__ import annotations
+import dataclasses
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILENAME = 'decisions.jsonl'
+
+
+def snapshot_signal(signal: Any) -> Optional[Dict[str, Any]]:
+    """Copia superficial de los atributos de una señal (las estrategias la mutan después)"""
+    if signal is None:
+        return None
+    if dataclasses.is_dataclass(signal):
+        data = {f.name: getattr(signal, f.name) for f in dataclasses.fields(signal)}
+    else:
+        data = {}
+    data.update(getattr(signal, '__dict__', {}))
+    return data
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+class DecisionJournal:
+    """
+    Escritor de la bitácora con cola acotada.
+
+    - `record()` nunca bloquea: si la cola está llena la entrada se descarta y se cuenta.
+    - El hilo escritor agrupa entradas, las serializa y hace un solo `write` por lote.
+    - Rotación por tamaño: decisions.jsonl → decisions.jsonl.1 → ... → .N (se borra la más vieja).
+    """
+
+    def __init__(self,
+                 directory: Optional[Path] = None,
+                 max_bytes: int = 50 * 1024 * 1024,
+                 backup_count: int = 10,
+                 flush_interval_ms: int = 500,
+                 max_queue_size: int = 20000):
+        """
+        Args:
+            directory: Carpeta de la bitácora (default: settings.DECISION_JOURNAL_DIR)
+            max_bytes: Tamaño a partir del cual se rota el fichero activo
+            backup_count: Ficheros rotados que se conservan
+            flush_interval_ms: Tiempo máximo que una entrada espera en memoria
+            max_queue_size: Entradas pendientes máximas antes de descartar
+        """
+        self.directory = Path(directory or settings.DECISION_JOURNAL_DIR)
+        self.path = self.directory / JOURNAL_FILENAME
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._write_lock = threading.Lock()
+
+        # Estadísticas
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+
+    def start(self) -> None:
+        """Iniciar el hilo escritor (idempotente)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='decision-journal', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Detener el hilo escritor vaciando lo pendiente"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+
+    def record(self, entry: Dict[str, Any]) -> bool:
+        """Encolar una decisión (False si se descartó por cola llena)"""
+        entry.setdefault('ts', time.time())
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self) -> int:
+        """Escribir sincrónicamente todo lo pendiente. Retorna entradas escritas."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return self._write(batch) if batch else 0
+
+    def _collect(self) -> List[Dict[str, Any]]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < 1000:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]) -> int:
+        lines = []
+        for entry in batch:
+            try:
+                lines.append(json.dumps(entry, default=_json_default, ensure_ascii=False, separators=(',', ':')))
+            except (TypeError, ValueError) as e:
+                logger.debug(f"Decisión no serializable descartada: {e}")
+                self.dropped += 1
+        if not lines:
+            return 0
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        with self._write_lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                if self.path.exists() and self.path.stat().st_size + len(data) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, 'ab') as fh:
+                    fh.write(data)
+            except OSError as e:
+                logger.error(f"Error escribiendo la bitácora de decisiones: {e}")
+                self.dropped += len(lines)
+                return 0
+            self.written += len(lines)
+            return len(lines)
+
+    def _rotate(self) -> None:
+        oldest = self.path.with_name(f'{JOURNAL_FILENAME}.{self.backup_count}')
+        if oldest.exists():
+            oldest.unlink()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self.path.with_name(f'{JOURNAL_FILENAME}.{index}')
+            if source.exists():
+                os.replace(source, self.path.with_name(f'{JOURNAL_FILENAME}.{index + 1}'))
+        if self.backup_count > 0:
+            os.replace(self.path, self.path.with_name(f'{JOURNAL_FILENAME}.1'))
+        else:
+            self.path.unlink()
+        self.rotations += 1
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+
+def journal_files(directory: Optional[Path] = None) -> List[Path]:
+    """Ficheros de la bitácora del más antiguo al más reciente"""
+    directory = Path(directory or settings.DECISION_JOURNAL_DIR)
+    rotated = sorted(
+        (p for p in directory.glob(f'{JOURNAL_FILENAME}.*') if p.suffix[1:].isdigit()),
+        key=lambda p: int(p.suffix[1:]), reverse=True,
+    )
+    active = directory / JOURNAL_FILENAME
+    return rotated + ([active] if active.exists() else [])
+
+
+def read_decisions(directory: Optional[Path] = None, since: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """Recorrer las decisiones en orden cronológico (opcionalmente desde un epoch)"""
+    for path in journal_files(directory):
+        with open(path, 'r', encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Línea truncada por un corte del proceso
+                if since is None or entry.get('ts', 0) >= since:
+                    yield entry
+
+
+def summarize_decisions(entries) -> Dict[str, Any]:
+    """
+    Conteos para análisis de filtros
+
+    Returns:
+        {'total', 'by_status': {estado: n}, 'by_reason': {motivo: n},
+         'by_origin': {origen: {estado: n}}}
+    """
+    summary: Dict[str, Any] = {'total': 0, 'by_status': {}, 'by_reason': {}, 'by_origin': {}}
+    for entry in entries:
+        status = entry.get('status') or 'unknown'
+        summary['total'] += 1
+        summary['by_status'][status] = summary['by_status'].get(status, 0) + 1
+        reason = entry.get('reason')
+        if reason:
+            summary['by_reason'][reason] = summary['by_reason'].get(reason, 0) + 1
+        origin = entry.get('origin')
+        if origin:
+            per_origin = summary['by_origin'].setdefault(origin, {})
+            per_origin[status] = per_origin.get(status, 0) + 1
+    return summary
+
+
+_journal: Optional[DecisionJournal] = None
+_journal_lock = threading.Lock()
+
+
+def start_decision_journal(directory: Optional[Path] = None, **kwargs) -> DecisionJournal:
+    """Bitácora del proceso (el trading loop la arranca; sin ella `record_decision` no hace nada)"""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = DecisionJournal(directory, **kwargs)
+        _journal.start()
+        return _journal
+
+
+def get_decision_journal() -> Optional[DecisionJournal]:
+    return _journal
+
+
+def stop_decision_journal() -> None:
+    global _journal
+    with _journal_lock:
+        journal, _journal = _journal, None
+    if journal is not None:
+        journal.stop()
+
+
+def record_decision(entry: Dict[str, Any]) -> bool:
+    """Registrar una decisión si hay bitácora activa en este proceso"""
+    journal = _journal
+    if journal is None:
+        return False
+    return journal.record(entry)
@@ -1,9 +1,12 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional, Literal
+from typing import Any, Optional, Literal
 from decimal import Decimal
 from django.utils import timezone
-from market.models import Tick
+from engine.services.tick_buffer import fetch_recent_prices
+from engine.services.streaming_indicators import (
+    RollingExtrema, StreamingIndicatorStore, SymbolIndicators, WindowedEMA
+)
 
 
 Direction = Literal['CALL', 'PUT']
@@ -22,13 +25,21 @@ class EMAExtremaSignal:
 
 
 class EMA200ExtremaStrategy:
-    def __init__(self, lookback_ticks: int = 200, extrema_window: int = 60, ema_period: int = 200):
+    def __init__(self, lookback_ticks: int = 200, extrema_window: int = 60, ema_period: int = 200,
+                 tick_source: Optional[Any] = None):
         self.lookback_ticks = max(lookback_ticks, 200)
         self.extrema_window = max(extrema_window, 30)
         self.ema_period = max(ema_period, 2)
+        self.tick_source = tick_source  # TickBufferStore compartido (None = BD)
+        # EMA y extremos incrementales por símbolo (solo con buffer en memoria)
+        self.indicators = StreamingIndicatorStore.for_source(tick_source, lambda: SymbolIndicators(
+            ema=WindowedEMA(self.ema_period),
+            extrema=RollingExtrema(self.extrema_window),
+            range20=RollingExtrema(20),
+        ))
 
-    def _fetch_ticks(self, symbol: str, limit: int) -> list[Tick]:
-        return list(Tick.objects.filter(symbol=symbol).order_by('-timestamp')[:limit])
+    def _fetch_prices(self, symbol: str, limit: int) -> list[float]:
+        return fetch_recent_prices(symbol, limit, self.tick_source).tolist()
 
     def _compute_ema(self, prices: list[float], period: int = 200) -> Optional[float]:
         if len(prices) < period:
@@ -47,23 +58,33 @@ class EMA200ExtremaStrategy:
 
     def analyze_symbol(self, symbol: str) -> Optional[EMAExtremaSignal]:
         # Traer suficientes ticks
-        ticks = self._fetch_ticks(symbol, max(self.lookback_ticks, self.extrema_window) + 5)
-        if len(ticks) < self.lookback_ticks:
+        prices = self._fetch_prices(symbol, max(self.lookback_ticks, self.extrema_window) + 5)  # cronológico
+        if len(prices) < self.lookback_ticks:
             return None
-        prices = [float(t.price) for t in reversed(ticks)]  # cronológico
         last_price = Decimal(str(prices[-1]))
 
-        ema200_val = self._compute_ema(prices, self.ema_period)
+        state = self.indicators.get(symbol) if self.indicators else None
+        if state is not None and not state.ready_for(prices):
+            state = None
+
+        if state:
+            ema200_val = state['ema'].value
+            recent_high, recent_low = state['extrema'].high, state['extrema'].low
+        else:
+            ema200_val = self._compute_ema(prices, self.ema_period)
+            recent_high, recent_low = self._recent_extrema(prices, self.extrema_window)
         if ema200_val is None:
             return None
-        recent_high, recent_low = self._recent_extrema(prices, self.extrema_window)
         if recent_high is None or recent_low is None:
             return None
 
         # Aproximación de ATR% simple (rango último N / precio actual)
         try:
-            last_n = prices[-min(20, len(prices)):]  # 20 últimos
-            high_n, low_n = max(last_n), min(last_n)
+            if state:
+                high_n, low_n = state['range20'].high, state['range20'].low
+            else:
+                last_n = prices[-min(20, len(prices)):]  # 20 últimos
+                high_n, low_n = max(last_n), min(last_n)
             atr_ratio = (high_n - low_n) / prices[-1] if prices[-1] > 0 else 0.0
         except Exception:
             atr_ratio = 0.0
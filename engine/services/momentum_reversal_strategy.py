@@ -9,12 +9,15 @@ Detecta:
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional, List, Literal
+from typing import Any, Optional, List, Literal
 from decimal import Decimal
 import numpy as np
 
 from django.utils import timezone
-from market.models import Tick
+from engine.services.tick_buffer import fetch_recent_prices
+from engine.services.streaming_indicators import (
+    RollingDeltas, RollingExtrema, StreamingIndicatorStore, SymbolIndicators
+)
 
 
 Direction = Literal['CALL', 'PUT']
@@ -51,7 +54,8 @@ class MomentumReversalStrategy:
                  long_timeframe: int = 60,  # Ticks para timeframe largo
                  rsi_period: int = 14,  # Período para RSI
                  rsi_extreme_high: float = 75.0,  # RSI sobrecompra
-                 rsi_extreme_low: float = 25.0):  # RSI sobreventa
+                 rsi_extreme_low: float = 25.0,  # RSI sobreventa
+                 tick_source: Optional[Any] = None):  # TickBufferStore compartido (None = BD)
         """
         Inicializar estrategia de reversión
         
@@ -70,10 +74,19 @@ class MomentumReversalStrategy:
         self.rsi_period = rsi_period
         self.rsi_extreme_high = rsi_extreme_high
         self.rsi_extreme_low = rsi_extreme_low
+        self.tick_source = tick_source
+        # La fatiga mide el RSI al cierre de los primeros 50 ticks de la ventana,
+        # es decir, `window - 50` ticks atrás respecto al último
+        self.window = max(self.long_timeframe, 50) + 10
+        self.rsi_lag = self.window - 50
+        self.indicators = StreamingIndicatorStore.for_source(tick_source, lambda: SymbolIndicators(
+            rsi=RollingDeltas(self.rsi_period, lags=self.rsi_lag),
+            range20=RollingExtrema(20),
+        ))
     
-    def _fetch_ticks(self, symbol: str, limit: int) -> List[Tick]:
-        """Obtener últimos ticks de un símbolo"""
-        return list(Tick.objects.filter(symbol=symbol).order_by('-timestamp')[:limit])
+    def _fetch_prices(self, symbol: str, limit: int) -> List[float]:
+        """Obtener últimos precios de un símbolo en orden cronológico"""
+        return fetch_recent_prices(symbol, limit, self.tick_source).tolist()
     
     def _calculate_rsi(self, prices: List[float], period: int = 14) -> Optional[float]:
         """Calcular RSI (Relative Strength Index)"""
@@ -114,17 +127,21 @@ class MomentumReversalStrategy:
         atr_ratio = (high - low) / current
         return float(atr_ratio)
     
-    def _detect_fatigue(self, ticks: List[Tick]) -> Optional[dict]:
+    def _detect_fatigue(self, history: List[float], state: Optional[SymbolIndicators] = None) -> Optional[dict]:
         """
         Detectar fatiga del movimiento:
         - 5+ ticks consecutivos en una dirección
         - Momentum acumulado alto
         - RSI en zona extrema
+
+        Los detectores reciben la ventana cronológica completa y conservan los
+        mismos cortes que cuando recibían la lista de ticks descendente
+        (`ticks[-n:]` invertido equivale a `history[:n]`).
         """
-        if len(ticks) < self.fatigue_threshold + 5:
+        if len(history) < self.fatigue_threshold + 5:
             return None
         
-        prices = [float(t.price) for t in reversed(ticks[-self.fatigue_threshold-5:])]
+        prices = history[:self.fatigue_threshold + 5]
         consecutive_up = 0
         consecutive_down = 0
         momentum_accumulated = 0.0
@@ -161,8 +178,12 @@ class MomentumReversalStrategy:
             return None
         
         # Calcular RSI
-        all_prices = [float(t.price) for t in reversed(ticks[-50:])]
-        rsi = self._calculate_rsi(all_prices, self.rsi_period)
+        if state is not None and len(history) == self.window:
+            window = state['rsi'].window(self.rsi_lag)
+            rsi = window.rsi() if window else None
+        else:
+            all_prices = history[:50]
+            rsi = self._calculate_rsi(all_prices, self.rsi_period)
         
         # Validar RSI en zona extrema
         if rsi is None:
@@ -186,17 +207,17 @@ class MomentumReversalStrategy:
             'confidence': min(1.0, max(0.5, (momentum_accumulated / 0.10) * 0.3 + (abs(rsi - 50) / 50) * 0.7))
         }
     
-    def _detect_breakout(self, ticks: List[Tick]) -> Optional[dict]:
+    def _detect_breakout(self, history: List[float]) -> Optional[dict]:
         """
         Detectar ruptura de consolidación:
         - ATR% bajo (<0.001%) en últimos N ticks
         - ATR% aumenta 2x+ en tick actual
         - Precio rompe rango reciente
         """
-        if len(ticks) < 25:
+        if len(history) < 25:
             return None
         
-        prices = [float(t.price) for t in reversed(ticks[-25:])]
+        prices = history[:25]
         
         # ATR% de los últimos 10 ticks (consolidación)
         atr_consolidation = self._calculate_atr_ratio(prices[-15:-5], period=10)
@@ -236,17 +257,17 @@ class MomentumReversalStrategy:
         
         return None
     
-    def _detect_momentum_extreme(self, ticks: List[Tick]) -> Optional[dict]:
+    def _detect_momentum_extreme(self, history: List[float]) -> Optional[dict]:
         """
         Detectar reversión por momentum extremo:
         - Momentum >0.05% (muy alto)
         - 3er tick consecutivo con momentum alto
         - Precio cerca de máximo/mínimo reciente
         """
-        if len(ticks) < 35:
+        if len(history) < 35:
             return None
         
-        prices = [float(t.price) for t in reversed(ticks[-35:])]
+        prices = history[:35]
         
         # Calcular momentum de últimos 5 ticks
         recent_momentum = []
@@ -309,16 +330,16 @@ class MomentumReversalStrategy:
             'confidence': confidence
         }
     
-    def _detect_timeframe_divergence(self, ticks: List[Tick]) -> Optional[dict]:
+    def _detect_timeframe_divergence(self, history: List[float]) -> Optional[dict]:
         """
         Detectar divergencia de timeframes:
         - Tendencia larga (60 ticks) vs corta (15 ticks) opuestas
         - Momentum reciente aumentando
         """
-        if len(ticks) < self.long_timeframe:
+        if len(history) < self.long_timeframe:
             return None
         
-        prices = [float(t.price) for t in reversed(ticks[-self.long_timeframe:])]
+        prices = history[:self.long_timeframe]
         
         # Tendencia de largo plazo
         long_prices = prices[-self.long_timeframe:]
@@ -374,19 +395,25 @@ class MomentumReversalStrategy:
         Returns:
             MomentumReversalSignal si hay señal válida, None si no
         """
-        # Obtener suficientes ticks
-        ticks = self._fetch_ticks(symbol, max(self.long_timeframe, 50) + 10)
+        # Obtener suficientes precios (cronológicos)
+        prices = self._fetch_prices(symbol, self.window)
         
-        if len(ticks) < self.long_timeframe:
+        if len(prices) < self.long_timeframe:
             return None
         
-        prices = [float(t.price) for t in reversed(ticks)]
         last_price = Decimal(str(prices[-1]))
         
+        # Estado incremental solo si corresponde a la ventana completa
+        state = None
+        if self.indicators and len(prices) == self.window:
+            state = self.indicators.get(symbol)
+            if not state.ready_for(prices):
+                state = None
+        
         signals = []
         
         # 1. Detectar fatiga
-        fatigue = self._detect_fatigue(ticks)
+        fatigue = self._detect_fatigue(prices, state)
         if fatigue:
             signals.append({
                 'type': 'fatigue_reversal',
@@ -398,7 +425,7 @@ class MomentumReversalStrategy:
             })
         
         # 2. Detectar ruptura
-        breakout = self._detect_breakout(ticks)
+        breakout = self._detect_breakout(prices)
         if breakout:
             signals.append({
                 'type': 'breakout',
@@ -409,7 +436,7 @@ class MomentumReversalStrategy:
             })
         
         # 3. Detectar momentum extremo
-        momentum_extreme = self._detect_momentum_extreme(ticks)
+        momentum_extreme = self._detect_momentum_extreme(prices)
         if momentum_extreme:
             signals.append({
                 'type': 'momentum_extreme',
@@ -420,7 +447,7 @@ class MomentumReversalStrategy:
             })
         
         # 4. Detectar divergencia
-        divergence = self._detect_timeframe_divergence(ticks)
+        divergence = self._detect_timeframe_divergence(prices)
         if divergence:
             signals.append({
                 'type': 'timeframe_divergence',
@@ -458,7 +485,10 @@ class MomentumReversalStrategy:
         main_signal = max(signals, key=lambda x: x['confidence'] * x['weight'])
         
         # Calcular ATR% para el signal
-        atr_ratio = self._calculate_atr_ratio(prices, period=20)
+        if state and prices[-1] != 0:
+            atr_ratio = float((state['range20'].high - state['range20'].low) / prices[-1])
+        else:
+            atr_ratio = self._calculate_atr_ratio(prices, period=20)
         
         return MomentumReversalSignal(
             symbol=symbol,
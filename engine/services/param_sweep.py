@@ -0,0 +1,162 @@
+"""
+Barrido de parámetros de las estrategias en paralelo
+Cada configuración es un backtest de replay (`TickReplayBacktester`); las corridas
+se reparten en un ProcessPoolExecutor y todos los procesos leen los mismos ficheros
+.npy del archivo de ticks con memory-map (el sistema operativo comparte las páginas).
+"""
+
+from __future__ import annotations
+import csv
+import itertools
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from engine.services.tick_archive import TickArchiveReader
+from engine.services.tick_replay import ReplayConfig, ReplayResult, TickReplayBacktester
+
+logger = logging.getLogger(__name__)
+
+# En vivo el gestor adaptativo reescribe estos umbrales en cada ciclo: se barren
+# con adaptive.base_z_score_threshold / adaptive.base_momentum_threshold
+_OVERRIDDEN_PARAMS = ('primary.z_score_threshold', 'primary.momentum_threshold')
+
+
+def parameter_grid(space: Dict[str, Sequence[Any]]) -> Iterator[Dict[str, Any]]:
+    """Producto cartesiano de {parámetro: [valores]}"""
+    names = sorted(space)
+    for values in itertools.product(*(space[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def random_configs(space: Dict[str, Any], samples: int, seed: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Búsqueda aleatoria: listas se muestrean por elección, {'min', 'max'} de forma
+    uniforme (entera si ambos extremos son enteros)
+    """
+    rng = random.Random(seed)
+    names = sorted(space)
+    for _ in range(samples):
+        config = {}
+        for name in names:
+            spec = space[name]
+            if isinstance(spec, dict):
+                low, high = spec['min'], spec['max']
+                if isinstance(low, int) and isinstance(high, int):
+                    config[name] = rng.randint(low, high)
+                else:
+                    config[name] = rng.uniform(low, high)
+            else:
+                config[name] = rng.choice(list(spec))
+        yield config
+
+
+def validate_params(params: Dict[str, Any]) -> None:
+    """Rechazar claves inválidas antes de lanzar los procesos"""
+    overridden = [name for name in params if name in _OVERRIDDEN_PARAMS]
+    if overridden:
+        raise ValueError(
+            f"{overridden} los fija el gestor adaptativo en cada ciclo; "
+            f"usar adaptive.base_z_score_threshold / adaptive.base_momentum_threshold"
+        )
+    ReplayConfig(params=params).grouped_params()
+
+
+# Estado por proceso: ticks abiertos una vez con memory-map y reutilizados por cada corrida
+_worker_data: List[Tuple[str, Any, Any]] = []
+_worker_base: Dict[str, Any] = {}
+
+
+def _init_worker(root: str, symbols: List[str], since, until, base: Dict[str, Any]) -> None:
+    global _worker_data, _worker_base
+    reader = TickArchiveReader(Path(root))
+    _worker_data = []
+    for symbol in symbols:
+        epochs, prices = reader.read(symbol, since, until)
+        if len(prices):
+            _worker_data.append((symbol, epochs, prices))
+    _worker_base = base
+
+
+def _run_config(indexed: Tuple[int, Dict[str, Any]]) -> Tuple[int, Dict[str, Any]]:
+    index, params = indexed
+    config = ReplayConfig(**{**_worker_base, 'params': params})
+    backtester = TickReplayBacktester(config)
+    total = ReplayResult()
+    for symbol, epochs, prices in _worker_data:
+        total.merge(backtester.run_symbol(symbol, epochs, prices))
+    return index, total.to_dict()
+
+
+def run_sweep(configs: Sequence[Dict[str, Any]], symbols: List[str], root: Optional[Path] = None,
+              since=None, until=None, workers: Optional[int] = None,
+              base: Optional[Dict[str, Any]] = None, rank_by: str = 'pnl',
+              min_trades: int = 1) -> List[Dict[str, Any]]:
+    """
+    Ejecutar un backtest de replay por configuración en paralelo
+
+    Args:
+        configs: Parámetros por corrida (claves con prefijo, ver ReplayConfig.params)
+        symbols: Símbolos del archivo .npy a usar
+        root: Directorio del archivo (default: settings.TICK_ARCHIVE_DIR)
+        workers: Procesos (default: núcleos disponibles)
+        base: Otros campos de ReplayConfig comunes a todas las corridas (stake, payout...)
+        rank_by: 'pnl' o 'win_rate'
+        min_trades: Corridas con menos trades quedan al final del ranking
+
+    Returns:
+        Filas ordenadas de mejor a peor: rank, parámetros y métricas totales
+    """
+    configs = list(configs)
+    for params in configs:
+        validate_params(params)
+    root = TickArchiveReader(root).root
+    workers = workers or os.cpu_count() or 1
+    # Lotes grandes: cada corrida es corta y así se reduce el tráfico entre procesos
+    chunksize = max(1, len(configs) // (workers * 4))
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(configs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(root), list(symbols), since, until, base or {})) as pool:
+        for index, report in pool.map(_run_config, enumerate(configs), chunksize=chunksize):
+            results[index] = report
+
+    rows = []
+    for params, report in zip(configs, results):
+        total = report['total']
+        rows.append({
+            **params,
+            'trades': total['trades'],
+            'wins': total['wins'],
+            'win_rate': total['win_rate'],
+            'pnl': total['pnl'],
+            'by_strategy': report['by_strategy'],
+        })
+    rows.sort(key=lambda row: (row['trades'] >= min_trades, row[rank_by], row['trades']), reverse=True)
+    for rank, row in enumerate(rows, start=1):
+        row['rank'] = rank
+    logger.info(f"Barrido completado: {len(rows)} configuraciones en {workers} procesos")
+    return rows
+
+
+def write_results(rows: List[Dict[str, Any]], path: Path) -> None:
+    """Tabla CSV del ranking (una columna por parámetro y por métrica)"""
+    param_names = sorted({key for row in rows for key in row
+                          if key not in ('rank', 'trades', 'wins', 'win_rate', 'pnl', 'by_strategy')})
+    origins = sorted({origin for row in rows for origin in row['by_strategy']})
+    fieldnames = ['rank', *param_names, 'trades', 'wins', 'win_rate', 'pnl',
+                  *(f'{origin}.{metric}' for origin in origins for metric in ('trades', 'win_rate', 'pnl'))]
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='') as fh:
+        writer = csv.DictWriter(fh, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            flat = {key: value for key, value in row.items() if key != 'by_strategy'}
+            for origin, stats in row['by_strategy'].items():
+                for metric in ('trades', 'win_rate', 'pnl'):
+                    flat[f'{origin}.{metric}'] = stats[metric]
+            writer.writerow(flat)
@@ -10,6 +10,7 @@ from typing import List, Dict, Any, Optional
 from django.utils import timezone
 from monitoring.models import OrderAudit
 from engine.services.risk_protection import RiskProtectionSystem
+from engine.services.contract_settlement import get_settlement_service
 from connectors.deriv_client import DerivClient
 
 
@@ -39,14 +40,19 @@ class PositionMonitor:
             status__in=['pending', 'active', 'open']
         )
         
-        if not self._client:
-            self._client = DerivClient()
+        settlement = get_settlement_service()
         
         for position in active_positions:
             try:
-                # Verificar si el contrato ha expirado en Deriv (primera verificación)
+                # Verificar si el contrato ha expirado en Deriv (primera verificación).
+                # Con servicio de liquidación el contrato llega por su stream: solo se
+                # consulta directamente si no se pudo suscribir
                 contract_id = self._get_contract_id(position)
-                if contract_id:
+                if contract_id and settlement and position.id not in settlement.errors:
+                    settlement.track(position)
+                elif contract_id:
+                    if not self._client:
+                        self._client = DerivClient()
                     contract_info = self._client.get_open_contract_info(contract_id)
                     # Verificar si hay información útil del contrato (expiró o se vendió)
                     if contract_info and not contract_info.get('error'):
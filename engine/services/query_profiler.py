@@ -0,0 +1,237 @@
+"""
+Perfilador de consultas ORM por ciclo del trading loop
+Modo opcional: instala un `execute_wrapper` en todas las conexiones del proceso
+(también las de los hilos de evaluación) y atribuye cada consulta al método del
+proyecto que la disparó. Al cerrar cada ciclo deja un resumen con conteos,
+tiempo por llamador y patrones N+1 (la misma consulta repetida desde el mismo sitio).
+"""
+
+from __future__ import annotations
+import logging
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Módulos que nunca son "el llamador" (ORM, este perfilador, wrappers de métricas)
+_SKIP_MODULE_PREFIXES = ('django.', 'contextlib', 'threading', 'concurrent.', 'asgiref.',
+                         'engine.services.query_profiler', 'monitoring.metrics')
+_IN_LIST = re.compile(r'\((?:%s|\?)(?:,\s*(?:%s|\?))*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_COMPREHENSIONS = ('<listcomp>', '<dictcomp>', '<setcomp>', '<genexpr>')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """El ciclo (o el bloque de test) superó el presupuesto de consultas o tiene N+1"""
+
+    def __init__(self, profile: 'CycleProfile', reason: str):
+        self.profile = profile
+        super().__init__(f"{reason}\n{profile.format()}")
+
+
+def normalize_sql(sql: str) -> str:
+    """Forma canónica de una consulta para agrupar repeticiones (listas IN y números colapsados)"""
+    return _NUMBER.sub('N', _IN_LIST.sub('(...)', ' '.join(sql.split())))
+
+
+def caller_of(frame) -> str:
+    """Primer frame del proyecto (fuera de Django/librerías) como `modulo.Clase.metodo`"""
+    base_dir = str(getattr(settings, 'BASE_DIR', ''))
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        filename = frame.f_code.co_filename
+        if (not module.startswith(_SKIP_MODULE_PREFIXES) and frame.f_code.co_name not in _COMPREHENSIONS
+                and filename.startswith(base_dir) and 'site-packages' not in filename):
+            return f"{module}.{frame.f_code.co_qualname}"
+        frame = frame.f_back
+    return '<externo>'
+
+
+@dataclass
+class CallerStats:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class CycleProfile:
+    """Resumen de un ciclo: totales, desglose por llamador y sospechas de N+1"""
+    index: int
+    started: float
+    duration: float = 0.0
+    queries: int = 0
+    seconds: float = 0.0
+    by_caller: Dict[str, CallerStats] = field(default_factory=dict)
+    repeated: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    n_plus_one_threshold: int = 5
+
+    @property
+    def n_plus_one(self) -> List[Tuple[str, str, int]]:
+        """(llamador, sql normalizado, repeticiones) que alcanzan el umbral, de mayor a menor"""
+        hits = [(caller, sql, count) for (caller, sql), count in self.repeated.items()
+                if count >= self.n_plus_one_threshold]
+        return sorted(hits, key=lambda hit: hit[2], reverse=True)
+
+    def top_callers(self, limit: int = 10) -> List[Tuple[str, CallerStats]]:
+        return sorted(self.by_caller.items(), key=lambda item: item[1].queries, reverse=True)[:limit]
+
+    def to_dict(self) -> Dict:
+        return {
+            'cycle': self.index,
+            'duration': round(self.duration, 4),
+            'queries': self.queries,
+            'db_seconds': round(self.seconds, 4),
+            'by_caller': {caller: {'queries': s.queries, 'seconds': round(s.seconds, 4)}
+                          for caller, s in self.top_callers(limit=len(self.by_caller))},
+            'n_plus_one': [{'caller': c, 'sql': sql, 'count': n} for c, sql, n in self.n_plus_one],
+        }
+
+    def format(self, limit: int = 10) -> str:
+        lines = [f"🗄️ Ciclo {self.index}: {self.queries} consultas, {self.seconds * 1000:.1f}ms en BD "
+                 f"({self.duration:.2f}s de ciclo)"]
+        for caller, stats in self.top_callers(limit):
+            lines.append(f"   • {caller}: {stats.queries} consultas, {stats.seconds * 1000:.1f}ms")
+        for caller, sql, count in self.n_plus_one[:limit]:
+            lines.append(f"   ⚠️ N+1 en {caller}: {count}× {sql[:120]}")
+        return '\n'.join(lines)
+
+
+class QueryProfiler:
+    """
+    Wrapper de ejecución compartido por todas las conexiones del proceso.
+
+    - `install()` lo añade a las conexiones existentes del hilo actual y, vía la señal
+      `connection_created`, a las que se abran después en cualquier hilo.
+    - `begin_cycle()` cierra el ciclo en curso (si lo hay) y lo retorna; así un
+      `continue` en el loop no deja ciclos sin cerrar.
+    """
+
+    def __init__(self, budget: Optional[int] = None, n_plus_one_threshold: int = 5,
+                 strict: bool = False):
+        """
+        Args:
+            budget: Consultas máximas por ciclo (None = sin presupuesto)
+            n_plus_one_threshold: Repeticiones de la misma consulta desde el mismo llamador
+                a partir de las cuales se marca como N+1
+            strict: Lanzar QueryBudgetExceeded al cerrar un ciclo que supera el presupuesto
+        """
+        self.budget = budget
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._installed = False
+        self._cycles = 0
+        self._current: Optional[CycleProfile] = None
+        self.last: Optional[CycleProfile] = None
+
+    def __call__(self, execute, sql, params, many, context):
+        profile = self._current
+        if profile is None:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            caller = caller_of(sys._getframe(1))
+            key = (caller, normalize_sql(sql))
+            with self._lock:
+                profile.queries += 1
+                profile.seconds += elapsed
+                stats = profile.by_caller.get(caller)
+                if stats is None:
+                    stats = profile.by_caller[caller] = CallerStats()
+                stats.queries += 1
+                stats.seconds += elapsed
+                profile.repeated[key] = profile.repeated.get(key, 0) + 1
+
+    def _attach(self, connection) -> None:
+        # Al inicio de la lista: `connection.execute_wrapper()` hace pop() del último al salir
+        # y la conexión puede abrirse dentro de uno de esos bloques (QueryTimer)
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, self)
+
+    def _on_connection_created(self, sender, connection, **kwargs) -> None:
+        self._attach(connection)
+
+    def install(self) -> 'QueryProfiler':
+        if not self._installed:
+            for connection in connections.all():
+                self._attach(connection)
+            connection_created.connect(self._on_connection_created, weak=False)
+            self._installed = True
+        return self
+
+    def uninstall(self) -> Optional[CycleProfile]:
+        """Cerrar el ciclo en curso y dejar de perfilar (las conexiones de otros hilos lo ignoran)"""
+        if self._installed:
+            connection_created.disconnect(self._on_connection_created)
+            for connection in connections.all():
+                if self in connection.execute_wrappers:
+                    connection.execute_wrappers.remove(self)
+            self._installed = False
+        return self.end_cycle()
+
+    def begin_cycle(self) -> Optional[CycleProfile]:
+        """Abrir un ciclo nuevo; retorna el anterior ya cerrado"""
+        previous = self.end_cycle()
+        self._cycles += 1
+        self._current = CycleProfile(index=self._cycles, started=time.perf_counter(),
+                                     n_plus_one_threshold=self.n_plus_one_threshold)
+        return previous
+
+    def end_cycle(self) -> Optional[CycleProfile]:
+        with self._lock:
+            profile, self._current = self._current, None
+        if profile is None:
+            return None
+        profile.duration = time.perf_counter() - profile.started
+        self.last = profile
+        if self.budget is not None and profile.queries > self.budget:
+            logger.warning(f"Presupuesto de consultas superado: {profile.queries} > {self.budget}")
+            if self.strict:
+                raise QueryBudgetExceeded(profile, f"{profile.queries} consultas > presupuesto {self.budget}")
+        return profile
+
+    def over_budget(self, profile: Optional[CycleProfile]) -> bool:
+        return bool(profile and self.budget is not None and profile.queries > self.budget)
+
+
+@contextmanager
+def query_budget(budget: Optional[int] = None, n_plus_one_threshold: int = 5, allow_n_plus_one: bool = True):
+    """
+    Perfilar un bloque como un único ciclo (tests y diagnósticos puntuales).
+
+    Lanza QueryBudgetExceeded si se supera `budget`, y también ante patrones N+1
+    cuando `allow_n_plus_one` es False. El perfil queda en el objeto retornado (`.last`).
+    """
+    profiler = QueryProfiler(budget=budget, n_plus_one_threshold=n_plus_one_threshold, strict=True).install()
+    profiler.begin_cycle()
+    try:
+        yield profiler
+    except BaseException:
+        profiler.strict = False
+        profiler.uninstall()
+        raise
+    profile = profiler.uninstall()
+    if not allow_n_plus_one and profile.n_plus_one:
+        raise QueryBudgetExceeded(profile, f"{len(profile.n_plus_one)} patrones N+1 detectados")
+
+
+def profiler_from_settings() -> Optional[QueryProfiler]:
+    """Perfilador del trading loop si QUERY_PROFILE_ENABLED está activo"""
+    if not getattr(settings, 'QUERY_PROFILE_ENABLED', False):
+        return None
+    return QueryProfiler(
+        budget=getattr(settings, 'QUERY_BUDGET_PER_CYCLE', None) or None,
+        n_plus_one_threshold=getattr(settings, 'QUERY_PROFILE_N_PLUS_ONE', 5),
+    )
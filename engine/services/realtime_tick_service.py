@@ -4,10 +4,9 @@ import json
 import threading
 import time
 import websocket
-from datetime import datetime
-from django.utils import timezone
-from market.models import Candle, Tick
+from datetime import datetime, timezone as dt_timezone
 from connectors.deriv_client import DerivClient
+from engine.services.tick_writer import TickWriter
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,17 +18,36 @@ class RealtimeTickService:
         self.subscribed_symbols = set()
         self.tick_callbacks = []
         self.running = False
+        self.api_token = None
+        self.app_id = None
+        # Escritura de ticks por lotes (bulk_create) en un hilo aparte
+        self.tick_writer = TickWriter()
         
     def add_tick_callback(self, callback):
         """Agregar callback para procesar ticks"""
         self.tick_callbacks.append(callback)
     
+    def _load_api_config(self):
+        """Token y app_id de la configuración de API activa (como save_realtime_tick)"""
+        from trading_bot.models import DerivAPIConfig
+
+        api_config = DerivAPIConfig.objects.filter(is_active=True).only('api_token', 'is_demo', 'app_id').first()
+        if not api_config:
+            return False
+        self.api_token = api_config.api_token
+        self.app_id = api_config.app_id or 1089
+        return True
+
     def connect(self):
         """Conectar al WebSocket de Deriv"""
         if self.connected:
             return True
             
         try:
+            if not self._load_api_config():
+                logger.error("No hay configuración de API activa para el stream de ticks")
+                return False
+
             def on_message(ws, message):
                 data = json.loads(message)
                 self._process_message(data)
@@ -47,12 +65,12 @@ class RealtimeTickService:
                 self.connected = True
                 # Autenticar
                 auth_msg = {
-                    "authorize": "rOB3RNqw1EevPzu"  # Token de Deriv
+                    "authorize": self.api_token
                 }
                 ws.send(json.dumps(auth_msg))
             
             self.ws = websocket.WebSocketApp(
-                "wss://ws.derivws.com/websockets/v3?app_id=1089",
+                f"wss://ws.derivws.com/websockets/v3?app_id={self.app_id}",
                 on_message=on_message,
                 on_error=on_error,
                 on_close=on_close,
@@ -133,20 +151,10 @@ class RealtimeTickService:
             epoch = tick_data.get('epoch', int(time.time()))
             
             # Crear timestamp
-            timestamp = datetime.fromtimestamp(epoch, tz=timezone.utc)
-            
-            # Almacenar tick en base de datos
-            tick, created = Tick.objects.get_or_create(
-                symbol=symbol,
-                timestamp=timestamp,
-                defaults={
-                    'price': price,
-                    'volume': tick_data.get('volume', 0)
-                }
-            )
+            timestamp = datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
             
-            if created:
-                logger.debug(f"New tick stored: {symbol} @ {price}")
+            # Encolar tick para escritura por lotes (no bloquea el hilo del WebSocket)
+            self.tick_writer.submit(symbol, timestamp, price, tick_data.get('volume', 0))
             
             # Llamar callbacks
             for callback in self.tick_callbacks:
@@ -164,6 +172,7 @@ class RealtimeTickService:
             return True
             
         self.running = True
+        self.tick_writer.start()
         if self.connect():
             logger.info("RealtimeTickService started")
             return True
@@ -175,6 +184,7 @@ class RealtimeTickService:
         if self.ws:
             self.ws.close()
         self.connected = False
+        self.tick_writer.stop()
         logger.info("RealtimeTickService stopped")
 
 # Instancia global del servicio
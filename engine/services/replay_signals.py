@@ -0,0 +1,556 @@
+"""
+Señales de las estrategias del loop precalculadas sobre la serie del replay
+Reproduce `analyze_symbol` de cada estrategia con ventanas deslizantes de numpy
+(una operación por columna de la ventana para todos los ticks a la vez) y solo
+construye el objeto de señal en los ticks que la generan. Las estrategias o
+configuraciones sin versión vectorizada se evalúan con `analyze_symbol`.
+"""
+
+from __future__ import annotations
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from engine.services.ema200_extrema_strategy import EMA200ExtremaStrategy, EMAExtremaSignal
+from engine.services.momentum_reversal_strategy import MomentumReversalSignal, MomentumReversalStrategy
+from engine.services.statistical_strategy import StatisticalSignal, StatisticalStrategy
+from engine.services.tick_based_strategy import TickBasedStrategy, TrendSignal
+
+
+# Ticks por bloque precalculado (acota la memoria en replays largos)
+BLOCK_TICKS = 65536
+
+CALL, PUT = 1, -1
+_DIRECTIONS = {CALL: 'CALL', PUT: 'PUT'}
+
+
+def _windows(prices: np.ndarray, lo: int, hi: int, length: int) -> np.ndarray:
+    """Filas = ticks lo..hi-1, columnas = los `length` precios que terminan en cada tick"""
+    return sliding_window_view(prices[lo - length + 1:hi], length)
+
+
+def _deltas(prices: np.ndarray, lo: int, hi: int, length: int, lag: int = 0) -> np.ndarray:
+    """
+    Variaciones tick a tick que cubren las ventanas de `length` variaciones que
+    terminan `lag` ticks antes de cada tick lo..hi-1 (ventanas con sliding_window_view)
+    """
+    segment = prices[lo - lag - length:hi - lag]
+    return segment[1:] - segment[:-1]
+
+
+def _counts(flags: np.ndarray, length: int) -> np.ndarray:
+    """Cantidad de `flags` verdaderos por ventana de `length` (sumas acumuladas enteras)"""
+    total = np.concatenate(([0], np.cumsum(flags, dtype=np.int64)))
+    return total[length:] - total[:-length]
+
+
+def _column_extrema(columns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Máximo y mínimo por fila recorriendo las columnas"""
+    high = columns[:, 0].copy()
+    low = columns[:, 0].copy()
+    for c in range(1, columns.shape[1]):
+        np.maximum(high, columns[:, c], out=high)
+        np.minimum(low, columns[:, c], out=low)
+    return high, low
+
+
+def _column_sum(columns: np.ndarray) -> np.ndarray:
+    """Suma columna a columna (mismo orden que `sum()` sobre la lista de la ventana)"""
+    total = columns[:, 0].copy()
+    for c in range(1, columns.shape[1]):
+        total += columns[:, c]
+    return total
+
+
+def _ema(columns: np.ndarray, period: int, seed: np.ndarray) -> np.ndarray:
+    """EMA sembrada con `seed` y aplicada sobre las columnas en orden"""
+    k = 2.0 / (period + 1.0)
+    ema = seed.copy()
+    for c in range(columns.shape[1]):
+        ema *= 1 - k
+        ema += columns[:, c] * k
+    return ema
+
+
+def _streaks(deltas: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Rachas finales de alzas/bajas (`calculate_streaks`) sobre las columnas de variaciones"""
+    rows = deltas.shape[0]
+    up = np.zeros(rows, dtype=np.int64)
+    down = np.zeros(rows, dtype=np.int64)
+    last = np.zeros(rows, dtype=np.int64)
+    for c in range(deltas.shape[1]):
+        d = np.sign(deltas[:, c]).astype(np.int64)
+        up = np.where(d == 1, np.where(last == 1, up + 1, 1), np.where(d == -1, 0, up))
+        down = np.where(d == -1, np.where(last == -1, down + 1, 1), np.where(d == 1, 0, down))
+        last = d
+    return up, down
+
+
+def _rsi_moves(deltas: np.ndarray, period: int) -> np.ndarray:
+    """RSI promediando solo los movimientos de cada dirección (`DeltaWindow.rsi_moves`)"""
+    gains = sliding_window_view(np.where(deltas > 0, deltas, 0.0), period)
+    losses = sliding_window_view(np.where(deltas < 0, -deltas, 0.0), period)
+    gain_count = _counts(deltas > 0, period)
+    loss_count = _counts(deltas < 0, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_gain = np.where(gain_count > 0, _column_sum(gains) / np.maximum(gain_count, 1), 0.0)
+        avg_loss = np.where(loss_count > 0, _column_sum(losses) / np.maximum(loss_count, 1), 0.0)
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    rsi = np.where(avg_gain == 0, 0.0, rsi)
+    rsi = np.where(avg_loss == 0, 100.0, rsi)
+    return np.where((avg_gain == 0) & (avg_loss == 0), 50.0, rsi)
+
+
+def _rsi_period(deltas: np.ndarray, period: int) -> np.ndarray:
+    """RSI con ganancias/pérdidas promediadas sobre todo el período (`DeltaWindow.rsi`)"""
+    avg_gain = _column_sum(sliding_window_view(np.where(deltas > 0, deltas, 0.0), period)) / period
+    avg_loss = _column_sum(sliding_window_view(np.where(deltas < 0, -deltas, 0.0), period)) / period
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    return np.where(avg_loss == 0, 100.0, rsi)
+
+
+class SignalTable:
+    """
+    Señales de una estrategia por índice de tick, calculadas por bloques bajo demanda
+
+    Antes de `start` (ventanas incompletas) delega en `analyze_symbol`.
+    """
+
+    # Precios necesarios para que todas las ventanas de la estrategia estén completas
+    history = 1
+
+    def __init__(self, strategy: Any, symbol: str, prices: np.ndarray):
+        self.strategy = strategy
+        self.symbol = symbol
+        self.prices = prices
+        self.start = self.history - 1
+        self._block_index = -1
+        self._block_lo = 0
+        self._block: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def supports(cls, strategy: Any) -> bool:
+        return True
+
+    def signal_at(self, i: int) -> Optional[Any]:
+        if i < self.start:
+            return self.strategy.analyze_symbol(self.symbol)
+        block_index = i // BLOCK_TICKS
+        if block_index != self._block_index:
+            lo = max(self.start, block_index * BLOCK_TICKS)
+            hi = min(len(self.prices), (block_index + 1) * BLOCK_TICKS)
+            self._block = self._compute(lo, hi)
+            self._block_index, self._block_lo = block_index, lo
+        return self._signal(self._block, i - self._block_lo)
+
+    def _compute(self, lo: int, hi: int) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+    def _signal(self, block: Dict[str, np.ndarray], j: int) -> Optional[Any]:
+        raise NotImplementedError
+
+
+class TickBasedTable(SignalTable):
+    """`TickBasedStrategy.analyze_symbol`: proporción de ticks alcistas y fuerza media"""
+
+    def __init__(self, strategy: TickBasedStrategy, symbol: str, prices: np.ndarray):
+        self.history = int(strategy.ticks_to_analyze)
+        super().__init__(strategy, symbol, prices)
+
+    @classmethod
+    def supports(cls, strategy: TickBasedStrategy) -> bool:
+        return int(strategy.ticks_to_analyze) >= 2
+
+    def _compute(self, lo: int, hi: int) -> Dict[str, np.ndarray]:
+        s = self.strategy
+        moves = self.history - 1
+        deltas = _deltas(self.prices, lo, hi, moves)
+        previous = self.prices[lo - moves:hi - 1]
+        up = _counts(deltas > 0, moves)
+        total = up + _counts(deltas < 0, moves)
+        force = _column_sum(sliding_window_view(np.abs(deltas / previous) * 100, moves)) / moves
+        with np.errstate(divide='ignore', invalid='ignore'):
+            upward_pct = np.where(total > 0, up / np.maximum(total, 1) * 100, 0.0)
+        direction = np.where(upward_pct >= s.trend_threshold_pct, CALL,
+                             np.where(upward_pct <= (100 - s.trend_threshold_pct), PUT, 0))
+        direction = np.where(force < s.force_threshold_pct, 0, direction)
+        return {'direction': direction, 'upward_pct': upward_pct, 'force': force,
+                'first': self.prices[lo - moves:hi - moves]}
+
+    def _signal(self, block: Dict[str, np.ndarray], j: int) -> Optional[TrendSignal]:
+        direction = block['direction'][j].item()
+        if not direction:
+            return None
+        force = block['force'][j].item()
+        return TrendSignal(
+            direction=_DIRECTIONS[direction],
+            strength=min(1.0, force / self.strategy.force_threshold_pct),
+            entry_price=block['first'][j].item(),
+            ticks_analyzed=self.history,
+            upward_ticks_pct=block['upward_pct'][j].item(),
+            force_pct=force,
+        )
+
+
+class EMAExtremaTable(SignalTable):
+    """`EMA200ExtremaStrategy.analyze_symbol`: precio frente a la EMA y cercanía a los extremos"""
+
+    def __init__(self, strategy: EMA200ExtremaStrategy, symbol: str, prices: np.ndarray):
+        self.history = max(strategy.lookback_ticks, strategy.ema_period, strategy.extrema_window, 20)
+        super().__init__(strategy, symbol, prices)
+
+    def _compute(self, lo: int, hi: int) -> Dict[str, np.ndarray]:
+        s = self.strategy
+        price = self.prices[lo:hi]
+        ema_window = _windows(self.prices, lo, hi, s.ema_period)
+        ema = _ema(ema_window[:, 1:], s.ema_period, ema_window[:, 0])
+        high, low = _column_extrema(_windows(self.prices, lo, hi, s.extrema_window))
+        high20, low20 = _column_extrema(_windows(self.prices, lo, hi, 20))
+        atr_ratio = (high20 - low20) / price
+
+        put = (price < ema) & (np.abs(price - high) / np.maximum(1e-9, high) <= 0.0018)
+        call = ~put & (price > ema) & (np.abs(price - low) / np.maximum(1e-9, low) <= 0.0018)
+        direction = np.where(put, PUT, np.where(call, CALL, 0))
+
+        conf_trend = np.minimum(1.0, np.maximum(0.0, (np.abs(price - ema) / ema) / 0.005))
+        extreme = np.where(put, high, low)
+        conf_ext = 1.0 - np.minimum(1.0, (np.abs(price - extreme) / extreme) / 0.0008)
+        conf_vol = 1.0 - np.maximum(0.0, np.minimum(1.0, (atr_ratio - 0.015) / 0.08))
+        confidence = np.maximum(0.0, np.minimum(1.0, 0.4 * conf_trend + 0.5 * conf_ext + 0.1 * conf_vol))
+        return {'direction': direction, 'price': price, 'ema': ema, 'high': high, 'low': low,
+                'confidence': confidence, 'atr_ratio': atr_ratio}
+
+    def _signal(self, block: Dict[str, np.ndarray], j: int) -> Optional[EMAExtremaSignal]:
+        direction = block['direction'][j].item()
+        if not direction:
+            return None
+        return EMAExtremaSignal(
+            symbol=self.symbol,
+            direction=_DIRECTIONS[direction],  # type: ignore
+            entry_price=Decimal(str(block['price'][j].item())),
+            ema200=Decimal(str(round(block['ema'][j].item(), 6))),
+            recent_high=Decimal(str(round(block['high'][j].item(), 6))),
+            recent_low=Decimal(str(round(block['low'][j].item(), 6))),
+            confidence=block['confidence'][j].item(),
+            atr_ratio=block['atr_ratio'][j].item(),
+        )
+
+
+class MomentumReversalTable(SignalTable):
+    """
+    `MomentumReversalStrategy.analyze_symbol`: fatiga, ruptura, momentum extremo y
+    divergencia sobre la ventana de `strategy.window` ticks, combinados por peso
+    """
+
+    # (tipo, peso) en el orden en que analyze_symbol agrega las señales
+    DETECTORS = (('fatigue_reversal', 0.30), ('breakout', 0.25),
+                 ('momentum_extreme', 0.25), ('timeframe_divergence', 0.20))
+
+    def __init__(self, strategy: MomentumReversalStrategy, symbol: str, prices: np.ndarray):
+        self.history = strategy.window
+        super().__init__(strategy, symbol, prices)
+
+    @classmethod
+    def supports(cls, strategy: MomentumReversalStrategy) -> bool:
+        # Cortes fijos de los detectores sobre el inicio de la ventana
+        return (1 <= strategy.short_timeframe <= strategy.long_timeframe and strategy.long_timeframe >= 5
+                and strategy.fatigue_threshold + 5 <= strategy.window and 1 <= strategy.rsi_period <= 49)
+
+    def _fatigue(self, h: np.ndarray, lo: int, hi: int):
+        s = self.strategy
+        prices = h[:, :s.fatigue_threshold + 5]
+        rows = prices.shape[0]
+        up = np.zeros(rows, dtype=np.int64)
+        down = np.zeros(rows, dtype=np.int64)
+        momentum = np.zeros(rows)
+        for c in range(1, prices.shape[1]):
+            diff = prices[:, c] - prices[:, c - 1]
+            moved = diff != 0
+            up = np.where(diff > 0, up + 1, 0)
+            down = np.where(diff < 0, down + 1, 0)
+            momentum = np.where(moved, momentum + np.abs(diff / prices[:, c - 1]) * 100, momentum)
+        direction = np.where(up >= s.fatigue_threshold, PUT, np.where(down >= s.fatigue_threshold, CALL, 0))
+
+        # RSI al cierre de los primeros 50 ticks de la ventana
+        rsi = _rsi_period(_deltas(self.prices, lo, hi, s.rsi_period, lag=s.rsi_lag), s.rsi_period)
+        direction = np.where((direction == PUT) & (rsi < s.rsi_extreme_high), 0, direction)
+        direction = np.where((direction == CALL) & (rsi > s.rsi_extreme_low), 0, direction)
+        direction = np.where(momentum < s.momentum_extreme_threshold, 0, direction)
+        confidence = np.minimum(1.0, np.maximum(0.5, (momentum / 0.10) * 0.3 + (np.abs(rsi - 50) / 50) * 0.7))
+        return direction, confidence, np.maximum(up, down), momentum
+
+    def _breakout(self, h: np.ndarray):
+        prices = h[:, :25]
+        consolidation, recent = prices[:, 10:20], prices[:, 20:25]
+        cons_high, cons_low = _column_extrema(consolidation)
+        recent_high, recent_low = _column_extrema(recent)
+        atr_consolidation = (cons_high - cons_low) / prices[:, 19]
+        atr_recent = (recent_high - recent_low) / prices[:, 24]
+        breakout = (atr_consolidation < 0.001) & (
+            atr_recent > atr_consolidation * self.strategy.consolidation_breakout_atr_ratio)
+        direction = np.where(recent_high > cons_high, CALL, np.where(recent_low < cons_low, PUT, 0))
+        direction = np.where(breakout, direction, 0)
+        strength = atr_recent / np.maximum(0.0001, atr_consolidation)
+        confidence = np.minimum(1.0, np.maximum(0.5, strength / 5.0))
+        return direction, confidence, atr_recent
+
+    def _momentum_extreme(self, h: np.ndarray):
+        prices = h[:, :35]
+        moves = (prices[:, 32:35] - prices[:, 31:34]) / prices[:, 31:34] * 100
+        extreme = np.abs(moves) > self.strategy.momentum_extreme_threshold
+        rising = extreme.all(axis=1) & (moves > 0).all(axis=1)
+        falling = extreme.all(axis=1) & (moves < 0).all(axis=1)
+        current = prices[:, 34]
+        high, low = _column_extrema(prices[:, 5:35])
+        direction = np.where(rising & (np.abs(current - high) / high < 0.002), PUT,
+                             np.where(falling & (np.abs(current - low) / low < 0.002), CALL, 0))
+        average = (np.abs(moves[:, 0]) + np.abs(moves[:, 1]) + np.abs(moves[:, 2])) / 3
+        confidence = np.minimum(1.0, np.maximum(0.5, (average / 0.10) * 0.8))
+        return direction, confidence, average
+
+    def _divergence(self, h: np.ndarray):
+        s = self.strategy
+        prices = h[:, :s.long_timeframe]
+        last, short_first = prices[:, -1], prices[:, -s.short_timeframe]
+        long_trend = np.where(last > prices[:, 0], CALL, PUT)
+        short_trend = np.where(last > short_first, CALL, PUT)
+        moves = (prices[:, -2:] - prices[:, -3:-1]) / prices[:, -3:-1] * 100
+        increasing = np.abs(moves[:, 1]) > np.abs(moves[:, 0])
+        direction = np.where((long_trend != short_trend) & increasing, short_trend, 0)
+        strength = np.abs(moves[:, 1])
+        divergence = np.abs(last - short_first) / short_first
+        confidence = np.minimum(1.0, np.maximum(0.5, (divergence * 100) * 0.5 + (strength / 0.05) * 0.5))
+        return direction, confidence, strength
+
+    def _compute(self, lo: int, hi: int) -> Dict[str, np.ndarray]:
+        h = _windows(self.prices, lo, hi, self.history)
+        fatigue, fatigue_conf, fatigue_count, fatigue_momentum = self._fatigue(h, lo, hi)
+        breakout, breakout_conf, _ = self._breakout(h)
+        extreme, extreme_conf, extreme_momentum = self._momentum_extreme(h)
+        divergence, divergence_conf, divergence_score = self._divergence(h)
+        directions = (fatigue, breakout, extreme, divergence)
+        confidences = (fatigue_conf, breakout_conf, extreme_conf, divergence_conf)
+
+        weighted = np.zeros(len(fatigue))
+        total_weight = np.zeros(len(fatigue))
+        call_weight = np.zeros(len(fatigue))
+        put_weight = np.zeros(len(fatigue))
+        first = np.zeros(len(fatigue), dtype=np.int64)  # Primera dirección agregada (desempate)
+        scores = np.full((len(fatigue), len(self.DETECTORS)), -np.inf)
+        for k, ((_, weight), direction, confidence) in enumerate(zip(self.DETECTORS, directions, confidences)):
+            present = direction != 0
+            weighted = np.where(present, weighted + confidence * weight, weighted)
+            total_weight = np.where(present, total_weight + weight, total_weight)
+            call_weight = np.where(direction == CALL, call_weight + weight, call_weight)
+            put_weight = np.where(direction == PUT, put_weight + weight, put_weight)
+            first = np.where((first == 0) & present, direction, first)
+            scores[:, k] = np.where(present, confidence * weight, -np.inf)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            confidence = np.where(total_weight > 0, weighted / total_weight, 0.0)
+        direction = np.where(call_weight > put_weight, CALL, np.where(put_weight > call_weight, PUT, first))
+        direction = np.where((total_weight == 0) | (confidence < 0.50), 0, direction)
+
+        price = self.prices[lo:hi]
+        high20, low20 = _column_extrema(_windows(self.prices, lo, hi, 20))
+        return {
+            'direction': direction, 'confidence': confidence, 'price': price,
+            'main': scores.argmax(axis=1), 'atr_ratio': (high20 - low20) / price,
+            'fatigue_count': fatigue_count, 'fatigue_momentum': fatigue_momentum,
+            'extreme_momentum': extreme_momentum, 'divergence_score': divergence_score,
+        }
+
+    def _signal(self, block: Dict[str, np.ndarray], j: int) -> Optional[MomentumReversalSignal]:
+        direction = block['direction'][j].item()
+        if not direction:
+            return None
+        main = block['main'][j].item()
+        return MomentumReversalSignal(
+            symbol=self.symbol,
+            direction=_DIRECTIONS[direction],  # type: ignore
+            entry_price=Decimal(str(block['price'][j].item())),
+            confidence=block['confidence'][j].item(),
+            signal_type=self.DETECTORS[main][0],
+            fatigue_count=block['fatigue_count'][j].item() if main == 0 else 0,
+            momentum_extreme=(block['fatigue_momentum'][j].item() if main == 0
+                              else block['extreme_momentum'][j].item() if main == 2 else 0.0),
+            atr_ratio=block['atr_ratio'][j].item(),
+            divergence_score=block['divergence_score'][j].item() if main == 3 else 0.0,
+        )
+
+
+class StatisticalTable(SignalTable):
+    """
+    `StatisticalStrategy.analyze_symbol`: los indicadores se precalculan por bloque;
+    la decisión depende de los umbrales adaptativos y se recalcula (vectorizada)
+    para cada combinación de umbrales que aparece durante el replay
+    """
+
+    def __init__(self, strategy: StatisticalStrategy, symbol: str, prices: np.ndarray):
+        self.history = max(strategy.ticks_to_analyze, strategy.trend_analysis_period)
+        super().__init__(strategy, symbol, prices)
+        self._decisions: Dict[Tuple[float, ...], Dict[str, np.ndarray]] = {}
+
+    @classmethod
+    def supports(cls, strategy: StatisticalStrategy) -> bool:
+        # Ventana de análisis completa para media/EMA/RSI/ATR y los dos bloques de momentum
+        window = strategy.ticks_to_analyze
+        return (not strategy.enable_symbol_filtering and strategy.trend_analysis_period >= 10
+                and strategy.lookback_periods >= 2 and strategy.ema_period >= 1
+                and window >= max(21, strategy.lookback_periods, strategy.ema_period, strategy.rsi_period + 2))
+
+    def _compute(self, lo: int, hi: int) -> Dict[str, np.ndarray]:
+        s = self.strategy
+        price = self.prices[lo:hi]
+        w = _windows(self.prices, lo, hi, s.ticks_to_analyze)
+
+        recent = w[:, -s.lookback_periods:]
+        mean = _column_sum(recent) / s.lookback_periods
+        squares = np.zeros(len(price))
+        below = np.zeros(len(price), dtype=np.int64)
+        for c in range(s.lookback_periods):
+            squares += (recent[:, c] - mean) ** 2
+            below += recent[:, c] < price
+        variance = squares / (s.lookback_periods - 1)
+        stdev = np.sqrt(np.where(variance <= (1e-12 * mean) ** 2, 0.0, variance))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_score = np.where(stdev > 0, (price - mean) / stdev, 0.0)
+        percentile = below / s.lookback_periods
+
+        recent_mean = _column_sum(w[:, -10:]) / 10
+        previous_mean = _column_sum(w[:, -20:-10]) / 10
+        change_pct = np.abs((recent_mean - previous_mean) / previous_mean) * 100
+
+        ema = _ema(w[:, s.ema_period:], s.ema_period, _column_sum(w[:, :s.ema_period]) / s.ema_period)
+        rsi = _rsi_moves(_deltas(self.prices, lo, hi, s.rsi_period), s.rsi_period)
+        rsi_prev = _rsi_moves(_deltas(self.prices, lo, hi, s.rsi_period, lag=1), s.rsi_period)
+        atr_ratio = (_column_sum(sliding_window_view(np.abs(_deltas(self.prices, lo, hi, 20)), 20)) / 20) / price
+        up_streak, down_streak = _streaks(sliding_window_view(_deltas(self.prices, lo, hi, 10), 10))
+
+        trend = _windows(self.prices, lo, hi, s.trend_analysis_period)
+        initial = min(30, trend.shape[1] // 2)
+        recent_period = min(30, trend.shape[1])
+        initial_avg = _column_sum(trend[:, :initial]) / initial
+        recent_avg = _column_sum(trend[:, -recent_period:]) / recent_period
+        main_trend = np.where((recent_avg > initial_avg * (1 + 0.05 / 100)) & (price >= recent_avg * 0.999), CALL,
+                              np.where((recent_avg < initial_avg * (1 - 0.05 / 100)) & (price <= recent_avg * 1.001),
+                                       PUT, 0))
+        return {
+            'price': price, 'mean': mean, 'z_score': z_score, 'percentile': percentile,
+            'momentum_direction': np.sign(recent_mean - previous_mean).astype(np.int64),
+            'change_pct': change_pct, 'ema': ema, 'rsi': rsi, 'rsi_prev': rsi_prev, 'atr_ratio': atr_ratio,
+            'up_streak': up_streak, 'down_streak': down_streak, 'main_trend': main_trend,
+        }
+
+    def signal_at(self, i: int) -> Optional[Any]:
+        if i >= self.start and i // BLOCK_TICKS != self._block_index:
+            self._decisions.clear()
+        return super().signal_at(i)
+
+    def _thresholds(self) -> Tuple[float, float, float, float]:
+        """(umbral de momentum vigente, z-score, momentum, confianza mínima) como en analyze_symbol"""
+        s = self.strategy
+        adaptive = s.adaptive_params
+        if adaptive:
+            return (s.momentum_threshold, adaptive.z_score_threshold,
+                    adaptive.momentum_threshold, adaptive.confidence_minimum)
+        return s.momentum_threshold, s.base_z_score_threshold, s.base_momentum_threshold, 0.6
+
+    def _decide(self, b: Dict[str, np.ndarray], thresholds: Tuple[float, ...]) -> Dict[str, np.ndarray]:
+        """Rama elegida (0 ninguna, 1 reversión, 2 momentum, 3 extremo), dirección, confianza y score"""
+        current_momentum, z_threshold, momentum_threshold, confidence_minimum = thresholds
+        price, z_signed, percentile, ema = b['price'], b['z_score'], b['percentile'], b['ema']
+        rsi, rsi_prev, trend = b['rsi'], b['rsi_prev'], b['main_trend']
+        z_score = np.abs(z_signed)
+        # calculate_momentum usa el umbral vigente antes de que analyze_symbol lo actualice
+        confirmed = b['change_pct'] >= current_momentum
+        strength = np.minimum(1.0, b['change_pct'] / (current_momentum * 2))
+        momentum_direction = np.where(confirmed, b['momentum_direction'], 0)
+        extreme = (percentile > 0.8) | (percentile < 0.2)
+        score = (z_score > z_threshold).astype(np.int64) + confirmed + extreme
+        with np.errstate(divide='ignore', invalid='ignore'):
+            near_ema = (ema != 0) & (np.abs(price - ema) / ema * 100 < 0.0001)
+
+        # 1. Reversión a la media (si entra en la rama y se filtra, no hay señal)
+        reversion = z_score > z_threshold
+        reversion_direction = np.where(z_signed > 0, PUT, CALL)
+        reversion_conf = np.minimum(0.9, z_score / (z_threshold * 2))
+        reversion_ok = np.where(
+            reversion_direction == PUT,
+            (trend != CALL) & ~((rsi != 0) & (rsi > 80)),
+            (reversion_conf >= confidence_minimum) & (trend != PUT) & ~((rsi != 0) & (rsi < 20)),
+        ) & ~near_ema
+        reversion_conf = np.maximum(reversion_conf, np.minimum(1.0, 0.35 + 0.2 * score))
+
+        # 2. Momentum (con confianza inicial <= 0.35 pasa a la rama de extremos)
+        momentum = ~reversion & (momentum_direction != 0)
+        aligned = (trend == 0) | (momentum_direction == trend)
+        strong = strength > 0.35
+        momentum_ok = np.where(
+            momentum_direction == CALL,
+            ~((ema != 0) & (price < ema)) & (rsi > rsi_prev) & (b['up_streak'] >= 1),
+            ~((ema != 0) & (price > ema)) & (rsi < rsi_prev) & (b['down_streak'] >= 1),
+        )
+        momentum_conf = np.maximum(strength, np.minimum(1.0, 0.35 + 0.2 * score))
+        momentum_ok &= momentum_conf >= confidence_minimum
+        momentum_final = momentum & (~aligned | strong)
+
+        # 3. Posición extrema dentro de la ventana
+        branch = np.where(reversion, np.where(reversion_ok, 1, 0),
+                          np.where(momentum_final, np.where(aligned & momentum_ok, 2, 0),
+                                   np.where(extreme, 3, 0)))
+        direction = np.select([branch == 1, branch == 2, branch == 3],
+                              [reversion_direction, momentum_direction, np.where(percentile > 0.8, PUT, CALL)], 0)
+        confidence = np.select([branch == 1, branch == 2], [reversion_conf, momentum_conf], 0.4)
+        return {'branch': branch, 'direction': direction, 'confidence': confidence, 'score': score}
+
+    def _signal(self, block: Dict[str, np.ndarray], j: int) -> Optional[StatisticalSignal]:
+        thresholds = self._thresholds()
+        decision = self._decisions.get(thresholds)
+        if decision is None:
+            decision = self._decisions[thresholds] = self._decide(block, thresholds)
+        branch = decision['branch'][j].item()
+        if not branch:
+            return None
+        return StatisticalSignal(
+            direction=_DIRECTIONS[decision['direction'][j].item()],
+            confidence=decision['confidence'][j].item(),
+            signal_type=('mean_reversion', 'momentum', 'extreme')[branch - 1],
+            entry_price=block['price'][j].item(),
+            z_score=block['z_score'][j].item(),
+            mean_price=block['mean'][j].item(),
+            current_position=block['percentile'][j].item(),
+            confluence_score=decision['score'][j].item(),
+            atr_ratio=block['atr_ratio'][j].item(),
+            up_streak=block['up_streak'][j].item(),
+            down_streak=block['down_streak'][j].item(),
+        )
+
+
+# Tabla vectorizada por clase de estrategia (tipo exacto: las subclases pueden cambiar la lógica)
+TABLES = {
+    StatisticalStrategy: StatisticalTable,
+    EMA200ExtremaStrategy: EMAExtremaTable,
+    TickBasedStrategy: TickBasedTable,
+    MomentumReversalStrategy: MomentumReversalTable,
+}
+
+
+def signal_evaluators(strategies: Dict[str, Any], symbol: str,
+                      prices: np.ndarray) -> List[Tuple[str, Callable[[int], Optional[Any]]]]:
+    """
+    (nombre, señal(i)) por estrategia para el tick de índice `i` de `prices`;
+    sin tabla vectorizada (o con precios no positivos) se usa `analyze_symbol`
+    """
+    vectorizable = len(prices) > 0 and bool(np.all(prices > 0))
+    evaluators = []
+    for name, strategy in strategies.items():
+        table_cls = TABLES.get(type(strategy))
+        if vectorizable and table_cls is not None and table_cls.supports(strategy):
+            evaluators.append((name, table_cls(strategy, symbol, prices).signal_at))
+        else:
+            evaluators.append((name, lambda i, analyze=strategy.analyze_symbol: analyze(symbol)))
+    return evaluators
@@ -314,7 +314,7 @@ def decide_entry_after_sweep(
     
     # Calcular ATR
     atr_val_series = atr(intraday_highs, intraday_lows, intraday_closes, period=14)
-    if not atr_val_series or len(atr_val_series) == 0:
+    if len(atr_val_series) == 0:
         return None
     atr_val = atr_val_series[-1]
     current_price = intraday_closes[-1]
@@ -351,14 +351,14 @@ def decide_entry_after_sweep(
     # 2. MACD
     if len(intraday_closes) >= 35:  # Necesitamos al menos 35 períodos para MACD
         macd_data = macd(intraday_closes)
-        if macd_data and macd_data['macd_line'] and macd_data['signal_line']:
+        if len(macd_data['macd_line']) and len(macd_data['signal_line']):
             macd_line = macd_data['macd_line'][-1]
             signal_line = macd_data['signal_line'][-1]
     
     # 3. RSI
     if len(intraday_closes) >= 15:
         rsi_vals = rsi(intraday_closes)
-        if rsi_vals:
+        if len(rsi_vals):
             rsi_val = rsi_vals[-1]
     
     # 4. Estocástico
@@ -371,7 +371,7 @@ def decide_entry_after_sweep(
     # 5. Bandas de Bollinger
     if len(intraday_closes) >= 20:
         bb_data = bollinger_bands(intraday_closes)
-        if bb_data and bb_data['upper'] and bb_data['lower']:
+        if len(bb_data['upper']) and len(bb_data['lower']):
             bb_upper = bb_data['upper'][-1]
             bb_lower = bb_data['lower'][-1]
             bb_middle = bb_data['middle'][-1]
@@ -380,7 +380,7 @@ def decide_entry_after_sweep(
     # 6. EMA
     if len(intraday_closes) >= 10:
         ema_vals = ema(intraday_closes, 10)
-        if ema_vals:
+        if len(ema_vals):
             ema_value = ema_vals[-1]
     
     # 7. Volumen
@@ -392,7 +392,7 @@ def decide_entry_after_sweep(
     # MEJORA: 8. EMA 200 (tendencia macro)
     if len(intraday_closes) >= 200:
         ema_200_vals = ema(intraday_closes, 200)
-        if ema_200_vals:
+        if len(ema_200_vals):
             ema_200_value = ema_200_vals[-1]
     
     # MEJORA: 9. Factor de volatilidad ATR
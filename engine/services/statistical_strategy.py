@@ -6,12 +6,16 @@ Combina Mean Reversion y Momentum con detección de condiciones extremas
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional, List, Dict, Any
-from statistics import mean, stdev
+from statistics import fmean, stdev
 import numpy as np
 
 from django.utils import timezone
 from market.models import Tick
 from monitoring.models import OrderAudit
+from engine.services.tick_buffer import fetch_recent_prices
+from engine.services.streaming_indicators import (
+    RollingDeltas, RollingStats, StreamingIndicatorStore, SymbolIndicators, WindowedEMA
+)
 
 
 @dataclass
@@ -55,7 +59,8 @@ class StatisticalStrategy:
                  enable_symbol_filtering: bool = True,  # Filtrar símbolos con bajo win rate
                  min_trades_for_filtering: int = 5,  # Mínimo de trades antes de filtrar
                  min_win_rate_threshold: float = 0.30,  # Win rate mínimo (30%)
-                 adaptive_params: Optional[Any] = None):  # Parámetros adaptativos
+                 adaptive_params: Optional[Any] = None,  # Parámetros adaptativos
+                 tick_source: Optional[Any] = None):  # TickBufferStore compartido (None = BD)
         """
         Inicializar estrategia
         
@@ -67,6 +72,7 @@ class StatisticalStrategy:
             ema_period: Período para EMA
             rsi_period: Período para RSI
             trend_analysis_period: Número de ticks para analizar tendencia principal (default: 60 = ~1 hora)
+            tick_source: Fuente de precios en memoria; si es None se consulta Tick en BD
         """
         self.ticks_to_analyze = ticks_to_analyze
         self.lookback_periods = lookback_periods
@@ -80,22 +86,49 @@ class StatisticalStrategy:
         self.min_trades_for_filtering = min_trades_for_filtering
         self.min_win_rate_threshold = min_win_rate_threshold
         self.adaptive_params = adaptive_params
-        
+        self.tick_source = tick_source
+        # Indicadores incrementales por símbolo (solo con buffer en memoria)
+        self.indicators = StreamingIndicatorStore.for_source(tick_source, self._build_indicators)
+
         # Umbrales actuales (se ajustarán dinámicamente)
         self.z_score_threshold = z_score_threshold
         self.momentum_threshold = momentum_threshold
-    
+
     def get_recent_ticks(self, symbol: str, limit: int) -> List[Tick]:
         """Obtener últimos ticks de un símbolo"""
         return list(
             Tick.objects.filter(symbol=symbol)
             .order_by('-timestamp')[:limit]
         )
-    
-    def calculate_statistics(self, prices: List[float]) -> Dict[str, float]:
+
+    def get_recent_prices(self, symbol: str, limit: int) -> List[float]:
+        """Obtener últimos precios de un símbolo en orden cronológico"""
+        return fetch_recent_prices(symbol, limit, self.tick_source).tolist()
+
+    def _build_indicators(self) -> SymbolIndicators:
+        """Indicadores equivalentes a los cálculos sobre la ventana de `ticks_to_analyze`"""
+        return SymbolIndicators(
+            stats=RollingStats(self.lookback_periods),
+            ema=WindowedEMA(self.ema_period, window=self.ticks_to_analyze, seed=self.ema_period),
+            rsi=RollingDeltas(self.rsi_period, lags=1),
+            atr=RollingDeltas(20),
+        )
+
+    def _streaming_state(self, symbol: str, prices: List[float]) -> Optional[SymbolIndicators]:
+        """Estado incremental del símbolo si corresponde a la ventana completa de `prices`"""
+        if self.indicators is None or len(prices) < max(self.ticks_to_analyze, self.ema_period):
+            return None
+        state = self.indicators.get(symbol)
+        return state if state.ready_for(prices) else None
+
+    def calculate_statistics(self, prices: List[float], rolling: Optional[RollingStats] = None) -> Dict[str, float]:
         """
         Calcular estadísticas descriptivas de los precios
         
+        Args:
+            prices: Lista de precios
+            rolling: Media/desviación incremental de la misma ventana (evita recalcular)
+        
         Returns:
             Diccionario con media, desviación estándar, z-score, etc.
         """
@@ -112,13 +145,17 @@ class StatisticalStrategy:
         recent_prices = prices[-self.lookback_periods:]
         
         try:
-            mean_price = mean(recent_prices)
             current_price = prices[-1]
             
+            if rolling is not None and len(rolling) == len(recent_prices):
+                mean_price = rolling.mean
+                std_dev = rolling.stdev if len(recent_prices) > 1 else 0.0001
             # Solo calcular stdev si hay suficientes valores
-            if len(recent_prices) > 1:
+            elif len(recent_prices) > 1:
+                mean_price = fmean(recent_prices)
                 std_dev = stdev(recent_prices)
             else:
+                mean_price = fmean(recent_prices)
                 std_dev = 0.0001
             
             # Calcular z-score (cuántas desviaciones estándar está el precio actual)
@@ -164,7 +201,7 @@ class StatisticalStrategy:
         
         # Calcular EMA
         multiplier = 2 / (period + 1)
-        ema = mean(prices[:period])  # Primera EMA = SMA
+        ema = fmean(prices[:period])  # Primera EMA = SMA
         
         for price in prices[period:]:
             ema = (price * multiplier) + (ema * (1 - multiplier))
@@ -194,8 +231,8 @@ class StatisticalStrategy:
         gains = [d for d in deltas if d > 0]
         losses = [-d for d in deltas if d < 0]
 
-        avg_gain = mean(gains) if gains else 0.0
-        avg_loss = mean(losses) if losses else 0.0
+        avg_gain = fmean(gains) if gains else 0.0
+        avg_loss = fmean(losses) if losses else 0.0
 
         # Casos límite
         if avg_gain == 0 and avg_loss == 0:
@@ -216,7 +253,7 @@ class StatisticalStrategy:
             return None
         deltas = [abs(prices[i] - prices[i-1]) for i in range(1, len(prices))]
         window = deltas[-period:]
-        return mean(window) if window else None
+        return fmean(window) if window else None
 
     def calculate_streaks(self, prices: List[float]) -> Dict[str, int]:
         """Cuenta rachas consecutivas de alzas/bajas en los últimos ~10 ticks."""
@@ -253,25 +290,19 @@ class StatisticalStrategy:
         """
         try:
             # Obtener más ticks para análisis de tendencia (últimas 1-2 horas)
-            trend_ticks = self.get_recent_ticks(symbol, self.trend_analysis_period)
-            
-            if len(trend_ticks) < 10:  # Mínimo necesario para análisis
-                return None
-            
-            # Extraer precios
-            trend_prices = [float(tick.price) for tick in reversed(trend_ticks)]
-            
-            if len(trend_prices) < 10:
+            trend_prices = self.get_recent_prices(symbol, self.trend_analysis_period)
+
+            if len(trend_prices) < 10:  # Mínimo necesario para análisis
                 return None
             
             # Calcular promedio móvil simple de largo plazo
             # Usar primeros 30 ticks como referencia inicial
             initial_period = min(30, len(trend_prices) // 2)
-            initial_avg = mean(trend_prices[:initial_period])
+            initial_avg = fmean(trend_prices[:initial_period])
             
             # Calcular promedio de últimos 30 ticks
             recent_period = min(30, len(trend_prices))
-            recent_avg = mean(trend_prices[-recent_period:])
+            recent_avg = fmean(trend_prices[-recent_period:])
             
             # Precio actual
             current_price = trend_prices[-1]
@@ -319,8 +350,8 @@ class StatisticalStrategy:
         previous_10 = prices[-20:-10] if len(prices) >= 20 else prices[:10]
         
         try:
-            recent_mean = mean(recent_10)
-            previous_mean = mean(previous_10)
+            recent_mean = fmean(recent_10)
+            previous_mean = fmean(previous_10)
             
             # Calcular cambio porcentual
             change_pct = abs((recent_mean - previous_mean) / previous_mean) * 100 if previous_mean > 0 else 0.0
@@ -431,27 +462,33 @@ class StatisticalStrategy:
             print(f"🚫 {symbol}: Excluido por bajo win rate")
             return None
         
-        # Obtener ticks
-        ticks = self.get_recent_ticks(symbol, self.ticks_to_analyze)
-        
-        if len(ticks) < 10:
-            print(f"⚠️ {symbol}: Insuficientes ticks ({len(ticks)} < 10)")
+        # Obtener precios (cronológicos)
+        prices = self.get_recent_prices(symbol, self.ticks_to_analyze)
+
+        if len(prices) < 10:
+            print(f"⚠️ {symbol}: Insuficientes ticks ({len(prices)} < 10)")
             return None
-        
-        # Extraer precios
-        prices = [float(tick.price) for tick in reversed(ticks)]
-        
+
+        # Con ventana completa los indicadores salen del estado incremental (O(1) por tick)
+        state = self._streaming_state(symbol, prices)
+
         # Calcular estadísticas
-        stats = self.calculate_statistics(prices)
+        stats = self.calculate_statistics(prices, rolling=state['stats'] if state else None)
         momentum = self.calculate_momentum(prices)
         
         # FILTROS MEJORADOS: EMA, RSI, ATR, rachas de ticks
-        ema = self.calculate_ema(prices, self.ema_period)
-        rsi = self.calculate_rsi(prices, self.rsi_period)
-        rsi_prev = None
-        if len(prices) >= self.rsi_period + 2:
-            rsi_prev = self.calculate_rsi(prices[:-1], self.rsi_period)
-        atr = self.calculate_atr(prices, period=min(20, len(prices)-1))
+        if state:
+            ema = state['ema'].value
+            rsi = state['rsi'].window().rsi_moves()
+            rsi_prev = state['rsi'].window(1).rsi_moves()
+            atr = state['atr'].window().atr()
+        else:
+            ema = self.calculate_ema(prices, self.ema_period)
+            rsi = self.calculate_rsi(prices, self.rsi_period)
+            rsi_prev = None
+            if len(prices) >= self.rsi_period + 2:
+                rsi_prev = self.calculate_rsi(prices[:-1], self.rsi_period)
+            atr = self.calculate_atr(prices, period=min(20, len(prices)-1))
         atr_ratio = (atr / stats['current_price']) if (atr and stats['current_price'] > 0) else 0.0
         streaks = self.calculate_streaks(prices)
         up_streak, down_streak = streaks['up_streak'], streaks['down_streak']
@@ -0,0 +1,346 @@
+"""
+Indicadores incrementales por símbolo
+Mantienen estado acumulado (media/varianza, RSI, ATR, EMA, extremos) y se
+actualizan en O(1) por tick, en vez de recalcular ventanas de 50-200 ticks
+en cada pasada de las estrategias
+"""
+
+from __future__ import annotations
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Tuple
+
+
+class RollingStats:
+    """
+    Media y desviación estándar muestral sobre una ventana deslizante.
+
+    Welford con salida de elementos: al llenarse la ventana cada tick entra y el
+    más antiguo sale, ajustando media y M2 sin recorrer la ventana. Cada `window`
+    actualizaciones se recalcula desde la ventana para acotar el error de redondeo.
+    """
+
+    def __init__(self, window: int):
+        self.window = max(int(window), 1)
+        self.warmup = self.window
+        self.values: Deque[float] = deque(maxlen=self.window)
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._updates = 0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def update(self, x: float) -> None:
+        if len(self.values) == self.window:
+            old = self.values[0]
+            self.values.append(x)
+            old_mean = self.mean
+            self.mean += (x - old) / self.window
+            self._m2 += (x - old) * (x - self.mean + old - old_mean)
+        else:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self._m2 += delta * (x - self.mean)
+        self._updates += 1
+        if self._updates >= self.window:
+            self._resync()
+
+    def _resync(self) -> None:
+        n = len(self.values)
+        self.mean = sum(self.values) / n
+        self._m2 = sum((v - self.mean) ** 2 for v in self.values)
+        self._updates = 0
+
+    @property
+    def variance(self) -> float:
+        n = len(self.values)
+        if n < 2:
+            return 0.0
+        variance = max(self._m2, 0.0) / (n - 1)
+        # Ruido de redondeo en ventanas planas: la desviación exacta es 0
+        if variance <= (1e-12 * self.mean) ** 2:
+            return 0.0
+        return variance
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+
+@dataclass(frozen=True)
+class DeltaWindow:
+    """Agregados de las últimas `period` variaciones tick a tick"""
+    period: int
+    gain_sum: float
+    gain_count: int
+    loss_sum: float
+    loss_count: int
+    abs_sum: float
+
+    def rsi(self) -> float:
+        """RSI con ganancias/pérdidas promediadas sobre todo el período"""
+        avg_gain = self.gain_sum / self.period
+        avg_loss = self.loss_sum / self.period
+        if avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def rsi_moves(self) -> float:
+        """RSI promediando solo los movimientos de cada dirección (50 si no hay movimiento)"""
+        avg_gain = self.gain_sum / self.gain_count if self.gain_count else 0.0
+        avg_loss = self.loss_sum / self.loss_count if self.loss_count else 0.0
+        if avg_gain == 0 and avg_loss == 0:
+            return 50.0
+        if avg_loss == 0:
+            return 100.0
+        if avg_gain == 0:
+            return 0.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def atr(self) -> float:
+        """ATR a nivel de ticks: media del valor absoluto de las variaciones"""
+        return self.abs_sum / self.period
+
+
+class RollingDeltas:
+    """
+    Ventana de las últimas `period` variaciones de precio (base de RSI y ATR).
+
+    Guarda además los agregados de los últimos `lags` ticks para consultar el
+    valor de hace N ticks (p.ej. el RSI previo) sin recalcular.
+    """
+
+    def __init__(self, period: int, lags: int = 0):
+        self.period = max(int(period), 1)
+        self.warmup = self.period + 1 + lags
+        self.deltas: Deque[float] = deque(maxlen=self.period)
+        self._history: Deque[DeltaWindow] = deque(maxlen=lags + 1)
+        self._last_price: Optional[float] = None
+        self._gain_sum = self._loss_sum = self._abs_sum = 0.0
+        self._gain_count = self._loss_count = 0
+        self._updates = 0
+
+    def _add(self, d: float, sign: int) -> None:
+        if d > 0:
+            self._gain_sum += sign * d
+            self._gain_count += sign
+        elif d < 0:
+            self._loss_sum += sign * -d
+            self._loss_count += sign
+        self._abs_sum += sign * abs(d)
+
+    def update(self, price: float) -> None:
+        if self._last_price is None:
+            self._last_price = price
+            return
+        d = price - self._last_price
+        self._last_price = price
+        if len(self.deltas) == self.period:
+            self._add(self.deltas[0], -1)
+        self.deltas.append(d)
+        self._add(d, 1)
+        self._updates += 1
+        if self._updates >= self.period:
+            self._resync()
+        if not self._gain_count:
+            self._gain_sum = 0.0
+        if not self._loss_count:
+            self._loss_sum = 0.0
+        if len(self.deltas) == self.period:
+            self._history.append(DeltaWindow(self.period, self._gain_sum, self._gain_count,
+                                             self._loss_sum, self._loss_count, self._abs_sum))
+
+    def _resync(self) -> None:
+        self._gain_sum = sum(d for d in self.deltas if d > 0)
+        self._loss_sum = sum(-d for d in self.deltas if d < 0)
+        self._abs_sum = sum(abs(d) for d in self.deltas)
+        self._updates = 0
+
+    def window(self, lag: int = 0) -> Optional[DeltaWindow]:
+        """Agregados de la ventana que terminaba hace `lag` ticks (None si no hay datos)"""
+        if lag >= len(self._history):
+            return None
+        return self._history[-1 - lag]
+
+
+class WindowedEMA:
+    """
+    EMA calculada sobre los últimos `window` precios, sembrada con la media de los
+    `seed` primeros de esa ventana (la definición que usan las estrategias).
+
+    La parte exponencial se desliza en O(1): entra el tick nuevo con peso k y sale
+    el que pasa al bloque semilla con peso k·(1-k)^(window-seed-1).
+    """
+
+    def __init__(self, period: int, window: Optional[int] = None, seed: int = 1):
+        self.period = max(int(period), 1)
+        self.window = max(int(window or self.period), 1)
+        self.seed = max(1, min(int(seed), self.window))
+        self.warmup = self.window
+        self.k = 2.0 / (self.period + 1.0)
+        self.q = 1.0 - self.k
+        self._tail = self.window - self.seed
+        self._q_tail = self.q ** self._tail
+        self._leaving_weight = self.k * self.q ** (self._tail - 1) if self._tail else 0.0
+        self.prices: Deque[float] = deque(maxlen=self.window)
+        self._seed_sum = 0.0
+        self._acc = 0.0
+        self._updates = 0
+
+    def update(self, price: float) -> None:
+        if len(self.prices) < self.window:
+            self.prices.append(price)
+            if len(self.prices) == self.window:
+                self._resync()
+            return
+        oldest = self.prices[0]
+        entering_seed = self.prices[self.seed] if self._tail else price
+        self.prices.append(price)
+        self._seed_sum += entering_seed - oldest
+        if self._tail:
+            self._acc = self.k * price + self.q * self._acc - self.q * self._leaving_weight * entering_seed
+        self._updates += 1
+        if self._updates >= self.window:
+            self._resync()
+
+    def _resync(self) -> None:
+        values = list(self.prices)
+        self._seed_sum = sum(values[:self.seed])
+        acc = 0.0
+        for price in values[self.seed:]:
+            acc = price * self.k + acc * self.q
+        self._acc = acc
+        self._updates = 0
+
+    @property
+    def value(self) -> Optional[float]:
+        if len(self.prices) < self.window:
+            return None
+        return (self._seed_sum / self.seed) * self._q_tail + self._acc
+
+
+class RollingExtrema:
+    """Máximo y mínimo de los últimos `window` precios con colas monótonas (O(1) amortizado)"""
+
+    def __init__(self, window: int):
+        self.window = max(int(window), 1)
+        self.warmup = self.window
+        self._count = 0
+        self._max: Deque[Tuple[int, float]] = deque()
+        self._min: Deque[Tuple[int, float]] = deque()
+
+    def update(self, price: float) -> None:
+        i = self._count
+        self._count += 1
+        while self._max and self._max[-1][1] <= price:
+            self._max.pop()
+        self._max.append((i, price))
+        while self._min and self._min[-1][1] >= price:
+            self._min.pop()
+        self._min.append((i, price))
+        start = self._count - self.window
+        if self._max[0][0] < start:
+            self._max.popleft()
+        if self._min[0][0] < start:
+            self._min.popleft()
+
+    @property
+    def ready(self) -> bool:
+        return self._count >= self.window
+
+    @property
+    def high(self) -> Optional[float]:
+        return self._max[0][1] if self.ready else None
+
+    @property
+    def low(self) -> Optional[float]:
+        return self._min[0][1] if self.ready else None
+
+
+class SymbolIndicators:
+    """Conjunto de indicadores de un símbolo alimentados con la misma serie de precios"""
+
+    def __init__(self, **indicators: Any):
+        self._indicators: Dict[str, Any] = indicators
+        self.warmup = max((ind.warmup for ind in indicators.values()), default=1)
+        self.count = 0
+        self.last_price: Optional[float] = None
+
+    def __getitem__(self, name: str) -> Any:
+        return self._indicators[name]
+
+    def update(self, price: float) -> None:
+        for indicator in self._indicators.values():
+            indicator.update(price)
+        self.count += 1
+        self.last_price = price
+
+    def extend(self, prices: Iterable[float]) -> None:
+        for price in prices:
+            self.update(price)
+
+    def ready_for(self, prices) -> bool:
+        """True si el estado corresponde a `prices` (ventana completa y mismo último tick)"""
+        return (
+            len(prices) > 0
+            and self.count >= self.warmup
+            and self.last_price == float(prices[-1])
+        )
+
+
+class StreamingIndicatorStore:
+    """
+    Estado de indicadores por símbolo sincronizado con un TickBufferStore.
+
+    `get(symbol)` solo procesa los ticks agregados al buffer desde la última
+    llamada; si el buffer se recreó o se perdieron ticks (desborde), reconstruye
+    el estado con los últimos `warmup` precios del buffer.
+    """
+
+    def __init__(self, tick_source, factory: Callable[[], SymbolIndicators]):
+        self.tick_source = tick_source
+        self.factory = factory
+        self._entries: Dict[str, Tuple[Any, int, SymbolIndicators]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_source(cls, tick_source, factory: Callable[[], SymbolIndicators]) -> Optional['StreamingIndicatorStore']:
+        """Crear el store solo si la fuente es un buffer en memoria (None si se lee de BD)"""
+        if tick_source is None or not hasattr(tick_source, 'get_buffer'):
+            return None
+        return cls(tick_source, factory)
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        lock = self._locks.get(symbol)
+        if lock is None:
+            with self._lock:
+                lock = self._locks.setdefault(symbol, threading.Lock())
+        return lock
+
+    def get(self, symbol: str) -> SymbolIndicators:
+        buffer = self.tick_source.get_buffer(symbol)
+        with self._symbol_lock(symbol):
+            appended = buffer.appended
+            entry = self._entries.get(symbol)
+            new = appended - entry[1] if entry else -1
+            if entry is None or entry[0] is not buffer or new < 0 or new > len(buffer):
+                state = self.factory()
+                state.extend(buffer.prices(state.warmup).tolist())
+            else:
+                state = entry[2]
+                if new:
+                    state.extend(buffer.prices(new).tolist())
+            self._entries[symbol] = (buffer, appended, state)
+            return state
+
+    def clear(self, symbol: Optional[str] = None) -> None:
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol, None)
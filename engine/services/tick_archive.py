@@ -0,0 +1,187 @@
+"""
+Archivo columnar de ticks para replay e investigación offline
+Un par de ficheros `.npy` por símbolo y día UTC (`<símbolo>/<YYYY-MM-DD>.epoch.npy`
+y `.price.npy`, float64), más un marcador `.complete` si se exportó con el día ya
+cerrado. El lector los abre con memory-map y devuelve vistas sin
+copia del rango pedido, así que semanas de ticks se leen sin tocar la BD viva.
+"""
+
+from __future__ import annotations
+import logging
+import os
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from market.models import Tick, TickChunk
+from engine.services.tick_retention import load_ticks
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('epoch', 'price')
+
+
+def default_root() -> Path:
+    return Path(getattr(settings, 'TICK_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'data' / 'tick_archive'))
+
+
+def _day_bounds(day: date) -> Tuple[datetime, datetime]:
+    start = datetime.combine(day, dt_time.min, tzinfo=dt_timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def _column_path(root: Path, symbol: str, day: date, column: str) -> Path:
+    return root / symbol / f'{day.isoformat()}.{column}.npy'
+
+
+def _complete_path(root: Path, symbol: str, day: date) -> Path:
+    return root / symbol / f'{day.isoformat()}.complete'
+
+
+def _save_atomic(path: Path, values: np.ndarray) -> None:
+    """Escribir en un temporal y renombrar: un lector nunca ve un fichero a medias"""
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as fh:
+        np.save(fh, np.ascontiguousarray(values, dtype=np.float64))
+    os.replace(tmp, path)
+
+
+def export_day(symbol: str, day: date, root: Optional[Path] = None, complete: bool = False) -> int:
+    """
+    Exportar los ticks de un día UTC (archivo TickChunk + tabla caliente)
+
+    Args:
+        complete: El día ya cerró al empezar la exportación; se deja el marcador
+            `.complete` y las siguientes exportaciones lo omiten
+
+    Returns:
+        Ticks escritos (0 si el día no tiene datos; no se crean ficheros)
+    """
+    root = Path(root or default_root())
+    epochs, prices = load_ticks(symbol, *_day_bounds(day))
+    if len(epochs) == 0:
+        return 0
+    (root / symbol).mkdir(parents=True, exist_ok=True)
+    marker = _complete_path(root, symbol, day)
+    if not complete and marker.exists():
+        marker.unlink()
+    # Precio antes que epoch: el lector considera completo un día cuando existe el epoch
+    _save_atomic(_column_path(root, symbol, day, 'price'), prices)
+    _save_atomic(_column_path(root, symbol, day, 'epoch'), epochs)
+    if complete:
+        marker.touch()
+    return len(epochs)
+
+
+def _available_days(symbol: str) -> List[date]:
+    days = set(TickChunk.objects.filter(symbol=symbol).values_list('day', flat=True))
+    bounds = Tick.objects.filter(symbol=symbol).aggregate(first=Min('timestamp'), last=Max('timestamp'))
+    if bounds['first'] is not None:
+        day = bounds['first'].astimezone(dt_timezone.utc).date()
+        last = bounds['last'].astimezone(dt_timezone.utc).date()
+        while day <= last:
+            days.add(day)
+            day += timedelta(days=1)
+    return sorted(days)
+
+
+def export_ticks(symbols: Optional[Iterable[str]] = None, since: Optional[date] = None,
+                 until: Optional[date] = None, root: Optional[Path] = None,
+                 overwrite: bool = False) -> Dict[str, int]:
+    """
+    Exportar por símbolo y día. Se omiten (salvo `overwrite`) solo los días que se
+    exportaron ya cerrados; un día exportado mientras estaba en curso se vuelve a
+    exportar entero para recoger los ticks que llegaron después.
+
+    Returns:
+        {símbolo: ticks escritos}
+    """
+    root = Path(root or default_root())
+    if symbols is None:
+        symbols = sorted(set(Tick.objects.values_list('symbol', flat=True).distinct()) |
+                         set(TickChunk.objects.values_list('symbol', flat=True).distinct()))
+    now = timezone.now()
+    written: Dict[str, int] = {}
+    for symbol in symbols:
+        written[symbol] = 0
+        for day in _available_days(symbol):
+            if (since and day < since) or (until and day > until):
+                continue
+            if not overwrite and _complete_path(root, symbol, day).exists():
+                continue
+            written[symbol] += export_day(symbol, day, root, complete=_day_bounds(day)[1] <= now)
+    logger.info(f"Archivo de ticks exportado en {root}: {written}")
+    return written
+
+
+def _as_epoch(value: Union[datetime, float, int, None], default: float) -> float:
+    if value is None:
+        return default
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+class TickArchiveReader:
+    """
+    Lector del archivo `.npy` con memory-map
+
+    `iter_days` entrega vistas sin copia de cada día; `read` las une (solo copia si
+    el rango abarca más de un día).
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or default_root())
+
+    def symbols(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def days(self, symbol: str) -> List[date]:
+        folder = self.root / symbol
+        if not folder.exists():
+            return []
+        return sorted(date.fromisoformat(p.name.split('.', 1)[0]) for p in folder.glob('*.epoch.npy'))
+
+    def open_day(self, symbol: str, day: date) -> Tuple[np.ndarray, np.ndarray]:
+        """Columnas completas de un día como np.memmap de solo lectura"""
+        epochs = np.load(_column_path(self.root, symbol, day, 'epoch'), mmap_mode='r')
+        prices = np.load(_column_path(self.root, symbol, day, 'price'), mmap_mode='r')
+        return epochs, prices
+
+    def iter_days(self, symbol: str, since: Union[datetime, float, None] = None,
+                  until: Union[datetime, float, None] = None) -> Iterator[Tuple[date, np.ndarray, np.ndarray]]:
+        """(día, epochs, prices) del rango [since, until) como vistas del memory-map"""
+        lo = _as_epoch(since, -np.inf)
+        hi = _as_epoch(until, np.inf)
+        for day in self.days(symbol):
+            day_start, day_end = _day_bounds(day)
+            if day_end.timestamp() <= lo or day_start.timestamp() >= hi:
+                continue
+            epochs, prices = self.open_day(symbol, day)
+            # Columnas ordenadas por tiempo: el rango se corta por búsqueda binaria
+            start, stop = np.searchsorted(epochs, [lo, hi], side='left')
+            if stop > start:
+                yield day, epochs[start:stop], prices[start:stop]
+
+    def read(self, symbol: str, since: Union[datetime, float, None] = None,
+             until: Union[datetime, float, None] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ticks de [since, until)
+
+        Returns:
+            (epochs, prices) float64; si el rango cae en un solo día son vistas sin copia
+        """
+        parts = list(self.iter_days(symbol, since, until))
+        if not parts:
+            return np.empty(0), np.empty(0)
+        if len(parts) == 1:
+            return parts[0][1], parts[0][2]
+        return (np.concatenate([epochs for _, epochs, _ in parts]),
+                np.concatenate([prices for _, _, prices in parts]))
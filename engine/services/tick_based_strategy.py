@@ -10,6 +10,7 @@ from typing import Optional, List, Dict, Any
 
 from django.utils import timezone
 from market.models import Tick
+from engine.services.tick_buffer import fetch_recent_prices
 
 
 @dataclass
@@ -29,7 +30,8 @@ class TickBasedStrategy:
     def __init__(self,
                  ticks_to_analyze: int = 50,
                  trend_threshold_pct: float = 65.0,
-                 force_threshold_pct: float = 0.15):
+                 force_threshold_pct: float = 0.15,
+                 tick_source: Optional[Any] = None):
         """
         Inicializar estrategia
         
@@ -37,10 +39,12 @@ class TickBasedStrategy:
             ticks_to_analyze: Número de ticks a analizar (default: 50)
             trend_threshold_pct: Porcentaje mínimo para confirmar tendencia (default: 65%)
             force_threshold_pct: Umbral de fuerza en porcentaje (default: 0.15%)
+            tick_source: Fuente de precios en memoria; si es None se consulta Tick en BD
         """
         self.ticks_to_analyze = ticks_to_analyze
         self.trend_threshold_pct = trend_threshold_pct
         self.force_threshold_pct = force_threshold_pct
+        self.tick_source = tick_source
     
     def get_recent_ticks(self, symbol: str, limit: int) -> List[Tick]:
         """
@@ -57,18 +61,22 @@ class TickBasedStrategy:
             Tick.objects.filter(symbol=symbol)
             .order_by('-timestamp')[:limit]
         )
-    
-    def calculate_trend_strength(self, ticks: List[Tick]) -> Dict[str, Any]:
+
+    def get_recent_prices(self, symbol: str, limit: int) -> List[float]:
+        """Obtener últimos precios de un símbolo en orden cronológico"""
+        return fetch_recent_prices(symbol, limit, self.tick_source).tolist()
+
+    def calculate_trend_strength(self, prices: List[float]) -> Dict[str, Any]:
         """
         Calcular tendencia y fuerza del movimiento
         
         Args:
-            ticks: Lista de ticks (ordenados del más antiguo al más reciente)
+            prices: Lista de precios (ordenados del más antiguo al más reciente)
             
         Returns:
             Diccionario con estadísticas de tendencia
         """
-        if len(ticks) < 2:
+        if len(prices) < 2:
             return {
                 'direction': None,
                 'strength': 0.0,
@@ -78,18 +86,15 @@ class TickBasedStrategy:
                 'force_pct': 0.0
             }
         
-        # Invertir lista para tener del más antiguo al más reciente
-        ticks = list(reversed(ticks))
-        
         upward_count = 0
         downward_count = 0
         price_differences = []
         
-        current_price = float(ticks[0].price)
+        current_price = prices[0]
         
-        for i in range(1, len(ticks)):
-            prev_price = float(ticks[i-1].price)
-            curr_price = float(ticks[i].price)
+        for i in range(1, len(prices)):
+            prev_price = prices[i-1]
+            curr_price = prices[i]
             
             # Contar ticks alcistas y bajistas
             if curr_price > prev_price:
@@ -143,14 +148,14 @@ class TickBasedStrategy:
         Returns:
             TrendSignal si hay señal válida, None si no
         """
-        # Obtener últimos ticks
-        ticks = self.get_recent_ticks(symbol, self.ticks_to_analyze)
+        # Obtener últimos precios (cronológicos)
+        prices = self.get_recent_prices(symbol, self.ticks_to_analyze)
         
-        if len(ticks) < 2:
+        if len(prices) < 2:
             return None
         
         # Calcular tendencia y fuerza
-        trend_data = self.calculate_trend_strength(ticks)
+        trend_data = self.calculate_trend_strength(prices)
         
         # Si no hay dirección clara, no hay señal
         if not trend_data['direction']:
@@ -170,7 +175,7 @@ class TickBasedStrategy:
             direction=trend_data['direction'],
             strength=trend_data['strength'],
             entry_price=trend_data['current_price'],
-            ticks_analyzed=len(ticks),
+            ticks_analyzed=len(prices),
             upward_ticks_pct=trend_data['upward_pct'],
             force_pct=trend_data['force_pct']
         )
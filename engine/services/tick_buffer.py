@@ -0,0 +1,171 @@
+"""
+Buffer circular de ticks en memoria por símbolo
+Carga la ventana reciente desde BD una sola vez y luego solo trae los ticks nuevos,
+de modo que todas las estrategias lean la misma ventana sin volver a consultar Tick
+"""
+
+from __future__ import annotations
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from market.models import Tick
+
+
+class SymbolTickBuffer:
+    """
+    Buffer circular de capacidad fija con pares (epoch, precio) en float64.
+
+    Cada valor se escribe dos veces (en `pos` y en `pos + capacity`), así la ventana
+    de los últimos N ticks siempre es un slice contiguo y las lecturas devuelven
+    vistas de solo lectura sin copiar memoria.
+    """
+
+    def __init__(self, symbol: str, capacity: int = 1024):
+        self.symbol = symbol
+        self.capacity = max(int(capacity), 1)
+        self._epochs = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._prices = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._head = 0  # Próxima posición de escritura (0..capacity-1)
+        self._size = 0
+        # Total de ticks agregados desde la creación (para consumidores incrementales)
+        self.appended = 0
+        # Timestamp del último tick cargado (para consultas incrementales)
+        self.last_timestamp: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, epoch: float, price: float, timestamp: Optional[datetime] = None) -> None:
+        """Agregar un tick al final del buffer (descarta el más antiguo si está lleno)"""
+        pos = self._head
+        mirror = pos + self.capacity
+        self._epochs[pos] = self._epochs[mirror] = epoch
+        self._prices[pos] = self._prices[mirror] = price
+        self._head = (pos + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+        self.appended += 1
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+
+    def _window(self, data: np.ndarray, limit: Optional[int]) -> np.ndarray:
+        n = self._size if limit is None else max(0, min(int(limit), self._size))
+        end = self._head + self.capacity
+        view = data[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def prices(self, limit: Optional[int] = None) -> np.ndarray:
+        """Últimos `limit` precios en orden cronológico (vista sin copia)"""
+        return self._window(self._prices, limit)
+
+    def epochs(self, limit: Optional[int] = None) -> np.ndarray:
+        """Últimos `limit` epochs en orden cronológico (vista sin copia)"""
+        return self._window(self._epochs, limit)
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        """Último tick como (epoch, precio) o None si el buffer está vacío"""
+        if not self._size:
+            return None
+        pos = (self._head - 1) % self.capacity
+        return float(self._epochs[pos]), float(self._prices[pos])
+
+
+class TickBufferStore:
+    """
+    Conjunto de buffers por símbolo compartido por las estrategias del loop.
+
+    `refresh(symbol)` es la única operación que consulta la BD: la primera vez carga
+    los últimos `capacity` ticks y después solo los posteriores al último cargado.
+    Las lecturas (`get_prices`, `latest_price`) nunca consultan la BD salvo para la
+    carga inicial de un símbolo que aún no tiene buffer.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self._buffers: Dict[str, SymbolTickBuffer] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, symbol: str) -> Tuple[SymbolTickBuffer, bool]:
+        buffer = self._buffers.get(symbol)
+        if buffer is not None:
+            return buffer, False
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            if buffer is not None:
+                return buffer, False
+            buffer = SymbolTickBuffer(symbol, self.capacity)
+            self._buffers[symbol] = buffer
+            return buffer, True
+
+    def get_buffer(self, symbol: str) -> SymbolTickBuffer:
+        """Obtener el buffer del símbolo, cargándolo desde BD si es nuevo"""
+        buffer, created = self._get_or_create(symbol)
+        if created:
+            self.refresh(symbol)
+        return buffer
+
+    def refresh(self, symbol: str) -> int:
+        """
+        Traer de BD solo los ticks posteriores al último cargado
+
+        Returns:
+            Número de ticks agregados al buffer
+        """
+        buffer, _ = self._get_or_create(symbol)
+        queryset = Tick.objects.filter(symbol=symbol)
+        if buffer.last_timestamp is not None:
+            queryset = queryset.filter(timestamp__gt=buffer.last_timestamp)
+        rows = list(
+            queryset.order_by('-timestamp').values_list('timestamp', 'price')[:self.capacity]
+        )
+        for timestamp, price in reversed(rows):
+            buffer.append(timestamp.timestamp(), float(price), timestamp)
+        return len(rows)
+
+    def push(self, symbol: str, timestamp: datetime, price: float) -> None:
+        """Agregar un tick recibido en vivo sin pasar por la BD"""
+        buffer = self.get_buffer(symbol)
+        if buffer.last_timestamp is not None and timestamp <= buffer.last_timestamp:
+            return
+        buffer.append(timestamp.timestamp(), float(price), timestamp)
+
+    def get_prices(self, symbol: str, limit: int) -> np.ndarray:
+        """Últimos `limit` precios del símbolo en orden cronológico"""
+        return self.get_buffer(symbol).prices(limit)
+
+    def get_epochs(self, symbol: str, limit: int) -> np.ndarray:
+        """Últimos `limit` epochs del símbolo en orden cronológico"""
+        return self.get_buffer(symbol).epochs(limit)
+
+    def latest_price(self, symbol: str) -> Optional[float]:
+        """Último precio conocido del símbolo"""
+        latest = self.get_buffer(symbol).latest()
+        return latest[1] if latest else None
+
+    def clear(self, symbol: Optional[str] = None) -> None:
+        """Descartar buffers (todos o de un símbolo) para forzar recarga"""
+        with self._lock:
+            if symbol is None:
+                self._buffers.clear()
+            else:
+                self._buffers.pop(symbol, None)
+
+
+def fetch_recent_prices(symbol: str, limit: int, tick_source=None) -> np.ndarray:
+    """
+    Precios cronológicos (float64) de los últimos `limit` ticks de un símbolo
+
+    Usa `tick_source` (p.ej. TickBufferStore) si se inyecta; si no, consulta la BD.
+    """
+    if tick_source is not None:
+        return tick_source.get_prices(symbol, limit)
+    rows = list(
+        Tick.objects.filter(symbol=symbol)
+        .order_by('-timestamp')
+        .values_list('price', flat=True)[:limit]
+    )
+    return np.array([float(price) for price in reversed(rows)], dtype=np.float64)
@@ -0,0 +1,208 @@
+"""
+Bus de ticks entre procesos
+`save_realtime_tick` publica cada tick en cuanto llega de Deriv y el trading loop
+lo recibe sin pasar por la tabla Tick: la escritura en BD queda como efecto
+secundario asíncrono (TickWriter). Transporte: datagramas Unix (un socket por
+suscriptor en `TICK_BUS_DIR`), así el publicador nunca bloquea y cada lector
+espera en recv() sin sondear.
+"""
+
+from __future__ import annotations
+import errno
+import itertools
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from monitoring.metrics import record_tick_dropped
+
+logger = logging.getLogger(__name__)
+
+# seq, epoch del tick, precio, volumen, hora de publicación, símbolo (ascii, relleno con \0)
+TICK_FORMAT = struct.Struct('<Qdddd24s')
+SUBSCRIBER_GLOB = 'sub-*.sock'
+
+TickCallback = Callable[[str, float, datetime], None]
+
+
+def bus_dir() -> Path:
+    return Path(getattr(settings, 'TICK_BUS_DIR', '/tmp/intradia-tickbus'))
+
+
+def encode_tick(seq: int, symbol: str, epoch: float, price: float, volume: float = 0.0,
+                sent_at: Optional[float] = None) -> bytes:
+    return TICK_FORMAT.pack(seq, epoch, price, volume, time.time() if sent_at is None else sent_at,
+                            symbol.encode('ascii'))
+
+
+def decode_tick(data: bytes) -> Tuple[int, str, float, float, float, float]:
+    """(seq, símbolo, epoch, precio, volumen, hora de publicación)"""
+    seq, epoch, price, volume, sent_at, raw_symbol = TICK_FORMAT.unpack(data)
+    return seq, raw_symbol.rstrip(b'\0').decode('ascii'), epoch, price, volume, sent_at
+
+
+class TickBusPublisher:
+    """
+    Publicador (un proceso): envía cada tick a todos los suscriptores vivos.
+
+    - `sendto` no bloqueante: si el buffer de un suscriptor está lleno, el tick se
+      descarta para ese suscriptor y se registra en métricas (`bus_full`). La cola
+      del kernel por socket es `net.unix.max_dgram_qlen` (10 por defecto): holgada
+      para el ritmo de ticks de Deriv, no para ráfagas sin pausa.
+    - Los suscriptores se descubren por sus sockets en el directorio del bus; se
+      vuelve a listar cada `rescan_interval` segundos y se limpian los muertos.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, rescan_interval: float = 1.0):
+        self.directory = Path(directory or bus_dir())
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.rescan_interval = rescan_interval
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._subscribers: List[str] = []
+        self._scanned_at = 0.0
+
+        # Estadísticas
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def subscribers(self) -> List[str]:
+        return list(self._subscribers)
+
+    def rescan(self) -> List[str]:
+        self._subscribers = sorted(str(path) for path in self.directory.glob(SUBSCRIBER_GLOB))
+        self._scanned_at = time.monotonic()
+        return self.subscribers
+
+    def publish(self, symbol: str, epoch: float, price: float, volume: float = 0.0) -> int:
+        """Enviar un tick; retorna a cuántos suscriptores llegó"""
+        with self._lock:
+            if time.monotonic() - self._scanned_at > self.rescan_interval:
+                self.rescan()
+            message = encode_tick(next(self._seq), symbol, epoch, float(price), float(volume or 0))
+            delivered = 0
+            for path in list(self._subscribers):
+                try:
+                    self._sock.sendto(message, path)
+                    delivered += 1
+                except BlockingIOError:
+                    self.dropped += 1
+                    record_tick_dropped('bus_full')
+                except OSError as e:
+                    if e.errno in (errno.ECONNREFUSED, errno.ENOENT):
+                        # Suscriptor muerto: su socket quedó huérfano
+                        self._subscribers.remove(path)
+                        try:
+                            os.unlink(path)
+                        except OSError:
+                            pass
+                    else:
+                        logger.warning(f"Error publicando tick en {path}: {e}")
+            self.published += 1
+            return delivered
+
+    def close(self) -> None:
+        self._sock.close()
+
+
+class TickBusSubscriber:
+    """
+    Suscriptor: un socket propio en el directorio del bus y un hilo lector.
+
+    Los callbacks tienen la firma de `RealtimeTickService.add_tick_callback`
+    (`symbol, price, timestamp`), así el TickEventScheduler se conecta igual.
+    Los saltos en la secuencia del publicador se cuentan en `gaps`.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, recv_buffer: int = 4 * 1024 * 1024):
+        self.directory = Path(directory or bus_dir())
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = str(self.directory / f'sub-{os.getpid()}-{id(self):x}.sock')
+        self.recv_buffer = recv_buffer
+        self._callbacks: List[TickCallback] = []
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._last_seq = 0
+
+        # Estadísticas
+        self.received = 0
+        self.gaps = 0
+        self.last_latency = 0.0  # Segundos entre la publicación y la recepción
+        self.last_by_symbol: Dict[str, Tuple[float, float]] = {}
+
+    def add_tick_callback(self, callback: TickCallback) -> None:
+        self._callbacks.append(callback)
+
+    def start(self) -> None:
+        """Crear el socket y arrancar el lector (idempotente)"""
+        if self._running:
+            return
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.recv_buffer)
+        except OSError:
+            pass
+        self._sock.bind(self.path)
+        self._sock.settimeout(0.5)  # Para poder detener el lector
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='tick-bus-subscriber', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def _run(self) -> None:
+        while self._running:
+            try:
+                data = self._sock.recv(TICK_FORMAT.size)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self._running:
+                    logger.exception("Error leyendo del bus de ticks")
+                return
+            if len(data) != TICK_FORMAT.size:
+                continue
+            self._dispatch(*decode_tick(data))
+
+    def _dispatch(self, seq: int, symbol: str, epoch: float, price: float, volume: float,
+                  sent_at: float) -> None:
+        if seq < self._last_seq:
+            # El publicador se reinició: su secuencia vuelve a empezar
+            self._last_seq = 0
+        if self._last_seq and seq > self._last_seq + 1:
+            self.gaps += seq - self._last_seq - 1
+        self._last_seq = seq
+        self.received += 1
+        self.last_latency = time.time() - sent_at
+        self.last_by_symbol[symbol] = (epoch, price)
+        timestamp = datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
+        for callback in self._callbacks:
+            try:
+                callback(symbol, price, timestamp)
+            except Exception as e:
+                logger.error(f"Error en callback del bus de ticks: {e}")
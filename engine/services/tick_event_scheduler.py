@@ -0,0 +1,184 @@
+"""
+Evaluación de estrategias disparada por ticks
+En lugar de barrer todos los símbolos cada N segundos, solo se evalúan los
+símbolos que recibieron ticks nuevos, agrupando ráfagas con una ventana por símbolo
+"""
+
+from __future__ import annotations
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class TickEventScheduler:
+    """
+    Planificador de evaluaciones por símbolo alimentado desde el ingest de ticks.
+
+    - `on_tick()` se registra con `RealtimeTickService.add_tick_callback`; solo
+      encola el tick en memoria (no toca la BD ni bloquea el hilo del WebSocket).
+    - Debounce por símbolo: el primer tick programa la evaluación para dentro de
+      `debounce_ms`; los ticks que llegan dentro de esa ventana se agrupan en la
+      misma evaluación. Como máximo hay una evaluación en curso por símbolo; si
+      llegan ticks mientras tanto, el símbolo se reprograma al terminar.
+    - La evaluación (`evaluate_symbol`) corre en un pool de hilos; la fase con
+      efectos (`process_symbol`: riesgo, capital, orden) se serializa con un lock.
+    """
+
+    STATUSES = ('executed', 'skipped', 'rejected', 'error')
+
+    def __init__(self,
+                 loop,
+                 debounce_ms: int = 250,
+                 workers: int = 4,
+                 on_result: Optional[Callable[[str, Optional[Dict[str, Any]]], None]] = None):
+        """
+        Args:
+            loop: TickTradingLoop (o compatible) con `tick_buffers`, `evaluate_symbol` y `process_symbol`
+            debounce_ms: Ventana de agrupación de ticks por símbolo
+            workers: Hilos para evaluar símbolos en paralelo
+            on_result: Callback opcional `(symbol, result)` tras cada evaluación
+        """
+        self.loop = loop
+        self.debounce = max(0, debounce_ms) / 1000.0
+        self.workers = max(1, workers)
+        self.on_result = on_result
+
+        self._cond = threading.Condition()
+        self._order_lock = threading.Lock()
+        self._heap: List[Tuple[float, str]] = []
+        self._scheduled: Set[str] = set()
+        self._in_flight: Set[str] = set()
+        self._pending_ticks: Dict[str, List[Tuple[datetime, float]]] = {}
+        self._symbols: Optional[Set[str]] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # Estadísticas
+        self.ticks = 0
+        self.coalesced = 0
+        self.evaluations = 0
+        self._counts = {status: 0 for status in self.STATUSES}
+
+    def start(self) -> None:
+        """Iniciar el hilo despachador y el pool de evaluación (idempotente)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tick-eval')
+        self._thread = threading.Thread(target=self._run, name='tick-event-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Detener el despachador y esperar las evaluaciones en curso"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def set_symbols(self, symbols: Optional[Iterable[str]]) -> None:
+        """Restringir los símbolos a evaluar (None = todos los que lleguen)"""
+        with self._cond:
+            self._symbols = set(symbols) if symbols is not None else None
+
+    def on_tick(self, symbol: str, price: float, timestamp: datetime) -> None:
+        """Callback de ingest: registrar el tick y programar la evaluación del símbolo"""
+        with self._cond:
+            if not self._running:
+                return
+            if self._symbols is not None and symbol not in self._symbols:
+                return
+            self.ticks += 1
+            self._pending_ticks.setdefault(symbol, []).append((timestamp, price))
+            if symbol in self._scheduled or symbol in self._in_flight:
+                # Se evalúa en la ventana ya programada o al terminar la actual
+                self.coalesced += 1
+                return
+            self._schedule_locked(symbol)
+
+    def pop_counts(self) -> Dict[str, int]:
+        """Resultados por estado desde la última llamada (para el resumen periódico)"""
+        with self._cond:
+            counts = self._counts
+            self._counts = {status: 0 for status in self.STATUSES}
+            return counts
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Esperar a que no queden evaluaciones programadas ni en curso"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._scheduled or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def _schedule_locked(self, symbol: str) -> None:
+        heapq.heappush(self._heap, (time.monotonic() + self.debounce, symbol))
+        self._scheduled.add(symbol)
+        self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._running and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                if not self._running:
+                    return
+                ready = []
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    _, symbol = heapq.heappop(self._heap)
+                    self._scheduled.discard(symbol)
+                    self._in_flight.add(symbol)
+                    ready.append(symbol)
+            for symbol in ready:
+                self._executor.submit(self._evaluate, symbol)
+
+    def _evaluate(self, symbol: str) -> None:
+        result = None
+        try:
+            close_old_connections()
+            with self._cond:
+                ticks = self._pending_ticks.pop(symbol, [])
+            for timestamp, price in ticks:
+                self.loop.tick_buffers.push(symbol, timestamp, price)
+
+            signals = self.loop.evaluate_symbol(symbol, refresh=False)
+            with self._order_lock:
+                result = self.loop.process_symbol(symbol, signals=signals)
+        except Exception as e:
+            logger.exception(f"Error evaluando {symbol} por tick: {e}")
+            result = {'status': 'error', 'error': str(e)}
+
+        if self.on_result:
+            try:
+                self.on_result(symbol, result)
+            except Exception as e:
+                logger.error(f"Error en callback de resultado para {symbol}: {e}")
+
+        close_old_connections()
+        with self._cond:
+            self.evaluations += 1
+            status = (result or {}).get('status', 'skipped')
+            if status in self._counts:
+                self._counts[status] += 1
+            self._in_flight.discard(symbol)
+            if self._pending_ticks.get(symbol) and self._running:
+                self._schedule_locked(symbol)
+            self._cond.notify_all()
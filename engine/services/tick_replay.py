@@ -0,0 +1,332 @@
+"""
+Backtest por replay de ticks de las estrategias del TickTradingLoop
+Evalúa ticks grabados con las mismas cuatro estrategias (señales precalculadas sobre
+la serie en `replay_signals`, o `analyze_symbol` con fuente inyectada, sin ORM),
+elige la señal con las mismas reglas que `process_symbol` y liquida cada entrada
+como opción binaria Rise/Fall al vencimiento.
+"""
+
+from __future__ import annotations
+import bisect
+import contextlib
+import heapq
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from engine.services.adaptive_filter_manager import AdaptiveFilterManager, AdaptiveParameters
+from engine.services.replay_signals import signal_evaluators
+from engine.services.tick_trading_loop import (
+    build_strategy_stack, contract_duration, select_signal, should_enter_signal
+)
+
+
+class ReplayBuffer:
+    """
+    Vista de un símbolo hasta el cursor de replay, con la interfaz de
+    SymbolTickBuffer que usan las estrategias (lecturas sin copia)
+    """
+
+    def __init__(self, symbol: str, epochs: np.ndarray, prices: np.ndarray):
+        self.symbol = symbol
+        self._epochs = np.asarray(epochs, dtype=np.float64)
+        self._prices = np.asarray(prices, dtype=np.float64)
+        # Ticks visibles (= total agregado, para StreamingIndicatorStore)
+        self.appended = 0
+
+    def __len__(self) -> int:
+        return self.appended
+
+    def prices(self, limit: Optional[int] = None) -> np.ndarray:
+        start = 0 if limit is None else max(0, self.appended - int(limit))
+        return self._prices[start:self.appended]
+
+    def epochs(self, limit: Optional[int] = None) -> np.ndarray:
+        start = 0 if limit is None else max(0, self.appended - int(limit))
+        return self._epochs[start:self.appended]
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        if not self.appended:
+            return None
+        i = self.appended - 1
+        return float(self._epochs[i]), float(self._prices[i])
+
+
+class ReplayTickSource:
+    """Sustituto de TickBufferStore para el replay: nunca consulta la BD"""
+
+    def __init__(self):
+        self._buffers: Dict[str, ReplayBuffer] = {}
+
+    def load(self, symbol: str, epochs: np.ndarray, prices: np.ndarray) -> ReplayBuffer:
+        buffer = ReplayBuffer(symbol, epochs, prices)
+        self._buffers[symbol] = buffer
+        return buffer
+
+    def get_buffer(self, symbol: str) -> ReplayBuffer:
+        return self._buffers[symbol]
+
+    def get_prices(self, symbol: str, limit: int) -> np.ndarray:
+        return self._buffers[symbol].prices(limit)
+
+    def get_epochs(self, symbol: str, limit: int) -> np.ndarray:
+        return self._buffers[symbol].epochs(limit)
+
+    def latest_price(self, symbol: str) -> Optional[float]:
+        latest = self._buffers[symbol].latest()
+        return latest[1] if latest else None
+
+    def refresh(self, symbol: str) -> int:
+        return 0
+
+
+class StoredTickData:
+    """Fuente de ticks desde la BD (archivo TickChunk + tabla caliente) con la interfaz `read`"""
+
+    def read(self, symbol: str, since=None, until=None) -> Tuple[np.ndarray, np.ndarray]:
+        from engine.services.tick_retention import load_ticks
+        return load_ticks(symbol, since or datetime.fromtimestamp(0, tz=dt_timezone.utc), until)
+
+
+# Prefijos de `ReplayConfig.params`: claves de build_strategy_stack + gestor adaptativo
+PARAM_GROUPS = ('primary', 'secondary', 'ticks', 'reversal', 'adaptive')
+
+
+@dataclass
+class ReplayConfig:
+    """Parámetros de simulación"""
+    stake: float = 1.0
+    payout: float = 0.95  # Ganancia neta por unidad apostada si el contrato gana
+    initial_balance: float = 100.0  # Balance simulado (drawdown del gestor adaptativo)
+    min_interval_seconds: float = 30.0  # Intervalo por símbolo con prioridad neutra (0.5)
+    warmup_ticks: int = 200  # Ventana más larga de las estrategias
+    use_statistical: bool = True
+    # Señales precalculadas con numpy sobre toda la serie (False = analyze_symbol tick a tick)
+    vectorized: bool = True
+    # Argumentos de constructor con prefijo de grupo, p.ej. {'reversal.fatigue_threshold': 4,
+    # 'adaptive.base_z_score_threshold': 2.2}
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def grouped_params(self) -> Dict[str, Dict[str, Any]]:
+        groups: Dict[str, Dict[str, Any]] = {}
+        for key, value in self.params.items():
+            group, _, name = key.partition('.')
+            if group not in PARAM_GROUPS or not name:
+                raise ValueError(f"Parámetro inválido '{key}' (prefijos válidos: {', '.join(PARAM_GROUPS)})")
+            groups.setdefault(group, {})[name] = value
+        return groups
+
+
+@dataclass
+class StrategyStats:
+    trades: int = 0
+    wins: int = 0
+    pnl: float = 0.0
+
+    @property
+    def losses(self) -> int:
+        return self.trades - self.wins
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.trades if self.trades else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trades': self.trades,
+            'wins': self.wins,
+            'losses': self.losses,
+            'win_rate': round(self.win_rate, 4),
+            'pnl': round(self.pnl, 2),
+        }
+
+
+@dataclass
+class ReplayResult:
+    ticks: int = 0  # Ticks evaluados (los del intervalo entre entradas no se evalúan)
+    elapsed_seconds: float = 0.0
+    unsettled: int = 0  # Entradas cuyo vencimiento cae fuera de los datos
+    by_strategy: Dict[str, StrategyStats] = field(default_factory=dict)
+
+    def record(self, origin: str, won: bool, pnl: float) -> None:
+        stats = self.by_strategy.setdefault(origin, StrategyStats())
+        stats.trades += 1
+        stats.wins += int(won)
+        stats.pnl += pnl
+
+    def merge(self, other: 'ReplayResult') -> None:
+        self.ticks += other.ticks
+        self.elapsed_seconds += other.elapsed_seconds
+        self.unsettled += other.unsettled
+        for origin, stats in other.by_strategy.items():
+            total = self.by_strategy.setdefault(origin, StrategyStats())
+            total.trades += stats.trades
+            total.wins += stats.wins
+            total.pnl += stats.pnl
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = StrategyStats()
+        for stats in self.by_strategy.values():
+            total.trades += stats.trades
+            total.wins += stats.wins
+            total.pnl += stats.pnl
+        return {
+            'ticks': self.ticks,
+            'elapsed_seconds': round(self.elapsed_seconds, 3),
+            'ticks_per_minute': int(self.ticks / self.elapsed_seconds * 60) if self.elapsed_seconds else 0,
+            'unsettled': self.unsettled,
+            'total': total.to_dict(),
+            'by_strategy': {origin: stats.to_dict() for origin, stats in sorted(self.by_strategy.items())},
+        }
+
+
+class _NullWriter:
+    """Destino de los print de diagnóstico de las estrategias durante el replay"""
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def settle_binary(direction: str, entry_price: float, exit_price: float) -> bool:
+    """Rise/Fall: CALL gana si el precio de salida es mayor, PUT si es menor (empate pierde)"""
+    if direction == 'CALL':
+        return exit_price > entry_price
+    return exit_price < entry_price
+
+
+class _SimulatedAccount:
+    """Resultados y balance simulados que alimentan al AdaptiveFilterManager del replay"""
+
+    def __init__(self, manager: AdaptiveFilterManager, initial_balance: float):
+        self.manager = manager
+        self.balance = Decimal(str(initial_balance))
+        self.outcomes: Deque[str] = deque(maxlen=max(manager.win_rate_global_lookback, 20))
+        self.total = 0
+        # Vencimientos pendientes (epoch, won, pnl): el resultado se conoce al expirar
+        self.pending: List[Tuple[float, bool, float]] = []
+
+    def open(self, expiry: float, won: bool, pnl: float) -> None:
+        heapq.heappush(self.pending, (expiry, won, pnl))
+
+    def settle_until(self, now: float) -> bool:
+        """Aplicar los contratos vencidos; True si cambió algún resultado"""
+        changed = False
+        while self.pending and self.pending[0][0] <= now:
+            _, won, pnl = heapq.heappop(self.pending)
+            self.outcomes.appendleft('won' if won else 'lost')
+            self.balance += Decimal(str(pnl))
+            self.total += 1
+            changed = True
+        return changed
+
+    def parameters(self) -> AdaptiveParameters:
+        metrics = self.manager.metrics_from_outcomes(list(self.outcomes), self.total, self.total, self.balance)
+        return self.manager.adjust_parameters(metrics)
+
+
+class TickReplayBacktester:
+    """
+    Replay tick a tick de un símbolo con las cuatro estrategias del loop
+
+    El AdaptiveFilterManager se simula con los resultados del propio replay (como
+    en vivo, fija z-score/momentum/confianza de la estrategia principal). Los filtros
+    que dependen de la cuenta real (capital manager, protección de riesgo, filtro
+    de símbolos por win rate) no se simulan.
+    """
+
+    def __init__(self, config: Optional[ReplayConfig] = None, quiet: bool = True):
+        self.config = config or ReplayConfig()
+        self.quiet = quiet
+        self.tick_source = ReplayTickSource()
+        groups = self.config.grouped_params()
+        self.adaptive_kwargs = groups.pop('adaptive', {})
+        self.strategies = build_strategy_stack(self.tick_source, self.config.use_statistical, overrides=groups)
+        # El filtro por win rate histórico consulta OrderAudit: fuera del replay
+        if hasattr(self.strategies['primary'], 'enable_symbol_filtering'):
+            self.strategies['primary'].enable_symbol_filtering = False
+
+    def run_symbol(self, symbol: str, epochs: np.ndarray, prices: np.ndarray) -> ReplayResult:
+        """Recorrer los ticks de un símbolo (ordenados por tiempo) y liquidar las entradas"""
+        config = self.config
+        result = ReplayResult()
+        buffer = self.tick_source.load(symbol, epochs, prices)
+        epochs = buffer._epochs
+        prices = buffer._prices
+        n = len(prices)
+        primary = self.strategies['primary']
+        if config.vectorized:
+            evaluators = signal_evaluators(self.strategies, symbol, prices)
+        else:
+            evaluators = [(name, lambda i, analyze=strategy.analyze_symbol: analyze(symbol))
+                          for name, strategy in self.strategies.items()]
+        epoch_list = epochs.tolist()
+        last_epoch = epoch_list[-1] if n else 0.0
+        next_allowed = -np.inf
+        started = time.perf_counter()
+
+        with contextlib.redirect_stdout(_NullWriter()) if self.quiet else contextlib.nullcontext():
+            account = _SimulatedAccount(AdaptiveFilterManager(**self.adaptive_kwargs), config.initial_balance)
+            adaptive_stale = True
+            for i in range(min(config.warmup_ticks, n), n):
+                now = epoch_list[i]
+                if now < next_allowed:
+                    # Igual que el loop: sin evaluar dentro del intervalo del símbolo
+                    continue
+                buffer.appended = i + 1
+                result.ticks += 1
+                if account.settle_until(now) or adaptive_stale:
+                    if hasattr(primary, 'update_adaptive_parameters'):
+                        primary.update_adaptive_parameters(account.parameters())
+                    adaptive_stale = False
+                signals = {name: evaluate(i) for name, evaluate in evaluators}
+                signal, origin = select_signal(signals)
+                if signal is None or not should_enter_signal(primary, signal, origin):
+                    continue
+                direction = getattr(signal, 'direction', None)
+                if direction not in ('CALL', 'PUT'):
+                    continue
+
+                duration = contract_duration(symbol, float(getattr(signal, 'atr_ratio', 0.0) or 0.0))
+                next_allowed = now + config.min_interval_seconds
+                if last_epoch < now + duration:
+                    result.unsettled += 1
+                    continue
+                # Precio de salida: último tick al vencimiento
+                exit_index = bisect.bisect_right(epoch_list, now + duration) - 1
+                won = settle_binary(direction, prices[i], prices[exit_index])
+                pnl = config.stake * config.payout if won else -config.stake
+                result.record(origin, won, pnl)
+                account.open(now + duration, won, pnl)
+
+        for strategy in self.strategies.values():
+            if getattr(strategy, 'indicators', None) is not None:
+                strategy.indicators.clear(symbol)
+        result.elapsed_seconds = time.perf_counter() - started
+        return result
+
+    def run(self, source, symbols: Iterable[str], since: Union[datetime, float, None] = None,
+            until: Union[datetime, float, None] = None) -> ReplayResult:
+        """
+        Replay de varios símbolos desde una fuente con `read(symbol, since, until)`
+        (TickArchiveReader, StoredTickData o equivalente)
+        """
+        total = ReplayResult()
+        for symbol in symbols:
+            epochs, prices = source.read(symbol, since, until)
+            if len(prices):
+                total.merge(self.run_symbol(symbol, epochs, prices))
+        return total
+
+
+def run_tick_replay(source, symbols: List[str], since=None, until=None,
+                    config: Optional[ReplayConfig] = None) -> Dict[str, Any]:
+    """Atajo: backtest de replay y reporte por strategy_origin"""
+    return TickReplayBacktester(config).run(source, symbols, since, until).to_dict()
@@ -0,0 +1,193 @@
+"""
+Retención y compactación de ticks
+La tabla `Tick` solo guarda la ventana caliente que leen las estrategias; los ticks
+más antiguos se archivan en bloques float64 por símbolo y día (`TickChunk`), se
+resumen en velas de 1 minuto (`Candle`) y se borran de `Tick`. Los bloques más
+viejos que la retención del archivo se eliminan (las velas se conservan).
+"""
+
+from __future__ import annotations
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from market.models import Candle, Tick, TickChunk, Timeframe
+
+logger = logging.getLogger(__name__)
+
+TICK_DTYPE = np.dtype('<f8')
+ROLLUP_SECONDS = 60  # Candle de 1 minuto
+
+
+@dataclass
+class TickRetentionPolicy:
+    """Ventanas de retención (configurables por entorno)"""
+    hot_hours: float = field(default_factory=lambda: float(os.getenv('TICK_HOT_RETENTION_HOURS', '24')))
+    archive_days: int = field(default_factory=lambda: int(os.getenv('TICK_ARCHIVE_RETENTION_DAYS', '30')))
+
+    def hot_cutoff(self, now: Optional[datetime] = None) -> datetime:
+        """Inicio de la ventana caliente, alineado al minuto (una vela nunca queda partida)"""
+        now = now or timezone.now()
+        cutoff = now - timedelta(hours=self.hot_hours)
+        return cutoff.replace(second=0, microsecond=0)
+
+    def archive_cutoff(self, now: Optional[datetime] = None) -> date:
+        now = now or timezone.now()
+        return (now - timedelta(days=self.archive_days)).astimezone(dt_timezone.utc).date()
+
+
+def pack_ticks(epochs: np.ndarray, prices: np.ndarray) -> bytes:
+    """Serializar ticks como pares (epoch, precio) float64"""
+    return np.column_stack([epochs, prices]).astype(TICK_DTYPE, copy=False).tobytes()
+
+
+def unpack_ticks(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Inverso de `pack_ticks`: (epochs, prices)"""
+    pairs = np.frombuffer(bytes(data), dtype=TICK_DTYPE).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def _to_datetime(epoch: float) -> datetime:
+    return datetime.fromtimestamp(float(epoch), tz=dt_timezone.utc)
+
+
+def rollup_candles(symbol: str, epochs: np.ndarray, prices: np.ndarray) -> int:
+    """
+    Escribir velas de 1 minuto (OHLC, volumen = número de ticks) desde ticks ordenados.
+    Las velas existentes de esos minutos se reemplazan.
+
+    Returns:
+        Velas escritas
+    """
+    if len(epochs) == 0:
+        return 0
+    minutes = (epochs // ROLLUP_SECONDS).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, minutes[1:] != minutes[:-1]])
+    ends = np.r_[starts[1:], len(prices)] - 1
+    highs = np.maximum.reduceat(prices, starts)
+    lows = np.minimum.reduceat(prices, starts)
+    candles = [
+        Candle(
+            symbol=symbol,
+            timeframe=Timeframe.M1,
+            timestamp=_to_datetime(minutes[s] * ROLLUP_SECONDS),
+            open=Decimal(str(prices[s])),
+            high=Decimal(str(high)),
+            low=Decimal(str(low)),
+            close=Decimal(str(prices[e])),
+            volume=Decimal(int(e - s + 1)),
+        )
+        for s, e, high, low in zip(starts, ends, highs, lows)
+    ]
+    Candle.objects.bulk_create(
+        candles,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['symbol', 'timeframe', 'timestamp'],
+        update_fields=['open', 'high', 'low', 'close', 'volume'],
+    )
+    return len(candles)
+
+
+def _archive_day(symbol: str, day: date, epochs: np.ndarray, prices: np.ndarray) -> None:
+    """Fusionar ticks nuevos en el bloque del día y recalcular las velas de sus minutos"""
+    chunk = TickChunk.objects.select_for_update().filter(symbol=symbol, day=day).first()
+    if chunk is not None:
+        old_epochs, old_prices = unpack_ticks(chunk.data)
+        all_epochs = np.concatenate([old_epochs, epochs])
+        all_prices = np.concatenate([old_prices, prices])
+        # Orden temporal y un tick por epoch (prevalece el ya archivado)
+        all_epochs, first = np.unique(all_epochs, return_index=True)
+        all_prices = all_prices[first]
+    else:
+        chunk = TickChunk(symbol=symbol, day=day)
+        all_epochs, all_prices = epochs, prices
+
+    chunk.count = len(all_epochs)
+    chunk.first_timestamp = _to_datetime(all_epochs[0])
+    chunk.last_timestamp = _to_datetime(all_epochs[-1])
+    chunk.data = pack_ticks(all_epochs, all_prices)
+    chunk.save()
+
+    # Un tick tardío de un minuto ya resumido rehace esa vela con todos sus ticks
+    touched = np.isin(all_epochs // ROLLUP_SECONDS, np.unique(epochs // ROLLUP_SECONDS))
+    rollup_candles(symbol, all_epochs[touched], all_prices[touched])
+
+
+def compact_ticks(policy: Optional[TickRetentionPolicy] = None, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Mover los ticks fuera de la ventana caliente al archivo y purgar el archivo vencido
+
+    Returns:
+        Estadísticas: archived (ticks movidos), chunks (bloques tocados), purged (bloques borrados)
+    """
+    policy = policy or TickRetentionPolicy()
+    cutoff = policy.hot_cutoff(now)
+    stats = {'archived': 0, 'chunks': 0, 'purged': 0}
+
+    symbols = list(Tick.objects.filter(timestamp__lt=cutoff).values_list('symbol', flat=True).distinct())
+    for symbol in symbols:
+        # Un día UTC por transacción: acota memoria y el tamaño de cada borrado
+        while True:
+            first = Tick.objects.filter(symbol=symbol, timestamp__lt=cutoff).order_by('timestamp').values_list(
+                'timestamp', flat=True).first()
+            if first is None:
+                break
+            day_start = first.astimezone(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+            day_end = min(day_start + timedelta(days=1), cutoff)
+            with transaction.atomic():
+                window = Tick.objects.filter(symbol=symbol, timestamp__gte=day_start, timestamp__lt=day_end)
+                ticks = list(window.order_by('timestamp').values_list('timestamp', 'price'))
+                epochs = np.fromiter((ts.timestamp() for ts, _ in ticks), dtype=np.float64, count=len(ticks))
+                prices = np.fromiter((float(price) for _, price in ticks), dtype=np.float64, count=len(ticks))
+                _archive_day(symbol, day_start.date(), epochs, prices)
+                window.delete()
+            stats['archived'] += len(ticks)
+            stats['chunks'] += 1
+
+    stats['purged'], _ = TickChunk.objects.filter(day__lt=policy.archive_cutoff(now)).delete()
+    if stats['archived'] or stats['purged']:
+        logger.info(f"Compactación de ticks: {stats}")
+    return stats
+
+
+def load_ticks(symbol: str, since: datetime, until: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ticks de [since, until) uniendo archivo y tabla caliente
+
+    Returns:
+        (epochs, prices) float64 ordenados por tiempo
+    """
+    until = until or timezone.now()
+    lo, hi = since.timestamp(), until.timestamp()
+    epochs_parts, price_parts = [], []
+    chunks = TickChunk.objects.filter(
+        symbol=symbol,
+        day__gte=since.astimezone(dt_timezone.utc).date(),
+        day__lte=until.astimezone(dt_timezone.utc).date(),
+    ).order_by('day').values_list('data', flat=True)
+    for data in chunks:
+        epochs, prices = unpack_ticks(data)
+        mask = (epochs >= lo) & (epochs < hi)
+        epochs_parts.append(epochs[mask])
+        price_parts.append(prices[mask])
+
+    hot = list(Tick.objects.filter(symbol=symbol, timestamp__gte=since, timestamp__lt=until)
+               .order_by('timestamp').values_list('timestamp', 'price'))
+    if hot:
+        epochs_parts.append(np.array([ts.timestamp() for ts, _ in hot], dtype=np.float64))
+        price_parts.append(np.array([float(price) for _, price in hot], dtype=np.float64))
+
+    if not epochs_parts:
+        return np.empty(0), np.empty(0)
+    epochs = np.concatenate(epochs_parts)
+    prices = np.concatenate(price_parts)
+    order = np.argsort(epochs, kind='stable')
+    return epochs[order], prices[order]
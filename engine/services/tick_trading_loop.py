@@ -4,14 +4,12 @@ Con integración completa de gestión avanzada de capital y protección de riesg
 """
 
 from __future__ import annotations
-import json
 import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from datetime import timedelta
 from decimal import Decimal
 
 from django.utils import timezone
-from market.models import Tick
 
 from engine.services.tick_based_strategy import TickBasedStrategy, TrendSignal
 from engine.services.statistical_strategy import StatisticalStrategy, StatisticalSignal
@@ -21,50 +19,188 @@ from engine.services.execution_gateway import place_order_through_gateway
 from engine.services.advanced_capital_manager import AdvancedCapitalManager
 from engine.services.risk_protection import RiskProtectionSystem
 from engine.services.adaptive_filter_manager import AdaptiveFilterManager
+from engine.services.tick_buffer import TickBufferStore
+from engine.services.balance_service import get_balance_service
+from engine.services.contract_settlement import track_trade
+from engine.services.decision_journal import get_decision_journal, record_decision, snapshot_signal
+from monitoring.metrics import QueryTimer, record_stage, record_strategy_time, record_tick_age, stage_timer
 from monitoring.models import OrderAudit
-from connectors.deriv_client import DerivClient
+from connectors.deriv_client import get_deriv_client
 
 
-class TickTradingLoop:
-    """Bucle de trading basado en ticks con gestión avanzada de capital y protección de riesgo"""
-    
-    def __init__(self, use_statistical=True):
-        # NUEVA ESTRATEGIA ESTADÍSTICA HÍBRIDA
-        if use_statistical:
-            self.strategy = StatisticalStrategy(
-                ticks_to_analyze=50,
-                lookback_periods=20,  # Calcular media/desviación de últimos 20 ticks
-                z_score_threshold=2.0,  # 2 desviaciones estándar para reversión
-                momentum_threshold=0.02  # 0.02% para confirmar momentum
-            )
-        else:
-            # Estrategia antigua (tick-based)
-            self.strategy = TickBasedStrategy(
-                ticks_to_analyze=50,
-                trend_threshold_pct=60.0,
-                force_threshold_pct=0.0008
-            )
-        
-        # Seguimiento de últimas entradas para evitar spam
-        self.last_trade_time = {}
-        self.min_trade_interval = timedelta(seconds=60)  # Mínimo 60 segundos entre entradas del mismo símbolo
-        self.use_statistical = use_statistical
-        # Segunda estrategia (EMA + extremos) configurada a EMA100 como solicitaste
-        self.strategy_ema = EMA200ExtremaStrategy(lookback_ticks=200, extrema_window=60, ema_period=100)
+# Confianza mínima por estrategia cuando la principal no valida la señal
+MIN_CONFIDENCE_BY_ORIGIN = {
+    'momentum_reversal': 0.50,  # La estrategia de reversión ya filtra en analyze_symbol
+    'ema200_extrema': 0.60,
+    'tick_based': 0.40,  # Más laxo para ticks
+}
+
+
+def select_signal(signals: Dict[str, Any]) -> Tuple[Optional[Any], str]:
+    """
+    Elegir la mejor señal por confianza entre las cuatro estrategias
+
+    Args:
+        signals: Resultado de `evaluate_symbol` (primary/secondary/ticks/reversal)
+
+    Returns:
+        (señal, strategy_origin); la señal elegida queda marcada con `strategy_origin`
+    """
+    signal = None
+    strategy_origin = 'unknown'
+    signal_primary = signals.get('primary')
+    signal_secondary = signals.get('secondary')
+    signal_ticks = signals.get('ticks')
+    signal_reversal = signals.get('reversal')
+
+    if signal_primary and hasattr(signal_primary, 'confidence'):
+        signal = signal_primary
+        strategy_origin = 'statistical_hybrid'
+
+    if signal_secondary and hasattr(signal_secondary, 'confidence'):
+        if (signal is None) or (getattr(signal_secondary, 'confidence', 0) > getattr(signal, 'confidence', 0)):
+            signal = signal_secondary
+            strategy_origin = 'ema200_extrema'
+
+    # Integrar señal Tick-Based usando proxy de confianza
+    if signal_ticks and hasattr(signal_ticks, 'force_pct'):
+        try:
+            proxy_conf = max(0.0, min(1.0, float(signal_ticks.force_pct) / 100.0))
+        except Exception:
+            proxy_conf = 0.0
+        setattr(signal_ticks, 'confidence', proxy_conf)
+        if (signal is None) or (proxy_conf > getattr(signal, 'confidence', 0)):
+            signal = signal_ticks
+            strategy_origin = 'tick_based'
+
+    # Integrar señal de Reversión (cuarta estrategia)
+    if signal_reversal and hasattr(signal_reversal, 'confidence'):
+        if (signal is None) or (getattr(signal_reversal, 'confidence', 0) > getattr(signal, 'confidence', 0)):
+            signal = signal_reversal
+            strategy_origin = 'momentum_reversal'
+
+    # Marcar origen de estrategia seleccionado (para trazabilidad)
+    if signal is not None:
+        setattr(signal, 'strategy_origin', strategy_origin)
+    return signal, strategy_origin
+
+
+def should_enter_signal(strategy, signal, strategy_origin: str, relax_lvl: int = 0) -> bool:
+    """Validar la entrada con la estrategia principal y, si no, por confianza mínima según origen"""
+    if hasattr(strategy, 'should_enter_trade'):
+        try:
+            if strategy.should_enter_trade(signal):
+                return True
+        except Exception:
+            # Si la estrategia no puede validar, usar validación genérica
+            pass
+
+    if not hasattr(signal, 'confidence'):
+        return False
+    min_confidence = MIN_CONFIDENCE_BY_ORIGIN.get(strategy_origin, 0.50)
+    if relax_lvl > 0:
+        min_confidence = max(0.35, min_confidence - 0.05 * relax_lvl)
+    return signal.confidence >= min_confidence
+
+
+def contract_duration(symbol: str, atr_ratio: float) -> int:
+    """
+    Duración del contrato en segundos: base por clase de activo + factor por
+    volatilidad (ATR ratio), redondeada al bucket permitido más cercano
+    """
+    if symbol.startswith('frx'):
+        # Forex: usar 1 minuto (60 segundos) para opciones binarias
+        base = 60
+        atr_baseline = 0.0006
+        allowed = [60]  # 1 minuto para forex en binarias
+    else:
+        # Símbolos sintéticos y otros: usar 30 segundos
+        base = 30
+        atr_baseline = 0.0030
+        allowed = [30, 60, 120, 180, 300, 600, 900]
+
+    factor = 1.0
+    if atr_baseline > 0:
+        factor = max(0.5, min(2.0, (atr_ratio / atr_baseline) if atr_ratio > 0 else 1.0))
+    raw_duration = int(round(base * factor))
+    return min(allowed, key=lambda d: abs(d - raw_duration))
+
+
+def build_strategy_stack(tick_source, use_statistical: bool = True,
+                         overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Las cuatro estrategias del loop con su configuración, leyendo de `tick_source`
+
+    Args:
+        overrides: Argumentos de constructor a sustituir por estrategia, p.ej.
+                   {'reversal': {'fatigue_threshold': 4}} (backtests y barridos)
+
+    Returns:
+        {'primary', 'secondary', 'ticks', 'reversal'} (las claves de `evaluate_symbol`)
+    """
+    overrides = overrides or {}
+    # NUEVA ESTRATEGIA ESTADÍSTICA HÍBRIDA
+    if use_statistical:
+        primary_cls, primary_kwargs = StatisticalStrategy, dict(
+            ticks_to_analyze=50,
+            lookback_periods=20,  # Calcular media/desviación de últimos 20 ticks
+            z_score_threshold=2.0,  # 2 desviaciones estándar para reversión
+            momentum_threshold=0.02,  # 0.02% para confirmar momentum
+        )
+    else:
+        # Estrategia antigua (tick-based)
+        primary_cls, primary_kwargs = TickBasedStrategy, dict(
+            ticks_to_analyze=50,
+            trend_threshold_pct=60.0,
+            force_threshold_pct=0.0008,
+        )
+    stack = {
+        'primary': (primary_cls, primary_kwargs),
+        # Segunda estrategia (EMA + extremos) configurada a EMA100
+        'secondary': (EMA200ExtremaStrategy, dict(lookback_ticks=200, extrema_window=60, ema_period=100)),
         # Tercera estrategia (Tick-Based) para comparar y medir
-        self.strategy_ticks = TickBasedStrategy(
+        'ticks': (TickBasedStrategy, dict(
             ticks_to_analyze=40,
             trend_threshold_pct=55.0,      # más laxo
-            force_threshold_pct=0.0006     # más laxo
-        )
+            force_threshold_pct=0.0006,    # más laxo
+        )),
         # Cuarta estrategia (Reversión por Fatiga y Ruptura)
-        self.strategy_reversal = MomentumReversalStrategy(
+        'reversal': (MomentumReversalStrategy, dict(
             fatigue_threshold=5,
             momentum_extreme_threshold=0.05,
             consolidation_breakout_atr_ratio=2.0,
             short_timeframe=15,
-            long_timeframe=60
-        )
+            long_timeframe=60,
+        )),
+    }
+    unknown = set(overrides) - set(stack)
+    if unknown:
+        raise ValueError(f"Estrategias desconocidas: {sorted(unknown)}")
+    return {
+        name: cls(**{**kwargs, **overrides.get(name, {}), 'tick_source': tick_source})
+        for name, (cls, kwargs) in stack.items()
+    }
+
+
+class TickTradingLoop:
+    """Bucle de trading basado en ticks con gestión avanzada de capital y protección de riesgo"""
+    
+    def __init__(self, use_statistical=True):
+        # Buffer de ticks en memoria compartido por las cuatro estrategias:
+        # se refresca una vez por símbolo en cada pasada (solo ticks nuevos)
+        self.tick_buffers = TickBufferStore(capacity=1024)
+
+        # Estrategia principal (estadística híbrida o tick-based) + tres complementarias
+        strategies = build_strategy_stack(self.tick_buffers, use_statistical)
+        self.strategy = strategies['primary']
+        self.strategy_ema = strategies['secondary']
+        self.strategy_ticks = strategies['ticks']
+        self.strategy_reversal = strategies['reversal']
+
+        # Seguimiento de últimas entradas para evitar spam
+        self.last_trade_time = {}
+        self.min_trade_interval = timedelta(seconds=60)  # Mínimo 60 segundos entre entradas del mismo símbolo
+        self.use_statistical = use_statistical
         
         # Inicializar sistemas de gestión de capital y protección (se cargarán desde BD al procesar)
         self.capital_manager = None
@@ -72,9 +208,6 @@ class TickTradingLoop:
         self.adaptive_filter_manager = AdaptiveFilterManager()
         self._client = None
         
-        # Cache de balance para evitar rate limiting
-        from engine.services.balance_cache import BalanceCache
-        self._balance_cache = BalanceCache(ttl_seconds=10)
         # Prioridades por símbolo (0..1) inyectadas por el loop
         self.symbol_priorities: Dict[str, float] = {}
         # Flag de modo recuperación (priorizar alta confianza y reducir tamaño)
@@ -121,13 +254,10 @@ class TickTradingLoop:
     def _estimate_symbol_score_from_ticks(self, symbol: str) -> float:
         """Calcular un score heurístico basado en ticks recientes cuando no hay trades."""
         try:
-            recent_ticks = list(
-                Tick.objects.filter(symbol=symbol).order_by('-timestamp')[:80]
-            )
-            if len(recent_ticks) < 20:
+            prices = self.tick_buffers.get_prices(symbol, 80).tolist()
+            if len(prices) < 20:
                 return 0.5
 
-            prices = [float(t.price) for t in reversed(recent_ticks)]
             if len(prices) < 2:
                 return 0.5
 
@@ -161,20 +291,8 @@ class TickTradingLoop:
             
             # Obtener balance actual (con cache)
             if not self._client:
-                # Intentar obtener configuración del usuario
-                try:
-                    from trading_bot.models import DerivAPIConfig
-                    api_config = DerivAPIConfig.objects.filter(is_active=True).only('api_token', 'is_demo', 'app_id').first()
-                    if api_config:
-                        self._client = DerivClient(
-                            api_token=api_config.api_token,
-                            is_demo=api_config.is_demo,
-                            app_id=api_config.app_id
-                        )
-                    else:
-                        self._client = DerivClient()
-                except Exception:
-                    self._client = DerivClient()
+                # Cliente compartido con place_binary_option (configuración activa del usuario)
+                self._client = get_deriv_client()
             try:
                 balance_info = self._client.get_balance()
                 if isinstance(balance_info, dict):
@@ -240,18 +358,92 @@ class TickTradingLoop:
             traceback.print_exc()
             return False
     
-    def process_symbol(self, symbol: str) -> Optional[Dict[str, Any]]:
+    def evaluate_symbol(self, symbol: str, refresh: bool = True) -> Dict[str, Any]:
+        """
+        Fase de evaluación (sin efectos sobre capital ni órdenes): refrescar el buffer
+        del símbolo y correr las cuatro estrategias.
+
+        No toca estado compartido del loop, así que puede ejecutarse en paralelo para
+        varios símbolos; el resultado se pasa luego a `process_symbol(symbol, signals)`.
+        La estrategia principal usa los umbrales adaptativos fijados en la última
+        pasada serializada.
+        """
+        if refresh:
+            with stage_timer('tick_refresh', symbol):
+                self.tick_buffers.refresh(symbol)
+        latest = self.tick_buffers.get_buffer(symbol).latest()
+        if latest is not None:
+            record_tick_age(symbol, time.time() - latest[0])
+
+        signals = {}
+        for name, strategy in (('primary', self.strategy), ('secondary', self.strategy_ema),
+                               ('ticks', self.strategy_ticks), ('reversal', self.strategy_reversal)):
+            start = time.perf_counter()
+            signals[name] = strategy.analyze_symbol(symbol)
+            record_strategy_time(type(strategy).__name__, symbol, time.perf_counter() - start)
+        return signals
+
+    def process_symbol(self, symbol: str, signals: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
         Procesar símbolo y ejecutar operación si hay señal
         CON PROTECCIÓN AVANZADA DE RIESGO INTEGRADA
         
         Args:
             symbol: Símbolo a procesar
+            signals: Señales ya calculadas con `evaluate_symbol` (modo concurrente).
+                     Si es None se evalúa aquí mismo (modo secuencial).
             
         Returns:
             Diccionario con resultado de la operación
         """
+        trace: Dict[str, Any] = {'signals': signals}
+        start = time.perf_counter()
+        with QueryTimer(symbol):
+            result = self._process_symbol(symbol, signals, trace)
+        end = time.perf_counter()
+        # Chequeos de riesgo de evaluaciones que no llegaron a enviar orden
+        checks_started = trace.pop('checks_started', None)
+        if checks_started is not None:
+            record_stage('risk_checks', symbol, end - checks_started)
+        record_stage('process_symbol', symbol, end - start)
+        self._record_decision(symbol, result, trace)
+        return result
+
+    def _record_decision(self, symbol: str, result: Optional[Dict[str, Any]], trace: Dict[str, Any]) -> None:
+        """Dejar la evaluación en la bitácora de decisiones (solo copia; serializa otro hilo)"""
+        if get_decision_journal() is None:
+            return
+        signals = trace.get('signals') or {}
+        result = result or {}
+        record_decision({
+            'symbol': symbol,
+            'status': result.get('status'),
+            'reason': result.get('reason'),
+            'origin': trace.get('origin'),
+            'signals': {name: snapshot_signal(signal) for name, signal in signals.items()},
+            'adaptive': snapshot_signal(trace.get('adaptive')),
+            'relaxation_level': self.relaxation_level,
+            'result': {key: value for key, value in result.items() if key not in ('status', 'reason')},
+        })
+
+    def _process_symbol(self, symbol: str, signals: Optional[Dict[str, Any]],
+                        trace: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Cuerpo de `process_symbol`; deja en `trace` señales, origen y parámetros adaptativos"""
         try:
+            if signals is None:
+                # Traer solo los ticks nuevos del símbolo; las estrategias leen del buffer
+                with stage_timer('tick_refresh', symbol):
+                    self.tick_buffers.refresh(symbol)
+            latest_tick = self.tick_buffers.get_buffer(symbol).latest()
+            trace['tick_epoch'] = latest_tick[0] if latest_tick else None
+            if signals is not None and not any(signals.values()):
+                # Evaluado en paralelo sin ninguna señal: no hace falta la fase serializada
+                return {
+                    'status': 'skipped',
+                    'reason': 'no_clear_trend',
+                    'message': f'Símbolo {symbol} sin señal clara, omitido'
+                }
+
             # Inicializar sistemas de capital si no están inicializados
             if not self.capital_manager or not self.risk_protection:
                 if not self._initialize_capital_systems():
@@ -262,23 +454,12 @@ class TickTradingLoop:
             
             # Obtener balance actual (obtener dict completo para account_type)
             if not self._client:
-                # Intentar obtener configuración del usuario
-                try:
-                    from trading_bot.models import DerivAPIConfig
-                    api_config = DerivAPIConfig.objects.filter(is_active=True).only('api_token', 'is_demo', 'app_id').first()
-                    if api_config:
-                        self._client = DerivClient(
-                            api_token=api_config.api_token,
-                            is_demo=api_config.is_demo,
-                            app_id=api_config.app_id
-                        )
-                    else:
-                        self._client = DerivClient()
-                except Exception:
-                    self._client = DerivClient()
+                # Cliente compartido con place_binary_option (configuración activa del usuario)
+                self._client = get_deriv_client()
             try:
                 # Obtener balance_info completo directamente (no usar cache que solo devuelve Decimal)
-                balance_info = self._client.get_balance()
+                with stage_timer('balance', symbol):
+                    balance_info = self._client.get_balance()
                 # Extraer balance y account_type
                 if isinstance(balance_info, dict):
                     current_balance = Decimal(str(balance_info.get('balance', 0)))
@@ -332,8 +513,12 @@ class TickTradingLoop:
                 # Esto es típico de cuenta demo, pero permitimos operar si el usuario quiere
                 pass  # Por ahora permitimos, pero podríamos rechazar aquí si se desea
             
+            # Desde aquí hasta la orden: chequeos de riesgo y filtros
+            trace['checks_started'] = time.perf_counter()
+
             # 0. SISTEMA ADAPTATIVO: Obtener parámetros ajustados según métricas
             adaptive_params = self.adaptive_filter_manager.get_adjusted_parameters(current_balance)
+            trace['adaptive'] = adaptive_params
 
             # Aplicar relajación global si el loop lleva tiempo sin operar
             relax_lvl = getattr(self, 'relaxation_level', 0)
@@ -372,8 +557,8 @@ class TickTradingLoop:
             symbol_performance = self.adaptive_filter_manager.calculate_symbol_performance(lookback=20)
             
             # Actualizar symbol_priorities con los scores calculados
-            for symbol, perf in symbol_performance.items():
-                self.symbol_priorities[symbol] = perf['score']
+            for perf_symbol, perf in symbol_performance.items():
+                self.symbol_priorities[perf_symbol] = perf['score']
 
             # Fallback: si el símbolo actual no tiene datos (o son muy pocos), estimar por ticks
             symbol_perf_entry = symbol_performance.get(symbol)
@@ -570,45 +755,14 @@ class TickTradingLoop:
                     'next_allowed': (last_trade + sym_interval).isoformat()
                 }
             
-            # Analizar símbolo con todas las estrategias
-            signal_primary = self.strategy.analyze_symbol(symbol)
-            signal_secondary = self.strategy_ema.analyze_symbol(symbol)
-            signal_ticks = self.strategy_ticks.analyze_symbol(symbol)
-            signal_reversal = self.strategy_reversal.analyze_symbol(symbol)
+            # Analizar símbolo con todas las estrategias (o usar la evaluación concurrente)
+            if signals is None:
+                signals = self.evaluate_symbol(symbol, refresh=False)
+                trace['signals'] = signals
             
-            # Elegir la mejor por confianza si todas existen; si solo una existe, usar esa
-            signal = None
-            strategy_origin = 'unknown'
-            
-            if signal_primary and hasattr(signal_primary, 'confidence'):
-                signal = signal_primary
-                strategy_origin = 'statistical_hybrid'
-            
-            if signal_secondary and hasattr(signal_secondary, 'confidence'):
-                if (signal is None) or (getattr(signal_secondary, 'confidence', 0) > getattr(signal, 'confidence', 0)):
-                    signal = signal_secondary
-                    strategy_origin = 'ema200_extrema'
-            
-            # Integrar señal Tick-Based usando proxy de confianza
-            if signal_ticks and hasattr(signal_ticks, 'force_pct'):
-                try:
-                    proxy_conf = max(0.0, min(1.0, float(signal_ticks.force_pct) / 100.0))
-                except Exception:
-                    proxy_conf = 0.0
-                setattr(signal_ticks, 'confidence', proxy_conf)
-                if (signal is None) or (proxy_conf > getattr(signal, 'confidence', 0)):
-                    signal = signal_ticks
-                    strategy_origin = 'tick_based'
-            
-            # Integrar señal de Reversión (cuarta estrategia)
-            if signal_reversal and hasattr(signal_reversal, 'confidence'):
-                if (signal is None) or (getattr(signal_reversal, 'confidence', 0) > getattr(signal, 'confidence', 0)):
-                    signal = signal_reversal
-                    strategy_origin = 'momentum_reversal'
-            
-            # Marcar origen de estrategia seleccionado (para trazabilidad)
-            if signal is not None:
-                setattr(signal, 'strategy_origin', strategy_origin)
+            # Elegir la mejor por confianza (marca `strategy_origin` en la señal)
+            signal, strategy_origin = select_signal(signals)
+            trace['origin'] = strategy_origin if signal is not None else None
             
             if not signal:
                 # No hay señal - omitir silenciosamente (no registrar)
@@ -622,33 +776,8 @@ class TickTradingLoop:
             if hasattr(signal, 'force_pct') and signal.force_pct > 0:
                 print(f"📡 {symbol}: Señal generada ({signal.direction}), fuerza: {signal.force_pct:.6f}%, confianza: {getattr(signal, 'confidence', 'N/A')}")
             
-            # Verificar si debe entrar (validación genérica basada en confianza)
-            should_enter = False
-            if hasattr(self.strategy, 'should_enter_trade'):
-                try:
-                    should_enter = self.strategy.should_enter_trade(signal)
-                except Exception:
-                    # Si la estrategia no puede validar, usar validación genérica
-                    should_enter = False
-            
-            # Validación genérica para señales con confidence
-            if not should_enter and hasattr(signal, 'confidence'):
-                # Umbral mínimo de confianza (ajustable según estrategia)
-                min_confidence = 0.50  # Base
-                if strategy_origin == 'momentum_reversal':
-                    min_confidence = 0.50  # La estrategia de reversión ya filtra en analyze_symbol
-                elif strategy_origin == 'ema200_extrema':
-                    min_confidence = 0.60
-                elif strategy_origin == 'tick_based':
-                    min_confidence = 0.40  # Más laxo para ticks
-                else:
-                    min_confidence = 0.50
-                
-                if relax_lvl > 0:
-                    min_confidence = max(0.35, min_confidence - 0.05 * relax_lvl)
-
-                if signal.confidence >= min_confidence:
-                    should_enter = True
+            # Verificar si debe entrar (validación de la estrategia principal o por confianza)
+            should_enter = should_enter_signal(self.strategy, signal, strategy_origin, relax_lvl)
             
             if not should_enter:
                 # Insuficiente confianza - mostrar razón para debugging
@@ -730,8 +859,8 @@ class TickTradingLoop:
 
             # 3. CALCULAR TAMAÑO DE POSICIÓN USANDO ADVANCED CAPITAL MANAGER
             # Obtener precio actual y ATR
-            latest_tick = Tick.objects.filter(symbol=symbol).order_by('-timestamp').first()
-            entry_price = Decimal(str(latest_tick.price)) if latest_tick else Decimal('1.0')
+            latest_price = self.tick_buffers.latest_price(symbol)
+            entry_price = Decimal(str(latest_price)) if latest_price is not None else Decimal('1.0')
             atr_value = Decimal(str(getattr(signal, 'atr_ratio', 0.0) * float(entry_price))) if hasattr(signal, 'atr_ratio') else None
             
             # Calcular tamaño óptimo de posición
@@ -819,25 +948,7 @@ class TickTradingLoop:
                 pass
             
             # Obtener parámetros de la operación - DURACIÓN DINÁMICA ADAPTATIVA
-            # Base por clase de activo + factor por volatilidad (ATR ratio)
-            atr_ratio = getattr(signal, 'atr_ratio', 0.0)
-            if symbol.startswith('frx'):
-                # Forex: usar 1 minuto (60 segundos) para opciones binarias
-                base = 60
-                atr_baseline = 0.0006
-                allowed = [60]  # 1 minuto para forex en binarias
-            else:
-                # Símbolos sintéticos y otros: usar 30 segundos
-                base = 30
-                atr_baseline = 0.0030
-                allowed = [30, 60, 120, 180, 300, 600, 900]
-
-            factor = 1.0
-            if atr_baseline > 0:
-                factor = max(0.5, min(2.0, (atr_ratio / atr_baseline) if atr_ratio > 0 else 1.0))
-            raw_duration = int(round(base * factor))
-            # Elegir bucket permitido más cercano
-            duration = min(allowed, key=lambda d: abs(d - raw_duration))
+            duration = contract_duration(symbol, getattr(signal, 'atr_ratio', 0.0))
             
             # Obtener parámetros de trade (genérico para todas las estrategias)
             try:
@@ -848,9 +959,9 @@ class TickTradingLoop:
                     entry_price = getattr(signal, 'entry_price', None)
                     if entry_price is None:
                         # Obtener último precio del símbolo
-                        last_tick = Tick.objects.filter(symbol=symbol).order_by('-timestamp').first()
-                        if last_tick:
-                            entry_price = Decimal(str(last_tick.price))
+                        last_price = self.tick_buffers.latest_price(symbol)
+                        if last_price is not None:
+                            entry_price = Decimal(str(last_price))
                         else:
                             entry_price = Decimal('0')
                     
@@ -870,8 +981,8 @@ class TickTradingLoop:
                 # Fallback: construir parámetros básicos
                 entry_price = getattr(signal, 'entry_price', None)
                 if entry_price is None:
-                    last_tick = Tick.objects.filter(symbol=symbol).order_by('-timestamp').first()
-                    entry_price = Decimal(str(last_tick.price)) if last_tick else Decimal('0')
+                    last_price = self.tick_buffers.latest_price(symbol)
+                    entry_price = Decimal(str(last_price)) if last_price is not None else Decimal('0')
                 
                 trade_params = {
                     'direction': signal.direction,
@@ -902,6 +1013,8 @@ class TickTradingLoop:
                 }
             
             # Ejecutar orden
+            record_stage('risk_checks', symbol, time.perf_counter() - trace.pop('checks_started'))
+            buy_sent_at = time.time()
             result = self.place_binary_option(
                 symbol=symbol,
                 side=side,
@@ -910,6 +1023,10 @@ class TickTradingLoop:
                 martingale_active=martingale_active
             )
             
+            if result.get('accepted') and trace.get('tick_epoch'):
+                # Del tick evaluado a la confirmación del contrato
+                record_stage('tick_to_contract', symbol, time.time() - trace['tick_epoch'])
+            
             # Actualizar estado del capital manager después de trade
             if result.get('accepted'):
                 # El trade se registró como pending, la actualización de martingala
@@ -927,30 +1044,30 @@ class TickTradingLoop:
                 if 'amount' not in result:
                     result['amount'] = amount  # Monto final usado (después de ajustes)
                 
-                # Actualizar balance cacheado si viene en la respuesta
+                # Actualizar balance si viene en la respuesta
                 if 'balance_after' in result:
                     try:
-                        self._balance_cache.update(Decimal(str(result['balance_after'])))
-                        
-                        # También actualizar el caché del DerivClient compartido
-                        # PRESERVAR account_type del resultado en lugar de hardcodear 'demo'
-                        if '_shared_deriv_client' in globals():
-                            try:
-                                # Preservar account_type del resultado o del caché actual
-                                current_account_type = result.get('account_type')
-                                if not current_account_type and _shared_deriv_client._balance_cache_value:
-                                    current_account_type = _shared_deriv_client._balance_cache_value.get('account_type', 'demo')
-                                if not current_account_type:
-                                    current_account_type = 'demo'  # Último recurso
-                                
-                                _shared_deriv_client._balance_cache_value = {
-                                    'balance': float(result['balance_after']),
-                                    'currency': 'USD',
-                                    'account_type': current_account_type  # ← USAR EL QUE VINO
-                                }
-                                _shared_deriv_client._balance_cache_time = time.time()
-                            except Exception:
-                                pass
+                        balance_service = get_balance_service()
+                        if balance_service is not None:
+                            # Stream de balance activo: registrarlo ahí salvo que el stream ya sea más reciente
+                            balance_service.record(Decimal(str(result['balance_after'])), sent_at=buy_sent_at)
+                        else:
+                            # Sin stream: actualizar el caché del DerivClient compartido
+                            # PRESERVAR account_type del resultado en lugar de hardcodear 'demo'
+                            shared_client = get_deriv_client()
+                            # Preservar account_type del resultado o del caché actual
+                            current_account_type = result.get('account_type')
+                            if not current_account_type and shared_client._balance_cache_value:
+                                current_account_type = shared_client._balance_cache_value.get('account_type', 'demo')
+                            if not current_account_type:
+                                current_account_type = 'demo'  # Último recurso
+                            
+                            shared_client._balance_cache_value = {
+                                'balance': float(result['balance_after']),
+                                'currency': 'USD',
+                                'account_type': current_account_type  # ← USAR EL QUE VINO
+                            }
+                            shared_client._balance_cache_time = time.time()
                     except Exception:
                         pass
             
@@ -1051,34 +1168,13 @@ class TickTradingLoop:
         Returns:
             Resultado de la operación
         """
-        from connectors.deriv_client import DerivClient
-        from connectors.deriv_client import OrderRequest
-        
-        # Reusar un solo cliente a nivel de módulo para evitar reconexiones constantes
-        global _shared_deriv_client
-        try:
-            _shared_deriv_client
-        except NameError:
-            # Intentar obtener configuración del usuario
-            try:
-                from trading_bot.models import DerivAPIConfig
-                api_config = DerivAPIConfig.objects.filter(is_active=True).only('api_token', 'is_demo', 'app_id').first()
-                if api_config:
-                    _shared_deriv_client = DerivClient(
-                        api_token=api_config.api_token,
-                        is_demo=api_config.is_demo,
-                        app_id=api_config.app_id
-                    )
-                else:
-                    _shared_deriv_client = DerivClient()
-            except Exception:
-                _shared_deriv_client = DerivClient()
-        client = _shared_deriv_client
+        # Cliente compartido del proceso (los sockets viven en el pool del conector)
+        client = get_deriv_client()
         
         try:
             # PASO 1: CONECTAR Y AUTENTICAR
             print(f"  🔐 {symbol}: Verificando conexión...")
-            if not client.connected or not client.ws or not client.ws.sock or not client.ws.sock.connected:
+            if not client.connected:
                 print(f"  🔐 {symbol}: Conectando y autenticando...")
                 if not client.authenticate():
                     return {
@@ -1131,7 +1227,6 @@ class TickTradingLoop:
             ask_price = None
             
             try:
-                client.response_event.clear()
                 proposal_req = {
                     "proposal": 1,
                     "amount": float(amount),
@@ -1144,16 +1239,17 @@ class TickTradingLoop:
                 }
                 
                 # Verificar conexión antes de enviar proposal
-                if not client.ws or not client.ws.sock or not client.ws.sock.connected:
+                if not client.connected:
                     if not client.authenticate():
                         return {'accepted': False, 'reason': 'ws_disconnected', 'error_message': 'WebSocket desconectado'}
                 
-                client.ws.send(json.dumps(proposal_req))
+                proposal_started = time.perf_counter()
+                proposal_future = client.send_request_async(proposal_req)
                 print(f"  📊 {symbol}: Enviado proposal para obtener ask_price...")
                 
-                if client.response_event.wait(timeout=5):
-                    proposal_data = client.response_data
-                    
+                proposal_data = client.wait_response(proposal_future, timeout=5)
+                record_stage('proposal', symbol, time.perf_counter() - proposal_started)
+                if proposal_data is not None:
                     # Manejar errores en proposal
                     if proposal_data.get("error"):
                         error_info = proposal_data.get("error", {})
@@ -1179,11 +1275,9 @@ class TickTradingLoop:
                                 amount = retry_amount
                                 # Reintenta proposal UNA vez con el nuevo amount
                                 try:
-                                    client.response_event.clear()
                                     proposal_req['amount'] = float(amount)
-                                    client.ws.send(json.dumps(proposal_req))
-                                    if client.response_event.wait(timeout=5):
-                                        proposal_data = client.response_data
+                                    proposal_data = client.send_request(proposal_req, timeout=5)
+                                    if proposal_data is not None:
                                         if proposal_data.get("error"):
                                             # Si vuelve a fallar, omitir
                                             return {
@@ -1257,7 +1351,7 @@ class TickTradingLoop:
             print(f"  📋 {symbol}: Mensaje buy preparado | {side.upper()} | Amount: ${amount:.2f} | Price: ${ask_price:.2f} | Duration: {duration}s")
             
             # PASO 5: VERIFICAR CONEXIÓN FINAL
-            if not client.ws or not client.ws.sock or not client.ws.sock.connected:
+            if not client.connected:
                 print(f"  🔄 {symbol}: Reconectando antes de enviar orden...")
                 if not client.authenticate():
                     return {
@@ -1268,8 +1362,8 @@ class TickTradingLoop:
             
             # PASO 6: ENVIAR ORDEN
             try:
-                client.response_event.clear()
-                client.ws.send(json.dumps(buy_msg))
+                buy_started = time.perf_counter()
+                buy_future = client.send_request_async(buy_msg)
                 print(f"  📤 {symbol}: Orden enviada a Deriv | {side.upper()} | ${amount:.2f} | ${ask_price:.2f} | {duration}s")
             except Exception as send_error:
                 error_msg = f"Error enviando orden: {send_error}"
@@ -1281,8 +1375,9 @@ class TickTradingLoop:
                 }
             
             # PASO 7: ESPERAR RESPUESTA
-            if client.response_event.wait(timeout=15):  # Aumentado a 15s
-                data = client.response_data
+            data = client.wait_response(buy_future, timeout=15)  # Aumentado a 15s
+            record_stage('buy', symbol, time.perf_counter() - buy_started)
+            if data is not None:
                 
                 # PASO 8: MANEJAR ERRORES
                 if data.get('error'):
@@ -1563,6 +1658,7 @@ class TickTradingLoop:
             max_retries = 3
             retry_delay = 0.5  # segundos
             order = None
+            write_started = time.perf_counter()
             
             for attempt in range(max_retries):
                 try:
@@ -1595,6 +1691,12 @@ class TickTradingLoop:
                     # Otro tipo de error - no reintentar, propagar
                     raise
             
+            record_stage('order_audit_write', symbol, time.perf_counter() - write_started)
+            
+            # Liquidación por evento: suscribirse al contrato recién comprado
+            if order is not None and order.accepted:
+                track_trade(order)
+            
             # Guardar risk_amount si está disponible (para uso por risk_protection)
             if position_size_info and hasattr(order, 'risk_amount'):
                 try:
@@ -1649,6 +1751,7 @@ class TickTradingLoop:
                         )
                         logger.warning(f"✅ Trade recuperado con guardado fallback: {fallback_order.id} para {symbol}")
                         print(f"✅ Trade recuperado con guardado fallback para {symbol}")
+                    track_trade(fallback_order)
                 except Exception as recovery_error:
                     logger.critical(f"❌❌ FALLO CRÍTICO: No se pudo recuperar trade {symbol} (Contract ID: {result.get('order_id')}): {recovery_error}")
                     print(f"❌❌ FALLO CRÍTICO: No se pudo recuperar trade {symbol}")
@@ -0,0 +1,207 @@
+"""
+Escritor de ticks por lotes
+Acumula ticks en memoria y los inserta con bulk_create cada N ms o M filas,
+en lugar de hacer get_or_create (SELECT + INSERT) por cada tick recibido
+"""
+
+from __future__ import annotations
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from django.db import InterfaceError, OperationalError, connection
+
+from market.models import Tick
+from monitoring.metrics import record_tick_dropped, record_tick_flush
+
+logger = logging.getLogger(__name__)
+
+# Marca en la cola para despertar al hilo escritor al detenerlo
+_WAKEUP = object()
+
+
+class TickWriter:
+    """
+    Etapa de escritura de ticks con buffer acotado.
+
+    - `submit()` solo encola el tick; el hilo escritor agrupa y hace un único
+      INSERT por lote con `ignore_conflicts=True` (la unicidad symbol+timestamp
+      la resuelve la BD).
+    - Backpressure: la cola es acotada; si está llena, `submit()` espera hasta
+      `put_timeout` y, si sigue llena, descarta el tick y lo registra en métricas.
+    - Un lote con filas inválidas se divide a la mitad hasta aislarlas: solo se
+      descartan esas filas (`bad_row`), no el lote entero.
+    """
+
+    def __init__(self,
+                 flush_interval_ms: int = 250,
+                 max_batch_rows: int = 500,
+                 max_queue_size: int = 20000,
+                 put_timeout: float = 0.5,
+                 max_retries: int = 3):
+        """
+        Args:
+            flush_interval_ms: Tiempo máximo que un tick espera en memoria antes de escribirse
+            max_batch_rows: Filas máximas por INSERT
+            max_queue_size: Ticks pendientes máximos antes de aplicar backpressure
+            put_timeout: Segundos que `submit()` espera si la cola está llena
+            max_retries: Reintentos ante errores transitorios de BD (p.ej. SQLite bloqueada)
+        """
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._flush_lock = threading.Lock()
+
+        # Estadísticas. `submitted`: filas enviadas en INSERTs exitosos; incluye los
+        # duplicados que la BD ignora (bulk_create con ignore_conflicts no dice cuáles)
+        self.submitted = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        """Iniciar el hilo escritor (idempotente)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='tick-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Detener el hilo escritor vaciando lo pendiente"""
+        self._stop_event.set()
+        if self._thread:
+            try:
+                self._queue.put_nowait(_WAKEUP)
+            except queue.Full:
+                pass  # Cola llena: el lote en curso se completa sin esperar
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+
+    def submit(self, symbol: str, timestamp: datetime, price, volume=0) -> bool:
+        """
+        Encolar un tick para escritura
+
+        Returns:
+            True si se encoló, False si se descartó por backpressure
+        """
+        tick = Tick(symbol=symbol, timestamp=timestamp, price=price, volume=volume or 0)
+        try:
+            self._queue.put(tick, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            record_tick_dropped('queue_full')
+            return False
+
+    def flush(self) -> int:
+        """Escribir sincrónicamente todo lo pendiente. Retorna filas enviadas a la BD."""
+        total = 0
+        while True:
+            batch = self._drain(self.max_batch_rows)
+            if not batch:
+                return total
+            total += self._write(batch)
+
+    def _drain(self, limit: int) -> List[Tick]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                tick = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if tick is not _WAKEUP:
+                batch.append(tick)
+        return batch
+
+    def _collect(self) -> List[Tick]:
+        """Esperar hasta completar un lote o cumplir el intervalo de flush"""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        if first is _WAKEUP:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                tick = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if tick is _WAKEUP:
+                break
+            batch.append(tick)
+        return batch
+
+    def _write(self, batch: List[Tick]) -> int:
+        with self._flush_lock:
+            start = time.perf_counter()
+            submitted = self._insert(batch)
+            if submitted:
+                elapsed = time.perf_counter() - start
+                self.submitted += submitted
+                self.flushes += 1
+                self.last_flush_seconds = elapsed
+                record_tick_flush(elapsed, submitted)
+            return submitted
+
+    def _insert(self, batch: List[Tick]) -> int:
+        """INSERT de un lote; retorna las filas enviadas (0 si se descartó)"""
+        for attempt in range(self.max_retries):
+            try:
+                Tick.objects.bulk_create(batch, ignore_conflicts=True)
+                return len(batch)
+            except (OperationalError, InterfaceError) as e:
+                # Errores transitorios (p.ej. SQLite bloqueada, conexión caída): reintentar el lote
+                if attempt < self.max_retries - 1:
+                    logger.warning(f"Error de BD escribiendo {len(batch)} ticks (intento {attempt + 1}): {e}")
+                    time.sleep(0.1 * (attempt + 1))
+                    continue
+                logger.error(f"Descartando lote de {len(batch)} ticks tras {self.max_retries} intentos: {e}")
+                self.dropped += len(batch)
+                record_tick_dropped('db_error', len(batch))
+                return 0
+            except Exception as e:
+                # Datos inválidos: dividir el lote para descartar solo las filas malas
+                if len(batch) == 1:
+                    tick = batch[0]
+                    logger.error(f"Descartando tick inválido {tick.symbol} {tick.timestamp} {tick.price!r}: {e}")
+                    self.dropped += 1
+                    record_tick_dropped('bad_row')
+                    return 0
+                middle = len(batch) // 2
+                return self._insert(batch[:middle]) + self._insert(batch[middle:])
+        return 0
+
+    def _run(self) -> None:
+        try:
+            while not self._stop_event.is_set():
+                batch = self._collect()
+                if not batch:
+                    continue
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    # Un lote inválido no debe matar al escritor: se descarta y se sigue
+                    logger.exception(f"Error inesperado escribiendo {len(batch)} ticks; lote descartado: {e}")
+                    self.dropped += len(batch)
+                    record_tick_dropped('write_error', len(batch))
+        finally:
+            # La conexión de BD es por hilo: cerrarla al terminar
+            connection.close()
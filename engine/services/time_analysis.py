@@ -5,11 +5,8 @@ Analiza la base de datos para identificar los horarios con mejor rendimiento
 
 from __future__ import annotations
 from typing import Dict, List, Tuple
-from decimal import Decimal
 from django.utils import timezone
-from django.db.models import Count, Avg, Sum, Q
-from monitoring.models import OrderAudit
-from collections import defaultdict
+from monitoring.aggregates import hourly_outcomes
 
 
 class TimeAnalysis:
@@ -38,27 +35,8 @@ class TimeAnalysis:
             
             since = timezone.now() - timedelta(days=self.lookback_days)
             
-            # Obtener todos los trades finalizados en el período
-            trades = OrderAudit.objects.filter(
-                timestamp__gte=since,
-                accepted=True,
-                status__in=['won', 'lost']
-            )
-            
-            # Agrupar por hora
-            hourly_stats = defaultdict(lambda: {'won': 0, 'lost': 0, 'pnl': Decimal('0.00'), 'trades': []})
-            
-            for trade in trades:
-                hour = trade.timestamp.hour
-                hourly_stats[hour]['trades'].append(trade)
-                
-                if trade.status == 'won':
-                    hourly_stats[hour]['won'] += 1
-                elif trade.status == 'lost':
-                    hourly_stats[hour]['lost'] += 1
-                
-                if trade.pnl:
-                    hourly_stats[hour]['pnl'] += Decimal(str(trade.pnl))
+            # Agregados por hora mantenidos al liquidarse cada trade (sin recorrer OrderAudit)
+            hourly_stats = hourly_outcomes(since)
             
             # Calcular métricas finales
             result = {}
@@ -0,0 +1,245 @@
+"""
+Read-model de operaciones y métricas para /engine/trades/
+El dashboard consulta cada 2 segundos; en vez de recorrer 200 OrderAudit, abrir un
+DerivClient y recalcular métricas por request, el JSON se construye una vez en
+`TradesSnapshot` (trading loop por ciclo, o la vista si quedó desactualizado) y
+la vista lo sirve tal cual con ETag.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from monitoring.models import OrderAudit, TradesSnapshot
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PK = 1
+HISTORY_LIMIT = 200
+
+# Nombres cortos de estrategia para el dashboard
+STRATEGY_LABELS = {
+    'statistical_hybrid': 'Híbrida',
+    'ema200_extrema': 'EMA100',
+    'tick_based': 'Ticks',
+    'momentum_reversal': 'Reversión',
+}
+
+EMPTY_METRICS = {
+    'total_pnl': 0,
+    'win_rate': 0,
+    'win_rate_pct': 0,
+    'drawdown_pct': 0,
+    'losing_streak': 0,
+    'total_trades': 0,
+    'active_trades': 0,
+    'pause_active': False,
+    'pause_allowed_symbol': None,
+}
+
+
+def _trade_amount(trade: OrderAudit) -> float:
+    """Monto REAL del trade (respuesta > size > position_sizing > request)"""
+    amount = None
+    if trade.response_payload:
+        amount = trade.response_payload.get('amount')
+        if amount:
+            amount = float(amount)
+    if not amount and trade.size:
+        amount = float(trade.size)
+    if not amount and trade.request_payload:
+        position_sizing = trade.request_payload.get('position_sizing', {})
+        if position_sizing:
+            amount = position_sizing.get('risk_amount') or position_sizing.get('amount')
+            if amount:
+                amount = float(amount)
+        if not amount:
+            amount = trade.request_payload.get('amount') or trade.request_payload.get('stake')
+            if amount:
+                amount = float(amount)
+    return amount or 0.0
+
+
+def _contract_id(trade: OrderAudit) -> Optional[Any]:
+    try:
+        payload = trade.response_payload
+        if payload and isinstance(payload, dict):
+            buy = payload.get('buy')
+            return (
+                payload.get('order_id') or
+                payload.get('contract_id') or
+                (buy.get('contract_id') if isinstance(buy, dict) else None)
+            )
+    except Exception:
+        pass
+    return None
+
+
+def _confidence_pct(trade: OrderAudit) -> Optional[float]:
+    """Confianza (0-1) guardada en position_sizing o en la señal, como porcentaje"""
+    try:
+        if trade.request_payload and isinstance(trade.request_payload, dict):
+            conf_val = (trade.request_payload.get('position_sizing') or {}).get('confidence')
+            if conf_val is None:
+                conf_val = trade.request_payload.get('confidence')
+            if conf_val is not None:
+                return float(conf_val) * 100.0 if float(conf_val) <= 1.0 else float(conf_val)
+    except Exception:
+        pass
+    return None
+
+
+def _strategy_label(trade: OrderAudit) -> str:
+    try:
+        payload = trade.request_payload
+        internal_name = payload.get('strategy')
+        # Fallback heurístico si 'strategy' no está presente en el payload
+        if not internal_name:
+            if 'z_score' in payload or 'signal_type' in payload:
+                internal_name = 'statistical_hybrid'
+            elif 'ema200' in payload or 'recent_high' in payload:
+                internal_name = 'ema200_extrema'
+            elif 'force_pct' in payload:
+                internal_name = 'tick_based'
+            elif 'fatigue_count' in payload or 'momentum_extreme' in payload or 'divergence_score' in payload:
+                internal_name = 'momentum_reversal'
+        return STRATEGY_LABELS.get(internal_name, 'Desconocida')
+    except Exception:
+        return 'Desconocida'
+
+
+def serialize_trade(trade: OrderAudit) -> Dict[str, Any]:
+    return {
+        'id': trade.id,
+        'symbol': trade.symbol,
+        'direction': trade.action.upper(),
+        'price': float(trade.price) if trade.price else 0.0,
+        'timestamp': trade.timestamp.isoformat(),
+        'status': trade.status,
+        'amount': _trade_amount(trade),
+        'pnl': float(trade.pnl) if trade.pnl else 0.0,
+        'contract_id': _contract_id(trade),
+        'confidence_pct': _confidence_pct(trade),
+        'strategy': _strategy_label(trade),
+    }
+
+
+def _metrics(current_balance: Decimal, adaptive_manager=None) -> Dict[str, Any]:
+    since = timezone.now() - timedelta(hours=24)
+    totals = OrderAudit.objects.filter(timestamp__gte=since).aggregate(
+        total=Count('id'),
+        won=Count('id', filter=Q(status='won')),
+        lost=Count('id', filter=Q(status='lost')),
+        active=Count('id', filter=Q(status__in=['pending', 'active'])),
+        pnl=Sum('pnl'),
+    )
+    won, lost = totals['won'], totals['lost']
+    win_rate = (won / (won + lost)) if (won + lost) > 0 else 0
+
+    # Winrate de los últimos 20 trades (más preciso para control de pérdidas)
+    recent_20 = list(OrderAudit.objects.filter(
+        accepted=True, status__in=['won', 'lost']
+    ).order_by('-timestamp').values_list('status', flat=True)[:20])
+    win_rate_recent = (recent_20.count('won') / len(recent_20)) if recent_20 else win_rate
+
+    metrics = {
+        **EMPTY_METRICS,
+        'total_pnl': float(totals['pnl'] or 0),
+        'win_rate': win_rate_recent,  # decimal 0-1
+        'win_rate_pct': win_rate_recent * 100,
+        'total_trades': totals['total'],
+        'active_trades': totals['active'],
+    }
+    try:
+        from engine.services.adaptive_filter_manager import AdaptiveFilterManager
+        manager = adaptive_manager or AdaptiveFilterManager()
+        metrics_obj = manager.calculate_metrics(current_balance)
+        try:
+            top_list = manager.get_top_symbols_by_performance(lookback=20, top_n=1)
+            best_symbol = top_list[0][0] if top_list else None
+        except Exception:
+            best_symbol = None
+        pause_info = manager.should_pause_trading(metrics_obj, best_symbol=best_symbol)
+        metrics.update({
+            'drawdown_pct': metrics_obj.drawdown_pct,
+            'losing_streak': metrics_obj.losing_streak,
+            'pause_active': bool(pause_info.get('should_pause')),
+            'pause_allowed_symbol': pause_info.get('allowed_symbol'),
+        })
+    except Exception as e:
+        logger.warning(f"Error calculando drawdown para el snapshot de trades: {e}")
+    return metrics
+
+
+def build_trades_payload(current_balance: Decimal, adaptive_manager=None) -> Dict[str, Any]:
+    """Respuesta completa de /engine/trades/ (últimas 200 operaciones + métricas)"""
+    active, completed = [], []
+    for trade in OrderAudit.objects.order_by('-timestamp')[:HISTORY_LIMIT]:
+        # pending/active son activas; won, lost, rejected, expired... son finalizadas
+        (active if trade.status in ('pending', 'active') else completed).append(serialize_trade(trade))
+    return {
+        'success': True,
+        'active': active,
+        'completed': completed,
+        'metrics': _metrics(current_balance, adaptive_manager),
+    }
+
+
+def refresh_trades_snapshot(current_balance: Optional[Decimal] = None, adaptive_manager=None) -> TradesSnapshot:
+    """
+    Reconstruir el snapshot
+
+    Args:
+        current_balance: Balance real (trading loop); None reutiliza el último conocido,
+            así la vista nunca abre una conexión a Deriv
+        adaptive_manager: Gestor adaptativo a reutilizar (comparte su snapshot de métricas)
+    """
+    snapshot, _ = TradesSnapshot.objects.get_or_create(pk=SNAPSHOT_PK)
+    # Versión leída ANTES de construir: una escritura concurrente deja el snapshot desactualizado
+    version = snapshot.source_version
+    if current_balance is None:
+        current_balance = snapshot.balance if snapshot.balance is not None else Decimal('0')
+
+    payload = json.dumps(build_trades_payload(Decimal(str(current_balance)), adaptive_manager),
+                         ensure_ascii=False, separators=(',', ':'))
+    etag = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    updates = {
+        'built_version': version,
+        'refreshed_at': timezone.now(),
+        'balance': Decimal(str(current_balance)).quantize(Decimal('0.01')),
+    }
+    if etag != snapshot.etag:
+        updates.update(payload=payload, etag=etag)
+    TradesSnapshot.objects.filter(pk=SNAPSHOT_PK).update(**updates)
+    for field, value in updates.items():
+        setattr(snapshot, field, value)
+    return snapshot
+
+
+def set_snapshot_balance(balance: Decimal) -> None:
+    """Publicar un balance nuevo sin reconstruir el payload (stream de balance)"""
+    balance = Decimal(str(balance)).quantize(Decimal('0.01'))
+    if not TradesSnapshot.objects.filter(pk=SNAPSHOT_PK).update(balance=balance):
+        TradesSnapshot.objects.get_or_create(pk=SNAPSHOT_PK, defaults={'balance': balance})
+
+
+def get_trades_snapshot(max_age: float = 30.0) -> TradesSnapshot:
+    """
+    Snapshot vigente (sin cargar el payload si no hace falta)
+
+    Se reconstruye si no existe, si hubo escrituras de OrderAudit desde que se
+    construyó o si tiene más de `max_age` segundos (ventana de 24h de las métricas).
+    """
+    snapshot = TradesSnapshot.objects.filter(pk=SNAPSHOT_PK).defer('payload').first()
+    if (snapshot is None or snapshot.built_version != snapshot.source_version
+            or snapshot.refreshed_at is None
+            or (timezone.now() - snapshot.refreshed_at).total_seconds() > max_age):
+        snapshot = refresh_trades_snapshot()
+    return snapshot
@@ -151,6 +151,7 @@ def check_pending_contracts_task(max_age_minutes: int = 5):
     from decimal import Decimal
     from monitoring.models import OrderAudit
     from connectors.deriv_client import DerivClient
+    from engine.services.contract_settlement import contract_id_for, reconcile_contracts
     from trading_bot.models import DerivAPIConfig
 
     try:
@@ -182,48 +183,31 @@ def check_pending_contracts_task(max_age_minutes: int = 5):
             except Exception:
                 errors += 1
 
-        for trade in pending_trades:
+        # Un stream proposal_open_contract por contrato, abiertos en paralelo: los ya
+        # vendidos se liquidan con la primera respuesta (sin consultas una por una)
+        # Los trades sin contract_id se auto-expiran arriba al superar 2h
+        candidates = [trade for trade in pending_trades if contract_id_for(trade)]
+        service = reconcile_contracts(client.connector, candidates, wait=15.0)
+        updated = service.settled
+
+        for trade in candidates:
+            error = service.errors.get(trade.id)
+            if error is None:
+                continue
             try:
-                contract_id = None
-                if trade.response_payload and isinstance(trade.response_payload, dict):
-                    contract_id = (
-                        trade.response_payload.get('contract_id') or
-                        trade.response_payload.get('order_id') or
-                        (trade.response_payload.get('buy', {}).get('contract_id') if isinstance(trade.response_payload.get('buy'), dict) else None)
-                    )
-                if not contract_id:
-                    # Si supera 2h ya se auto-expiró arriba; si no, saltar
-                    continue
-
-                info = client.get_open_contract_info(str(contract_id))
-                if info.get('error'):
-                    err = str(info.get('error')).lower()
-                    if any(k in err for k in ['not found', 'expired', 'invalid', 'does not exist', 'contract_id']):
-                        trade.status = 'lost'
-                        trade.pnl = -Decimal(str(trade.size or 0))
-                        if not trade.response_payload:
-                            trade.response_payload = {}
-                        trade.response_payload['auto_expired'] = True
-                        trade.response_payload['auto_expired_at'] = timezone.now().isoformat()
-                        trade.response_payload['error'] = info.get('error')
-                        trade.save()
-                        expired += 1
-                    else:
-                        errors += 1
-                    continue
-
-                if info.get('is_sold', False):
-                    status = info.get('status')
-                    profit = Decimal(str(info.get('profit', 0)))
-                    trade.status = status if status else ('won' if profit > 0 else 'lost')
-                    trade.pnl = profit
+                err = str(error).lower()
+                if any(k in err for k in ['not found', 'expired', 'invalid', 'does not exist', 'contract_id']):
+                    trade.status = 'lost'
+                    trade.pnl = -Decimal(str(trade.size or 0))
                     if not trade.response_payload:
                         trade.response_payload = {}
-                    trade.response_payload['auto_updated'] = True
-                    trade.response_payload['auto_updated_at'] = timezone.now().isoformat()
-                    trade.response_payload['contract_info'] = info
+                    trade.response_payload['auto_expired'] = True
+                    trade.response_payload['auto_expired_at'] = timezone.now().isoformat()
+                    trade.response_payload['error'] = error
                     trade.save()
-                    updated += 1
+                    expired += 1
+                else:
+                    errors += 1
             except Exception:
                 errors += 1
 
@@ -231,3 +215,15 @@ def check_pending_contracts_task(max_age_minutes: int = 5):
     except Exception as e:
         return {'ok': False, 'error': str(e)}
 
+
+
+@shared_task
+def compact_ticks_task():
+    """Tarea periódica: archiva los ticks fuera de la ventana caliente (velas 1m + bloques float64)
+    y purga el archivo vencido, para que la tabla Tick no crezca sin límite."""
+    from engine.services.tick_retention import compact_ticks
+
+    try:
+        return {'ok': True, **compact_ticks()}
+    except Exception as e:
+        return {'ok': False, 'error': str(e)}
@@ -1,3 +1,999 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+import numpy as np
+
+from market.models import Tick
+from engine.services.tick_buffer import SymbolTickBuffer, TickBufferStore, fetch_recent_prices
+from engine.services.tick_event_scheduler import TickEventScheduler
+from engine.services.streaming_indicators import (
+    RollingDeltas, RollingExtrema, RollingStats, StreamingIndicatorStore, SymbolIndicators, WindowedEMA
+)
+from engine.services.tick_writer import TickWriter
+
+try:
+    import fakeredis  # noqa: F401
+    import lupa  # noqa: F401
+    HAS_FAKE_REDIS = True
+except ImportError:
+    HAS_FAKE_REDIS = False
+
+
+class TickBufferTests(TestCase):
+    def setUp(self):
+        self.symbol = 'R_TEST'
+        self.ts0 = timezone.now() - timezone.timedelta(minutes=10)
+        for i in range(30):
+            Tick.objects.create(
+                symbol=self.symbol,
+                timestamp=self.ts0 + timezone.timedelta(seconds=i),
+                price=Decimal('100') + Decimal(i) / 10,
+            )
+
+    def test_ring_buffer_wraps_and_keeps_order(self):
+        buf = SymbolTickBuffer('X', capacity=5)
+        for i in range(12):
+            buf.append(float(i), float(i) * 2)
+        self.assertEqual(len(buf), 5)
+        self.assertEqual(buf.prices().tolist(), [14.0, 16.0, 18.0, 20.0, 22.0])
+        self.assertEqual(buf.epochs(2).tolist(), [10.0, 11.0])
+        self.assertEqual(buf.latest(), (11.0, 22.0))
+        # Las lecturas son vistas de solo lectura
+        self.assertFalse(buf.prices().flags.writeable)
+
+    def test_store_matches_orm_and_refreshes_incrementally(self):
+        store = TickBufferStore(capacity=20)
+        self.assertEqual(
+            store.get_prices(self.symbol, 15).tolist(),
+            fetch_recent_prices(self.symbol, 15).tolist(),
+        )
+        self.assertEqual(store.refresh(self.symbol), 0)
+
+        Tick.objects.create(
+            symbol=self.symbol,
+            timestamp=self.ts0 + timezone.timedelta(seconds=30),
+            price=Decimal('200'),
+        )
+        self.assertEqual(store.refresh(self.symbol), 1)
+        self.assertEqual(store.latest_price(self.symbol), 200.0)
+        self.assertEqual(len(store.get_buffer(self.symbol)), 20)
+
+
+class TickWriterTests(TestCase):
+    def test_flush_writes_batches_and_ignores_duplicates(self):
+        writer = TickWriter(max_batch_rows=4)
+        ts0 = timezone.now()
+        for i in range(10):
+            writer.submit('R_W', ts0 + timezone.timedelta(seconds=i), Decimal('1.5'))
+        # Duplicado de un tick ya encolado: lo ignora la BD
+        writer.submit('R_W', ts0, Decimal('9.9'))
+        self.assertEqual(writer.pending, 11)
+
+        writer.flush()
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual(writer.flushes, 3)
+        self.assertEqual(Tick.objects.filter(symbol='R_W').count(), 10)
+        self.assertEqual(Tick.objects.get(symbol='R_W', timestamp=ts0).price, Decimal('1.5'))
+
+
+class TickWriterThreadTests(TransactionTestCase):
+    def test_bad_batch_does_not_kill_writer_and_stop_flushes(self):
+        import time
+
+        writer = TickWriter(flush_interval_ms=20)
+        writer.start()
+        ts0 = timezone.now()
+        writer.submit('R_W', ts0, 'no-es-un-precio')
+        deadline = time.monotonic() + 5
+        while writer.dropped == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(writer.dropped, 1)
+
+        # Ventana de flush larga: stop() despierta al escritor en vez de esperarla
+        writer.flush_interval = 60
+        writer.submit('R_W', ts0 + timezone.timedelta(seconds=1), Decimal('1.5'))
+        writer.stop(timeout=2)
+        self.assertEqual(Tick.objects.filter(symbol='R_W').count(), 1)
+        self.assertEqual(writer.submitted, 1)
+
+    def test_bad_row_only_drops_itself(self):
+        writer = TickWriter(max_batch_rows=8)
+        ts0 = timezone.now()
+        for i in range(8):
+            writer.submit('R_B', ts0 + timezone.timedelta(seconds=i), 'no-es-un-precio' if i == 5 else Decimal('2'))
+        self.assertEqual(writer.flush(), 7)
+        self.assertEqual((writer.submitted, writer.dropped), (7, 1))
+        self.assertEqual(Tick.objects.filter(symbol='R_B').count(), 7)
+
+
+class RealtimeTickServiceTests(SimpleTestCase):
+    def test_raw_tick_message_reaches_callbacks(self):
+        from engine.services.realtime_tick_service import RealtimeTickService
+
+        service = RealtimeTickService()
+        received = []
+        service.add_tick_callback(lambda symbol, price, timestamp: received.append((symbol, price, timestamp)))
+        service._process_message({
+            'msg_type': 'tick',
+            'tick': {'symbol': 'R_10', 'quote': 6123.45, 'epoch': 1700000000},
+        })
+
+        self.assertEqual(len(received), 1)
+        symbol, price, timestamp = received[0]
+        self.assertEqual((symbol, price), ('R_10', 6123.45))
+        self.assertEqual(timestamp, timezone.datetime(2023, 11, 14, 22, 13, 20, tzinfo=dt_timezone.utc))
+        self.assertEqual(service.tick_writer.pending, 1)
+
+
+class ConcurrentEvaluationTests(TransactionTestCase):
+    # Los hilos del pool usan su propia conexión: los ticks deben estar confirmados
+    def setUp(self):
+        ts0 = timezone.now() - timezone.timedelta(minutes=10)
+        for symbol in ('R_A', 'R_B'):
+            Tick.objects.bulk_create([
+                Tick(symbol=symbol, timestamp=ts0 + timezone.timedelta(seconds=i),
+                     price=Decimal('100') + Decimal(i % 7) / 10)
+                for i in range(120)
+            ])
+
+    def test_parallel_evaluation_matches_sequential(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from engine.services.tick_trading_loop import TickTradingLoop
+
+        loop = TickTradingLoop()
+        sequential = {symbol: loop.evaluate_symbol(symbol) for symbol in ('R_A', 'R_B')}
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            parallel = dict(zip(('R_A', 'R_B'), executor.map(loop.evaluate_symbol, ('R_A', 'R_B'))))
+        self.assertEqual(set(parallel['R_A']), {'primary', 'secondary', 'ticks', 'reversal'})
+        for symbol in ('R_A', 'R_B'):
+            for name, signal in sequential[symbol].items():
+                self.assertEqual(repr(parallel[symbol][name]), repr(signal))
+
+    def test_process_symbol_short_circuits_without_signals(self):
+        from engine.services.tick_trading_loop import TickTradingLoop
+
+        loop = TickTradingLoop()
+        result = loop.process_symbol('R_A', signals={'primary': None, 'secondary': None, 'ticks': None, 'reversal': None})
+        self.assertEqual(result['status'], 'skipped')
+        self.assertEqual(result['reason'], 'no_clear_trend')
+
+
+class FakeBuffers:
+    def __init__(self):
+        self.pushed = []
+
+    def push(self, symbol, timestamp, price):
+        self.pushed.append((symbol, price))
+
+
+class FakeLoop:
+    def __init__(self):
+        self.tick_buffers = FakeBuffers()
+        self.evaluated = []
+
+    def evaluate_symbol(self, symbol, refresh=True):
+        self.evaluated.append((symbol, refresh, len(self.tick_buffers.pushed)))
+        return {'primary': None}
+
+    def process_symbol(self, symbol, signals=None):
+        return {'status': 'skipped', 'reason': 'no_clear_trend'}
+
+
+class TickEventSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.loop = FakeLoop()
+        self.results = []
+        self.scheduler = TickEventScheduler(self.loop, debounce_ms=50, workers=2,
+                                            on_result=lambda symbol, result: self.results.append(symbol))
+        self.scheduler.start()
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_burst_of_ticks_coalesces_into_one_evaluation(self):
+        self.scheduler.set_symbols(['R_A', 'R_B'])
+        now = timezone.now()
+        for i in range(5):
+            self.scheduler.on_tick('R_A', 100.0 + i, now + timezone.timedelta(seconds=i))
+        self.scheduler.on_tick('R_B', 50.0, now)
+        self.scheduler.on_tick('R_IGNORED', 1.0, now)
+        self.assertTrue(self.scheduler.wait_idle(5))
+
+        self.assertEqual(sorted(s for s, _, _ in self.loop.evaluated), ['R_A', 'R_B'])
+        # Sin consultas a BD: los ticks llegan al buffer antes de evaluar
+        self.assertTrue(all(refresh is False for _, refresh, _ in self.loop.evaluated))
+        self.assertEqual(len(self.loop.tick_buffers.pushed), 6)
+        self.assertEqual(self.scheduler.coalesced, 4)
+        self.assertEqual(self.scheduler.pop_counts()['skipped'], 2)
+        self.assertEqual(sorted(self.results), ['R_A', 'R_B'])
+
+    def test_symbols_without_new_ticks_are_not_evaluated(self):
+        self.scheduler.on_tick('R_A', 100.0, timezone.now())
+        self.assertTrue(self.scheduler.wait_idle(5))
+        self.scheduler.on_tick('R_A', 101.0, timezone.now() + timezone.timedelta(seconds=1))
+        self.assertTrue(self.scheduler.wait_idle(5))
+        self.assertEqual([s for s, _, _ in self.loop.evaluated], ['R_A', 'R_A'])
+        self.assertEqual(self.scheduler.evaluations, 2)
+
+
+class StreamingIndicatorTests(TestCase):
+    def _walk(self, n, seed=7):
+        import random
+        rng = random.Random(seed)
+        prices = [100.0]
+        for _ in range(n - 1):
+            prices.append(round(prices[-1] + rng.choice([-1, 0, 1]) * rng.random() * 0.05, 3))
+        return prices
+
+    def test_incremental_values_match_window_recomputation(self):
+        from engine.services.statistical_strategy import StatisticalStrategy
+        from engine.services.ema200_extrema_strategy import EMA200ExtremaStrategy
+
+        strategy = StatisticalStrategy()
+        ema200 = EMA200ExtremaStrategy()
+        state = SymbolIndicators(
+            stats=RollingStats(20), ema=WindowedEMA(10, window=50, seed=10),
+            rsi=RollingDeltas(14, lags=1), atr=RollingDeltas(20),
+            ema200=WindowedEMA(200), extrema=RollingExtrema(60),
+        )
+        prices = self._walk(1200)
+        for i, price in enumerate(prices):
+            state.update(price)
+            if i < 250:
+                continue
+            window = prices[i - 49:i + 1]
+            stats = strategy.calculate_statistics(window)
+            self.assertAlmostEqual(state['stats'].mean, stats['mean'], places=9)
+            self.assertAlmostEqual(state['stats'].stdev, stats['stdev'], places=9)
+            self.assertAlmostEqual(state['ema'].value, strategy.calculate_ema(window, 10), places=9)
+            self.assertAlmostEqual(state['rsi'].window().rsi_moves(), strategy.calculate_rsi(window, 14), places=9)
+            self.assertAlmostEqual(state['rsi'].window(1).rsi_moves(), strategy.calculate_rsi(window[:-1], 14), places=9)
+            self.assertAlmostEqual(state['atr'].window().atr(), strategy.calculate_atr(window, 20), places=9)
+            self.assertAlmostEqual(state['ema200'].value, ema200._compute_ema(prices[:i + 1], 200), places=9)
+            self.assertEqual((state['extrema'].high, state['extrema'].low),
+                             ema200._recent_extrema(prices[:i + 1], 60))
+
+    def test_store_consumes_only_new_buffer_ticks(self):
+        buffers = TickBufferStore(capacity=100)
+        store = StreamingIndicatorStore(buffers, lambda: SymbolIndicators(stats=RollingStats(20)))
+        ts0 = timezone.now()
+        prices = self._walk(60)
+        for i, price in enumerate(prices[:40]):
+            buffers.push('R_S', ts0 + timezone.timedelta(seconds=i), price)
+        state = store.get('R_S')
+        self.assertEqual(state.count, 20)  # reconstruido con la ventana necesaria
+
+        for i, price in enumerate(prices[40:], start=40):
+            buffers.push('R_S', ts0 + timezone.timedelta(seconds=i), price)
+        self.assertIs(store.get('R_S'), state)
+        self.assertEqual(state.count, 40)
+        self.assertTrue(state.ready_for(buffers.get_prices('R_S', 20)))
+        self.assertAlmostEqual(state['stats'].mean, sum(prices[-20:]) / 20, places=9)
+
+
+class AdaptiveFilterSnapshotTests(TestCase):
+    def setUp(self):
+        from monitoring.models import OrderAudit
+        ts0 = timezone.now() - timezone.timedelta(minutes=30)
+        for i, (symbol, status, pnl) in enumerate([
+            ('R_10', 'won', '0.95'), ('R_10', 'lost', '-1'), ('R_25', 'won', '0.95'), ('R_25', 'won', '0.95'),
+        ]):
+            OrderAudit.objects.create(timestamp=ts0 + timezone.timedelta(minutes=i), request_hash=str(i),
+                                      accepted=True, symbol=symbol, status=status, pnl=Decimal(pnl))
+        self.pending = OrderAudit.objects.create(request_hash='p', accepted=True, symbol='R_10', status='pending')
+
+    def test_metrics_share_one_snapshot_until_a_trade_settles(self):
+        from engine.services.adaptive_filter_manager import AdaptiveFilterManager
+
+        manager = AdaptiveFilterManager()
+        with self.assertNumQueries(2):
+            metrics = manager.calculate_metrics(Decimal('100'))
+            performance = manager.calculate_symbol_performance(lookback=20)
+            manager.calculate_metrics(Decimal('100'))
+        self.assertEqual(metrics.total_trades, 5)
+        self.assertEqual(metrics.win_rate_recent, 0.75)
+        self.assertEqual(metrics.win_rate_global, 0.75)
+        self.assertEqual(performance['R_25']['trades_count'], 2)
+
+        # Los llamadores pueden modificar el resultado sin alterar el snapshot
+        performance['R_X'] = {}
+        self.assertNotIn('R_X', manager.calculate_symbol_performance(lookback=20))
+
+        self.pending.status = 'lost'
+        self.pending.save()
+        metrics = manager.calculate_metrics(Decimal('100'))
+        self.assertEqual(metrics.win_rate_recent, 0.6)
+
+
+class FakeStreamConnector:
+    """Conector que registra los streams abiertos; el test empuja los mensajes"""
+
+    def __init__(self, first=None):
+        self.callbacks = {}
+        self.forgotten = []
+        self.first = first
+
+    def subscribe(self, payload, callback):
+        from concurrent.futures import Future
+        contract_id = payload['contract_id']
+        self.callbacks[contract_id] = callback
+        future = Future()
+        message = self.first(contract_id) if self.first else {
+            'proposal_open_contract': {'contract_id': contract_id, 'is_sold': 0},
+            'subscription': {'id': f'sub-{contract_id}'},
+        }
+        callback(message)
+        future.set_result(message)
+        return future
+
+    def forget(self, subscription_id):
+        self.forgotten.append(subscription_id)
+
+
+class ContractSettlementTests(TransactionTestCase):
+    # El servicio escribe desde su propio hilo
+    def _trade(self, contract_id):
+        from monitoring.models import OrderAudit
+        return OrderAudit.objects.create(request_hash=str(contract_id), accepted=True, symbol='R_10', action='call',
+                                         size=Decimal('1'), status='pending',
+                                         response_payload={'order_id': contract_id})
+
+    def test_stream_settles_trade_once_and_reports_errors(self):
+        from engine.services.contract_settlement import ContractSettlementService
+        from monitoring.models import OrderAudit
+
+        connector = FakeStreamConnector()
+        settled = []
+        service = ContractSettlementService(connector, on_settled=settled.append)
+        won, missing = self._trade(111), self._trade(222)
+        self.assertTrue(service.track(won))
+        self.assertFalse(service.track(won))  # ya en seguimiento
+        service.track(missing)
+
+        sold = {'proposal_open_contract': {'contract_id': 111, 'is_sold': 1, 'status': 'won',
+                                           'profit': 0.95, 'sell_price': 1.95},
+                'subscription': {'id': 'sub-111'}}
+        connector.callbacks[111](sold)
+        connector.callbacks[111](sold)  # duplicado: se ignora
+        connector.callbacks[222]({'error': {'code': 'InvalidContractId', 'message': 'Contract not found'}})
+        service.stop()
+
+        won.refresh_from_db()
+        self.assertEqual((won.status, won.pnl, won.exit_price), ('won', Decimal('0.95'), Decimal('1.95')))
+        self.assertEqual([trade.pk for trade in settled], [won.pk])
+        self.assertEqual(service.settled, 1)
+        self.assertIn('sub-111', connector.forgotten)
+        self.assertIn(missing.pk, service.errors)
+        self.assertEqual(OrderAudit.objects.get(pk=missing.pk).status, 'pending')
+
+    def test_reconcile_settles_already_sold_contracts_in_one_pass(self):
+        from engine.services.contract_settlement import reconcile_contracts
+
+        def first(contract_id):
+            return {'proposal_open_contract': {'contract_id': contract_id, 'is_sold': int(contract_id == 1),
+                                               'profit': -1}}
+
+        trades = [self._trade(1), self._trade(2)]
+        service = reconcile_contracts(FakeStreamConnector(first), trades, wait=5)
+        self.assertEqual(service.last_states, {trades[0].pk: 'settled', trades[1].pk: 'open'})
+        trades[0].refresh_from_db()
+        self.assertEqual((trades[0].status, trades[0].pnl), ('lost', Decimal('-1')))
+
+
+class TickRetentionTests(TestCase):
+    def test_old_ticks_roll_up_into_candles_and_compact_chunks(self):
+        from market.models import Candle, TickChunk
+        from engine.services.tick_retention import TickRetentionPolicy, compact_ticks, load_ticks
+
+        now = timezone.now().replace(second=30, microsecond=0)
+        minute = (now - timezone.timedelta(hours=3)).replace(second=0)
+        prices = ['10.5', '11', '9.75', '10', '12']
+        for i, price in enumerate(prices):
+            # 3 ticks en el primer minuto, 2 en el siguiente
+            Tick.objects.create(symbol='R_C', timestamp=minute + timezone.timedelta(seconds=20 * i), price=Decimal(price))
+        Tick.objects.create(symbol='R_C', timestamp=now - timezone.timedelta(minutes=5), price=Decimal('13'))
+
+        stats = compact_ticks(TickRetentionPolicy(hot_hours=1, archive_days=30), now=now)
+        self.assertEqual((stats['archived'], stats['purged']), (5, 0))
+        self.assertEqual(Tick.objects.filter(symbol='R_C').count(), 1)  # solo la ventana caliente
+
+        candles = list(Candle.objects.filter(symbol='R_C', timeframe='1m').order_by('timestamp').values_list(
+            'timestamp', 'open', 'high', 'low', 'close', 'volume'))
+        self.assertEqual(candles[0], (minute, Decimal('10.5'), Decimal('11'), Decimal('9.75'), Decimal('9.75'), Decimal('3')))
+        self.assertEqual(candles[1][1:], (Decimal('10'), Decimal('12'), Decimal('10'), Decimal('12'), Decimal('2')))
+
+        epochs, values = load_ticks('R_C', now - timezone.timedelta(hours=4), now)
+        self.assertEqual(values.tolist(), [10.5, 11.0, 9.75, 10.0, 12.0, 13.0])
+        self.assertTrue((epochs[1:] > epochs[:-1]).all())
+
+        # Retención del archivo: los bloques vencidos se purgan, las velas quedan
+        stats = compact_ticks(TickRetentionPolicy(hot_hours=1, archive_days=0), now=now + timezone.timedelta(days=2))
+        self.assertEqual(stats['archived'], 1)
+        self.assertFalse(TickChunk.objects.filter(symbol='R_C').exists())
+        self.assertEqual(Candle.objects.filter(symbol='R_C', timeframe='1m').count(), 3)
+
+
+class TickArchiveTests(TestCase):
+    def test_export_and_memory_mapped_range_read(self):
+        import tempfile
+        from engine.services.tick_archive import TickArchiveReader, export_ticks
+
+        day_start = (timezone.now() - timezone.timedelta(days=3)).astimezone(dt_timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        for day in range(2):
+            for i in range(5):
+                Tick.objects.create(symbol='R_X', price=Decimal(100 + 10 * day + i),
+                                    timestamp=day_start + timezone.timedelta(days=day, minutes=i))
+
+        with tempfile.TemporaryDirectory() as root:
+            self.assertEqual(export_ticks(root=root), {'R_X': 10})
+            self.assertEqual(export_ticks(root=root), {'R_X': 0})  # días pasados ya exportados
+
+            reader = TickArchiveReader(root)
+            self.assertEqual(reader.symbols(), ['R_X'])
+            self.assertEqual(len(reader.days('R_X')), 2)
+
+            epochs, prices = reader.read('R_X', day_start + timezone.timedelta(minutes=1),
+                                         day_start + timezone.timedelta(minutes=4))
+            self.assertEqual(prices.tolist(), [101.0, 102.0, 103.0])
+            self.assertIsInstance(prices.base, np.memmap)  # vista sin copia
+
+            _, prices = reader.read('R_X')
+            self.assertEqual(prices.tolist(), [100.0, 101.0, 102.0, 103.0, 104.0,
+                                               110.0, 111.0, 112.0, 113.0, 114.0])
+
+    def test_day_exported_while_open_is_exported_again_after_close(self):
+        import tempfile
+        from unittest import mock
+        from engine.services.tick_archive import TickArchiveReader, export_ticks
+
+        day_start = timezone.datetime(2024, 3, 1, tzinfo=dt_timezone.utc)
+        for i in range(3):
+            Tick.objects.create(symbol='R_T', price=Decimal(100 + i), timestamp=day_start + timezone.timedelta(hours=i))
+
+        with tempfile.TemporaryDirectory() as root:
+            with mock.patch('engine.services.tick_archive.timezone.now',
+                            return_value=day_start + timezone.timedelta(hours=3)):
+                self.assertEqual(export_ticks(root=root), {'R_T': 3})
+
+            # Ticks que llegan después de la exportación, antes de que cierre el día
+            for i in range(3, 5):
+                Tick.objects.create(symbol='R_T', price=Decimal(100 + i), timestamp=day_start + timezone.timedelta(hours=i))
+            with mock.patch('engine.services.tick_archive.timezone.now',
+                            return_value=day_start + timezone.timedelta(days=1, minutes=10)):
+                self.assertEqual(export_ticks(root=root), {'R_T': 5})
+                self.assertEqual(export_ticks(root=root), {'R_T': 0})  # ya exportado cerrado
+
+            _, prices = TickArchiveReader(root).read('R_T')
+            self.assertEqual(prices.tolist(), [100.0, 101.0, 102.0, 103.0, 104.0])
+
+
+class TickReplayTests(TestCase):
+    def test_replay_reports_per_strategy_without_database(self):
+        from engine.services.tick_replay import TickReplayBacktester, settle_binary
+
+        rng = np.random.default_rng(7)
+        prices = 1000 + np.cumsum(rng.normal(0, 0.5, 3000))
+        epochs = 1.7e9 + np.arange(3000) * 2.0
+
+        with self.assertNumQueries(0):
+            result = TickReplayBacktester().run_symbol('R_100', epochs, prices)
+        report = result.to_dict()
+
+        # Solo cuentan los ticks evaluados: tras el calentamiento de 200 y fuera del intervalo entre entradas
+        self.assertLess(report['ticks'], 2800)
+        self.assertGreater(report['ticks'], report['total']['trades'])
+        self.assertGreater(report['total']['trades'], 0)
+        self.assertEqual(sum(s['trades'] for s in report['by_strategy'].values()), report['total']['trades'])
+        for stats in report['by_strategy'].values():
+            self.assertAlmostEqual(stats['pnl'], round(stats['wins'] * 0.95 - stats['losses'], 2), places=2)
+
+        self.assertTrue(settle_binary('CALL', 1.0, 1.1))
+        self.assertTrue(settle_binary('PUT', 1.0, 0.9))
+        self.assertFalse(settle_binary('CALL', 1.0, 1.0))  # empate pierde
+
+    def test_vectorized_signals_match_per_tick_strategies(self):
+        import contextlib
+        from engine.services.replay_signals import signal_evaluators
+        from engine.services.tick_replay import ReplayConfig, TickReplayBacktester, _NullWriter
+
+        rng = np.random.default_rng(3)
+        prices = np.round(1000 + np.cumsum(rng.normal(0, 0.5, 3000)), 2)
+        epochs = 1.7e9 + np.arange(3000) * 2.0
+
+        reports = [
+            TickReplayBacktester(ReplayConfig(min_interval_seconds=0, vectorized=vectorized))
+            .run_symbol('R_100', epochs, prices).to_dict()
+            for vectorized in (True, False)
+        ]
+        self.assertEqual(reports[0]['ticks'], 2800)
+        self.assertEqual(reports[0]['by_strategy'], reports[1]['by_strategy'])
+        self.assertEqual(reports[0]['unsettled'], reports[1]['unsettled'])
+
+        # Cada estrategia por separado: misma señal que analyze_symbol tick a tick
+        backtester = TickReplayBacktester()
+        buffer = backtester.tick_source.load('R_100', epochs, prices)
+        evaluators = dict(signal_evaluators(backtester.strategies, 'R_100', buffer._prices))
+        with contextlib.redirect_stdout(_NullWriter()):
+            for i in range(200, 3000, 7):
+                buffer.appended = i + 1
+                for name, strategy in backtester.strategies.items():
+                    expected, signal = strategy.analyze_symbol('R_100'), evaluators[name](i)
+                    self.assertIs(type(expected), type(signal), f'{name} en el tick {i}')
+                    if expected is not None:
+                        self.assertEqual(expected.direction, signal.direction)
+                        for field, value in vars(expected).items():
+                            if isinstance(value, float):
+                                self.assertAlmostEqual(value, getattr(signal, field), places=6, msg=field)
+                            else:
+                                self.assertEqual(value, getattr(signal, field), field)
+
+
+class ParameterSweepTests(SimpleTestCase):
+    def test_sweep_ranks_configs_across_processes(self):
+        import csv
+        import tempfile
+        from pathlib import Path
+        from engine.services.param_sweep import parameter_grid, run_sweep, write_results
+
+        rng = np.random.default_rng(11)
+        epochs = 1.7e9 + np.arange(2000) * 2.0
+        prices = 1000 + np.cumsum(rng.normal(0, 0.5, 2000))
+        configs = list(parameter_grid({'reversal.fatigue_threshold': [4, 6],
+                                       'adaptive.base_z_score_threshold': [2.0, 3.0]}))
+        self.assertEqual(len(configs), 4)
+
+        with tempfile.TemporaryDirectory() as root:
+            folder = Path(root) / 'R_100'
+            folder.mkdir()
+            np.save(folder / '2023-11-14.epoch.npy', epochs)
+            np.save(folder / '2023-11-14.price.npy', prices)
+
+            rows = run_sweep(configs, ['R_100'], root=Path(root), workers=2)
+            self.assertEqual([row['rank'] for row in rows], [1, 2, 3, 4])
+            pnls = [row['pnl'] for row in rows if row['trades']]
+            self.assertEqual(pnls, sorted(pnls, reverse=True))
+
+            path = Path(root) / 'results.csv'
+            write_results(rows, path)
+            with open(path) as fh:
+                table = list(csv.DictReader(fh))
+            self.assertEqual(len(table), 4)
+            self.assertIn('reversal.fatigue_threshold', table[0])
+
+        with self.assertRaises(ValueError):
+            run_sweep([{'primary.z_score_threshold': 2.5}], ['R_100'])
+
+
+class DecisionJournalTests(SimpleTestCase):
+    def test_background_writer_rotates_and_reads_back_in_order(self):
+        import tempfile
+        from engine.services.adaptive_filter_manager import AdaptiveParameters
+        from engine.services.decision_journal import (
+            DecisionJournal, journal_files, read_decisions, snapshot_signal, summarize_decisions
+        )
+
+        adaptive = AdaptiveParameters(2.5, 0.02, 0.6, 1.0, False)
+        with tempfile.TemporaryDirectory() as root:
+            journal = DecisionJournal(root, max_bytes=2048, backup_count=2, flush_interval_ms=10)
+
+            def record(i):
+                status = 'executed' if i % 3 == 0 else 'skipped'
+                journal.record({'ts': float(i), 'symbol': 'R_10', 'status': status,
+                                'reason': None if status == 'executed' else 'insufficient_confidence',
+                                'origin': 'tick_based', 'adaptive': snapshot_signal(adaptive),
+                                'result': {'amount': Decimal('1.5')}})
+
+            # Lotes pequeños para forzar la rotación; luego el hilo escritor
+            for i in range(50):
+                record(i)
+                if i % 5 == 4:
+                    journal.flush()
+            journal.start()
+            for i in range(50, 60):
+                record(i)
+            journal.stop()
+
+            self.assertEqual(journal.dropped, 0)
+            self.assertGreater(journal.rotations, 0)
+            self.assertLessEqual(len(journal_files(root)), 3)  # activo + 2 rotados
+
+            entries = list(read_decisions(root))
+            timestamps = [entry['ts'] for entry in entries]
+            self.assertEqual(timestamps, sorted(timestamps))
+            self.assertEqual(timestamps[-1], 59.0)  # lo más viejo se descarta al rotar
+            self.assertEqual(entries[-1]['adaptive']['z_score_threshold'], 2.5)
+            self.assertEqual(entries[-1]['result']['amount'], 1.5)
+
+            summary = summarize_decisions(entries)
+            self.assertEqual(summary['total'], len(entries))
+            self.assertEqual(sum(summary['by_origin']['tick_based'].values()), len(entries))
+
+
+class QueryProfilerTests(TestCase):
+    def _lookup_each(self, symbols):
+        return [Tick.objects.filter(symbol=symbol).first() for symbol in symbols]
+
+    def test_attributes_queries_to_caller_and_flags_n_plus_one(self):
+        from engine.services.adaptive_filter_manager import AdaptiveFilterManager
+        from engine.services.query_profiler import query_budget
+
+        with query_budget(n_plus_one_threshold=5) as profiler:
+            self._lookup_each([f'R_{i}' for i in range(6)])
+            AdaptiveFilterManager().calculate_metrics(Decimal('100'))
+        profile = profiler.last
+        self.assertGreaterEqual(profile.queries, 7)
+        self.assertEqual(profile.by_caller['engine.tests.QueryProfilerTests._lookup_each'].queries, 6)
+        self.assertTrue(any(caller.startswith('engine.services.adaptive_filter_manager.AdaptiveFilterManager.')
+                            for caller in profile.by_caller))
+        [(caller, sql, count)] = profile.n_plus_one
+        self.assertEqual((caller, count), ('engine.tests.QueryProfilerTests._lookup_each', 6))
+        self.assertIn('"market_tick"', sql)
+
+    def test_budget_and_n_plus_one_fail_the_block(self):
+        from engine.services.query_profiler import QueryBudgetExceeded, query_budget
+
+        with query_budget(budget=3):
+            self._lookup_each(['R_10', 'R_25'])
+        with self.assertRaises(QueryBudgetExceeded) as ctx:
+            with query_budget(budget=3):
+                self._lookup_each(['R_10', 'R_25', 'R_50', 'R_75'])
+        self.assertEqual(ctx.exception.profile.queries, 4)
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(n_plus_one_threshold=3, allow_n_plus_one=False):
+                self._lookup_each(['R_10', 'R_25', 'R_50'])
+
+    def test_cycles_and_uninstall_leave_connection_clean(self):
+        from django.db import connection
+        from engine.services.query_profiler import QueryProfiler
+        from monitoring.metrics import QueryTimer
+
+        profiler = QueryProfiler(budget=1).install()
+        self.assertIsNone(profiler.begin_cycle())
+        with QueryTimer('R_10'):
+            self._lookup_each(['R_10', 'R_25'])
+        first = profiler.begin_cycle()
+        self._lookup_each(['R_10'])
+        last = profiler.uninstall()
+        self.assertEqual((first.index, first.queries), (1, 2))
+        self.assertTrue(profiler.over_budget(first))
+        self.assertEqual((last.index, last.queries), (2, 1))
+        self.assertEqual(connection.execute_wrappers, [])
+
+
+@skipUnless(HAS_FAKE_REDIS, 'requiere fakeredis[lua]')
+class RedisProfileTests(SimpleTestCase):
+    """El perfil USE_REDIS contra un Redis falso por TCP (dos clientes = dos procesos)"""
+
+    def test_group_send_crosses_channel_layer_instances(self):
+        from asgiref.sync import async_to_sync
+        from channels_redis.core import RedisChannelLayer
+        from config.redis_profile import CHANNELS_DB, channel_layers, fake_redis_server, redis_db_url
+
+        with fake_redis_server() as url:
+            config = channel_layers(redis_db_url(url, CHANNELS_DB))['default']['CONFIG']
+
+            async def roundtrip():
+                daphne, trading_loop = RedisChannelLayer(**config), RedisChannelLayer(**config)
+                try:
+                    channel = await daphne.new_channel()
+                    await daphne.group_add('trading_updates', channel)
+                    await trading_loop.group_send('trading_updates', {'type': 'trading_update', 'message': {'x': 1}})
+                    return await daphne.receive(channel)
+                finally:
+                    await daphne.close_pools()
+                    await trading_loop.close_pools()
+
+            message = async_to_sync(roundtrip)()
+        self.assertEqual(message, {'type': 'trading_update', 'message': {'x': 1}})
+
+    def test_cache_is_shared_and_celery_broker_reachable(self):
+        from django.core.cache.backends.redis import RedisCache
+        from kombu import Connection
+        from config.redis_profile import (
+            CACHE_DB, CELERY_BROKER_DB, CELERY_RESULTS_DB, caches, celery_settings, fake_redis_server, redis_db_url,
+        )
+
+        with fake_redis_server() as url:
+            params = caches(redis_db_url(url, CACHE_DB), max_connections=4)['default']
+            location = params.pop('LOCATION')
+            worker_a, worker_b = RedisCache(location, dict(params)), RedisCache(location, dict(params))
+            worker_a.set('balance', {'balance': 100.5})
+            self.assertEqual(worker_b.get('balance'), {'balance': 100.5})
+
+            celery = celery_settings(redis_db_url(url, CELERY_BROKER_DB), redis_db_url(url, CELERY_RESULTS_DB))
+            with Connection(celery['CELERY_BROKER_URL'],
+                            transport_options=celery['CELERY_BROKER_TRANSPORT_OPTIONS']) as conn:
+                queue = conn.SimpleQueue('profile-check')
+                queue.put({'ok': True})
+                message = queue.get(timeout=2)
+                message.ack()
+                self.assertEqual(message.payload, {'ok': True})
+                queue.close()
+
+    def test_db_url_keeps_credentials_and_query(self):
+        from config.redis_profile import redis_db_url
+        self.assertEqual(redis_db_url('redis://:secret@redis:6379/0?ssl_cert_reqs=none', 3),
+                         'redis://:secret@redis:6379/3?ssl_cert_reqs=none')
+
+
+class TradesReadModelTests(TestCase):
+    def setUp(self):
+        from monitoring.models import OrderAudit
+        now = timezone.now()
+        OrderAudit.objects.create(timestamp=now - timezone.timedelta(minutes=5), request_hash='a', accepted=True,
+                                  symbol='R_10', action='call', status='won', pnl=Decimal('0.95'),
+                                  request_payload={'strategy': 'momentum_reversal', 'confidence': 0.8},
+                                  response_payload={'amount': 1.0, 'order_id': 11})
+        OrderAudit.objects.create(timestamp=now - timezone.timedelta(minutes=1), request_hash='b', accepted=True,
+                                  symbol='R_25', action='put', status='active', size=Decimal('2'))
+
+    def test_serves_snapshot_with_etag_and_304(self):
+        response = self.client.get('/engine/trades/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([t['symbol'] for t in data['active']], ['R_25'])
+        [won] = data['completed']
+        self.assertEqual((won['strategy'], won['contract_id'], won['amount']), ('Reversión', 11, 1.0))
+        self.assertAlmostEqual(won['confidence_pct'], 80.0)
+        self.assertEqual(data['metrics']['total_trades'], 2)
+        self.assertEqual(data['metrics']['win_rate'], 1.0)
+        etag = response['ETag']
+
+        # Snapshot vigente: una sola lectura (sin payload) para responder 304
+        with self.assertNumQueries(1):
+            response = self.client.get('/engine/trades/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_trade_writes_invalidate_snapshot(self):
+        from engine.services.trades_read_model import refresh_trades_snapshot
+        from monitoring.models import OrderAudit, TradesSnapshot
+
+        refresh_trades_snapshot(Decimal('250'))
+        etag = self.client.get('/engine/trades/')['ETag']
+        trade = OrderAudit.objects.get(request_hash='b')
+        trade.status = 'lost'
+        trade.pnl = Decimal('-1')
+        trade.save()
+
+        response = self.client.get('/engine/trades/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['active'], [])
+        snapshot = TradesSnapshot.objects.get()
+        self.assertEqual(snapshot.built_version, snapshot.source_version)
+        # La vista reconstruye con el último balance conocido (sin conectarse a Deriv)
+        self.assertEqual(snapshot.balance, Decimal('250.00'))
+
+
+class FakeAsyncConnector:
+    """Conector con `arequest` async: responde el balance sin red"""
+    connected = True
+
+    def __init__(self, balance=125.5):
+        self.balance = balance
+        self.requests = []
+
+    async def arequest(self, payload, timeout=10.0):
+        import asyncio
+        self.requests.append(payload)
+        await asyncio.sleep(0)
+        return {'msg_type': 'balance', 'balance': {'balance': self.balance, 'currency': 'USD', 'loginid': 'VRTC1'}}
+
+
+class AsyncApiViewsTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from monitoring.models import OrderAudit
+        self.user = User.objects.create_user('trader', password='x')
+        now = timezone.now()
+        OrderAudit.objects.create(timestamp=now - timezone.timedelta(hours=2), request_hash='w', accepted=True,
+                                  symbol='R_10', action='call', status='won', pnl=Decimal('1.5'))
+        OrderAudit.objects.create(timestamp=now - timezone.timedelta(hours=1), request_hash='l', accepted=True,
+                                  symbol='R_10', action='put', status='lost', pnl=Decimal('-1'))
+        OrderAudit.objects.create(timestamp=now, request_hash='p', accepted=True, symbol='R_25', action='call',
+                                  status='pending', size=Decimal('2'), request_payload={'contract_id': 7})
+
+    def test_views_are_async(self):
+        from asgiref.sync import iscoroutinefunction
+        from engine import views
+        for view in (views.get_balance, views.get_trades, views.metrics, views.active_trades_api):
+            self.assertTrue(iscoroutinefunction(view), view.__name__)
+
+    async def test_metrics_and_active_trades(self):
+        response = await self.async_client.get('/engine/metrics/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['total_trades'], data['won_trades'], data['lost_trades'], data['active_trades']),
+                         (3, 1, 1, 1))
+        self.assertAlmostEqual(data['pnl'], 0.5)
+        self.assertEqual(data['winrate'], 0.5)
+
+        response = await self.async_client.get('/engine/api/trades/active/')
+        self.assertEqual(response.status_code, 302)  # login_required
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/engine/api/trades/active/')
+        [trade] = response.json()['trades']
+        self.assertEqual((trade['symbol'], trade['contract_id'], trade['amount']), ('R_25', 7, 2.0))
+
+        response = await self.async_client.get('/engine/trades/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['completed']), 2)
+
+    async def test_balance_awaits_connector_and_caches(self):
+        from unittest import mock
+        from connectors.deriv_client import DerivClient
+        from trading_bot.models import DerivAPIConfig
+
+        await DerivAPIConfig.objects.acreate(user=self.user, api_token='token-demo', is_demo=True, is_active=True)
+        client = DerivClient(api_token='token-demo', is_demo=True, app_id='1089')
+        client._connector = FakeAsyncConnector()
+        with mock.patch('connectors.deriv_client.get_deriv_client', return_value=client):
+            first = (await self.async_client.get('/engine/balance/')).json()
+            second = (await self.async_client.get('/engine/balance/')).json()
+        self.assertTrue(first['success'])
+        self.assertEqual((first['balance'], first['account_type']), (125.5, 'demo'))
+        self.assertEqual(second['balance'], 125.5)
+        # La segunda respuesta sale del caché del cliente: una sola petición a Deriv
+        self.assertEqual(client._connector.requests, [{'balance': 1}])
+
+
+class FakeBalanceConnector:
+    """Conector con un stream `balance`; el test empuja los cambios"""
+    connected = True
+    balance_stream = None
+
+    def __init__(self, balance=100.0):
+        self.callback = None
+        self.stream_socket_up = True  # Socket del pool que lleva el stream
+        self.forgotten = []
+        self.requests = []
+        self.first = {'msg_type': 'balance', 'subscription': {'id': 'bal-1'},
+                      'balance': {'balance': balance, 'currency': 'USD', 'loginid': 'CR123'}}
+
+    def subscribe(self, payload, callback):
+        from concurrent.futures import Future
+        self.callback = callback
+        callback(self.first)
+        future = Future()
+        future.set_result(self.first)
+        return future
+
+    def push(self, balance):
+        self.callback({'msg_type': 'balance', 'subscription': {'id': 'bal-1'},
+                       'balance': {'balance': balance, 'currency': 'USD', 'loginid': 'CR123'}})
+
+    def forget(self, subscription_id):
+        self.forgotten.append(subscription_id)
+
+    def stream_connected(self, subscription_id):
+        return self.stream_socket_up and subscription_id == 'bal-1'
+
+    def request(self, payload, timeout=10.0):
+        self.requests.append(payload)
+        raise AssertionError('get_balance no debe consultar a Deriv con el stream activo')
+
+
+class BalanceServiceTests(TransactionTestCase):
+    # Los listeners publican desde el hilo del servicio
+    def tearDown(self):
+        from engine.services.balance_service import stop_balance_service
+        stop_balance_service()
+
+    def test_stream_serves_client_and_publishes_changes(self):
+        import time
+        from connectors.deriv_client import DerivClient
+        from engine.services.balance_service import get_balance_service, start_balance_service
+        from monitoring.models import TradesSnapshot
+
+        connector = FakeBalanceConnector()
+        service = start_balance_service(connector)
+        self.assertIs(get_balance_service(), service)
+        self.assertEqual(service.balance, Decimal('100.0'))
+
+        client = DerivClient(api_token='token', is_demo=False, app_id='1089')
+        client._connector = connector
+        info = client.get_balance()
+        self.assertEqual((info['balance'], info['account_type'], info['source']), (100.0, 'real', 'stream'))
+
+        seen = []
+        service.add_listener(seen.append)
+        buy_sent_at = time.time()
+        connector.push(97.25)
+        connector.push(97.25)  # Sin cambio: no se publica de nuevo
+        # El stream ya informó después de enviar esta compra: su balance_after está viejo
+        self.assertIsNone(service.record(Decimal('98.00'), sent_at=buy_sent_at))
+        self.assertEqual(service.balance, Decimal('97.25'))
+        service.record(Decimal('96.25'), sent_at=time.time())
+        deadline = time.monotonic() + 2
+        while (not seen or seen[-1].balance != Decimal('96.25')) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(seen[-1].source, 'buy')
+        self.assertEqual(client.get_balance()['balance'], 96.25)
+        # Versiones: 100 -> 97.25 -> 96.25
+        self.assertEqual(seen[-1].version, 3)
+        while TradesSnapshot.objects.filter(balance=Decimal('96.25')).count() == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(TradesSnapshot.objects.get().balance, Decimal('96.25'))
+        self.assertEqual(connector.requests, [])
+
+        # Otro socket del pool sigue conectado, pero no el que lleva la suscripción
+        connector.stream_socket_up = False
+        self.assertTrue(connector.connected)
+        self.assertIsNone(service.info())
+
+    def test_rejected_stream_falls_back_to_polling(self):
+        from engine.services.balance_service import get_balance_service, start_balance_service
+
+        connector = FakeBalanceConnector()
+        connector.first = {'msg_type': 'balance', 'error': {'code': 'AuthorizationRequired'}}
+        self.assertIsNone(start_balance_service(connector))
+        self.assertIsNone(get_balance_service())
+        self.assertIsNone(connector.balance_stream)
+
+
+class TickBusTests(SimpleTestCase):
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.TemporaryDirectory(prefix='tb-')
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_publisher_fans_out_ticks_in_order(self):
+        import threading
+        import time
+        from engine.services.tick_bus import TickBusPublisher, TickBusSubscriber
+
+        subscribers, received = [], []
+        done = threading.Event()
+        for _ in range(2):
+            subscriber = TickBusSubscriber(self.tmp.name)
+            seen = []
+            received.append(seen)
+
+            def on_tick(symbol, price, timestamp, seen=seen):
+                seen.append((symbol, price, timestamp))
+                if all(len(r) == 50 for r in received):
+                    done.set()
+
+            subscriber.add_tick_callback(on_tick)
+            subscriber.start()
+            self.addCleanup(subscriber.stop)
+            subscribers.append(subscriber)
+
+        publisher = TickBusPublisher(self.tmp.name)
+        self.addCleanup(publisher.close)
+        for i in range(50):
+            self.assertEqual(publisher.publish('R_10', 1700000000 + i, 100.0 + i), 2)
+            if i % 5 == 4:
+                # Ráfagas por debajo de net.unix.max_dgram_qlen (10 por defecto)
+                time.sleep(0.01)
+        self.assertTrue(done.wait(2))
+        for seen in received:
+            self.assertEqual([price for _, price, _ in seen], [100.0 + i for i in range(50)])
+            symbol, _, timestamp = seen[-1]
+            self.assertEqual((symbol, timestamp.timestamp()), ('R_10', 1700000049))
+        self.assertEqual([s.gaps for s in subscribers], [0, 0])
+        self.assertLess(subscribers[0].last_latency, 1.0)
+
+    def test_dead_subscribers_are_dropped_and_gaps_counted(self):
+        import socket
+        from engine.services.tick_bus import TickBusPublisher, TickBusSubscriber, encode_tick
+
+        # Socket huérfano de un proceso que murió sin limpiar
+        orphan = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        orphan.bind(f'{self.tmp.name}/sub-999-dead.sock')
+        orphan.close()
+        publisher = TickBusPublisher(self.tmp.name)
+        self.addCleanup(publisher.close)
+        self.assertEqual(publisher.publish('R_25', 1700000000, 1.5), 0)
+        self.assertEqual(publisher.subscribers, [])
+
+        subscriber = TickBusSubscriber(self.tmp.name)
+        subscriber._dispatch(1, 'R_25', 1700000000, 1.0, 0, 0)
+        subscriber._dispatch(4, 'R_25', 1700000001, 1.1, 0, 0)
+        self.assertEqual((subscriber.received, subscriber.gaps), (2, 2))
+        self.assertEqual(len(encode_tick(1, 'frxEURUSD', 1.0, 1.1)), 64)
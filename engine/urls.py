@@ -4,6 +4,7 @@ from .views import (
     get_balance, 
     get_trades,
     metrics,
+    prometheus_metrics,
     dashboard,
     capital_config, 
     trading_config_api,
@@ -29,6 +30,7 @@ urlpatterns = [
     path('balance/', get_balance, name='balance'),
     path('trades/', get_trades, name='trades'),
     path('metrics/', metrics, name='metrics'),
+    path('metrics/prometheus/', prometheus_metrics, name='prometheus-metrics'),
     path('capital-config/', capital_config, name='capital-config'),
     path('trading-config-api/', trading_config_api, name='trading-config-api'),
     path('quick-controls-api/', quick_controls_api, name='quick-controls-api'),
@@ -9,10 +9,13 @@ from engine.services.backtester import run_backtest
 from learning.models import PolicyState
 from monitoring.models import OrderAudit
 from monitoring.metrics import hash_payload, record_order, update_pnl_metrics, get_metrics
+from prometheus_client import CONTENT_TYPE_LATEST
 import time
 import json
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from asgiref.sync import sync_to_async
 
 
 @api_view(['GET'])
@@ -26,264 +29,46 @@ def dashboard(request):
     return render(request, 'dashboard_precios_realtime_v2.html')
 
 
-@api_view(['GET'])
-def get_trades(request):
-    """Obtener operaciones activas y finalizadas"""
-    try:
-        from datetime import timedelta
-        from django.utils import timezone
-        from django.db import DatabaseError
-        
-        # Historial persistente desde la BD (no limitar a 30 minutos)
-        # Mostrar las últimas 200 operaciones, incluyendo finalizadas antiguas
-        # Incluir TODOS los trades sin filtrar por estado
-        # Usar list() para evaluar el QuerySet y obtener todos los resultados
-        try:
-            trades = list(OrderAudit.objects.all().order_by('-timestamp')[:200])
-        except DatabaseError as db_error:
-            # Si la BD está corrupta, retornar respuesta vacía en lugar de caer
-            import logging
-            logger = logging.getLogger('trading_loop')
-            logger.error(f"❌ Error de base de datos al obtener trades: {db_error}")
-            return JsonResponse({
-                'success': False,
-                'error': 'Error de base de datos. Por favor, ejecuta el script de reparación.',
-                'active': [],
-                'completed': [],
-                'metrics': {
-                    'total_pnl': 0,
-                    'win_rate': 0,
-                    'win_rate_pct': 0,
-                    'drawdown_pct': 0,
-                    'losing_streak': 0,
-                    'total_trades': 0,
-                    'active_trades': 0,
-                    'pause_active': False,
-                    'pause_allowed_symbol': None
-                }
-            }, status=500)
-        
-        # Debug: mostrar cantidad de trades encontrados
-        print(f"📊 Total trades encontrados: {len(trades)}")
-        
-        active = []
-        completed = []
-        
-        for trade in trades:
-            # Obtener monto/stake REAL del trade (prioridad al monto final usado)
-            amount = None
-            
-            # 1. Primero intentar desde response_payload['amount'] (monto REAL usado después de ajustes)
-            if trade.response_payload:
-                amount = trade.response_payload.get('amount')
-                if amount:
-                    amount = float(amount)
-            
-            # 2. Si no está en response_payload, usar size (campo directo del modelo)
-            if not amount and trade.size:
-                amount = float(trade.size)
-            
-            # 3. Si aún no tenemos monto, intentar desde request_payload
-            if not amount and trade.request_payload:
-                # Intentar obtener desde position_sizing (monto calculado, puede diferir del real)
-                position_sizing = trade.request_payload.get('position_sizing', {})
-                if position_sizing:
-                    amount = position_sizing.get('risk_amount') or position_sizing.get('amount')
-                    if amount:
-                        amount = float(amount)
-                # Si no está en position_sizing, buscar en el request directamente
-                if not amount:
-                    amount = trade.request_payload.get('amount') or trade.request_payload.get('stake')
-                    if amount:
-                        amount = float(amount)
-            
-            # Si aún no tenemos monto, usar 0.0 (no debería pasar)
-            if not amount:
-                amount = 0.0
-            
-            # Extraer contract_id del payload si existe
-            contract_id = None
-            try:
-                if trade.response_payload and isinstance(trade.response_payload, dict):
-                    contract_id = (
-                        trade.response_payload.get('order_id') or
-                        trade.response_payload.get('contract_id') or
-                        (trade.response_payload.get('buy', {}).get('contract_id') if isinstance(trade.response_payload.get('buy'), dict) else None)
-                    )
-            except Exception:
-                contract_id = None
+@require_GET
+async def get_trades(request):
+    """Obtener operaciones activas y finalizadas (read-model precalculado, con ETag)"""
+    from django.conf import settings
+    from django.db import DatabaseError
+    from django.utils.http import parse_etags
+    from engine.services.trades_read_model import EMPTY_METRICS, get_trades_snapshot
 
-            # Extraer confianza (0-1) y convertir a porcentaje (0-100)
-            confidence_pct = None
-            try:
-                # Preferir la confianza guardada en position_sizing
-                if trade.request_payload and isinstance(trade.request_payload, dict):
-                    pos_sizing = trade.request_payload.get('position_sizing') or {}
-                    conf_val = pos_sizing.get('confidence')
-                    if conf_val is None:
-                        # Alternativa: confianza del propio signal (estrategia estadística)
-                        conf_val = trade.request_payload.get('confidence')
-                    if conf_val is not None:
-                        confidence_pct = float(conf_val) * 100.0 if float(conf_val) <= 1.0 else float(conf_val)
-            except Exception:
-                confidence_pct = None
-
-            # Extraer estrategia del request_payload
-            strategy_name = None
-            try:
-                internal_name = trade.request_payload.get('strategy')
-                # Fallback heurístico si 'strategy' no está presente en el payload
-                if not internal_name:
-                    if 'z_score' in trade.request_payload or 'signal_type' in trade.request_payload:
-                        internal_name = 'statistical_hybrid'
-                    elif 'ema200' in trade.request_payload or 'recent_high' in trade.request_payload:
-                        internal_name = 'ema200_extrema'
-                    elif 'force_pct' in trade.request_payload:
-                        internal_name = 'tick_based'
-                    elif 'fatigue_count' in trade.request_payload or 'momentum_extreme' in trade.request_payload or 'divergence_score' in trade.request_payload:
-                        internal_name = 'momentum_reversal'
-                # Mapear a nombres cortos y dicientes
-                if internal_name == 'statistical_hybrid':
-                    strategy_name = 'Híbrida'
-                elif internal_name == 'ema200_extrema':
-                    strategy_name = 'EMA100'
-                elif internal_name == 'tick_based':
-                    strategy_name = 'Ticks'
-                elif internal_name == 'momentum_reversal':
-                    strategy_name = 'Reversión'
-                else:
-                    strategy_name = 'Desconocida'
-            except Exception:
-                strategy_name = 'Desconocida'
-            
-            trade_data = {
-                'id': trade.id,
-                'symbol': trade.symbol,
-                'direction': trade.action.upper(),
-                'price': float(trade.price) if trade.price else 0.0,
-                'timestamp': trade.timestamp.isoformat(),
-                'status': trade.status,
-                'amount': amount,  # Monto REAL usado en el trade
-                'pnl': float(trade.pnl) if trade.pnl else 0.0,  # P&L para operaciones finalizadas
-                'contract_id': contract_id,
-                'confidence_pct': confidence_pct,
-                'strategy': strategy_name
-            }
-            
-            # Mostrar como activo si está pending o active
-            # Mostrar como completado si está won, lost, rejected, o cualquier otro estado
-            if trade.status in ['pending', 'active']:
-                active.append(trade_data)
-            else:
-                # Incluir todos los estados finalizados: won, lost, rejected, expired, etc.
-                completed.append(trade_data)
-        
-        # Debug: mostrar cantidad de trades por categoría
-        print(f"📊 Trades activos: {len(active)}, Trades completados: {len(completed)}")
-        
-        # MÉTRICAS: Operaciones en las últimas 24 horas
-        since_metrics = timezone.now() - timedelta(hours=24)
-        try:
-            recent_trades = OrderAudit.objects.filter(timestamp__gte=since_metrics)
-        except DatabaseError as db_error:
-            import logging
-            logger = logging.getLogger('trading_loop')
-            logger.error(f"❌ Error de base de datos al obtener recent_trades: {db_error}")
-            recent_trades = []
-        
-        total_trades = recent_trades.count()
-        won_trades = recent_trades.filter(status='won').count()
-        lost_trades = recent_trades.filter(status='lost').count()
-        active_trades = recent_trades.filter(status__in=['pending', 'active']).count()
-        
-        # P&L total de las últimas 24 horas
-        total_pnl = sum(float(t.pnl or 0) for t in recent_trades)
-        
-        # Win rate general (últimas 24 horas)
-        win_rate = (won_trades / (won_trades + lost_trades)) * 100 if (won_trades + lost_trades) > 0 else 0
-        
-        # Calcular winrate de últimos 20 trades (más preciso para control de pérdidas)
-        try:
-            try:
-                recent_20_trades = list(OrderAudit.objects.filter(
-                    accepted=True,
-                    status__in=['won', 'lost']
-                ).order_by('-timestamp')[:20])
-            except DatabaseError as db_error:
-                import logging
-                logger = logging.getLogger('trading_loop')
-                logger.error(f"❌ Error de base de datos al obtener recent_20_trades: {db_error}")
-                recent_20_trades = []
-            
-            recent_20_total = len(recent_20_trades)
-            recent_20_won = sum(1 for t in recent_20_trades if t.status == 'won')
-            win_rate_recent = (recent_20_won / recent_20_total) if recent_20_total > 0 else (win_rate / 100)
-        except Exception:
-            win_rate_recent = win_rate / 100  # Fallback a winrate general
-        
-        # Calcular drawdown y estado de pausa para métricas
-        drawdown_pct = 0.0
-        pause_active = False
-        pause_allowed_symbol = None
-        losing_streak = 0
-        try:
-            from engine.services.adaptive_filter_manager import AdaptiveFilterManager
-            from decimal import Decimal
-            # Obtener balance actual para calcular drawdown correctamente
-            try:
-                from connectors.deriv_client import DerivClient
-                from trading_bot.models import DerivAPIConfig
-                api_config = DerivAPIConfig.objects.filter(is_active=True).only('api_token', 'is_demo', 'app_id').first()
-                if api_config:
-                    client = DerivClient(api_token=api_config.api_token, is_demo=api_config.is_demo, app_id=api_config.app_id)
-                    balance_info = client.get_balance()
-                    current_balance = Decimal(str(balance_info.get('balance', 0) if isinstance(balance_info, dict) else balance_info))
-                else:
-                    current_balance = Decimal('0')
-            except:
-                current_balance = Decimal('0')
-            
-            adaptive_manager = AdaptiveFilterManager()
-            metrics_obj = adaptive_manager.calculate_metrics(current_balance)
-            drawdown_pct = metrics_obj.drawdown_pct
-            losing_streak = metrics_obj.losing_streak
-            # Evaluar pausa y símbolo permitido
-            try:
-                top_list = adaptive_manager.get_top_symbols_by_performance(lookback=20, top_n=1)
-                best_symbol = top_list[0][0] if top_list else None
-            except Exception:
-                best_symbol = None
-            pause_info = adaptive_manager.should_pause_trading(metrics_obj, best_symbol=best_symbol)
-            pause_active = bool(pause_info.get('should_pause'))
-            pause_allowed_symbol = pause_info.get('allowed_symbol')
-        except Exception as e:
-            print(f"Error calculando drawdown: {e}")
-            drawdown_pct = 0.0
-            pause_active = False
-            pause_allowed_symbol = None
-        
+    try:
+        snapshot = await sync_to_async(get_trades_snapshot)(max_age=getattr(settings, 'TRADES_SNAPSHOT_MAX_AGE', 30))
+    except DatabaseError as db_error:
+        # Si la BD está corrupta, retornar respuesta vacía en lugar de caer
+        import logging
+        logging.getLogger('trading_loop').error(f"❌ Error de base de datos al obtener trades: {db_error}")
         return JsonResponse({
-            'success': True,
-            'active': active,
-            'completed': completed,
-            'metrics': {
-                'total_pnl': total_pnl,
-                'win_rate': win_rate_recent,  # Winrate últimos 20 trades (decimal 0-1)
-                'win_rate_pct': win_rate_recent * 100,  # Mantener porcentaje para display
-                'drawdown_pct': drawdown_pct,
-                'losing_streak': losing_streak,
-                'total_trades': total_trades,
-                'active_trades': active_trades,
-                'pause_active': pause_active,
-                'pause_allowed_symbol': pause_allowed_symbol
-            }
-        })
+            'success': False,
+            'error': 'Error de base de datos. Por favor, ejecuta el script de reparación.',
+            'active': [],
+            'completed': [],
+            'metrics': EMPTY_METRICS,
+        }, status=500)
     except Exception as e:
         return JsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
 
+    etag = f'"{snapshot.etag}"'
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (etag in parse_etags(if_none_match) or '*' in parse_etags(if_none_match)):
+        response = HttpResponse(status=304)
+    else:
+        if 'payload' in snapshot.get_deferred_fields():
+            await snapshot.arefresh_from_db(fields=['payload'])
+        response = HttpResponse(snapshot.payload, content_type='application/json')
+    response['ETag'] = etag
+    # El navegador revalida siempre: con 304 reutiliza su copia sin transferir el cuerpo
+    response['Cache-Control'] = 'no-cache'
+    return response
+
 
 @login_required
 @csrf_exempt
@@ -322,65 +107,78 @@ def diagnose_stuck_trades_api(request):
         }, status=500)
 
 
-@api_view(['GET'])
-def get_balance(request):
-    """Obtener balance de Deriv con manejo de rate limiting"""
+def _active_api_config():
+    """(api_token, is_demo, app_id) de la DerivAPIConfig activa, o JsonResponse de error"""
+    from trading_bot.models import DerivAPIConfig
+
+    api_token = None
+    is_demo = False  # Default a REAL (más seguro)
+    app_id = '1089'
     try:
-        from connectors.deriv_client import DerivClient
-        from trading_bot.models import DerivAPIConfig
-        
-        # Obtener configuración activa (usar only() para evitar campos scope_*)
-        api_token = None
-        is_demo = False  # Default a REAL (más seguro)
-        app_id = '1089'
-        
+        # Obtener configuración activa sin filtrar por usuario específico
+        # Usar only() para evitar campos scope_* que no existen
+        config = DerivAPIConfig.objects.filter(is_active=True).only('api_token', 'is_demo', 'app_id').first()
+        if config:
+            api_token = config.api_token
+            is_demo = config.is_demo
+            app_id = config.app_id
+            print(f"✅ Configuración encontrada: is_demo={is_demo}, app_id={app_id}, token={api_token[:10] if api_token else 'None'}...")
+        else:
+            print("⚠️ No se encontró configuración activa de DerivAPIConfig")
+            return JsonResponse({
+                'success': False,
+                'error': 'No hay configuración de API activa',
+                'balance': 0.0,
+                'currency': 'USD',
+                'account_type': 'unknown'
+            }, status=500)
+    except Exception as e:
+        print(f"⚠️ Error al obtener configuración en get_balance: {e}")
+        import traceback
+        traceback.print_exc()
+        # Si hay error, intentar obtener de forma alternativa
         try:
-            # Obtener configuración activa sin filtrar por usuario específico
-            # Usar only() para evitar campos scope_* que no existen
-            config = DerivAPIConfig.objects.filter(is_active=True).only('api_token', 'is_demo', 'app_id').first()
-            if config:
-                api_token = config.api_token
-                is_demo = config.is_demo
-                app_id = config.app_id
-                print(f"✅ Configuración encontrada: is_demo={is_demo}, app_id={app_id}, token={api_token[:10] if api_token else 'None'}...")
-            else:
-                print("⚠️ No se encontró configuración activa de DerivAPIConfig")
-                return JsonResponse({
-                    'success': False,
-                    'error': 'No hay configuración de API activa',
-                    'balance': 0.0,
-                    'currency': 'USD',
-                    'account_type': 'unknown'
-                }, status=500)
-        except Exception as e:
-            print(f"⚠️ Error al obtener configuración en get_balance: {e}")
-            import traceback
-            traceback.print_exc()
-            # Si hay error, intentar obtener de forma alternativa
-            try:
-                from django.db import connection
-                with connection.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT api_token, is_demo, app_id 
-                        FROM trading_bot_derivapiconfig 
-                        WHERE is_active = 1 
-                        LIMIT 1
-                    """)
-                    row = cursor.fetchone()
-                    if row:
-                        api_token = row[0] or ''
-                        is_demo = bool(row[1]) if row[1] is not None else False
-                        app_id = row[2] or '1089'
-                        print(f"✅ Configuración obtenida vía SQL: is_demo={is_demo}, app_id={app_id}")
-            except Exception as e2:
-                print(f"⚠️ Error al obtener configuración con SQL: {e2}")
-                return JsonResponse({
-                    'success': False,
-                    'error': f'Error obteniendo configuración: {str(e2)}',
-                    'balance': 0.0,
-                    'currency': 'USD',
-                    'account_type': 'unknown'
-                }, status=500)
+            from django.db import connection
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT api_token, is_demo, app_id 
+                    FROM trading_bot_derivapiconfig 
+                    WHERE is_active = 1 
+                    LIMIT 1
+                """)
+                row = cursor.fetchone()
+                if row:
+                    api_token = row[0] or ''
+                    is_demo = bool(row[1]) if row[1] is not None else False
+                    app_id = row[2] or '1089'
+                    print(f"✅ Configuración obtenida vía SQL: is_demo={is_demo}, app_id={app_id}")
+        except Exception as e2:
+            print(f"⚠️ Error al obtener configuración con SQL: {e2}")
+            return JsonResponse({
+                'success': False,
+                'error': f'Error obteniendo configuración: {str(e2)}',
+                'balance': 0.0,
+                'currency': 'USD',
+                'account_type': 'unknown'
+            }, status=500)
+    return api_token, is_demo, app_id
+
+
+@require_GET
+async def get_balance(request):
+    """
+    Obtener balance de Deriv con manejo de rate limiting
+
+    Vista async: la petición a Deriv se espera en el event loop (`aget_balance`),
+    sin ocupar un hilo del servidor mientras Deriv responde.
+    """
+    try:
+        from connectors.deriv_client import get_deriv_client
+
+        config = await sync_to_async(_active_api_config)()
+        if isinstance(config, HttpResponse):
+            return config
+        api_token, is_demo, app_id = config
         
         if not api_token:
             print("❌ No hay token de API disponible")
@@ -392,38 +190,16 @@ def get_balance(request):
                 'account_type': 'unknown'
             }, status=500)
         
-        # Reutilizar cliente compartido global para evitar múltiples conexiones
-        global _shared_deriv_client_web
-        try:
-            _shared_deriv_client_web
-        except NameError:
-            # Crear cliente compartido solo una vez
-            print("🔧 Creando nuevo cliente Deriv compartido")
-            _shared_deriv_client_web = DerivClient(api_token=api_token, is_demo=is_demo, app_id=app_id)
-        else:
-            # Actualizar configuración si cambió
-            if (_shared_deriv_client_web.api_token != api_token or 
-                _shared_deriv_client_web.is_demo != is_demo or
-                _shared_deriv_client_web.app_id != app_id):
-                print("🔧 Configuración cambió, recreando cliente")
-                # Cerrar conexión anterior si existe
-                try:
-                    if _shared_deriv_client_web.ws:
-                        _shared_deriv_client_web.ws.close()
-                except:
-                    pass
-                # Crear nuevo cliente con nueva configuración
-                _shared_deriv_client_web = DerivClient(api_token=api_token, is_demo=is_demo, app_id=app_id)
-        
-        client = _shared_deriv_client_web
+        # Cliente compartido del proceso; los sockets los mantiene el pool del conector
+        client = get_deriv_client(api_token=api_token, is_demo=is_demo, app_id=app_id)
         
         # Verificar estado de conexión antes de obtener balance
-        print(f"🔍 Estado del cliente: connected={client.connected}, ws={client.ws is not None}, ws_connected={client.ws.sock.connected if client.ws and client.ws.sock else False}")
+        print(f"🔍 Estado del cliente: connected={client.connected}")
         
-        # Si no está conectado, intentar autenticar
-        if not client.connected or not client.ws or not client.ws.sock or not client.ws.sock.connected:
+        # Si no está conectado, intentar autenticar (bloqueante: fuera del event loop)
+        if not client.connected:
             print("⚠️ Cliente no conectado, intentando autenticar...")
-            if not client.authenticate():
+            if not await sync_to_async(client.authenticate, thread_sensitive=False)():
                 print("❌ Fallo en autenticación")
                 return JsonResponse({
                     'success': False,
@@ -435,7 +211,7 @@ def get_balance(request):
                 }, status=500)
             print("✅ Autenticación exitosa")
         
-        balance_info = client.get_balance()
+        balance_info = await client.aget_balance()
         
         # Verificar si hay error en la respuesta
         if balance_info.get('error'):
@@ -482,10 +258,9 @@ def get_balance(request):
         traceback.print_exc()
         # Si hay error, intentar obtener del último trade
         try:
-            from monitoring.models import OrderAudit
-            last_trade = OrderAudit.objects.filter(
+            last_trade = await OrderAudit.objects.filter(
                 accepted=True
-            ).order_by('-timestamp').first()
+            ).order_by('-timestamp').afirst()
             if last_trade and last_trade.response_payload:
                 balance_after = last_trade.response_payload.get('balance_after')
                 if balance_after:
@@ -508,34 +283,34 @@ def get_balance(request):
         }, status=500)
 
 
-@api_view(['GET'])
-def metrics(request):
-    """Métricas en tiempo real del sistema"""
+@require_GET
+async def metrics(request):
+    """Métricas en tiempo real del sistema (últimas 24h en una sola consulta agregada)"""
     try:
         from datetime import timedelta
+        from django.db.models import Count, Q, Sum
         from django.utils import timezone
         
         # Operaciones en las últimas 24 horas
         since_metrics = timezone.now() - timedelta(hours=24)
-        recent_trades = OrderAudit.objects.filter(timestamp__gte=since_metrics)
-        
-        total_trades = recent_trades.count()
-        won_trades = recent_trades.filter(status='won').count()
-        lost_trades = recent_trades.filter(status='lost').count()
-        active_trades = recent_trades.filter(status__in=['pending', 'active']).count()
-        
-        # P&L total de las últimas 24 horas
-        total_pnl = sum(float(t.pnl or 0) for t in recent_trades)
+        totals = await OrderAudit.objects.filter(timestamp__gte=since_metrics).aaggregate(
+            total=Count('id'),
+            won=Count('id', filter=Q(status='won')),
+            lost=Count('id', filter=Q(status='lost')),
+            active=Count('id', filter=Q(status__in=['pending', 'active'])),
+            pnl=Sum('pnl'),
+        )
+        won_trades, lost_trades = totals['won'], totals['lost']
         
         # Win rate
         completed_trades = won_trades + lost_trades
         winrate = (won_trades / completed_trades) if completed_trades > 0 else 0
         
         return JsonResponse({
-            'pnl': total_pnl,
+            'pnl': float(totals['pnl'] or 0),
             'winrate': winrate,
-            'total_trades': total_trades,
-            'active_trades': active_trades,
+            'total_trades': totals['total'],
+            'active_trades': totals['active'],
             'won_trades': won_trades,
             'lost_trades': lost_trades
         })
@@ -551,6 +326,11 @@ def metrics(request):
         }, status=500)
 
 
+def prometheus_metrics(request):
+    """Registro Prometheus de este proceso (formato de texto para scraping)"""
+    return HttpResponse(get_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+
 @login_required
 def capital_config(request):
     """Vista para mostrar y editar configuración de capital"""
@@ -1225,10 +1005,9 @@ def trading_loop_control_api(request):
         }, status=500)
 
 @login_required
-def active_trades_api(request):
+async def active_trades_api(request):
     """API para obtener trades activos/pendientes"""
     try:
-        from monitoring.models import OrderAudit
         from django.utils import timezone
         
         # Obtener trades activos/pendientes (incluir también 'rejected' si se muestran como activos temporalmente)
@@ -1237,7 +1016,8 @@ def active_trades_api(request):
         ).order_by('-timestamp')[:100]  # Aumentar límite para mostrar más trades
         
         trades_data = []
-        for trade in active_trades:
+        now = timezone.now()
+        async for trade in active_trades:
             contract_id = None
             if trade.request_payload:
                 contract_id = trade.request_payload.get('contract_id') or trade.request_payload.get('order_id')
@@ -1251,7 +1031,7 @@ def active_trades_api(request):
                 'timestamp': trade.timestamp.isoformat(),
                 'status': trade.status,
                 'contract_id': contract_id,
-                'hours_ago': round((timezone.now() - trade.timestamp).total_seconds() / 3600, 2)
+                'hours_ago': round((now - trade.timestamp).total_seconds() / 3600, 2)
             })
         
         return JsonResponse({
@@ -1,76 +1,111 @@
 from __future__ import annotations
 
-from typing import Iterable, List, Optional, Dict, Tuple
+from typing import Iterable, List, Optional, Dict, Tuple, Union
 from dataclasses import dataclass
 import math
 import statistics
 
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
-def ema(values: Iterable[float], period: int) -> List[float]:
-    values = list(values)
-    if period <= 1 or not values:
-        return values
+
+# Los indicadores aceptan una serie (1-D) o una matriz con una fila por símbolo (2-D)
+# y devuelven arrays con la misma forma que la entrada.
+ArrayLike = Union[Iterable[float], np.ndarray]
+
+
+def _as_rows(values: ArrayLike) -> Tuple[np.ndarray, bool]:
+    """Convertir la entrada a matriz float64 (filas = símbolos); indica si era 1-D"""
+    arr = np.asarray(values if isinstance(values, np.ndarray) else list(values), dtype=np.float64)
+    if arr.ndim == 1:
+        return arr.reshape(1, -1), True
+    return arr, False
+
+
+def _restore(rows: np.ndarray, was_1d: bool) -> np.ndarray:
+    return rows[0] if was_1d else rows
+
+
+def _ema_rows(rows: np.ndarray, period: int) -> np.ndarray:
+    """
+    EMA por fila sembrada con el primer valor. La recurrencia es secuencial en el
+    tiempo, así que se vectoriza entre símbolos; con una sola fila se recorre en
+    floats de Python (mismas operaciones, sin el costo por elemento de NumPy).
+    """
     k = 2 / (period + 1)
-    out: List[float] = []
-    ema_val = values[0]
-    for v in values:
-        ema_val = v * k + ema_val * (1 - k)
-        out.append(ema_val)
+    out = np.empty_like(rows)
+    if rows.shape[1] == 0:
+        return out
+    if rows.shape[0] == 1:
+        ema_val = float(rows[0, 0])
+        values = []
+        for v in rows[0].tolist():
+            ema_val = v * k + ema_val * (1 - k)
+            values.append(ema_val)
+        out[0] = values
+        return out
+    ema_val = rows[:, 0].copy()
+    for t in range(rows.shape[1]):
+        ema_val = rows[:, t] * k + ema_val * (1 - k)
+        out[:, t] = ema_val
     return out
 
 
-def sma(values: Iterable[float], period: int) -> List[float]:
-    values = list(values)
-    if period <= 1:
-        return values
-    out: List[float] = []
-    window_sum = 0.0
-    for i, v in enumerate(values):
-        window_sum += v
-        if i >= period:
-            window_sum -= values[i - period]
-        if i >= period - 1:
-            out.append(window_sum / period)
-        else:
-            out.append(window_sum / (i + 1))
+def _sma_rows(rows: np.ndarray, period: int) -> np.ndarray:
+    """SMA por fila; antes de completar la ventana promedia los valores disponibles"""
+    out = np.empty_like(rows)
+    n = rows.shape[1]
+    warm = min(period - 1, n)
+    if warm:
+        out[:, :warm] = np.cumsum(rows[:, :warm], axis=1) / np.arange(1, warm + 1)
+    if n >= period:
+        out[:, period - 1:] = sliding_window_view(rows, period, axis=1).sum(axis=2) / period
     return out
 
 
-def rsi(closes: Iterable[float], period: int = 14) -> List[float]:
-    closes = list(closes)
-    if len(closes) < 2:
-        return [0.0 for _ in closes]
-    gains: List[float] = [0.0]
-    losses: List[float] = [0.0]
-    for i in range(1, len(closes)):
-        diff = closes[i] - closes[i - 1]
-        gains.append(max(diff, 0.0))
-        losses.append(max(-diff, 0.0))
-    avg_gain = sma(gains, period)
-    avg_loss = sma(losses, period)
-    rsi_vals: List[float] = []
-    for g, l in zip(avg_gain, avg_loss):
-        if l == 0:
-            rsi_vals.append(100.0)
-        else:
-            rs = g / l
-            rsi_vals.append(100 - (100 / (1 + rs)))
-    return rsi_vals
+def ema(values: ArrayLike, period: int) -> np.ndarray:
+    rows, was_1d = _as_rows(values)
+    if period <= 1 or rows.size == 0:
+        return _restore(rows, was_1d)
+    return _restore(_ema_rows(rows, period), was_1d)
 
 
-def true_range(highs: Iterable[float], lows: Iterable[float], closes: Iterable[float]) -> List[float]:
-    highs = list(highs)
-    lows = list(lows)
-    closes = list(closes)
-    tr: List[float] = []
-    prev_close = closes[0] if closes else 0.0
-    for h, l, c in zip(highs, lows, closes):
-        tr.append(max(h - l, abs(h - prev_close), abs(l - prev_close)))
-        prev_close = c
-    return tr
+def sma(values: ArrayLike, period: int) -> np.ndarray:
+    rows, was_1d = _as_rows(values)
+    if period <= 1:
+        return _restore(rows, was_1d)
+    return _restore(_sma_rows(rows, period), was_1d)
 
 
-def atr(highs: Iterable[float], lows: Iterable[float], closes: Iterable[float], period: int = 14) -> List[float]:
+def rsi(closes: ArrayLike, period: int = 14) -> np.ndarray:
+    rows, was_1d = _as_rows(closes)
+    if rows.shape[1] < 2:
+        return _restore(np.zeros_like(rows), was_1d)
+    diff = np.diff(rows, axis=1)
+    zero = np.zeros((rows.shape[0], 1))
+    gains = np.concatenate([zero, np.maximum(diff, 0.0)], axis=1)
+    losses = np.concatenate([zero, np.maximum(-diff, 0.0)], axis=1)
+    if period > 1:
+        gains, losses = _sma_rows(gains, period), _sma_rows(losses, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.where(losses == 0, 100.0, 100 - (100 / (1 + gains / losses)))
+    return _restore(out, was_1d)
+
+
+def true_range(highs: ArrayLike, lows: ArrayLike, closes: ArrayLike) -> np.ndarray:
+    h, was_1d = _as_rows(highs)
+    l, _ = _as_rows(lows)
+    c, _ = _as_rows(closes)
+    n = min(h.shape[1], l.shape[1], c.shape[1])
+    h, l, c = h[:, :n], l[:, :n], c[:, :n]
+    if n == 0:
+        return _restore(np.zeros_like(h), was_1d)
+    prev_close = np.concatenate([c[:, :1], c[:, :-1]], axis=1)
+    tr = np.maximum(np.maximum(h - l, np.abs(h - prev_close)), np.abs(l - prev_close))
+    return _restore(tr, was_1d)
+
+
+def atr(highs: ArrayLike, lows: ArrayLike, closes: ArrayLike, period: int = 14) -> np.ndarray:
     tr = true_range(highs, lows, closes)
     return ema(tr, period)
 
@@ -135,12 +170,12 @@ def detect_engulfing(opens: Iterable[float], closes: Iterable[float]) -> Optiona
     return None
 
 
-def macd(closes: Iterable[float], fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> Dict[str, List[float]]:
+def macd(closes: ArrayLike, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> Dict[str, np.ndarray]:
     """
     Calcula MACD (Moving Average Convergence Divergence).
     
     Args:
-        closes: Lista de precios de cierre
+        closes: Precios de cierre (1-D) o matriz con una fila por símbolo (2-D)
         fast_period: Período de la EMA rápida (default: 12)
         slow_period: Período de la EMA lenta (default: 26)
         signal_period: Período de la línea de señal (default: 9)
@@ -151,41 +186,42 @@ def macd(closes: Iterable[float], fast_period: int = 12, slow_period: int = 26,
             - 'signal_line': Signal Line = EMA(MACD Line)
             - 'histogram': Histogram = MACD Line - Signal Line
     """
-    closes = list(closes)
+    rows, was_1d = _as_rows(closes)
     
-    if len(closes) < slow_period + signal_period:
+    if rows.shape[1] < slow_period + signal_period:
+        zeros = _restore(np.zeros_like(rows), was_1d)
         return {
-            'macd_line': [0.0] * len(closes),
-            'signal_line': [0.0] * len(closes),
-            'histogram': [0.0] * len(closes)
+            'macd_line': zeros,
+            'signal_line': zeros.copy(),
+            'histogram': zeros.copy()
         }
     
     # Calcular EMAs
-    ema_fast = ema(closes, fast_period)
-    ema_slow = ema(closes, slow_period)
+    ema_fast = ema(rows, fast_period)
+    ema_slow = ema(rows, slow_period)
     
     # MACD Line
-    macd_line = [fast - slow for fast, slow in zip(ema_fast, ema_slow)]
+    macd_line = ema_fast - ema_slow
     
     # Signal Line (EMA del MACD)
     signal_line = ema(macd_line, signal_period)
     
     # Histogram
-    histogram = [m - s for m, s in zip(macd_line, signal_line)]
+    histogram = macd_line - signal_line
     
     return {
-        'macd_line': macd_line,
-        'signal_line': signal_line,
-        'histogram': histogram
+        'macd_line': _restore(macd_line, was_1d),
+        'signal_line': _restore(signal_line, was_1d),
+        'histogram': _restore(histogram, was_1d)
     }
 
 
-def bollinger_bands(closes: Iterable[float], period: int = 20, num_std: float = 2.0) -> Dict[str, List[float]]:
+def bollinger_bands(closes: ArrayLike, period: int = 20, num_std: float = 2.0) -> Dict[str, np.ndarray]:
     """
     Calcula las Bandas de Bollinger.
     
     Args:
-        closes: Lista de precios de cierre
+        closes: Precios de cierre (1-D) o matriz con una fila por símbolo (2-D)
         period: Período para el cálculo de la SMA (default: 20)
         num_std: Número de desviaciones estándar (default: 2.0)
         
@@ -195,52 +231,48 @@ def bollinger_bands(closes: Iterable[float], period: int = 20, num_std: float =
             - 'middle': Banda media (SMA)
             - 'lower': Banda inferior
     """
-    closes = list(closes)
+    rows, was_1d = _as_rows(closes)
     
-    if len(closes) < period:
+    if rows.shape[1] < period:
+        zeros = _restore(np.zeros_like(rows), was_1d)
         return {
-            'upper': [0.0] * len(closes),
-            'middle': [0.0] * len(closes),
-            'lower': [0.0] * len(closes)
+            'upper': zeros,
+            'middle': zeros.copy(),
+            'lower': zeros.copy()
         }
     
     # Calcular SMA (middle band)
-    middle = sma(closes, period)
+    middle = sma(rows, period)
     
-    # Calcular desviación estándar
-    upper = []
-    lower = []
+    # Antes de completar la ventana las bandas son el propio cierre
+    upper = rows.copy()
+    lower = rows.copy()
     
-    for i in range(len(closes)):
-        if i < period - 1:
-            upper.append(closes[i])
-            lower.append(closes[i])
-        else:
-            # Calcular desviación estándar de los últimos 'period' valores
-            window = closes[i - period + 1:i + 1]
-            mean = sum(window) / len(window)
-            variance = sum((x - mean) ** 2 for x in window) / len(window)
-            std_dev = math.sqrt(variance)
-            
-            upper.append(middle[i] + (num_std * std_dev))
-            lower.append(middle[i] - (num_std * std_dev))
+    # Desviación estándar poblacional de cada ventana de 'period' valores
+    windows = sliding_window_view(rows, period, axis=1)
+    mean = windows.sum(axis=2) / period
+    variance = ((windows - mean[..., None]) ** 2).sum(axis=2) / period
+    std_dev = np.sqrt(variance)
+    
+    upper[:, period - 1:] = middle[:, period - 1:] + (num_std * std_dev)
+    lower[:, period - 1:] = middle[:, period - 1:] - (num_std * std_dev)
     
     return {
-        'upper': upper,
-        'middle': middle,
-        'lower': lower
+        'upper': _restore(upper, was_1d),
+        'middle': _restore(middle, was_1d),
+        'lower': _restore(lower, was_1d)
     }
 
 
-def stochastic(highs: Iterable[float], lows: Iterable[float], closes: Iterable[float], 
-               k_period: int = 14, d_period: int = 3) -> Dict[str, List[float]]:
+def stochastic(highs: ArrayLike, lows: ArrayLike, closes: ArrayLike, 
+               k_period: int = 14, d_period: int = 3) -> Dict[str, np.ndarray]:
     """
     Calcula el Oscilador Estocástico (%K y %D).
     
     Args:
-        highs: Lista de precios máximos
-        lows: Lista de precios mínimos
-        closes: Lista de precios de cierre
+        highs: Precios máximos (1-D) o matriz con una fila por símbolo (2-D)
+        lows: Precios mínimos, misma forma que highs
+        closes: Precios de cierre, misma forma que highs
         k_period: Período para %K (default: 14)
         d_period: Período para %D (default: 3)
         
@@ -249,41 +281,36 @@ def stochastic(highs: Iterable[float], lows: Iterable[float], closes: Iterable[f
             - 'k_percent': %K
             - 'd_percent': %D
     """
-    highs = list(highs)
-    lows = list(lows)
-    closes = list(closes)
+    h, was_1d = _as_rows(highs)
+    l, _ = _as_rows(lows)
+    c, _ = _as_rows(closes)
     
-    if len(highs) < k_period or len(lows) < k_period or len(closes) < k_period:
+    if h.shape[1] < k_period or l.shape[1] < k_period or c.shape[1] < k_period:
+        zeros = _restore(np.zeros_like(c), was_1d)
         return {
-            'k_percent': [0.0] * len(closes),
-            'd_percent': [0.0] * len(closes)
+            'k_percent': zeros,
+            'd_percent': zeros.copy()
         }
     
-    k_percent = []
+    n = c.shape[1]
+    k_percent = np.full_like(c, 50.0)  # Valor neutral hasta completar la ventana
     
-    for i in range(len(closes)):
-        if i < k_period - 1:
-            k_percent.append(50.0)  # Valor neutral
-        else:
-            # Encontrar máximo y mínimo en la ventana
-            window_highs = highs[i - k_period + 1:i + 1]
-            window_lows = lows[i - k_period + 1:i + 1]
-            
-            highest_high = max(window_highs)
-            lowest_low = min(window_lows)
-            
-            if highest_high == lowest_low:
-                k_percent.append(50.0)  # Evitar división por cero
-            else:
-                k_pct = ((closes[i] - lowest_low) / (highest_high - lowest_low)) * 100
-                k_percent.append(k_pct)
+    # Máximo y mínimo en cada ventana
+    highest_high = sliding_window_view(h[:, :n], k_period, axis=1).max(axis=2)
+    lowest_low = sliding_window_view(l[:, :n], k_period, axis=1).min(axis=2)
+    price_range = highest_high - lowest_low
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k_window = ((c[:, k_period - 1:] - lowest_low) / price_range) * 100
+    # Evitar división por cero
+    k_percent[:, k_period - 1:] = np.where(price_range == 0, 50.0, k_window)
     
     # Calcular %D (SMA de %K)
     d_percent = sma(k_percent, d_period)
     
     return {
-        'k_percent': k_percent,
-        'd_percent': d_percent
+        'k_percent': _restore(k_percent, was_1d),
+        'd_percent': _restore(d_percent, was_1d)
     }
 
 
@@ -0,0 +1,459 @@
+"""
+Feed compartido del dashboard en tiempo real
+Un único `DashboardHub` por proceso escucha el grupo `trading_updates`, construye
+un snapshot por evento (agrupando ráfagas) y reparte a cada WebSocket solo lo que
+cambió respecto al snapshot anterior. El costo por evento es una consulta de
+snapshot + O(cambios) por cliente, en vez de todas las consultas por cliente.
+
+El mismo canal lleva también el read-model de operaciones y el balance, así el
+dashboard no sondea /engine/trades/ ni /engine/balance/ mientras el socket esté
+abierto. Las escrituras de OrderAudit y el trading loop avisan con `notify_dashboard()`.
+"""
+import asyncio
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from channels.db import database_sync_to_async
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from engine.services.trades_read_model import get_trades_snapshot
+from market.models import Tick
+from monitoring.models import OrderAudit
+
+logger = logging.getLogger(__name__)
+
+TRADING_GROUP = 'trading_updates'
+
+# Instrumentos cuyo último tick se publica en el dashboard
+DASHBOARD_SYMBOLS = [
+    # Forex
+    'frxEURUSD', 'frxGBPUSD', 'frxUSDJPY', 'frxUSDCHF', 'frxAUDUSD',
+    # Commodities
+    'frxXAUUSD', 'frxXAGUSD',
+    # Índices sintéticos
+    'R_10', 'R_25', 'R_50', 'BOOM1000', 'CRASH1000',
+    # Crypto
+    'cryBTCUSD', 'cryETHUSD',
+]
+
+
+def _active_orders() -> Dict[int, Dict[str, Any]]:
+    """Órdenes activas por id (sin tiempo transcurrido: se calcula al enviar)"""
+    orders = {}
+    for order in OrderAudit.objects.filter(status='active').order_by('timestamp'):
+        orders[order.id] = {
+            'id': order.id,
+            'symbol': order.symbol,
+            'action': order.action,
+            'entry_price': float(order.price or 0),
+            'stop_loss': float(order.stop_loss or 0),
+            'take_profit': float(order.take_profit or 0),
+            'timestamp': order.timestamp.isoformat(),
+        }
+    return orders
+
+
+def _recent_closed(limit: int = 10) -> List[Dict[str, Any]]:
+    orders = OrderAudit.objects.filter(status__in=['won', 'lost']).order_by('-timestamp')[:limit]
+    return [{
+        'id': order.id,
+        'symbol': order.symbol,
+        'action': order.action,
+        'entry_price': float(order.price or 0),
+        'exit_price': float(order.exit_price or 0),
+        'pnl': float(order.pnl or 0),
+        'status': order.status,
+        'timestamp': order.timestamp.isoformat(),
+    } for order in orders]
+
+
+def _metrics() -> Dict[str, Any]:
+    """Métricas de las últimas 24 horas en una sola consulta agregada"""
+    since = timezone.now() - timedelta(hours=24)
+    totals = OrderAudit.objects.filter(timestamp__gte=since).aggregate(
+        total=Count('id'),
+        won=Count('id', filter=Q(status='won')),
+        lost=Count('id', filter=Q(status='lost')),
+        active=Count('id', filter=Q(status__in=['pending', 'active'])),
+        pnl=Sum('pnl'),
+    )
+    won, lost = totals['won'], totals['lost']
+    return {
+        'total_trades': totals['total'],
+        'won_trades': won,
+        'lost_trades': lost,
+        'active_trades': totals['active'],
+        'total_pnl': float(totals['pnl'] or 0),
+        'win_rate': (won / (won + lost)) * 100 if (won + lost) > 0 else 0,
+    }
+
+
+def _latest_ticks(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    ticks = {}
+    for symbol in symbols:
+        tick = Tick.objects.filter(symbol=symbol).order_by('-timestamp').first()
+        if tick:
+            ticks[symbol] = {
+                'symbol': tick.symbol,
+                'price': float(tick.price),
+                'timestamp': tick.timestamp.isoformat(),
+            }
+    return ticks
+
+
+def _trades_and_balance(previous: Optional[Dict[str, Any]]):
+    """
+    Read-model de /engine/trades/ y último balance conocido del trading loop
+
+    El payload solo se carga y decodifica si cambió su ETag respecto al snapshot anterior.
+    """
+    previous = previous or {}
+    try:
+        snapshot = get_trades_snapshot(max_age=getattr(settings, 'TRADES_SNAPSHOT_MAX_AGE', 30))
+    except Exception as e:
+        logger.warning(f"No se pudo leer el snapshot de trades para el dashboard: {e}")
+        return previous.get('trades'), previous.get('balance')
+    trades = previous.get('trades')
+    if trades is None or trades['etag'] != snapshot.etag:
+        trades = {'etag': snapshot.etag, 'data': json.loads(snapshot.payload)} if snapshot.etag else None
+    balance = None
+    if snapshot.balance is not None:
+        balance = {'balance': float(snapshot.balance), 'currency': 'USD'}
+    return trades, balance
+
+
+def build_snapshot(symbols: Optional[List[str]] = None,
+                   previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Estado completo del dashboard (compartido por todos los clientes del proceso)"""
+    trades, balance = _trades_and_balance(previous)
+    return {
+        'active_orders': _active_orders(),
+        'recent_closed': _recent_closed(),
+        'metrics': _metrics(),
+        'latest_ticks': _latest_ticks(symbols or DASHBOARD_SYMBOLS),
+        'trades': trades,
+        'balance': balance,
+    }
+
+
+def diff_snapshots(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Cambios de `old` a `new` (None si no hay ninguno)
+
+    Returns:
+        {'active_orders': {'upsert': {id: orden}, 'remove': [ids]},
+         'recent_closed': [...] (lista completa, solo si cambió),
+         'metrics': {...} (solo si cambió), 'latest_ticks': {símbolo: tick} (solo los que cambiaron),
+         'trades': {'etag', 'data'} (si cambió el ETag), 'balance': {...} (solo si cambió)}
+    """
+    old = old or {'active_orders': {}, 'recent_closed': None, 'metrics': None, 'latest_ticks': {}}
+    delta: Dict[str, Any] = {}
+
+    upsert = {order_id: order for order_id, order in new['active_orders'].items()
+              if old['active_orders'].get(order_id) != order}
+    remove = [order_id for order_id in old['active_orders'] if order_id not in new['active_orders']]
+    if upsert or remove:
+        delta['active_orders'] = {'upsert': upsert, 'remove': remove}
+    if new['recent_closed'] != old['recent_closed']:
+        delta['recent_closed'] = new['recent_closed']
+    if new['metrics'] != old['metrics']:
+        delta['metrics'] = new['metrics']
+    ticks = {symbol: tick for symbol, tick in new['latest_ticks'].items()
+             if old['latest_ticks'].get(symbol) != tick}
+    if ticks:
+        delta['latest_ticks'] = ticks
+    new_trades, old_trades = new.get('trades'), old.get('trades')
+    if new_trades and (old_trades is None or old_trades['etag'] != new_trades['etag']):
+        delta['trades'] = new_trades
+    if new.get('balance') and new['balance'] != old.get('balance'):
+        delta['balance'] = new['balance']
+    return delta or None
+
+
+def merge_deltas(pending: Optional[Dict[str, Any]], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Combinar dos deltas consecutivos en uno equivalente (coalescing por cliente)"""
+    if not pending:
+        return delta
+    merged = dict(pending)
+    if 'active_orders' in delta:
+        previous = pending.get('active_orders', {'upsert': {}, 'remove': []})
+        upsert = dict(previous['upsert'])
+        remove = [order_id for order_id in previous['remove'] if order_id not in delta['active_orders']['upsert']]
+        upsert.update(delta['active_orders']['upsert'])
+        for order_id in delta['active_orders']['remove']:
+            upsert.pop(order_id, None)
+            if order_id not in remove:
+                remove.append(order_id)
+        merged['active_orders'] = {'upsert': upsert, 'remove': remove}
+    for key in ('recent_closed', 'metrics', 'trades', 'balance'):
+        if key in delta:
+            merged[key] = delta[key]
+    if 'latest_ticks' in delta:
+        merged['latest_ticks'] = {**pending.get('latest_ticks', {}), **delta['latest_ticks']}
+    return merged
+
+
+def _with_elapsed(orders, now) -> List[Dict[str, Any]]:
+    result = []
+    for order in orders:
+        started = datetime.fromisoformat(order['timestamp'])
+        result.append({**order, 'elapsed_seconds': int((now - started).total_seconds())})
+    return result
+
+
+def full_payload(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """Mensaje `trading_update` con el estado completo (formato histórico del consumer)"""
+    now = timezone.now()
+    return {
+        'active_orders': _with_elapsed(snapshot['active_orders'].values(), now),
+        'recent_closed': _with_elapsed(snapshot['recent_closed'], now),
+        'metrics': snapshot['metrics'],
+        'latest_ticks': snapshot['latest_ticks'],
+        'trades': snapshot['trades']['data'] if snapshot.get('trades') else None,
+        'balance': snapshot.get('balance'),
+        'timestamp': now.isoformat(),
+    }
+
+
+def delta_payload(delta: Dict[str, Any], version: int) -> Dict[str, Any]:
+    """Mensaje `trading_delta` (las claves ausentes no cambiaron)"""
+    now = timezone.now()
+    data: Dict[str, Any] = {'version': version, 'timestamp': now.isoformat()}
+    if 'active_orders' in delta:
+        data['active_orders'] = {
+            'upsert': _with_elapsed(delta['active_orders']['upsert'].values(), now),
+            'remove': delta['active_orders']['remove'],
+        }
+    if 'recent_closed' in delta:
+        data['recent_closed'] = _with_elapsed(delta['recent_closed'], now)
+    for key in ('metrics', 'latest_ticks', 'balance'):
+        if key in delta:
+            data[key] = delta[key]
+    if 'trades' in delta:
+        data['trades'] = delta['trades']['data']
+    return data
+
+
+class DashboardHub:
+    """
+    Snapshot compartido del dashboard para los consumers de este proceso.
+
+    - Se une una sola vez al grupo `trading_updates` con su propio canal.
+    - Cada evento marca el snapshot como sucio; tras `debounce` segundos se
+      reconstruye una vez y el delta se entrega a cada suscriptor con `push_delta()`.
+    - Sin channel layer compartido (InMemory, el default sin USE_REDIS) los avisos
+      de otros procesos (trading_loop) no llegan: el snapshot se reconstruye además
+      cada `local_poll_interval` segundos mientras haya clientes.
+    - Se detiene al desuscribirse el último cliente. Arranque y parada van
+      serializados: un connect durante la parada espera y vuelve a arrancar.
+    """
+
+    def __init__(self, debounce: float = 0.1, local_poll_interval: float = 2.0):
+        self.debounce = debounce
+        self.local_poll_interval = local_poll_interval
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.version = 0
+        self.builds = 0
+        self._subscribers = set()
+        # Primitivas asyncio ligadas al event loop del servidor: se crean en _start()
+        self._dirty: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._channel: Optional[str] = None
+        self._channel_layer = None
+        self._lifecycle: Optional[asyncio.Lock] = None
+        self._lifecycle_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _lifecycle_lock(self) -> asyncio.Lock:
+        """Lock de arranque/parada, ligado al event loop que lo usa"""
+        loop = asyncio.get_running_loop()
+        if self._lifecycle is None or self._lifecycle_loop is not loop:
+            self._lifecycle, self._lifecycle_loop = asyncio.Lock(), loop
+        return self._lifecycle
+
+    async def subscribe(self, subscriber) -> Dict[str, Any]:
+        """Registrar un cliente; retorna el snapshot actual para su envío inicial"""
+        self._subscribers.add(subscriber)
+        async with self._lifecycle_lock():
+            if not self._tasks:
+                await self._start()
+        if self.snapshot is None:
+            await self.refresh()
+        return self.snapshot
+
+    async def unsubscribe(self, subscriber) -> None:
+        self._subscribers.discard(subscriber)
+        async with self._lifecycle_lock():
+            # Se vuelve a comprobar con el lock: pudo suscribirse otro cliente mientras tanto
+            if not self._subscribers and self._tasks:
+                await self._stop()
+
+    def request_refresh(self) -> None:
+        """Marcar el snapshot como desactualizado (se reconstruye tras el debounce)"""
+        if self._dirty is not None:
+            self._dirty.set()
+
+    def request_refresh_threadsafe(self) -> bool:
+        """request_refresh() desde otro hilo (p.ej. una escritura del ORM). False si el hub no corre."""
+        loop, dirty = self._loop, self._dirty
+        if loop is None or dirty is None or not self._tasks or loop.is_closed():
+            return False
+        loop.call_soon_threadsafe(dirty.set)
+        return True
+
+    async def refresh(self) -> Optional[Dict[str, Any]]:
+        """Reconstruir el snapshot y repartir el delta. Retorna el delta (None si nada cambió)."""
+        async with self._lock:
+            snapshot = await database_sync_to_async(build_snapshot)(previous=self.snapshot)
+            self.builds += 1
+            previous, self.snapshot = self.snapshot, snapshot
+            if previous is None:
+                return None
+            delta = diff_snapshots(previous, snapshot)
+            if delta is None:
+                return None
+            self.version += 1
+            for subscriber in list(self._subscribers):
+                subscriber.push_delta(delta, self.version)
+            return delta
+
+    async def _start(self) -> None:
+        self._dirty = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._loop = asyncio.get_running_loop()
+        # La tarea se registra antes del primer await: otro connect simultáneo no arranca otra
+        self._tasks.append(asyncio.create_task(self._refresher()))
+        self._channel_layer = get_channel_layer()
+        if self._channel_layer is not None:
+            self._channel = await self._channel_layer.new_channel()
+            await self._channel_layer.group_add(TRADING_GROUP, self._channel)
+            self._tasks.append(asyncio.create_task(self._listen()))
+        if not is_shared_layer(self._channel_layer):
+            self._tasks.append(asyncio.create_task(self._poll_local()))
+
+    async def _stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._channel_layer is not None and self._channel:
+            await self._channel_layer.group_discard(TRADING_GROUP, self._channel)
+        self._channel = None
+        self._loop = None
+        self.snapshot = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                await self._channel_layer.receive(self._channel)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Error recibiendo del grupo {TRADING_GROUP}: {e}")
+                await asyncio.sleep(1)
+                continue
+            self._dirty.set()
+
+    async def _poll_local(self) -> None:
+        """Sin layer compartido: marcar el snapshot como sucio periódicamente"""
+        while True:
+            await asyncio.sleep(self.local_poll_interval)
+            self._dirty.set()
+
+    async def _refresher(self) -> None:
+        while True:
+            await self._dirty.wait()
+            # Agrupar ráfagas de eventos en un solo snapshot
+            await asyncio.sleep(self.debounce)
+            self._dirty.clear()
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error reconstruyendo el snapshot del dashboard: {e}")
+
+
+_hub: Optional[DashboardHub] = None
+
+
+def is_shared_layer(layer) -> bool:
+    """True si el channel layer comunica procesos (Redis); InMemory solo llega al propio"""
+    return layer is not None and not isinstance(layer, InMemoryChannelLayer)
+
+
+def get_dashboard_hub() -> DashboardHub:
+    """Hub del proceso (se crea al conectar el primer cliente)"""
+    global _hub
+    if _hub is None:
+        _hub = DashboardHub()
+    return _hub
+
+
+
+class DashboardNotifier:
+    """
+    Aviso `trading_update` al grupo desde código sync, sin bloquear al que escribe.
+
+    Un hilo con su propio event loop (y pool del channel layer) publica; las ráfagas
+    de avisos mientras publica se agrupan en un solo mensaje.
+    """
+
+    def __init__(self):
+        self._pending = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.sent = 0
+
+    def notify(self) -> None:
+        self._pending.set()
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='dashboard-notifier', daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                self._pending.wait()
+                self._pending.clear()
+                try:
+                    loop.run_until_complete(get_channel_layer().group_send(
+                        TRADING_GROUP, {'type': 'trading_update', 'message': {}}))
+                    self.sent += 1
+                except Exception as e:
+                    logger.warning(f"No se pudo avisar al grupo {TRADING_GROUP}: {e}")
+        finally:
+            loop.close()
+
+
+_notifier: Optional[DashboardNotifier] = None
+_notifier_lock = threading.Lock()
+
+
+def notify_dashboard() -> None:
+    """
+    Avisar a los dashboards de que cambiaron operaciones o balance
+
+    El hub de este proceso se marca directamente; con un channel layer compartido
+    (Redis) el aviso llega además a los hubs de los demás procesos (Daphne).
+    """
+    global _notifier
+    if _hub is not None:
+        _hub.request_refresh_threadsafe()
+    if not is_shared_layer(get_channel_layer()):
+        return
+    if _notifier is None:
+        with _notifier_lock:
+            if _notifier is None:
+                _notifier = DashboardNotifier()
+    _notifier.notify()
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0003_tick'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TickChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=32)),
+                ('day', models.DateField(db_index=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('first_timestamp', models.DateTimeField()),
+                ('last_timestamp', models.DateTimeField()),
+                ('data', models.BinaryField()),
+            ],
+            options={
+                'unique_together': {('symbol', 'day')},
+            },
+        ),
+    ]
@@ -83,3 +83,23 @@ class Tick(models.Model):
 
     def __str__(self) -> str:
         return f"{self.symbol} {self.price} @ {self.timestamp.isoformat()}"
+
+
+class TickChunk(models.Model):
+    """
+    Ticks archivados de un símbolo en un día UTC, en formato compacto:
+    pares (epoch, precio) float64 little-endian en un único blob.
+    Los ticks salen de `Tick` al superar la ventana caliente (ver tick_retention).
+    """
+    symbol = models.CharField(max_length=32)
+    day = models.DateField(db_index=True)
+    count = models.PositiveIntegerField(default=0)
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    data = models.BinaryField()
+
+    class Meta:
+        unique_together = ('symbol', 'day')
+
+    def __str__(self) -> str:
+        return f"TickChunk {self.symbol} {self.day.isoformat()} ({self.count} ticks)"
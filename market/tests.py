@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
 from django.utils import timezone
 from decimal import Decimal
 
@@ -6,6 +6,8 @@ from market.models import Candle, Zone, ZonePeriod, Timeframe
 from engine.services.zone_detector import compute_zones
 from engine.services.sweep_detector import detect_liquidity_sweep
 from engine.services.backtester import run_backtest
+from market import indicators
+from market.live_feed import diff_snapshots, get_dashboard_hub, merge_deltas
 
 
 class ZoneAndSweepTests(TestCase):
@@ -49,3 +51,192 @@ class ZoneAndSweepTests(TestCase):
         metrics = run_backtest(self.symbol, Timeframe.M5)
         self.assertIn('trades', metrics)
         self.assertIn('winrate', metrics)
+
+
+class VectorizedIndicatorTests(SimpleTestCase):
+    def setUp(self):
+        import numpy as np
+        rng = np.random.default_rng(5)
+        self.closes = 100 + np.cumsum(rng.uniform(-1, 1, size=(3, 120)), axis=1)
+        self.highs = self.closes + rng.uniform(0, 1, size=self.closes.shape)
+        self.lows = self.closes - rng.uniform(0, 1, size=self.closes.shape)
+
+    def test_known_values(self):
+        self.assertEqual(indicators.sma([1, 2, 3, 4, 5], 3).tolist(), [1.0, 1.5, 2.0, 3.0, 4.0])
+        self.assertEqual(indicators.ema([2, 2, 2], 5).tolist(), [2.0, 2.0, 2.0])
+        self.assertEqual(indicators.rsi([1, 2, 3, 4], 2).tolist(), [100.0] * 4)
+        self.assertEqual(indicators.true_range([3, 5], [1, 4], [2, 4.5]).tolist(), [2.0, 3.0])
+        flat = [5.0] * 20
+        self.assertEqual(indicators.stochastic(flat, flat, flat)['k_percent'].tolist(), [50.0] * 20)
+        self.assertEqual(indicators.macd([1.0] * 10)['macd_line'].tolist(), [0.0] * 10)
+
+    def test_batch_rows_match_single_series(self):
+        import numpy as np
+        batch = {
+            'ema': indicators.ema(self.closes, 20),
+            'rsi': indicators.rsi(self.closes),
+            'atr': indicators.atr(self.highs, self.lows, self.closes),
+            'macd': indicators.macd(self.closes)['histogram'],
+            'bb': indicators.bollinger_bands(self.closes)['upper'],
+            'stoch': indicators.stochastic(self.highs, self.lows, self.closes)['d_percent'],
+        }
+        for i in range(self.closes.shape[0]):
+            c, h, l = self.closes[i].tolist(), self.highs[i].tolist(), self.lows[i].tolist()
+            single = {
+                'ema': indicators.ema(c, 20),
+                'rsi': indicators.rsi(c),
+                'atr': indicators.atr(h, l, c),
+                'macd': indicators.macd(c)['histogram'],
+                'bb': indicators.bollinger_bands(c)['upper'],
+                'stoch': indicators.stochastic(h, l, c)['d_percent'],
+            }
+            for name, values in single.items():
+                self.assertEqual(batch[name].shape, self.closes.shape)
+                np.testing.assert_allclose(batch[name][i], values, rtol=1e-12, err_msg=name)
+
+
+class DashboardFeedTests(TransactionTestCase):
+    def _snapshot(self, orders, ticks, metrics=None):
+        return {'active_orders': orders, 'recent_closed': [], 'metrics': metrics or {'total_trades': 0},
+                'latest_ticks': ticks}
+
+    def test_diff_and_coalescing(self):
+        a, b = {'id': 1, 'symbol': 'R_10'}, {'id': 2, 'symbol': 'R_25'}
+        s0 = self._snapshot({1: a}, {'R_10': {'price': 1.0}})
+        s1 = self._snapshot({1: a, 2: b}, {'R_10': {'price': 1.0}, 'R_25': {'price': 2.0}})
+        s2 = self._snapshot({2: {**b, 'take_profit': 3.0}}, {'R_10': {'price': 1.5}, 'R_25': {'price': 2.0}},
+                            metrics={'total_trades': 1})
+        self.assertIsNone(diff_snapshots(s0, s0))
+        d1, d2 = diff_snapshots(s0, s1), diff_snapshots(s1, s2)
+        self.assertEqual(d1, {'active_orders': {'upsert': {2: b}, 'remove': []},
+                              'latest_ticks': {'R_25': {'price': 2.0}}})
+        merged = merge_deltas(d1, d2)
+        self.assertEqual(merged, diff_snapshots(s0, s2) | {'latest_ticks': {'R_10': {'price': 1.5},
+                                                                            'R_25': {'price': 2.0}}})
+        self.assertEqual(merged['active_orders'], {'upsert': {2: {**b, 'take_profit': 3.0}}, 'remove': [1]})
+
+    async def test_one_snapshot_per_event_and_deltas_to_every_client(self):
+        from asgiref.sync import sync_to_async
+        from channels.layers import get_channel_layer
+        from channels.testing import WebsocketCommunicator
+        from market.consumers import TradingConsumer
+        from market.models import Tick
+        from monitoring.models import OrderAudit
+
+        hub = get_dashboard_hub()
+        # La escritura de la orden ya avisa al hub: la ventana agrupa orden, tick y group_send
+        hub.debounce = 0.3
+        # Sin reconstrucciones periódicas durante el test: se cuentan las del evento
+        hub.local_poll_interval = 60
+        self.addCleanup(setattr, hub, 'local_poll_interval', 2.0)
+        clients = [WebsocketCommunicator(TradingConsumer.as_asgi(), '/ws/trading/') for _ in range(3)]
+        for client in clients:
+            connected, _ = await client.connect()
+            self.assertTrue(connected)
+            initial = await client.receive_json_from()
+            self.assertEqual(initial['type'], 'trading_update')
+            self.assertEqual(initial['data']['active_orders'], [])
+        builds = hub.builds
+
+        order = await sync_to_async(OrderAudit.objects.create)(
+            request_hash='h1', accepted=True, symbol='R_10', action='call', status='active', price=Decimal('10'))
+        await sync_to_async(Tick.objects.create)(symbol='R_10', timestamp=timezone.now(), price=Decimal('10.5'))
+        await get_channel_layer().group_send('trading_updates', {'type': 'trading_update', 'message': {}})
+
+        for client in clients:
+            message = await client.receive_json_from(timeout=2)
+            self.assertEqual(message['type'], 'trading_delta')
+            data = message['data']
+            self.assertEqual([o['id'] for o in data['active_orders']['upsert']], [order.id])
+            self.assertEqual(data['latest_ticks'], {'R_10': {'symbol': 'R_10', 'price': 10.5,
+                                                             'timestamp': data['latest_ticks']['R_10']['timestamp']}})
+            self.assertEqual(data['metrics']['active_trades'], 1)
+            self.assertNotIn('recent_closed', data)
+        self.assertEqual(hub.builds, builds + 1)
+
+        for client in clients:
+            await client.disconnect()
+        self.assertIsNone(hub.snapshot)
+
+    async def test_trade_writes_push_trades_and_balance(self):
+        from asgiref.sync import sync_to_async
+        from channels.testing import WebsocketCommunicator
+        from engine.services.trades_read_model import refresh_trades_snapshot
+        from market.consumers import TradingConsumer
+        from monitoring.models import OrderAudit
+
+        await sync_to_async(refresh_trades_snapshot)(Decimal('100'))
+        hub = get_dashboard_hub()
+        hub.debounce = 0.01
+        client = WebsocketCommunicator(TradingConsumer.as_asgi(), '/ws/trading/')
+        await client.connect()
+        initial = (await client.receive_json_from())['data']
+        self.assertEqual((initial['trades']['active'], initial['balance']), ([], {'balance': 100.0, 'currency': 'USD'}))
+
+        # Sin group_send: la señal de OrderAudit avisa al hub del proceso
+        await sync_to_async(OrderAudit.objects.create)(
+            request_hash='h2', accepted=True, symbol='R_25', action='put', status='pending', size=Decimal('1'))
+        data = (await client.receive_json_from(timeout=2))['data']
+        self.assertEqual([t['symbol'] for t in data['trades']['active']], ['R_25'])
+        self.assertNotIn('balance', data)
+
+        # El trading loop publica un balance nuevo
+        await sync_to_async(refresh_trades_snapshot)(Decimal('101.5'))
+        hub.request_refresh()
+        data = (await client.receive_json_from(timeout=2))['data']
+        self.assertEqual(data['balance'], {'balance': 101.5, 'currency': 'USD'})
+        self.assertNotIn('trades', data)
+        await client.disconnect()
+
+    async def test_subscribe_during_stop_keeps_hub_running(self):
+        import asyncio
+        from asgiref.sync import sync_to_async
+        from channels.layers import get_channel_layer
+        from market.models import Tick
+
+        class Client:
+            def __init__(self):
+                self.deltas = []
+
+            def push_delta(self, delta, version):
+                self.deltas.append(delta)
+
+        hub = get_dashboard_hub()
+        hub.debounce = 0.01
+        first, second = Client(), Client()
+        await hub.subscribe(first)
+        # El último cliente se va mientras otro conecta: la parada no debe dejar al nuevo sin hub
+        await asyncio.gather(hub.unsubscribe(first), hub.subscribe(second))
+        self.assertTrue(hub._tasks)
+        self.assertIsNotNone(hub._channel)
+        self.assertIsNotNone(hub.snapshot)
+
+        await sync_to_async(Tick.objects.create)(symbol='R_50', timestamp=timezone.now(), price=Decimal('5'))
+        await get_channel_layer().group_send('trading_updates', {'type': 'trading_update', 'message': {}})
+        for _ in range(200):
+            if second.deltas:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(list(second.deltas[0]['latest_ticks']), ['R_50'])
+        await hub.unsubscribe(second)
+        self.assertFalse(hub._tasks)
+
+    async def test_in_memory_layer_polls_changes_from_other_processes(self):
+        from asgiref.sync import sync_to_async
+        from channels.testing import WebsocketCommunicator
+        from engine.services.trades_read_model import refresh_trades_snapshot, set_snapshot_balance
+        from market.consumers import TradingConsumer
+
+        await sync_to_async(refresh_trades_snapshot)(Decimal('100'))
+        hub = get_dashboard_hub()
+        hub.debounce, hub.local_poll_interval = 0.01, 0.05
+        self.addCleanup(setattr, hub, 'local_poll_interval', 2.0)
+        client = WebsocketCommunicator(TradingConsumer.as_asgi(), '/ws/trading/')
+        await client.connect()
+        await client.receive_json_from()
+
+        # El trading loop (otro proceso) solo escribe en la BD: ningún aviso llega a este hub
+        await sync_to_async(set_snapshot_balance)(Decimal('99'))
+        data = (await client.receive_json_from(timeout=2))['data']
+        self.assertEqual(data['balance'], {'balance': 99.0, 'currency': 'USD'})
+        await client.disconnect()
@@ -0,0 +1,146 @@
+"""
+Agregados incrementales de resultados de operaciones
+Cada trade aceptado y liquidado (won/lost) cuenta en su TradeOutcomeBucket horario;
+si se vuelve a liquidar (reconciliación, edición del pnl) se resta el resultado
+anterior y se suma el nuevo. Las estadísticas leen los buckets de la ventana en
+vez de recorrer OrderAudit.
+"""
+
+from __future__ import annotations
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from django.db.models import F, Sum
+from django.db.models.functions import ExtractHour, TruncHour
+
+from monitoring.models import OrderAudit, TradeOutcomeBucket
+from monitoring.signals import SETTLED_STATUSES
+
+_TOTAL_FIELDS = ('won', 'lost', 'won_pnl_count', 'lost_pnl_count', 'won_pnl', 'lost_pnl', 'pnl_sq')
+
+# (hora del bucket, símbolo, estado, pnl)
+Outcome = Tuple[datetime, str, str, Optional[Decimal]]
+
+
+def bucket_hour(timestamp: datetime) -> datetime:
+    """Inicio de la hora UTC que contiene `timestamp`"""
+    return timestamp.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def settled_outcome(values: Mapping[str, Any]) -> Optional[Outcome]:
+    """
+    Lo que un trade aporta a los buckets, a partir de sus campos (`instance.__dict__`)
+
+    Returns:
+        None si no cuenta: no liquidado, o rechazado (`accepted=False`, sin contrato en Deriv)
+    """
+    status = values.get('status')
+    timestamp = values.get('timestamp')
+    if status not in SETTLED_STATUSES or timestamp is None or values.get('accepted') is False:
+        return None
+    pnl = values.get('pnl')
+    return bucket_hour(timestamp), values.get('symbol') or '', status, None if pnl is None else Decimal(str(pnl))
+
+
+def _apply(outcome: Outcome, sign: int) -> None:
+    hour, symbol, side, pnl = outcome
+    updates: Dict[str, Any] = {side: F(side) + sign}
+    if pnl is not None:
+        updates[f'{side}_pnl_count'] = F(f'{side}_pnl_count') + sign
+        updates[f'{side}_pnl'] = F(f'{side}_pnl') + sign * pnl
+        updates['pnl_sq'] = F('pnl_sq') + sign * float(pnl) ** 2
+    bucket, _ = TradeOutcomeBucket.objects.get_or_create(hour=hour, symbol=symbol)
+    TradeOutcomeBucket.objects.filter(pk=bucket.pk).update(**updates)
+
+
+def record_outcome_change(previous: Optional[Outcome], current: Optional[Outcome]) -> None:
+    """Restar el resultado anterior y sumar el nuevo (incrementos atómicos con F())"""
+    if previous == current:
+        return
+    if previous is not None:
+        _apply(previous, -1)
+    if current is not None:
+        _apply(current, 1)
+
+
+def record_removal(outcome: Optional[Outcome]) -> None:
+    """Restar un trade liquidado que se elimina de OrderAudit (limpiezas y reinicios)"""
+    record_outcome_change(outcome, None)
+
+
+def rebuild_outcome_buckets(order_model=OrderAudit, bucket_model=TradeOutcomeBucket) -> int:
+    """
+    Reconstruir todos los buckets desde OrderAudit (migración inicial o reparación)
+
+    Returns:
+        Número de buckets creados
+    """
+    buckets: Dict[tuple, Any] = {}
+    rows = (
+        order_model.objects.filter(status__in=SETTLED_STATUSES, accepted=True)
+        .annotate(bucket=TruncHour('timestamp', tzinfo=dt_timezone.utc))
+        .values_list('bucket', 'symbol', 'status', 'pnl')
+        .iterator()
+    )
+    for hour, symbol, status, pnl in rows:
+        key = (hour, symbol or '')
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = bucket_model(hour=hour, symbol=symbol or '', won_pnl=Decimal('0'),
+                                                 lost_pnl=Decimal('0'), pnl_sq=0.0)
+        setattr(bucket, status, getattr(bucket, status) + 1)
+        if pnl is not None:
+            pnl = Decimal(str(pnl))
+            setattr(bucket, f'{status}_pnl_count', getattr(bucket, f'{status}_pnl_count') + 1)
+            setattr(bucket, f'{status}_pnl', getattr(bucket, f'{status}_pnl') + pnl)
+            bucket.pnl_sq += float(pnl) ** 2
+
+    bucket_model.objects.all().delete()
+    bucket_model.objects.bulk_create(buckets.values(), batch_size=500)
+    return len(buckets)
+
+
+def outcome_totals(since: Optional[datetime] = None, symbol: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Totales de la ventana [since, ahora] (granularidad horaria: incluye la hora de `since`)
+
+    Returns:
+        Dict con won, lost, won_pnl_count, lost_pnl_count, won_pnl, lost_pnl (Decimal) y pnl_sq
+    """
+    buckets = TradeOutcomeBucket.objects.all()
+    if since is not None:
+        buckets = buckets.filter(hour__gte=bucket_hour(since))
+    if symbol:
+        buckets = buckets.filter(symbol=symbol)
+    totals = buckets.aggregate(**{name: Sum(name) for name in _TOTAL_FIELDS})
+    for name in _TOTAL_FIELDS:
+        if totals[name] is None:
+            totals[name] = Decimal('0') if name.endswith('_pnl') else 0
+    return totals
+
+
+def hourly_outcomes(since: Optional[datetime] = None) -> Dict[int, Dict[str, Any]]:
+    """
+    Totales por hora del día UTC (0-23)
+
+    Returns:
+        {hora: {'won': int, 'lost': int, 'pnl': Decimal}}
+    """
+    buckets = TradeOutcomeBucket.objects.all()
+    if since is not None:
+        buckets = buckets.filter(hour__gte=bucket_hour(since))
+    rows = (
+        buckets.annotate(hour_of_day=ExtractHour('hour', tzinfo=dt_timezone.utc))
+        .values('hour_of_day')
+        .annotate(won_total=Sum('won'), lost_total=Sum('lost'),
+                  won_pnl_total=Sum('won_pnl'), lost_pnl_total=Sum('lost_pnl'))
+    )
+    return {
+        row['hour_of_day']: {
+            'won': row['won_total'] or 0,
+            'lost': row['lost_total'] or 0,
+            'pnl': (row['won_pnl_total'] or Decimal('0')) + (row['lost_pnl_total'] or Decimal('0')),
+        }
+        for row in rows
+    }
@@ -1,6 +1,8 @@
-from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, generate_latest
+from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, generate_latest, start_http_server
+from contextlib import contextmanager
 import hashlib
 import json
+import time
 
 
 # Métricas Prometheus
@@ -9,6 +11,30 @@ ORDER_LATENCY = Histogram('order_latency_seconds', 'Order execution latency')
 PNL_GAUGE = Gauge('pnl_total', 'Total P&L')
 DRAWDOWN_GAUGE = Gauge('max_drawdown_percent', 'Maximum drawdown percentage')
 WINRATE_GAUGE = Gauge('winrate_percent', 'Win rate percentage')
+TICK_FLUSH_LATENCY = Histogram(
+    'tick_flush_latency_seconds', 'Tick batch flush latency',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+TICK_FLUSH_ROWS = Histogram(
+    'tick_flush_rows', 'Ticks written per batch flush',
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+TICKS_DROPPED = Counter('ticks_dropped_total', 'Ticks dropped by the tick writer', ['reason'])
+
+# Latencia del camino tick → orden (etiquetas por clase de símbolo para acotar cardinalidad)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_LATENCY = Histogram(
+    'trading_stage_latency_seconds', 'Latency per stage of the tick-to-order path',
+    ['stage', 'symbol_class'], buckets=LATENCY_BUCKETS
+)
+STRATEGY_LATENCY = Histogram(
+    'strategy_analysis_seconds', 'analyze_symbol time per strategy class',
+    ['strategy', 'symbol_class'], buckets=LATENCY_BUCKETS
+)
+TICK_AGE = Histogram(
+    'tick_age_seconds', 'Age of the newest tick when a symbol is evaluated',
+    ['symbol_class'], buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
 
 
 def hash_payload(payload: dict) -> str:
@@ -27,6 +53,91 @@ def record_latency(seconds: float):
     ORDER_LATENCY.observe(seconds)
 
 
+def record_tick_flush(seconds: float, rows: int):
+    """Registra latencia y tamaño de un flush de ticks"""
+    TICK_FLUSH_LATENCY.observe(seconds)
+    TICK_FLUSH_ROWS.observe(rows)
+
+
+def record_tick_dropped(reason: str, count: int = 1):
+    """Registra ticks descartados por el escritor de ticks"""
+    TICKS_DROPPED.labels(reason=reason).inc(count)
+
+
+def symbol_class(symbol: str) -> str:
+    """Clase del símbolo para etiquetas (forex, volatility, jump, step, boom_crash, crypto, other)"""
+    if symbol.startswith('frx'):
+        return 'forex'
+    if symbol.startswith(('R_', '1HZ')):
+        return 'volatility'
+    if symbol.startswith('JD'):
+        return 'jump'
+    if symbol.startswith(('stpRNG', 'STEP')):
+        return 'step'
+    if symbol.startswith(('BOOM', 'CRASH')):
+        return 'boom_crash'
+    if symbol.startswith('cry'):
+        return 'crypto'
+    return 'other'
+
+
+def record_stage(stage: str, symbol: str, seconds: float):
+    """Registra la duración de una etapa del camino tick → orden"""
+    STAGE_LATENCY.labels(stage=stage, symbol_class=symbol_class(symbol)).observe(seconds)
+
+
+@contextmanager
+def stage_timer(stage: str, symbol: str):
+    """Mide el bloque como etapa `stage` (se registra aunque el bloque falle)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, symbol, time.perf_counter() - start)
+
+
+def record_strategy_time(strategy: str, symbol: str, seconds: float):
+    """Registra el tiempo de analyze_symbol de una estrategia"""
+    STRATEGY_LATENCY.labels(strategy=strategy, symbol_class=symbol_class(symbol)).observe(seconds)
+
+
+def record_tick_age(symbol: str, seconds: float):
+    """Registra la antigüedad del último tick al evaluar el símbolo"""
+    TICK_AGE.labels(symbol_class=symbol_class(symbol)).observe(max(seconds, 0.0))
+
+
+class QueryTimer:
+    """
+    Acumula el tiempo de las consultas de BD del hilo actual mientras está activo
+    (via `connection.execute_wrapper`) y lo registra como etapa `db` al salir
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.seconds = 0.0
+        self.queries = 0
+        self._wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+    def __enter__(self):
+        from django.db import connection
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._wrapper.__exit__(*exc)
+        record_stage('db', self.symbol, self.seconds)
+        return False
+
+
 def update_pnl_metrics(pnl: float, drawdown: float, winrate: float):
     """Actualiza métricas de P&L"""
     PNL_GAUGE.set(pnl)
@@ -37,3 +148,19 @@ def update_pnl_metrics(pnl: float, drawdown: float, winrate: float):
 def get_metrics():
     """Devuelve métricas en formato Prometheus"""
     return generate_latest()
+
+
+_metrics_server_port = None
+
+
+def start_metrics_server(port: int) -> bool:
+    """
+    Exponer el registro por HTTP desde procesos que no son el servidor web
+    (trading loop): las métricas viven en la memoria de cada proceso
+    """
+    global _metrics_server_port
+    if _metrics_server_port is not None:
+        return _metrics_server_port == port
+    start_http_server(port)
+    _metrics_server_port = port
+    return True
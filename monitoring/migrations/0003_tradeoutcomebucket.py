@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:50
+
+from django.db import migrations, models
+
+
+def backfill_outcome_buckets(apps, schema_editor):
+    from monitoring.aggregates import rebuild_outcome_buckets
+    rebuild_outcome_buckets(
+        order_model=apps.get_model('monitoring', 'OrderAudit'),
+        bucket_model=apps.get_model('monitoring', 'TradeOutcomeBucket'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0002_orderaudit_action_orderaudit_error_message_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeOutcomeBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(db_index=True)),
+                ('symbol', models.CharField(blank=True, max_length=32)),
+                ('won', models.PositiveIntegerField(default=0)),
+                ('lost', models.PositiveIntegerField(default=0)),
+                ('won_pnl_count', models.PositiveIntegerField(default=0)),
+                ('lost_pnl_count', models.PositiveIntegerField(default=0)),
+                ('won_pnl', models.DecimalField(decimal_places=8, default=0, max_digits=24)),
+                ('lost_pnl', models.DecimalField(decimal_places=8, default=0, max_digits=24)),
+                ('pnl_sq', models.FloatField(default=0.0)),
+            ],
+            options={
+                'unique_together': {('hour', 'symbol')},
+            },
+        ),
+        migrations.RunPython(backfill_outcome_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0003_tradeoutcomebucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradesSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.TextField(default='')),
+                ('etag', models.CharField(blank=True, max_length=64)),
+                ('balance', models.DecimalField(blank=True, decimal_places=2, max_digits=20, null=True)),
+                ('source_version', models.PositiveBigIntegerField(default=0)),
+                ('built_version', models.PositiveBigIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -26,3 +26,46 @@ class OrderAudit(models.Model):
 
     def __str__(self) -> str:
         return f"OrderAudit {self.symbol} {self.action} {self.status} {self.timestamp.isoformat()}"
+
+
+class TradeOutcomeBucket(models.Model):
+    """
+    Resultados agregados por hora (UTC, según OrderAudit.timestamp) y símbolo.
+    Se actualiza una vez al liquidarse cada operación (ver monitoring.aggregates),
+    así las estadísticas no escanean OrderAudit completo.
+    """
+    hour = models.DateTimeField(db_index=True)
+    symbol = models.CharField(max_length=32, blank=True)
+    won = models.PositiveIntegerField(default=0)
+    lost = models.PositiveIntegerField(default=0)
+    # Solo operaciones con pnl registrado
+    won_pnl_count = models.PositiveIntegerField(default=0)
+    lost_pnl_count = models.PositiveIntegerField(default=0)
+    won_pnl = models.DecimalField(max_digits=24, decimal_places=8, default=0)
+    lost_pnl = models.DecimalField(max_digits=24, decimal_places=8, default=0)
+    pnl_sq = models.FloatField(default=0.0)  # Σ pnl² (desviación estándar)
+
+    class Meta:
+        unique_together = ('hour', 'symbol')
+
+    def __str__(self) -> str:
+        return f"TradeOutcomeBucket {self.symbol} {self.hour.isoformat()} {self.won}W/{self.lost}L"
+
+
+class TradesSnapshot(models.Model):
+    """
+    Read-model de /engine/trades/ (fila única, pk=1): el JSON ya serializado de
+    operaciones y métricas, con su ETag. Lo reconstruye el trading loop cada ciclo
+    (con el balance real) o la vista cuando quedó desactualizado.
+    `source_version` sube con cada escritura de OrderAudit; el snapshot está al día
+    si `built_version` coincide.
+    """
+    payload = models.TextField(default='')
+    etag = models.CharField(max_length=64, blank=True)
+    balance = models.DecimalField(max_digits=20, decimal_places=2, null=True, blank=True)
+    source_version = models.PositiveBigIntegerField(default=0)
+    built_version = models.PositiveBigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"TradesSnapshot v{self.built_version}/{self.source_version} {self.etag}"
@@ -0,0 +1,60 @@
+"""
+Señales de dominio sobre OrderAudit
+`trade_settled` se emite cuando una operación pasa a won/lost y cada vez que
+cambia un resultado ya liquidado (reconciliación, corrección del pnl)
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
+
+from monitoring.models import OrderAudit, TradesSnapshot
+
+SETTLED_STATUSES = ('won', 'lost')
+
+# Argumentos: instance (OrderAudit), previous_status (estado antes de guardarse o None)
+trade_settled = Signal()
+
+
+@receiver(post_init, sender=OrderAudit, dispatch_uid='monitoring_remember_status')
+def _remember_status(sender, instance, **kwargs):
+    from monitoring.aggregates import settled_outcome
+    # Leer del __dict__ para no disparar una consulta si algún campo está diferido
+    instance._persisted_status = instance.__dict__.get('status') if instance.pk else None
+    instance._persisted_outcome = settled_outcome(instance.__dict__) if instance.pk else None
+
+
+@receiver(post_save, sender=OrderAudit, dispatch_uid='monitoring_emit_trade_settled')
+def _emit_trade_settled(sender, instance, **kwargs):
+    from monitoring.aggregates import record_outcome_change, settled_outcome
+    status = instance.__dict__.get('status')
+    if status is None:
+        return
+    previous_status = getattr(instance, '_persisted_status', None)
+    previous_outcome = getattr(instance, '_persisted_outcome', None)
+    outcome = settled_outcome(instance.__dict__)
+    instance._persisted_status = status
+    instance._persisted_outcome = outcome
+    if outcome == previous_outcome:
+        return
+    # Buckets antes del aviso: los listeners leen los agregados ya actualizados
+    record_outcome_change(previous_outcome, outcome)
+    if status in SETTLED_STATUSES:
+        trade_settled.send(sender=sender, instance=instance, previous_status=previous_status)
+
+
+@receiver(post_delete, sender=OrderAudit, dispatch_uid='monitoring_remove_outcome_bucket')
+def _remove_outcome_bucket(sender, instance, **kwargs):
+    from monitoring.aggregates import record_removal
+    record_removal(getattr(instance, '_persisted_outcome', None))
+
+
+@receiver(post_save, sender=OrderAudit, dispatch_uid='monitoring_invalidate_trades_snapshot')
+@receiver(post_delete, sender=OrderAudit, dispatch_uid='monitoring_invalidate_trades_snapshot_delete')
+def _invalidate_trades_snapshot(sender, instance, **kwargs):
+    # Una sola UPDATE: la próxima lectura de /engine/trades/ reconstruye el snapshot
+    TradesSnapshot.objects.filter(pk=1).update(source_version=F('source_version') + 1)
+    # Los dashboards conectados reciben el cambio por WebSocket (tras el commit, sin bloquear)
+    from market.live_feed import notify_dashboard
+    transaction.on_commit(notify_dashboard)
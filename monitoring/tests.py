@@ -1,3 +1,113 @@
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from monitoring.aggregates import hourly_outcomes, outcome_totals, rebuild_outcome_buckets
+from monitoring.metrics import QueryTimer, stage_timer, symbol_class
+from monitoring.models import OrderAudit, TradeOutcomeBucket
+
+
+class TradeOutcomeAggregateTests(TestCase):
+    def _trade(self, symbol, pnl, minutes_ago, status='active'):
+        trade = OrderAudit.objects.create(
+            timestamp=timezone.now() - timezone.timedelta(minutes=minutes_ago),
+            request_hash=f'{symbol}-{minutes_ago}', accepted=True, symbol=symbol, status=status,
+        )
+        trade.pnl = Decimal(pnl)
+        trade.status = 'won' if trade.pnl > 0 else 'lost'
+        trade.save()
+        return trade
+
+    def test_settlement_updates_buckets_once(self):
+        trade = self._trade('R_10', '0.95', 5)
+        self._trade('R_10', '-1', 5 + 60 * 24 * 40)  # fuera de la ventana de 30 días
+        self._trade('R_25', '-1', 3)
+        trade.save()  # Guardar de nuevo no vuelve a contar el trade
+
+        totals = outcome_totals(timezone.now() - timezone.timedelta(days=30))
+        self.assertEqual((totals['won'], totals['lost']), (1, 1))
+        self.assertEqual(totals['won_pnl'] + totals['lost_pnl'], Decimal('-0.05'))
+        self.assertEqual(outcome_totals(symbol='R_10')['lost'], 1)
+        hour = trade.timestamp.astimezone(dt_timezone.utc).hour
+        self.assertEqual(hourly_outcomes(timezone.now() - timezone.timedelta(days=30))[hour]['won'], 1)
+
+        from engine.services.advanced_capital_manager import AdvancedCapitalManager
+        stats = AdvancedCapitalManager().get_trading_statistics()
+        self.assertEqual(stats['total_trades'], 2)
+        self.assertEqual(stats['avg_win'], Decimal('0.95'))
+        self.assertAlmostEqual(stats['std_dev'], 0.975, places=9)
+
+        # Reconstruir desde OrderAudit da los mismos buckets; borrar un trade lo resta
+        before = list(TradeOutcomeBucket.objects.order_by('hour', 'symbol').values_list(
+            'hour', 'symbol', 'won', 'lost', 'won_pnl', 'lost_pnl'))
+        rebuild_outcome_buckets()
+        after = list(TradeOutcomeBucket.objects.order_by('hour', 'symbol').values_list(
+            'hour', 'symbol', 'won', 'lost', 'won_pnl', 'lost_pnl'))
+        self.assertEqual(before, after)
+        OrderAudit.objects.filter(symbol='R_25').delete()
+        self.assertEqual(outcome_totals()['lost'], 1)
+
+    def test_resettlement_moves_trade_between_outcomes(self):
+        trade = self._trade('R_50', '-1', 5)
+        self.assertEqual((outcome_totals()['lost'], outcome_totals()['lost_pnl']), (1, Decimal('-1')))
+
+        # Reconciliación posterior: el contrato se había ganado
+        trade = OrderAudit.objects.get(pk=trade.pk)
+        trade.status, trade.pnl = 'won', Decimal('0.9')
+        trade.save(update_fields=['status', 'pnl'])
+        totals = outcome_totals()
+        self.assertEqual((totals['won'], totals['won_pnl'], totals['lost'], totals['lost_pnl']),
+                         (1, Decimal('0.9'), 0, Decimal('0')))
+
+        # Corrección del pnl sin cambiar el estado
+        trade.pnl = Decimal('0.95')
+        trade.save(update_fields=['pnl'])
+        self.assertEqual(outcome_totals()['won_pnl'], Decimal('0.95'))
+        self.assertAlmostEqual(outcome_totals()['pnl_sq'], 0.95 ** 2, places=9)
+
+    def test_rejected_orders_are_not_counted(self):
+        OrderAudit.objects.create(request_hash='rej', accepted=False, symbol='R_75', status='lost', pnl=Decimal('-1'))
+        self.assertEqual(outcome_totals()['lost'], 0)
+        rebuild_outcome_buckets()
+        self.assertEqual(outcome_totals()['lost'], 0)
+
+
+class StageLatencyMetricsTests(TestCase):
+    def _count(self, stage, cls):
+        return REGISTRY.get_sample_value(
+            'trading_stage_latency_seconds_count', {'stage': stage, 'symbol_class': cls}) or 0
+
+    def test_symbol_class(self):
+        self.assertEqual(symbol_class('frxEURUSD'), 'forex')
+        self.assertEqual(symbol_class('R_100'), 'volatility')
+        self.assertEqual(symbol_class('1HZ75V'), 'volatility')
+        self.assertEqual(symbol_class('JD25'), 'jump')
+        self.assertEqual(symbol_class('BOOM1000'), 'boom_crash')
+        self.assertEqual(symbol_class('cryBTCUSD'), 'crypto')
+        self.assertEqual(symbol_class('XYZ'), 'other')
+
+    def test_stage_timer_records_even_on_error(self):
+        before = self._count('balance', 'jump')
+        with self.assertRaises(RuntimeError):
+            with stage_timer('balance', 'JD10'):
+                raise RuntimeError('boom')
+        self.assertEqual(self._count('balance', 'jump'), before + 1)
+
+    def test_query_timer_accumulates_db_time(self):
+        before = self._count('db', 'forex')
+        with QueryTimer('frxGBPUSD') as timer:
+            list(OrderAudit.objects.all())
+            OrderAudit.objects.count()
+        self.assertEqual(timer.queries, 2)
+        self.assertGreater(timer.seconds, 0)
+        self.assertEqual(self._count('db', 'forex'), before + 1)
 
-# Create your tests here.
+    def test_prometheus_endpoint(self):
+        with stage_timer('risk_checks', 'R_10'):
+            pass
+        response = self.client.get('/engine/metrics/prometheus/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'trading_stage_latency_seconds_bucket', response.content)
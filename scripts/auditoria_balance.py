@@ -18,6 +18,7 @@ from django.contrib.auth import get_user_model
 from connectors.deriv_client import DerivClient
 from trading_bot.models import DerivAPIConfig
 from engine.views import get_balance
+from asgiref.sync import async_to_sync
 from django.test import RequestFactory
 from django.contrib.auth.models import AnonymousUser
 
@@ -133,7 +134,8 @@ try:
     else:
         request.user = AnonymousUser()
     
-    response = get_balance(request)
+    # La vista es async: ejecutarla en su propio event loop
+    response = async_to_sync(get_balance)(request)
     
     if hasattr(response, 'content'):
         import json
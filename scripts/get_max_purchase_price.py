@@ -8,7 +8,6 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
 from connectors.deriv_client import DerivClient
-import json
 import time
 
 print("=" * 80)
@@ -35,7 +34,6 @@ for symbol, contract_type, duration in symbols_to_test:
     
     for test_amount in amounts_to_test:
         try:
-            client.response_event.clear()
             req = {
                 "proposal": 1,
                 "amount": float(test_amount),
@@ -46,11 +44,8 @@ for symbol, contract_type, duration in symbols_to_test:
                 "duration_unit": "s",
                 "symbol": symbol,
             }
-            client.ws.send(json.dumps(req))
-            
-            if client.response_event.wait(timeout=5):
-                data = client.response_data
-                
+            data = client.send_request(req, timeout=5)
+            if data is not None:
                 if data.get("error"):
                     error_code = data['error'].get('code', '')
                     if 'maximum purchase price' in str(data['error']).lower():
@@ -1,59 +1,53 @@
 import asyncio
-import json
-import websockets
 from decimal import Decimal
 from datetime import datetime
 import logging
 
+from connectors.deriv_connector import get_connector
+
 logger = logging.getLogger(__name__)
 
 
 class DerivAPI:
-    """Cliente para interactuar con la API de Deriv mediante WebSocket"""
+    """
+    Cliente async de Deriv sobre el pool compartido del proceso
+    (connectors.deriv_connector): no abre sockets propios ni repite el handshake
+    """
     
     def __init__(self, api_token, app_id="1089", is_demo=True):
         self.api_token = api_token
         self.app_id = app_id
         self.is_demo = is_demo
-        self.ws_url = f"wss://ws.derivws.com/websockets/v3?app_id={app_id}"
-        self.ws = None
+        self.connector = None
         self.account_info = None
         self.balance = None
         
     async def connect(self):
-        """Conectar al WebSocket de Deriv"""
+        """Conectar al pool de Deriv y autorizar"""
         try:
-            self.ws = await websockets.connect(self.ws_url)
-            logger.info(f"Conectado a Deriv WebSocket")
-            
-            # Autorizar con el token
+            self.connector = get_connector(self.api_token, self.app_id)
             await self.authorize()
+            logger.info(f"Conectado a Deriv WebSocket")
             return True
         except Exception as e:
             logger.error(f"Error al conectar con Deriv: {e}")
             return False
     
     async def disconnect(self):
-        """Desconectar del WebSocket"""
-        if self.ws:
-            await self.ws.close()
-            logger.info("Desconectado de Deriv WebSocket")
+        """Soltar el pool (las conexiones son compartidas y siguen abiertas)"""
+        self.connector = None
     
-    async def send_request(self, request):
-        """Enviar una petición al WebSocket"""
-        if not self.ws:
+    async def send_request(self, request, timeout=10):
+        """Enviar una petición y esperar su respuesta (multiplexada por req_id)"""
+        if not self.connector:
             raise Exception("No conectado al WebSocket")
-        
-        await self.ws.send(json.dumps(request))
-        response = await self.ws.recv()
-        return json.loads(response)
+        return await self.connector.arequest(request, timeout)
     
     async def authorize(self):
-        """Autorizar la conexión con el token de API"""
-        request = {
-            "authorize": self.api_token
-        }
-        response = await self.send_request(request)
+        """Obtener la respuesta de authorize del pool (espera el handshake real)"""
+        response = await asyncio.to_thread(self.connector.start)
+        if response is None:
+            raise Exception("Timeout esperando autorización")
         
         if 'error' in response:
             raise Exception(f"Error de autorización: {response['error']['message']}")
@@ -165,12 +159,23 @@ class DerivAPI:
             "subscribe": 1
         }
         
-        await self.ws.send(json.dumps(request))
+        # El callback del stream corre en el hilo del conector: reenviar a este loop
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        try:
+            first = await asyncio.wrap_future(
+                self.connector.subscribe(request, lambda data: loop.call_soon_threadsafe(queue.put_nowait, data))
+            )
+        except (TimeoutError, ConnectionError) as e:
+            raise Exception(f"Error al suscribirse a ticks de {symbol}: {e}")
+        if 'error' in first:
+            raise Exception(f"Error al suscribirse a ticks: {first['error']['message']}")
+        subscription_id = (first.get('subscription') or {}).get('id')
         
         while True:
             try:
-                response = await asyncio.wait_for(self.ws.recv(), timeout=60)
-                data = json.loads(response)
+                data = await asyncio.wait_for(queue.get(), timeout=60)
+                subscription_id = (data.get('subscription') or {}).get('id', subscription_id)
                 
                 if 'tick' in data:
                     await callback(data['tick'])
@@ -183,6 +188,9 @@ class DerivAPI:
             except Exception as e:
                 logger.error(f"Error en suscripción a ticks: {e}")
                 break
+        
+        if subscription_id:
+            self.connector.forget(subscription_id)
     
     async def get_account_statement(self, limit=50):
         """Obtener el estado de cuenta"""
@@ -24,6 +24,12 @@ class DerivAPIConfig(models.Model):
     def __str__(self):
         return f"{self.user.username} - {'Demo' if self.is_demo else 'Real'}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # get_deriv_client() cachea la configuración activa
+        from connectors.deriv_client import clear_active_config_cache
+        clear_active_config_cache()
+
 
 class TradingStrategy(models.Model):
     """Estrategias de trading predefinidas"""